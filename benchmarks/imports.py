@@ -0,0 +1,95 @@
+"""Benchmark the time taken to import cagey and start its commands.
+
+Each case runs in a fresh Python process, so nothing is imported
+before it starts. Importing every submodule of :mod:`cagey` shows what
+``import cagey`` cost before its submodules were imported lazily.
+
+Run with::
+
+    python benchmarks/imports.py
+"""
+
+import statistics
+import subprocess
+import sys
+import time
+from typing import Annotated
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+HEAVY_MODULES = ("nmrglue", "numpy", "polars", "pyopenms", "rdkit")
+"""Dependencies which take long to import."""
+
+_RUN_APP = "from cagey._internal.scripts.cagey import app; app()"
+
+CASES = {
+    "import cagey": ["-c", "import cagey"],
+    "import every cagey submodule": [
+        "-c",
+        "import cagey; [getattr(cagey, name) for name in cagey.__all__]",
+    ],
+    "cagey help intro": ["-c", _RUN_APP, "help", "intro"],
+    "cagey stats --help": ["-c", _RUN_APP, "stats", "--help"],
+    "cagey export --help": ["-c", _RUN_APP, "export", "--help"],
+    "cagey ms --help": ["-c", _RUN_APP, "ms", "--help"],
+    "cagey --help": ["-c", _RUN_APP, "--help"],
+}
+"""The arguments given to the Python interpreter by each case."""
+
+
+def main(
+    repeat: Annotated[
+        int, typer.Option(help="Number of times to run each case.")
+    ] = 5,
+) -> None:
+    """Benchmark importing cagey and starting its commands."""
+    console = Console()
+    table = Table(title="Import Benchmarks", header_style="bold magenta")
+    table.add_column("case", style="green")
+    table.add_column("min (s)", style="blue")
+    table.add_column("median (s)", style="blue")
+    table.add_column("heavy modules imported")
+    with console.status("[bold green]Running cases...") as status:
+        for name, arguments in CASES.items():
+            status.update(f"[bold green]Running {name}...")
+            seconds = [_run(arguments) for _ in range(repeat)]
+            table.add_row(
+                name,
+                f"{min(seconds):.3f}",
+                f"{statistics.median(seconds):.3f}",
+                ", ".join(_heavy_modules(arguments)),
+            )
+    console.print(table)
+
+
+def _run(arguments: list[str]) -> float:
+    start = time.perf_counter()
+    subprocess.run(  # noqa: S603
+        [sys.executable, *arguments],
+        check=True,
+        capture_output=True,
+    )
+    return time.perf_counter() - start
+
+
+def _heavy_modules(arguments: list[str]) -> list[str]:
+    # -X importtime writes a line for each imported module to stderr,
+    # ending in the name of the module.
+    process = subprocess.run(  # noqa: S603
+        [sys.executable, "-X", "importtime", *arguments],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    imported = {
+        line.rsplit("|", 1)[-1].strip()
+        for line in process.stderr.splitlines()
+        if line.startswith("import time:")
+    }
+    return [module for module in HEAVY_MODULES if module in imported]
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,508 @@
+"""Benchmark the read queries on a synthetic database.
+
+Every query is timed, and its plan is checked with ``EXPLAIN QUERY PLAN``.
+Queries which read the whole database may scan an index, but must never
+scan a table. Queries filtered by reaction or precursor must not scan
+at all. The command exits with a non-zero status if any plan fails.
+
+Run with::
+
+    python benchmarks/queries.py
+"""
+
+import json
+import sqlite3
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Annotated, Any
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+import cagey
+from cagey import (
+    MassSpectrumParameters,
+    NmrParameters,
+    ReactionKey,
+    TurbidityParameters,
+)
+
+Query = Callable[[sqlite3.Connection], Any]
+
+_DATA = """
+BEGIN;
+
+WITH RECURSIVE i (n) AS (
+    SELECT 1 UNION ALL SELECT n + 1 FROM i WHERE n < 40
+)
+INSERT INTO precursors (name, smiles)
+SELECT 'Di' || n, 'O=Cc1cccc(C=O)c1' FROM i
+UNION ALL
+SELECT 'Tri' || n, 'NCCN(CCN)CCN' FROM i;
+
+WITH RECURSIVE i (n) AS (
+    SELECT 0 UNION ALL SELECT n + 1 FROM i WHERE n < {num_reactions} - 1
+)
+INSERT INTO reactions (
+    id, experiment, plate, formulation_number, di_name, tri_name
+)
+SELECT
+    n + 1,
+    printf('AB-%02d-%03d', n / 4800 / 100, n / 4800 % 100),
+    n / 48 % 100,
+    n % 48,
+    'Di' || (1 + n % 40),
+    'Tri' || (1 + n / 40 % 40)
+FROM i;
+
+INSERT INTO mass_spectra (id, reaction_id) SELECT id, id FROM reactions;
+INSERT INTO nmr_spectra (id, reaction_id) SELECT id, id FROM reactions;
+
+WITH RECURSIVE i (n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM i WHERE n < 9)
+INSERT INTO mass_spectrum_peaks (
+    mass_spectrum_id, di_count, tri_count, adduct, charge,
+    calculated_mz, spectrum_mz, separation_mz, intensity
+)
+SELECT
+    mass_spectra.id,
+    3,
+    2,
+    'H',
+    1,
+    500 + (mass_spectra.id * 7919 + n * 104729) % 2000,
+    500.1 + (mass_spectra.id * 7919 + n * 104729) % 2000,
+    0.1,
+    1e5
+FROM mass_spectra, i;
+
+INSERT INTO mass_spectrum_topology_assignments (
+    mass_spectrum_peak_id, topology
+)
+SELECT id, '4+6' FROM mass_spectrum_peaks WHERE id % 3 = 0;
+
+WITH RECURSIVE i (n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM i WHERE n < 1)
+INSERT INTO nmr_aldehyde_peaks (nmr_spectrum_id, ppm, amplitude)
+SELECT nmr_spectra.id, 9.5 + (nmr_spectra.id + n * 13) % 100 / 100.0, 10.0
+FROM nmr_spectra, i;
+
+WITH RECURSIVE i (n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM i WHERE n < 2)
+INSERT INTO nmr_imine_peaks (nmr_spectrum_id, ppm, amplitude)
+SELECT nmr_spectra.id, 8.0 + (nmr_spectra.id + n * 17) % 100 / 100.0, 10.0
+FROM nmr_spectra, i;
+
+INSERT INTO turbidity_dissolved_references (reaction_id, dissolved_reference)
+SELECT id, 1.5 FROM reactions;
+
+WITH RECURSIVE i (n) AS (SELECT 0 UNION ALL SELECT n + 1 FROM i WHERE n < 19)
+INSERT INTO turbidity_measurements (reaction_id, time, turbidity)
+SELECT
+    reactions.id,
+    datetime('2023-01-01', '+' || (reactions.id * 60 + n) || ' seconds')
+    || '.000000+00:00',
+    2.0
+FROM reactions, i;
+
+INSERT INTO turbidities (reaction_id, state)
+SELECT id, 'dissolved' FROM reactions;
+
+INSERT INTO ingest_log (reaction_id, kind)
+SELECT reactions.id, kinds.kind
+FROM
+    reactions,
+    (
+        SELECT 'mass_spectrum' AS kind
+        UNION ALL SELECT 'nmr_spectrum'
+        UNION ALL SELECT 'turbidity'
+    ) AS kinds
+ORDER BY reactions.id;
+
+WITH RECURSIVE i (n) AS (
+    SELECT 1 UNION ALL SELECT n + 1 FROM i WHERE n < {num_ingest_runs}
+)
+INSERT INTO ingest_runs (
+    id, command, cagey_version, started_at, wall_seconds, processes,
+    reactions_seconds, mass_spectra_seconds, nmr_seconds, turbidity_seconds
+)
+SELECT
+    n,
+    'insert',
+    '0.0.0',
+    strftime('%Y-%m-%dT%H:%M:%S+00:00', '2023-01-01', '+' || n || ' days'),
+    60.0,
+    8,
+    1.0,
+    40.0,
+    15.0,
+    4.0
+FROM i;
+
+INSERT INTO ingest_file_metrics (
+    run_id, kind, path, bytes_read, seconds, peaks, failed, memory_bytes
+)
+SELECT
+    1 + reactions.id % {num_ingest_runs},
+    kinds.kind,
+    printf('%s_%02d_%02d', reactions.experiment, reactions.plate,
+        reactions.formulation_number),
+    100000 + reactions.id % 1000,
+    0.5,
+    10,
+    0,
+    NULL
+FROM
+    reactions,
+    (
+        SELECT 'mass_spectrum' AS kind
+        UNION ALL SELECT 'nmr_spectrum'
+        UNION ALL SELECT 'turbidity'
+    ) AS kinds
+ORDER BY reactions.id;
+
+INSERT INTO reprocessed_reactions (parameter_set_id, reaction_id)
+SELECT parameter_sets.id, reactions.id
+FROM
+    reactions,
+    (
+        SELECT {mass_spectrum_parameter_set_id} AS id
+        UNION ALL SELECT {nmr_parameter_set_id}
+        UNION ALL SELECT {turbidity_parameter_set_id}
+    ) AS parameter_sets;
+
+INSERT INTO reprocessed_mass_spectrum_peaks (
+    parameter_set_id, reaction_id, di_count, tri_count, adduct, charge,
+    calculated_mz, spectrum_mz, separation_mz, intensity, topology
+)
+SELECT
+    {mass_spectrum_parameter_set_id},
+    mass_spectra.reaction_id,
+    di_count,
+    tri_count,
+    adduct,
+    charge,
+    calculated_mz,
+    spectrum_mz,
+    separation_mz,
+    intensity,
+    CASE WHEN mass_spectrum_peaks.id % 3 = 0 THEN '4+6' END
+FROM
+    mass_spectrum_peaks
+INNER JOIN
+    mass_spectra ON mass_spectrum_peaks.mass_spectrum_id = mass_spectra.id;
+
+INSERT INTO reprocessed_nmr_peaks (
+    parameter_set_id, reaction_id, kind, ppm, amplitude
+)
+SELECT
+    {nmr_parameter_set_id}, nmr_spectra.reaction_id, 'aldehyde', ppm, amplitude
+FROM
+    nmr_aldehyde_peaks
+INNER JOIN nmr_spectra ON nmr_aldehyde_peaks.nmr_spectrum_id = nmr_spectra.id
+UNION ALL
+SELECT
+    {nmr_parameter_set_id}, nmr_spectra.reaction_id, 'imine', ppm, amplitude
+FROM
+    nmr_imine_peaks
+INNER JOIN nmr_spectra ON nmr_imine_peaks.nmr_spectrum_id = nmr_spectra.id;
+
+INSERT INTO reprocessed_turbidities (parameter_set_id, reaction_id, state)
+SELECT {turbidity_parameter_set_id}, id, 'dissolved' FROM reactions;
+
+COMMIT;
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class Case:
+    """A benchmarked query.
+
+    Parameters:
+        name: The name of the case.
+        query: Runs the query.
+        filtered: Whether the query reads only part of the database.
+    """
+
+    name: str
+    """The name of the case."""
+    query: Query
+    """Runs the query."""
+    filtered: bool
+    """Whether the query reads only part of the database."""
+
+
+@dataclass(frozen=True, slots=True)
+class Result:
+    """The result of a benchmarked query.
+
+    Parameters:
+        name: The name of the case.
+        rows: The number of rows returned.
+        seconds: The time taken to run the query.
+        scans: The scans in the plans of the query which are not
+            allowed.
+    """
+
+    name: str
+    """The name of the case."""
+    rows: int
+    """The number of rows returned."""
+    seconds: float
+    """The time taken to run the query."""
+    scans: list[str]
+    """The scans in the plans of the query which are not allowed."""
+
+
+def make_database(connection: sqlite3.Connection, num_reactions: int) -> None:
+    """Fill a database with synthetic data.
+
+    Every reaction gets a mass spectrum with 10 peaks, a third of which
+    are assigned a topology, an NMR spectrum with 2 aldehyde and 3 imine
+    peaks, 20 turbidity measurements and the matching change feed
+    entries. The metrics of its files are stored in one of the ingest
+    runs, of which there is one for every 100 reactions, and the
+    default parameter set of each analysis has the same results as the
+    stored spectra and turbidities.
+
+    Parameters:
+        connection: A SQLite connection.
+        num_reactions: The number of reactions to add.
+    """
+    cagey.queries.create_tables(connection)
+    parameter_set_ids = {
+        f"{kind}_parameter_set_id": cagey.queries.insert_parameter_set(
+            connection, parameters
+        )
+        for kind, parameters in (
+            ("mass_spectrum", MassSpectrumParameters()),
+            ("nmr", NmrParameters()),
+            ("turbidity", TurbidityParameters()),
+        )
+    }
+    connection.executescript(
+        _DATA.format(
+            num_reactions=int(num_reactions),
+            num_ingest_runs=max(1, int(num_reactions) // 100),
+            **parameter_set_ids,
+        )
+    )
+    cagey.queries.rebuild_reaction_summaries(connection)
+
+
+def cases(connection: sqlite3.Connection) -> list[Case]:
+    """Get the benchmarked queries.
+
+    Parameters:
+        connection: A SQLite connection.
+
+    Returns:
+        Every ``*_df`` function of :mod:`cagey.queries`, the same
+        queries filtered by experiment and by precursor,
+        :func:`cagey.queries.mass_spectrum_peaks`, the m/z and ppm range
+        lookups and :func:`cagey.queries.changes_since`.
+    """
+    names = sorted(
+        name.removesuffix("_lazy")
+        for name in cagey.queries.__all__
+        if name.endswith("_lazy")
+    )
+    cases = [
+        Case(
+            f"{name}_df", getattr(cagey.queries, f"{name}_df"), filtered=False
+        )
+        for name in names
+    ]
+    for name in names:
+        lazy = getattr(cagey.queries, f"{name}_lazy")
+        for column, value in (
+            ("experiment", "AB-00-003"),
+            ("di_name", "Di1"),
+            ("tri_name", "Tri1"),
+        ):
+            if column not in lazy(connection).columns:
+                continue
+            cases.append(
+                Case(
+                    f"{name}_lazy {column}={value}",
+                    _filtered(lazy, column, value),
+                    filtered=True,
+                )
+            )
+    cases.append(
+        Case(
+            "mass_spectrum_peaks",
+            lambda connection: list(
+                cagey.queries.mass_spectrum_peaks(
+                    connection, ReactionKey("AB-00-003", 5, 7)
+                )
+            ),
+            filtered=True,
+        )
+    )
+    cases.append(
+        Case(
+            "peaks_in_mz_range",
+            lambda connection: cagey.queries.peaks_in_mz_range(
+                connection, 1234.08, 1234.12
+            ),
+            filtered=True,
+        )
+    )
+    cases.append(
+        Case(
+            "imine_peaks_in_ppm_range",
+            lambda connection: cagey.queries.imine_peaks_in_ppm_range(
+                connection, 8.1, 8.3, min_amplitude=20.0
+            ),
+            filtered=True,
+        )
+    )
+    cases.append(
+        Case(
+            "aldehyde_peaks_in_ppm_range",
+            lambda connection: cagey.queries.aldehyde_peaks_in_ppm_range(
+                connection, 9.6, 9.7
+            ),
+            filtered=True,
+        )
+    )
+    cases.append(
+        Case(
+            "changes_since",
+            lambda connection: list(
+                cagey.queries.changes_since(
+                    connection, cagey.queries.latest_cursor(connection) - 100
+                )
+            ),
+            filtered=True,
+        )
+    )
+    return cases
+
+
+def _filtered(
+    lazy: Callable[[sqlite3.Connection], cagey.queries.LazyQuery],
+    column: str,
+    value: str,
+) -> Query:
+    filters: dict[str, Any] = {column: value}
+
+    def query(connection: sqlite3.Connection) -> Any:
+        return lazy(connection).filter(**filters).collect()
+
+    return query
+
+
+def run(connection: sqlite3.Connection, case: Case) -> Result:
+    """Time a query and check its plans.
+
+    Parameters:
+        connection: A SQLite connection.
+        case: The query.
+
+    Returns:
+        The result.
+    """
+    statements: list[str] = []
+    connection.set_trace_callback(statements.append)
+    try:
+        start = time.perf_counter()
+        result = case.query(connection)
+        seconds = time.perf_counter() - start
+    finally:
+        connection.set_trace_callback(None)
+    scans = [
+        detail
+        for statement in statements
+        for detail in query_plan(connection, statement)
+        if _is_disallowed_scan(detail, filtered=case.filtered)
+    ]
+    return Result(case.name, len(result), seconds, scans)
+
+
+def query_plan(connection: sqlite3.Connection, statement: str) -> list[str]:
+    """Get the plan of a query.
+
+    Parameters:
+        connection: A SQLite connection.
+        statement: The query, with its parameters filled in.
+
+    Returns:
+        The details of each step of the plan.
+    """
+    return [
+        detail
+        for _, _, _, detail in connection.execute(
+            f"EXPLAIN QUERY PLAN {statement}"
+        )
+    ]
+
+
+def _is_disallowed_scan(detail: str, *, filtered: bool) -> bool:
+    if not detail.startswith("SCAN "):
+        return False
+    return filtered or " USING " not in detail
+
+
+def main(
+    reactions: Annotated[
+        int, typer.Option(help="Number of reactions in the database.")
+    ] = 100_000,
+    database: Annotated[
+        Path | None,
+        typer.Option(
+            help="Database to benchmark. It is created if it does not exist."
+        ),
+    ] = None,
+    output: Annotated[
+        Path | None, typer.Option(help="File to write the timings to.")
+    ] = None,
+) -> None:
+    """Benchmark the read queries on a synthetic database."""
+    console = Console()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if database is None:
+            database = Path(temp_dir) / "cagey.db"
+        exists = database.exists()
+        connection = sqlite3.connect(database)
+        if not exists:
+            with console.status("[bold green]Making database..."):
+                make_database(connection, reactions)
+
+        results = []
+        with console.status("[bold green]Running queries...") as status:
+            for case in cases(connection):
+                status.update(f"[bold green]Running {case.name}...")
+                results.append(run(connection, case))
+        connection.close()
+
+    table = Table(title="Query Benchmarks", header_style="bold magenta")
+    table.add_column("query", style="green")
+    table.add_column("rows", style="blue")
+    table.add_column("seconds", style="blue")
+    table.add_column("plan")
+    for result in results:
+        table.add_row(
+            result.name,
+            str(result.rows),
+            f"{result.seconds:.3f}",
+            "\n".join(f"[red]{scan}[/]" for scan in result.scans)
+            or "[green]ok[/]",
+        )
+    console.print(table)
+
+    if output is not None:
+        with output.open("w") as file:
+            json.dump(
+                {result.name: result.seconds for result in results},
+                file,
+                indent=2,
+            )
+    if any(result.scans for result in results):
+        raise typer.Exit(1)
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,116 @@
+"""Benchmark the spectrum similarity index on a synthetic database.
+
+The index is built twice, once for exact searches and once with lists
+for approximate searches, and the mean time of a top-k search is
+reported for each, along with the fraction of the exact neighbours the
+approximate search finds.
+
+Run with::
+
+    python benchmarks/similarity.py
+"""
+
+import sqlite3
+import tempfile
+import time
+from pathlib import Path
+from typing import Annotated
+
+import numpy as np
+import typer
+from queries import make_database
+from rich.console import Console
+from rich.table import Table
+
+import cagey
+
+
+def main(  # noqa: PLR0913
+    reactions: Annotated[
+        int, typer.Option(help="Number of reactions in the database.")
+    ] = 100_000,
+    database: Annotated[
+        Path | None,
+        typer.Option(
+            help="Database to benchmark. It is created if it does not exist."
+        ),
+    ] = None,
+    num_lists: Annotated[
+        int, typer.Option(help="Number of lists of the approximate index.")
+    ] = 316,
+    num_probes: Annotated[
+        int, typer.Option(help="Number of lists to search.")
+    ] = 8,
+    k: Annotated[int, typer.Option("-k")] = 10,
+    num_queries: int = 100,
+) -> None:
+    """Benchmark the spectrum similarity index."""
+    console = Console()
+    with tempfile.TemporaryDirectory() as temp_dir:
+        if database is None:
+            database = Path(temp_dir) / "cagey.db"
+        exists = database.exists()
+        connection = sqlite3.connect(database)
+        if not exists:
+            with console.status("[bold green]Making database..."):
+                make_database(connection, reactions)
+
+        table = Table(
+            title="Similarity Benchmarks", header_style="bold magenta"
+        )
+        table.add_column("index", style="green")
+        table.add_column("build seconds", style="blue")
+        table.add_column("query milliseconds", style="blue")
+        table.add_column("recall", style="blue")
+
+        rng = np.random.default_rng(0)
+        queries: list[np.ndarray] = []
+        exact: list[list[float]] = []
+        for name, lists, probes in (
+            ("exact", 0, None),
+            (f"{num_lists} lists, {num_probes} probes", num_lists, num_probes),
+        ):
+            with console.status(f"[bold green]Building {name} index..."):
+                start = time.perf_counter()
+                index = cagey.queries.SpectrumIndex.build(
+                    connection, Path(temp_dir) / name, num_lists=lists
+                )
+                build_seconds = time.perf_counter() - start
+            if not queries:
+                queries = [
+                    np.asarray(index.vectors[row])
+                    for row in rng.choice(len(index), num_queries)
+                ]
+            start = time.perf_counter()
+            found = [
+                [
+                    similar.similarity
+                    for similar in index.search(query, k, num_probes=probes)
+                ]
+                for query in queries
+            ]
+            query_seconds = (time.perf_counter() - start) / num_queries
+            if not exact:
+                exact = found
+            # Neighbours tied with the k-th exact neighbour are as good as
+            # the exact ones, so recall compares similarities, not reactions.
+            recall = np.mean(
+                [
+                    sum(s >= min(e, default=0) - 1e-6 for s in f)
+                    / max(len(e), 1)
+                    for f, e in zip(found, exact, strict=True)
+                ]
+            )
+            table.add_row(
+                name,
+                f"{build_seconds:.3f}",
+                f"{query_seconds * 1000:.3f}",
+                f"{recall:.3f}",
+            )
+            del index
+        connection.close()
+    console.print(table)
+
+
+if __name__ == "__main__":
+    typer.run(main)
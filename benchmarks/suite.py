@@ -0,0 +1,668 @@
+"""Benchmark the analysis functions, inserts and reads of cagey.
+
+Every case is run a number of times at one of the scales in
+:data:`SCALES`, and the fastest and median times are reported. The
+times can be saved as a JSON baseline, and a later run can be compared
+with a baseline, in which case the command exits with a non-zero
+status if any case is slower than the baseline by more than a
+threshold. Times depend on the machine, so baselines are only
+comparable with runs on the same machine.
+
+Run with::
+
+    python benchmarks/suite.py --scale small --save baseline.json
+    python benchmarks/suite.py --scale small --compare baseline.json
+"""
+
+import inspect
+import json
+import platform
+import re
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from itertools import cycle, islice, product
+from pathlib import Path
+from typing import Annotated, Any
+
+import numpy as np
+import polars as pl
+import typer
+from queries import make_database
+from rich.console import Console
+from rich.table import Table
+
+import cagey
+from cagey import (
+    MassSpectrumParameters,
+    MassSpectrumPeak,
+    MassSpectrumTopologyAssignment,
+    NmrParameters,
+    NmrPeak,
+    NmrRegion,
+    NmrSpectrum,
+    Precursor,
+    Reaction,
+    ReactionKey,
+    Row,
+    TurbidityParameters,
+    TurbidState,
+)
+
+DI_SMILES = "O=Cc1cccc(C=O)c1"
+TRI_SMILES = "NCCN(CCN)CCN"
+
+
+@dataclass(frozen=True, slots=True)
+class Scale:
+    """The size of the data the cases run on.
+
+    Parameters:
+        reactions: The number of reactions in the database read by the
+            queries.
+        spectra: The number of spectra, turbidity series and
+            precursors added by each insert.
+        features: The number of features in a mass spectrum.
+        peaks: The number of mass spectrum peaks assigned topologies.
+        nmr_points: The number of points of an NMR spectrum.
+        measurements: The number of measurements of a turbidity series.
+    """
+
+    reactions: int
+    """The number of reactions in the database read by the queries."""
+    spectra: int
+    """The number of spectra, turbidity series and precursors added by
+    each insert."""
+    features: int
+    """The number of features in a mass spectrum."""
+    peaks: int
+    """The number of mass spectrum peaks assigned topologies."""
+    nmr_points: int
+    """The number of points of an NMR spectrum."""
+    measurements: int
+    """The number of measurements of a turbidity series."""
+
+
+SCALES = {
+    "small": Scale(
+        reactions=1_000,
+        spectra=100,
+        features=1_000,
+        peaks=100,
+        nmr_points=16_384,
+        measurements=100,
+    ),
+    "medium": Scale(
+        reactions=10_000,
+        spectra=1_000,
+        features=5_000,
+        peaks=1_000,
+        nmr_points=65_536,
+        measurements=1_000,
+    ),
+    "campaign": Scale(
+        reactions=100_000,
+        spectra=10_000,
+        features=20_000,
+        peaks=10_000,
+        nmr_points=262_144,
+        measurements=10_000,
+    ),
+}
+"""The scales the cases can be run at."""
+
+Prepare = Callable[[Path], Callable[[], object]]
+
+_REPROCESSED_PARAMETERS: dict[
+    str, MassSpectrumParameters | NmrParameters | TurbidityParameters
+] = {
+    "reprocessed_nmr_peaks_df": NmrParameters(),
+    "reprocessed_turbidities_df": TurbidityParameters(),
+}
+
+
+@dataclass(frozen=True, slots=True)
+class Case:
+    """A benchmarked function.
+
+    Parameters:
+        name: The name of the case.
+        prepare: Makes the data for one run in the given directory,
+            and returns the function which is timed.
+    """
+
+    name: str
+    """The name of the case."""
+    prepare: Prepare
+    """Makes the data for one run in the given directory, and returns
+    the function which is timed."""
+
+
+@dataclass(frozen=True, slots=True)
+class Result:
+    """The times of a benchmarked function.
+
+    Parameters:
+        name: The name of the case.
+        seconds: The time taken by each run.
+    """
+
+    name: str
+    """The name of the case."""
+    seconds: list[float]
+    """The time taken by each run."""
+
+    def fastest(self) -> float:
+        """The time of the fastest run."""
+        return min(self.seconds)
+
+    def median(self) -> float:
+        """The median time of the runs."""
+        return statistics.median(self.seconds)
+
+
+def cases(scale: Scale, connection: sqlite3.Connection) -> list[Case]:
+    """Get the benchmarked functions.
+
+    Parameters:
+        scale: The size of the data.
+        connection: A database made by
+            :func:`queries.make_database`, which the reads query.
+
+    Returns:
+        The analysis functions, every ``insert_*`` function and every
+        ``*_df`` function of :mod:`cagey.queries`.
+    """
+    return [
+        *_analysis_cases(scale),
+        *_insert_cases(scale),
+        *_read_cases(connection),
+    ]
+
+
+def _analysis_cases(scale: Scale) -> list[Case]:
+    rng = np.random.default_rng(0)
+    features = _features(rng, scale.features)
+    peaks = [
+        Row(id_, peak)
+        for id_, peak in enumerate(islice(cycle(_peaks()), scale.peaks))
+    ]
+    region = _region(rng, scale.nmr_points)
+    turbidities = dict(
+        zip(
+            _timestamps(scale.measurements),
+            50.0 + rng.normal(size=scale.measurements),
+            strict=True,
+        )
+    )
+
+    def get_peaks(directory: Path) -> Callable[[], object]:
+        path = directory / "AB-01-001_01_01.csv"
+        features.write_csv(path)
+        return lambda: list(cagey.ms.get_peaks(path, DI_SMILES, TRI_SMILES))
+
+    def get_spectrum(directory: Path) -> Callable[[], object]:
+        pdata = cagey.testing.write_nmr_pdata(
+            directory,
+            ReactionKey("AB-01-001", 1, 1),
+            aldehyde_ppm=[10.0],
+            imine_ppm=[8.2],
+        )
+        return lambda: cagey.nmr.get_spectrum(pdata)
+
+    return [
+        Case("ms.get_peaks", get_peaks),
+        Case(
+            "ms.get_topologies",
+            lambda _: lambda: list(cagey.ms.get_topologies(peaks)),
+        ),
+        Case("nmr.get_spectrum", get_spectrum),
+        Case(
+            "nmr.get_spectrum_from_region",
+            lambda _: lambda: cagey.nmr.get_spectrum_from_region(region),
+        ),
+        Case(
+            "turbidity.get_turbid_state",
+            lambda _: (
+                lambda: cagey.turbidity.get_turbid_state(turbidities, 50.0)
+            ),
+        ),
+    ]
+
+
+def _insert_cases(scale: Scale) -> list[Case]:  # noqa: C901
+    rng = np.random.default_rng(1)
+    keys = [ReactionKey("AB-01-001", 1, i) for i in range(scale.spectra)]
+    features = _features(rng, scale.features)
+    peaks = list(islice(cycle(_peaks()), 10))
+    nmr_spectrum = NmrSpectrum(
+        aldehyde_peaks=[NmrPeak(9.9, 1e5), NmrPeak(10.0, 2e5)],
+        imine_peaks=[NmrPeak(8.2, 1e5), NmrPeak(8.3, 1e5), NmrPeak(8.4, 1e5)],
+    )
+    turbidities = dict.fromkeys(_timestamps(20), 50.0)
+
+    def database(directory: Path, *, reactions: bool) -> sqlite3.Connection:
+        connection = sqlite3.connect(directory / "cagey.db")
+        cagey.queries.create_tables(connection)
+        if reactions:
+            cagey.queries.insert_precursors(
+                connection,
+                [Precursor("Di1", DI_SMILES), Precursor("Tri1", TRI_SMILES)],
+            )
+            cagey.queries.insert_reactions(
+                connection,
+                [
+                    Reaction(
+                        key.experiment,
+                        key.plate,
+                        key.formulation_number,
+                        "Di1",
+                        "Tri1",
+                    )
+                    for key in keys
+                ],
+            )
+        return connection
+
+    def insert_precursors(directory: Path) -> Callable[[], object]:
+        connection = database(directory, reactions=False)
+        return lambda: cagey.queries.insert_precursors(
+            connection,
+            [Precursor(f"Di{i}", DI_SMILES) for i in range(scale.spectra)],
+        )
+
+    def insert_reactions(directory: Path) -> Callable[[], object]:
+        connection = database(directory, reactions=False)
+        cagey.queries.insert_precursors(
+            connection,
+            [Precursor("Di1", DI_SMILES), Precursor("Tri1", TRI_SMILES)],
+        )
+        return lambda: cagey.queries.insert_reactions(
+            connection,
+            [
+                Reaction("AB-01-001", i // 48, i % 48, "Di1", "Tri1")
+                for i in range(scale.reactions)
+            ],
+        )
+
+    def insert_mass_spectrum(
+        *, with_features: bool
+    ) -> Callable[[Path], Callable[[], object]]:
+        def prepare(directory: Path) -> Callable[[], object]:
+            connection = database(directory, reactions=True)
+
+            def insert() -> None:
+                for key in keys:
+                    cagey.queries.insert_mass_spectrum(
+                        connection,
+                        key,
+                        peaks,
+                        features=features if with_features else None,
+                        commit=False,
+                    )
+                connection.commit()
+
+            return insert
+
+        return prepare
+
+    def insert_topology_assignments(directory: Path) -> Callable[[], object]:
+        connection = database(directory, reactions=True)
+        for key in keys:
+            cagey.queries.insert_mass_spectrum(
+                connection, key, peaks, commit=False
+            )
+        connection.commit()
+        assignments = [
+            MassSpectrumTopologyAssignment(id_, "4+6")
+            for (id_,) in connection.execute(
+                "SELECT id FROM mass_spectrum_peaks"
+            )
+        ]
+        return lambda: cagey.queries.insert_mass_spectrum_topology_assignments(
+            connection, assignments
+        )
+
+    def insert_nmr_spectrum(directory: Path) -> Callable[[], object]:
+        connection = database(directory, reactions=True)
+
+        def insert() -> None:
+            for key in keys:
+                cagey.queries.insert_nmr_spectrum(
+                    connection, key, nmr_spectrum, commit=False
+                )
+            connection.commit()
+
+        return insert
+
+    def insert_turbidity(directory: Path) -> Callable[[], object]:
+        connection = database(directory, reactions=True)
+
+        def insert() -> None:
+            for key in keys:
+                cagey.queries.insert_turbidity(
+                    connection,
+                    key,
+                    1.5,
+                    turbidities,
+                    TurbidState.DISSOLVED,
+                    commit=False,
+                )
+            connection.commit()
+
+        return insert
+
+    def insert_parameter_set(directory: Path) -> Callable[[], object]:
+        connection = database(directory, reactions=False)
+
+        def insert() -> None:
+            for i in range(scale.spectra):
+                cagey.queries.insert_parameter_set(
+                    connection,
+                    MassSpectrumParameters(max_ppm_error=i),
+                    commit=False,
+                )
+            connection.commit()
+
+        return insert
+
+    return [
+        Case("queries.insert_precursors", insert_precursors),
+        Case("queries.insert_reactions", insert_reactions),
+        Case(
+            "queries.insert_mass_spectrum",
+            insert_mass_spectrum(with_features=False),
+        ),
+        Case(
+            "queries.insert_mass_spectrum features",
+            insert_mass_spectrum(with_features=True),
+        ),
+        Case(
+            "queries.insert_mass_spectrum_topology_assignments",
+            insert_topology_assignments,
+        ),
+        Case("queries.insert_nmr_spectrum", insert_nmr_spectrum),
+        Case("queries.insert_turbidity", insert_turbidity),
+        Case("queries.insert_parameter_set", insert_parameter_set),
+    ]
+
+
+def _read_cases(connection: sqlite3.Connection) -> list[Case]:
+    cases = []
+    for name in sorted(cagey.queries.__all__):
+        if not name.endswith("_df"):
+            continue
+        function = getattr(cagey.queries, name)
+        # The parameter sets were already added, with their results, by
+        # make_database, so their existing ids are returned.
+        arguments: dict[str, Any] = (
+            {
+                "parameter_set_id": cagey.queries.insert_parameter_set(
+                    connection,
+                    _REPROCESSED_PARAMETERS.get(
+                        name, MassSpectrumParameters()
+                    ),
+                )
+            }
+            if "parameter_set_id" in inspect.signature(function).parameters
+            else {}
+        )
+        cases.append(
+            Case(
+                f"queries.{name}",
+                _read(function, connection, arguments),
+            )
+        )
+    return cases
+
+
+def _read(
+    function: Callable[..., object],
+    connection: sqlite3.Connection,
+    arguments: dict[str, Any],
+) -> Prepare:
+    return lambda _: lambda: function(connection, **arguments)
+
+
+def _timestamps(num_timestamps: int) -> list[str]:
+    # One measurement a second, in the format of turbidity_data.json.
+    return [
+        f"2023_02_21_{i // 3600:02d}_{i // 60 % 60:02d}_{i % 60:02d}_000000"
+        for i in range(num_timestamps)
+    ]
+
+
+def _features(rng: np.random.Generator, num_features: int) -> pl.DataFrame:
+    return pl.DataFrame(
+        {
+            "mz": rng.uniform(100, 4000, num_features),
+            "height": rng.lognormal(10, 2, num_features),
+        }
+    )
+
+
+def _peaks() -> list[MassSpectrumPeak]:
+    return [
+        MassSpectrumPeak(
+            di_count=di_count,
+            tri_count=tri_count,
+            adduct="H",
+            charge=charge,
+            calculated_mz=1000.0,
+            spectrum_mz=1000.0,
+            separation_mz=1000.0 + 1 / charge,
+            intensity=1e5,
+        )
+        for (tri_count, di_count), charge in product(
+            [(2, 3), (4, 6), (6, 9), (8, 12), (3, 5)], [1, 2, 3]
+        )
+    ]
+
+
+def _region(rng: np.random.Generator, num_points: int) -> NmrRegion:
+    region = NmrRegion(
+        rng.normal(0, 100, num_points),
+        ppm_start=12.0,
+        ppm_step=-6.0 / num_points,
+    )
+    ppm = region.ppm()
+    for center, height in {7.26: 1e7, 8.2: 1e6, 10.0: 2e5}.items():
+        region.intensities[:] += height / (1 + ((ppm - center) / 0.002) ** 2)
+    return region
+
+
+def run(case: Case, directory: Path, repeat: int) -> Result:
+    """Time a case.
+
+    Parameters:
+        case: The case.
+        directory: A directory for the data of the case. Its contents
+            are removed after each run.
+        repeat: The number of times to run the case.
+
+    Returns:
+        The times of the runs.
+    """
+    seconds = []
+    for _ in range(repeat):
+        directory.mkdir()
+        try:
+            function = case.prepare(directory)
+            start = time.perf_counter()
+            function()
+            seconds.append(time.perf_counter() - start)
+            del function
+        finally:
+            shutil.rmtree(directory)
+    return Result(case.name, seconds)
+
+
+def main(  # noqa: PLR0913
+    scale: Annotated[
+        str,
+        typer.Option(help=f"Size of the data, one of {', '.join(SCALES)}."),
+    ] = "small",
+    repeat: Annotated[
+        int, typer.Option(help="Number of times to run each case.")
+    ] = 5,
+    case: Annotated[
+        str | None,
+        typer.Option(help="Only run cases whose name matches this regex."),
+    ] = None,
+    save: Annotated[
+        Path | None,
+        typer.Option(help="File to save the times to, as a baseline."),
+    ] = None,
+    compare: Annotated[
+        Path | None,
+        typer.Option(help="Baseline to compare the times with."),
+    ] = None,
+    threshold: Annotated[
+        float,
+        typer.Option(
+            help="Fraction by which a case may be slower than the "
+            "baseline before it is a regression."
+        ),
+    ] = 0.2,
+) -> None:
+    """Benchmark the analysis functions, inserts and reads of cagey."""
+    console = Console()
+    if scale not in SCALES:
+        msg = f"must be one of {', '.join(SCALES)}"
+        raise typer.BadParameter(msg, param_hint="--scale")
+    baseline = None
+    if compare is not None:
+        baseline = json.loads(compare.read_text())
+        if baseline["scale"] != scale:
+            msg = f"baseline was run at scale {baseline['scale']}"
+            raise typer.BadParameter(msg, param_hint="--compare")
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        connection = sqlite3.connect(Path(temp_dir) / "cagey.db")
+        with console.status("[bold green]Making database..."):
+            make_database(connection, SCALES[scale].reactions)
+        selected = [
+            case_
+            for case_ in cases(SCALES[scale], connection)
+            if case is None or re.search(case, case_.name)
+        ]
+        results = []
+        with console.status("[bold green]Running cases...") as status:
+            for case_ in selected:
+                status.update(f"[bold green]Running {case_.name}...")
+                results.append(
+                    run(case_, Path(temp_dir) / "case", repeat=repeat)
+                )
+        connection.close()
+
+    if save is not None:
+        save.write_text(json.dumps(baseline_json(scale, results), indent=2))
+        console.print(f"[bold green]:heavy_check_mark: Saved times:[/] {save}")
+
+    table = Table(title=f"Benchmarks ({scale})", header_style="bold magenta")
+    table.add_column("case", style="green", overflow="fold")
+    table.add_column("min seconds", style="blue")
+    table.add_column("median seconds", style="blue")
+    if baseline is not None:
+        table.add_column("baseline seconds", style="blue")
+        table.add_column("change")
+    for result in results:
+        row = [
+            result.name,
+            f"{result.fastest():.4f}",
+            f"{result.median():.4f}",
+        ]
+        if baseline is not None:
+            row += _change(result, baseline, threshold)
+        table.add_row(*row)
+    console.print(table)
+
+    regressions = (
+        []
+        if baseline is None
+        else regressed(results, baseline, threshold=threshold)
+    )
+    if regressions:
+        console.print(
+            f"[bold red]{len(regressions)} cases are more than "
+            f"{threshold:.0%} slower than the baseline:[/] "
+            f"{', '.join(regressions)}"
+        )
+        raise typer.Exit(1)
+
+
+def baseline_json(scale: str, results: list[Result]) -> dict[str, Any]:
+    """Get the baseline of a run.
+
+    Parameters:
+        scale: The name of the scale of the run.
+        results: The times of the cases.
+
+    Returns:
+        The baseline, which can be saved as JSON.
+    """
+    return {
+        "scale": scale,
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cases": {
+            result.name: {
+                "min": result.fastest(),
+                "median": result.median(),
+                "repeat": len(result.seconds),
+            }
+            for result in results
+        },
+    }
+
+
+def regressed(
+    results: list[Result], baseline: dict[str, Any], *, threshold: float
+) -> list[str]:
+    """Find the cases which are slower than in a baseline.
+
+    The fastest runs are compared, as they are the least affected by
+    other work on the machine.
+
+    Parameters:
+        results: The times of the cases.
+        baseline: A baseline made by :func:`baseline_json`.
+        threshold:
+            The fraction by which a case may be slower than the
+            baseline before it is a regression.
+
+    Returns:
+        The names of the slower cases. Cases missing from the baseline
+        are never regressions.
+    """
+    return [
+        result.name
+        for result in results
+        if result.name in baseline["cases"]
+        and result.fastest()
+        > baseline["cases"][result.name]["min"] * (1 + threshold)
+    ]
+
+
+def _change(
+    result: Result, baseline: dict[str, Any], threshold: float
+) -> list[str]:
+    if result.name not in baseline["cases"]:
+        return ["-", "[yellow]new[/]"]
+    before = baseline["cases"][result.name]["min"]
+    change = result.fastest() / before - 1
+    if change > threshold:
+        style = "red"
+    elif change < -threshold:
+        style = "green"
+    else:
+        style = "default"
+    return [f"{before:.4f}", f"[{style}]{change:+.1%}[/]"]
+
+
+if __name__ == "__main__":
+    typer.run(main)
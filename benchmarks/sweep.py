@@ -0,0 +1,116 @@
+"""Benchmark the mass spectrum parameter sweep on synthetic spectra.
+
+A plate of random feature lists is swept over a grid of peak
+parameters, and the time taken is compared with running
+:func:`cagey.ms.get_peaks_from_features` for a few points of the grid,
+scaled up to the whole grid.
+
+Run with::
+
+    python benchmarks/sweep.py
+"""
+
+import time
+from dataclasses import asdict
+from multiprocessing import Pool
+from typing import Annotated
+
+import numpy as np
+import polars as pl
+import typer
+from rich.console import Console
+from rich.table import Table
+
+import cagey
+from cagey import Precursors
+
+
+def main(
+    spectra: Annotated[
+        int, typer.Option(help="Number of mass spectra in the plate.")
+    ] = 48,
+    features: Annotated[
+        int, typer.Option(help="Number of features in each mass spectrum.")
+    ] = 5_000,
+    values: Annotated[
+        int, typer.Option(help="Number of values of each parameter.")
+    ] = 4,
+    naive_points: Annotated[
+        int,
+        typer.Option(help="Number of grid points to time without the sweep."),
+    ] = 2,
+    processes: Annotated[
+        int | None,
+        typer.Option(
+            help="Number of processes. Defaults to the number of CPUs."
+        ),
+    ] = None,
+) -> None:
+    """Benchmark the mass spectrum parameter sweep."""
+    console = Console()
+    # The pool is started before polars is used, so that the forked
+    # processes do not inherit the locks of polars' thread pool.
+    with Pool(processes) as pool:
+        rng = np.random.default_rng(0)
+        precursors = Precursors("O=Cc1cccc(C=O)c1", "NCCN(CCN)CCN")
+        plate = [
+            (
+                pl.DataFrame(
+                    {
+                        "mz": rng.uniform(100, 4000, features),
+                        "height": rng.lognormal(10, 2, features),
+                    }
+                ),
+                precursors,
+            )
+            for _ in range(spectra)
+        ]
+        grid = cagey.ms.parameter_grid(
+            calculated_peak_tolerance=np.linspace(0.05, 0.2, values).tolist(),
+            separation_peak_tolerance=np.linspace(0.05, 0.2, values).tolist(),
+            max_ppm_error=np.linspace(5, 20, values).tolist(),
+            max_separation=np.linspace(0.01, 0.04, values).tolist(),
+            min_peak_height=np.geomspace(1e3, 1e5, values).tolist(),
+        )
+
+        table = Table(title="Sweep Benchmarks", header_style="bold magenta")
+        table.add_column("method", style="green")
+        table.add_column("grid points", style="blue")
+        table.add_column("seconds", style="blue")
+
+        with console.status(
+            f"[bold green]Sweeping {len(grid)} grid points..."
+        ):
+            start = time.perf_counter()
+            cagey.ms.sweep_peaks(plate, grid, pool=pool)
+            sweep_seconds = time.perf_counter() - start
+        table.add_row("sweep_peaks", str(len(grid)), f"{sweep_seconds:.3f}")
+
+        with console.status("[bold green]Finding peaks without the sweep..."):
+            start = time.perf_counter()
+            for parameters in grid[:naive_points]:
+                for spectrum, _ in plate:
+                    list(
+                        cagey.ms.get_peaks_from_features(
+                            spectrum,
+                            precursors.di_smiles,
+                            precursors.tri_smiles,
+                            **asdict(parameters),
+                        )
+                    )
+            naive_seconds = time.perf_counter() - start
+        table.add_row(
+            "get_peaks_from_features",
+            str(naive_points),
+            f"{naive_seconds:.3f}",
+        )
+        table.add_row(
+            "get_peaks_from_features (scaled)",
+            str(len(grid)),
+            f"{naive_seconds / naive_points * len(grid):.3f}",
+        )
+    console.print(table)
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -1,31 +1,103 @@
 """Streamlined automated data analysis."""
 
-from cagey import ms, nmr, queries, reactions, turbidity
-from cagey._internal.types import (
-    MassSpectrumId,
-    MassSpectrumPeak,
-    MassSpectrumTopologyAssignment,
-    NmrPeak,
-    NmrSpectrum,
-    NmrSpectrumId,
-    Precursor,
-    Precursors,
-    Reaction,
-    ReactionKey,
-    Row,
-    TurbidState,
+import importlib
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from cagey import (
+        cache,
+        export,
+        memory,
+        ms,
+        nmr,
+        profiling,
+        queries,
+        reactions,
+        reprocessing,
+        testing,
+        tracing,
+        turbidity,
+        workers,
+    )
+    from cagey._internal.types import (
+        IngestChange,
+        IngestFileMetrics,
+        IngestKind,
+        IngestRun,
+        MassSpectrumId,
+        MassSpectrumParameters,
+        MassSpectrumPeak,
+        MassSpectrumTopologyAssignment,
+        NmrParameters,
+        NmrPeak,
+        NmrRegion,
+        NmrSpectrum,
+        NmrSpectrumId,
+        Precursor,
+        Precursors,
+        Reaction,
+        ReactionKey,
+        Row,
+        SimilarReaction,
+        TurbidityParameters,
+        TurbidState,
+    )
+
+_SUBMODULES = frozenset(
+    {
+        "cache",
+        "export",
+        "memory",
+        "ms",
+        "nmr",
+        "profiling",
+        "queries",
+        "reactions",
+        "reprocessing",
+        "testing",
+        "tracing",
+        "turbidity",
+        "workers",
+    }
+)
+_TYPES = frozenset(
+    {
+        "IngestChange",
+        "IngestFileMetrics",
+        "IngestKind",
+        "IngestRun",
+        "MassSpectrumId",
+        "MassSpectrumParameters",
+        "MassSpectrumPeak",
+        "MassSpectrumTopologyAssignment",
+        "NmrParameters",
+        "NmrPeak",
+        "NmrRegion",
+        "NmrSpectrum",
+        "NmrSpectrumId",
+        "Precursor",
+        "Precursors",
+        "Reaction",
+        "ReactionKey",
+        "Row",
+        "SimilarReaction",
+        "TurbidityParameters",
+        "TurbidState",
+    }
 )
 
 __all__ = [
-    "ms",
-    "nmr",
-    "queries",
-    "reactions",
-    "turbidity",
+    "IngestChange",
+    "IngestFileMetrics",
+    "IngestKind",
+    "IngestRun",
     "MassSpectrumId",
+    "MassSpectrumParameters",
     "MassSpectrumPeak",
     "MassSpectrumTopologyAssignment",
+    "NmrParameters",
     "NmrPeak",
+    "NmrRegion",
     "NmrSpectrum",
     "NmrSpectrumId",
     "Precursor",
@@ -33,5 +105,39 @@ __all__ = [
     "Reaction",
     "ReactionKey",
     "Row",
+    "SimilarReaction",
     "TurbidState",
+    "TurbidityParameters",
+    "cache",
+    "export",
+    "memory",
+    "ms",
+    "nmr",
+    "profiling",
+    "queries",
+    "reactions",
+    "reprocessing",
+    "testing",
+    "tracing",
+    "turbidity",
+    "workers",
 ]
+
+
+def __getattr__(name: str) -> Any:
+    # Submodules and types are imported when they are first used, so
+    # that importing cagey does not import RDKit, pyopenms, nmrglue or
+    # polars until they are needed.
+    if name in _SUBMODULES:
+        value = importlib.import_module(f"cagey.{name}")
+    elif name in _TYPES:
+        value = getattr(importlib.import_module("cagey._internal.types"), name)
+    else:
+        msg = f"module 'cagey' has no attribute {name!r}"
+        raise AttributeError(msg)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
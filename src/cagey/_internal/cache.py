@@ -0,0 +1,273 @@
+import itertools
+import os
+import threading
+from collections import Counter, OrderedDict
+from collections.abc import Hashable
+from dataclasses import dataclass
+from pathlib import Path
+from sqlite3 import Connection
+from typing import Any
+
+import polars as pl
+
+from cagey._internal.lazy import LazyQuery
+
+
+@dataclass(frozen=True, slots=True)
+class CacheInfo:
+    """Statistics of a query cache.
+
+    Parameters:
+        hits: The number of queries answered from the cache.
+        misses: The number of queries which were executed.
+        memory_bytes: The size of the results held in memory.
+        spilled_bytes: The size of the results spilled to disk.
+    """
+
+    hits: int
+    """The number of queries answered from the cache."""
+    misses: int
+    """The number of queries which were executed."""
+    memory_bytes: int
+    """The size of the results held in memory."""
+    spilled_bytes: int
+    """The size of the results spilled to disk."""
+
+
+_Key = tuple[Hashable, str, tuple[Any, ...]]
+
+
+@dataclass(frozen=True, slots=True)
+class _Entry:
+    version: Hashable
+    df: pl.DataFrame | None
+    path: Path | None
+    num_bytes: int
+
+
+class QueryCache:
+    """A cache of query results.
+
+    Results are held in memory until `max_bytes` is exceeded, at which
+    point the least recently used results are moved to Arrow IPC files
+    in `spill_directory`, or dropped if it is not given. Spilled files
+    are deleted, least recently used first, once they exceed
+    `max_spilled_bytes`.
+
+    Results are invalidated whenever the database is written to.
+    Database files in the default rollback journal mode are
+    identified by their device and inode, and versioned by the change
+    counter in their header, so that results are shared between
+    connections to the same file. For in-memory databases and
+    databases in WAL mode, results are tied to the connection and
+    versioned by ``PRAGMA data_version`` together with the changes
+    made through the connection itself. The cache holds a reference to
+    such connections for as long as it holds results for them.
+    Queries run inside an open transaction are not cached.
+
+    Examples:
+        .. code-block:: python
+
+            import sqlite3
+            import cagey
+
+            cache = cagey.cache.QueryCache()
+            connection = sqlite3.connect("path/to/cagey.db")
+            df = cache.collect(cagey.queries.reactions_lazy(connection))
+
+    Parameters:
+        max_bytes: The maximum size of the results held in memory.
+        spill_directory: The directory to spill results to.
+        max_spilled_bytes: The maximum size of the spilled results.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 256 * 2**20,
+        *,
+        spill_directory: Path | None = None,
+        max_spilled_bytes: int = 2**30,
+    ) -> None:
+        self.max_bytes = max_bytes
+        """The maximum size of the results held in memory."""
+        self.spill_directory = spill_directory
+        """The directory to spill results to."""
+        self.max_spilled_bytes = max_spilled_bytes
+        """The maximum size of the spilled results."""
+        self._memory: OrderedDict[_Key, _Entry] = OrderedDict()
+        self._spilled: OrderedDict[_Key, _Entry] = OrderedDict()
+        self._memory_bytes = 0
+        self._spilled_bytes = 0
+        self._versions: dict[Hashable, Hashable] = {}
+        self._entry_counts: Counter[Hashable] = Counter()
+        self._connections: dict[int, tuple[Connection, Hashable]] = {}
+        self._tokens = itertools.count()
+        self._file_names = itertools.count()
+        self._hits = 0
+        self._misses = 0
+        self._lock = threading.Lock()
+
+    def collect(self, query: LazyQuery) -> pl.DataFrame:
+        """Execute a query, or return its cached result.
+
+        Parameters:
+            query: The query.
+
+        Returns:
+            The result of the query.
+        """
+        if query.connection.in_transaction:
+            return query.collect()
+        with self._lock:
+            database, version = self._database_version(query.connection)
+            if self._versions.get(database, version) != version:
+                self._invalidate(database)
+            self._versions[database] = version
+            key = (database, query.sql(), query.parameters)
+            df = self._get(key, version)
+            if df is not None:
+                self._hits += 1
+                return df.clone()
+            self._misses += 1
+        df = query.collect()
+        with self._lock:
+            if self._versions.get(database) == version:
+                num_bytes = int(df.estimated_size())
+                self._put(key, _Entry(version, df, None, num_bytes))
+        return df.clone()
+
+    def info(self) -> CacheInfo:
+        """Get statistics of the cache.
+
+        Returns:
+            The statistics.
+        """
+        with self._lock:
+            return CacheInfo(
+                hits=self._hits,
+                misses=self._misses,
+                memory_bytes=self._memory_bytes,
+                spilled_bytes=self._spilled_bytes,
+            )
+
+    def clear(self) -> None:
+        """Remove all results from the cache."""
+        with self._lock:
+            for key in [*self._memory, *self._spilled]:
+                self._remove(key)
+            self._versions.clear()
+            self._connections.clear()
+
+    def _database_version(
+        self,
+        connection: Connection,
+    ) -> tuple[Hashable, Hashable]:
+        for _, name, file in connection.execute("PRAGMA database_list"):
+            if name == "main" and file:
+                try:
+                    with Path(file).open("rb") as database_file:
+                        stat = os.fstat(database_file.fileno())
+                        header = database_file.read(28)
+                except OSError:
+                    break
+                # Byte 18 is 1 in rollback journal mode and 2 in WAL
+                # mode, where the change counter is not kept up to date.
+                if len(header) == 28 and header[18] == 1:  # noqa: PLR2004
+                    return (
+                        (stat.st_dev, stat.st_ino),
+                        int.from_bytes(header[24:28], "big"),
+                    )
+                break
+        if id(connection) not in self._connections:
+            self._connections[id(connection)] = (
+                connection,
+                ("connection", next(self._tokens)),
+            )
+        _, database = self._connections[id(connection)]
+        ((data_version,),) = connection.execute("PRAGMA data_version")
+        return database, (data_version, connection.total_changes)
+
+    def _get(self, key: _Key, version: Hashable) -> pl.DataFrame | None:
+        if (entry := self._memory.get(key)) is not None:
+            if entry.version != version:
+                self._remove(key, forget_connection=False)
+                return None
+            self._memory.move_to_end(key)
+            return entry.df
+        if (entry := self._spilled.get(key)) is not None:
+            if entry.version != version or entry.path is None:
+                self._remove(key, forget_connection=False)
+                return None
+            df = pl.read_ipc(entry.path, memory_map=False)
+            self._put(key, _Entry(version, df, None, entry.num_bytes))
+            return df
+        return None
+
+    def _put(self, key: _Key, entry: _Entry) -> None:
+        self._remove(key, forget_connection=False)
+        self._memory[key] = entry
+        self._memory_bytes += entry.num_bytes
+        self._entry_counts[key[0]] += 1
+        while self._memory_bytes > self.max_bytes:
+            evicted_key, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.num_bytes
+            if not self._spill(evicted_key, evicted):
+                self._release(evicted_key[0])
+
+    def _spill(self, key: _Key, entry: _Entry) -> bool:
+        if (
+            self.spill_directory is None
+            or entry.df is None
+            or entry.num_bytes > self.max_spilled_bytes
+        ):
+            return False
+        self.spill_directory.mkdir(parents=True, exist_ok=True)
+        path = self.spill_directory / (
+            f"cagey-cache-{os.getpid()}-{next(self._file_names)}.arrow"
+        )
+        entry.df.write_ipc(path)
+        self._spilled[key] = _Entry(entry.version, None, path, entry.num_bytes)
+        self._spilled_bytes += entry.num_bytes
+        while self._spilled_bytes > self.max_spilled_bytes:
+            self._remove(next(iter(self._spilled)))
+        return True
+
+    def _invalidate(self, database: Hashable) -> None:
+        for key in [*self._memory, *self._spilled]:
+            if key[0] == database:
+                self._remove(key, forget_connection=False)
+
+    def _remove(self, key: _Key, *, forget_connection: bool = True) -> None:
+        removed = False
+        if (entry := self._memory.pop(key, None)) is not None:
+            self._memory_bytes -= entry.num_bytes
+            removed = True
+        if (entry := self._spilled.pop(key, None)) is not None:
+            self._spilled_bytes -= entry.num_bytes
+            if entry.path is not None:
+                entry.path.unlink(missing_ok=True)
+            removed = True
+        if removed:
+            self._release(key[0], forget_connection=forget_connection)
+
+    def _release(
+        self,
+        database: Hashable,
+        *,
+        forget_connection: bool = True,
+    ) -> None:
+        self._entry_counts[database] -= 1
+        if self._entry_counts[database] > 0:
+            return
+        del self._entry_counts[database]
+        # Entries of in-memory and WAL databases hold on to their
+        # connection, which is let go once they have all been evicted.
+        if (
+            forget_connection
+            and isinstance(database, tuple)
+            and database[0] == "connection"
+        ):
+            self._versions.pop(database, None)
+            for id_, (_, token) in list(self._connections.items()):
+                if token == database:
+                    del self._connections[id_]
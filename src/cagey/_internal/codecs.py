@@ -0,0 +1,69 @@
+import io
+
+import numpy as np
+import numpy.typing as npt
+import polars as pl
+
+
+def encode_features(features: pl.DataFrame) -> bytes:
+    """Encode the features of a mass spectrum for storage.
+
+    Parameters:
+        features: The features, with ``mz`` and ``height`` columns.
+
+    Returns:
+        The features as a zstd compressed Arrow IPC file.
+    """
+    # Features are stored as zstd compressed Arrow IPC files, which are
+    # a fraction of the size of the csv files and can be read by any
+    # Arrow library.
+    buffer = io.BytesIO()
+    features.select(
+        pl.col("mz").cast(pl.Float64),
+        pl.col("height").cast(pl.Float64),
+    ).write_ipc(buffer, compression="zstd")
+    return buffer.getvalue()
+
+
+def decode_features(features: bytes) -> pl.DataFrame:
+    """Decode the features of a mass spectrum.
+
+    Parameters:
+        features: The features made by :func:`encode_features`.
+
+    Returns:
+        The features, with ``mz`` and ``height`` columns.
+    """
+    return pl.read_ipc(io.BytesIO(features), memory_map=False)
+
+
+def encode_intensities(intensities: npt.NDArray[np.float64]) -> bytes:
+    """Encode the intensities of an NMR region for storage.
+
+    Parameters:
+        intensities: The intensities.
+
+    Returns:
+        The intensities as a zstd compressed Arrow IPC file.
+    """
+    buffer = io.BytesIO()
+    pl.DataFrame(
+        {"intensity": intensities}, schema={"intensity": pl.Float64}
+    ).write_ipc(buffer, compression="zstd")
+    return buffer.getvalue()
+
+
+def decode_intensities(intensities: bytes) -> npt.NDArray[np.float64]:
+    """Decode the intensities of an NMR region.
+
+    Parameters:
+        intensities: The intensities made by :func:`encode_intensities`.
+
+    Returns:
+        The intensities.
+    """
+    return (
+        pl.read_ipc(io.BytesIO(intensities), memory_map=False)
+        .get_column("intensity")
+        .to_numpy()
+    )
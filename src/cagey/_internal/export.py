@@ -0,0 +1,182 @@
+import json
+from collections.abc import Callable, Iterator, Sequence
+from datetime import UTC, datetime
+from pathlib import Path
+from sqlite3 import Connection
+from urllib.parse import quote
+
+import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from cagey._internal.lazy import LazyQuery
+from cagey._internal.queries import (
+    aldehyde_peaks_lazy,
+    imine_peaks_lazy,
+    mass_spectrum_peaks_lazy,
+    mass_spectrum_topology_assignments_lazy,
+    precursors_lazy,
+    reactions_lazy,
+    turbidity_dissolved_references_lazy,
+    turbidity_measurements_lazy,
+    turbidity_states_lazy,
+)
+
+DATASETS: dict[str, Callable[[Connection], LazyQuery]] = {
+    "precursors": precursors_lazy,
+    "reactions": reactions_lazy,
+    "aldehyde_peaks": aldehyde_peaks_lazy,
+    "imine_peaks": imine_peaks_lazy,
+    "mass_spectrum_peaks": mass_spectrum_peaks_lazy,
+    "mass_spectrum_topology_assignments": (
+        mass_spectrum_topology_assignments_lazy
+    ),
+    "turbidity_dissolved_references": turbidity_dissolved_references_lazy,
+    "turbidity_measurements": turbidity_measurements_lazy,
+    "turbidity_states": turbidity_states_lazy,
+}
+PARTITIONING = ("experiment", "plate")
+STATE_FILE = "_cagey_export.json"
+_TEMP_SUFFIX = ".tmp"
+
+
+def export_dataset(
+    connection: Connection,
+    directory: Path,
+    *,
+    batch_size: int = 100_000,
+) -> dict[str, int]:
+    """Export the database as a Parquet dataset.
+
+    Each query in :mod:`cagey.queries` is written to a subdirectory of
+    `directory` with the same columns as the matching ``*_df``
+    function. The data is Hive-partitioned by experiment and plate,
+    where the query has those columns, so it can be read with
+    :func:`polars.scan_parquet` using ``hive_partitioning=True``.
+
+    Exports are incremental. The highest ``rowid`` exported from each
+    table is stored in `directory`, and later exports into the same
+    `directory` only append rows added to the database since then.
+    Rows which were modified or deleted in the database are not
+    updated in the export. Files are only given their final name once
+    the rows they hold are stored as exported, so an export which
+    stops early neither loses nor repeats rows.
+
+    Parameters:
+        connection: A SQLite connection.
+        directory: The directory holding the dataset.
+        batch_size: The maximum number of rows held in memory at once.
+
+    Returns:
+        The number of rows exported from each query.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    state_file = directory / STATE_FILE
+    high_water_marks, runs = _read_state(state_file)
+    run = datetime.now(UTC).strftime("%Y%m%dT%H%M%S%f")
+    exported = {}
+    for name, lazy in DATASETS.items():
+        # Parts left by an export which stopped early are kept only if
+        # the state file was updated to include them.
+        _commit_parts(directory / name, runs.get(name))
+        query = lazy(connection)
+        ((high_water_mark,),) = connection.execute(
+            f"SELECT coalesce(max(rowid), 0) FROM {query.source.table}"  # noqa: S608
+        )
+        query = query.added_between(
+            high_water_marks.get(name, 0), high_water_mark
+        )
+        exported[name] = _write_partitions(
+            frames=query.iter_frames(batch_size),
+            schema=query.arrow_schema(),
+            directory=directory / name,
+            partitioning=[
+                column for column in PARTITIONING if column in query.columns
+            ],
+            file_name=f"part-{run}.parquet{_TEMP_SUFFIX}",
+        )
+        high_water_marks[name] = high_water_mark
+        runs[name] = run
+        _write_state(state_file, high_water_marks, runs)
+        _commit_parts(directory / name, run)
+    return exported
+
+
+def _write_partitions(
+    frames: Iterator[pl.DataFrame],
+    schema: pa.Schema,
+    directory: Path,
+    partitioning: Sequence[str],
+    file_name: str,
+) -> int:
+    # Batches arrive ordered by reaction, so each partition is written
+    # in one go and only one file needs to be open at any time.
+    file_schema = pa.schema(
+        field for field in schema if field.name not in partitioning
+    )
+    num_rows = 0
+    writer: tuple[Path, pq.ParquetWriter] | None = None
+    try:
+        for df in frames:
+            num_rows += len(df)
+            parts = (
+                df.partition_by(partitioning, maintain_order=True)
+                if partitioning
+                else [df]
+            )
+            for part in parts:
+                partition = directory.joinpath(
+                    *(
+                        f"{column}={quote(str(part[column][0]), safe='')}"
+                        for column in partitioning
+                    )
+                )
+                if writer is None or writer[0] != partition:
+                    if writer is not None:
+                        writer[1].close()
+                    partition.mkdir(parents=True, exist_ok=True)
+                    writer = (
+                        partition,
+                        pq.ParquetWriter(partition / file_name, file_schema),
+                    )
+                writer[1].write_table(
+                    part.drop(partitioning).to_arrow().cast(file_schema)
+                )
+    finally:
+        if writer is not None:
+            writer[1].close()
+    return num_rows
+
+
+def _commit_parts(directory: Path, run: str | None) -> None:
+    # Parts are written under a temporary name, and renamed once the
+    # state file records the rows they hold, so that no rows are
+    # exported twice. Parts of any other run were never recorded.
+    for path in directory.rglob(f"part-*.parquet{_TEMP_SUFFIX}"):
+        if path.name == f"part-{run}.parquet{_TEMP_SUFFIX}":
+            path.rename(path.with_suffix(""))
+        else:
+            path.unlink()
+
+
+def _read_state(state_file: Path) -> tuple[dict[str, int], dict[str, str]]:
+    if not state_file.exists():
+        return {}, {}
+    with state_file.open() as file:
+        state = json.load(file)
+    return state["high_water_marks"], state.get("runs", {})
+
+
+def _write_state(
+    state_file: Path,
+    high_water_marks: dict[str, int],
+    runs: dict[str, str],
+) -> None:
+    temp_file = state_file.with_suffix(_TEMP_SUFFIX)
+    with temp_file.open("w") as file:
+        json.dump(
+            {"high_water_marks": high_water_marks, "runs": runs},
+            file,
+            indent=2,
+        )
+    temp_file.replace(state_file)
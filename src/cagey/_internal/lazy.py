@@ -0,0 +1,332 @@
+from collections.abc import Iterable, Iterator, Sequence
+from dataclasses import dataclass, replace
+from datetime import datetime
+from sqlite3 import Connection
+from typing import Any
+
+import polars as pl
+import pyarrow as pa
+
+
+@dataclass(frozen=True, slots=True)
+class Column:
+    """A column which can be read by a lazy query.
+
+    Parameters:
+        name: The name of the column in the result.
+        expression: The SQL expression producing the column.
+        dtype: The data type of the column in the result.
+    """
+
+    name: str
+    """The name of the column in the result."""
+    expression: str
+    """The SQL expression producing the column."""
+    dtype: pl.DataType | type[pl.DataType]
+    """The data type of the column in the result.
+
+    Datetime columns must give their time unit and time zone, which
+    times are converted to.
+    """
+
+
+@dataclass(frozen=True, slots=True)
+class QuerySource:
+    """The tables a lazy query reads from.
+
+    Parameters:
+        table: The table with one row per result row.
+        columns: The columns which can be selected.
+        tables: The ``FROM`` and ``JOIN`` clauses of the query.
+        order_by: The names of the columns the results are ordered by.
+    """
+
+    table: str
+    """The table with one row per result row."""
+    columns: Sequence[Column]
+    """The columns which can be selected."""
+    tables: str
+    """The ``FROM`` and ``JOIN`` clauses of the query."""
+    order_by: Sequence[str]
+    """The names of the columns the results are ordered by."""
+
+    def column(self, name: str) -> Column:
+        """Get a column by name.
+
+        Parameters:
+            name: The name of the column.
+
+        Returns:
+            The column.
+
+        Raises:
+            ValueError: If the column does not exist.
+        """
+        for column in self.columns:
+            if column.name == name:
+                return column
+        msg = f"unknown column: {name!r}"
+        raise ValueError(msg)
+
+
+@dataclass(frozen=True, slots=True)
+class LazyQuery:
+    """A lazy query of the database.
+
+    The query is not executed until :meth:`collect` is called. Any
+    filters and projections applied beforehand are compiled into the
+    SQL of the query, so that only the requested rows and columns are
+    read from the database.
+
+    Parameters:
+        connection: A SQLite connection.
+        source: The tables the query reads from.
+        columns: The names of the selected columns.
+        predicates: The SQL predicates of the ``WHERE`` clause.
+        parameters: The parameters of the predicates.
+        max_rows: The maximum number of rows to return.
+    """
+
+    connection: Connection
+    """A SQLite connection."""
+    source: QuerySource
+    """The tables the query reads from."""
+    columns: tuple[str, ...] = ()
+    """The names of the selected columns."""
+    predicates: tuple[str, ...] = ()
+    """The SQL predicates of the ``WHERE`` clause."""
+    parameters: tuple[Any, ...] = ()
+    """The parameters of the predicates."""
+    max_rows: int | None = None
+    """The maximum number of rows to return."""
+
+    def __post_init__(self) -> None:
+        if not self.columns:
+            object.__setattr__(
+                self,
+                "columns",
+                tuple(column.name for column in self.source.columns),
+            )
+
+    @property
+    def schema(self) -> dict[str, pl.DataType | type[pl.DataType]]:
+        """The schema of the query result."""
+        return {name: self.source.column(name).dtype for name in self.columns}
+
+    def select(self, *columns: str) -> "LazyQuery":
+        """Select a subset of columns.
+
+        Parameters:
+            columns: The names of the columns to select.
+
+        Returns:
+            A new query which returns only the selected columns.
+        """
+        for column in columns:
+            if column not in self.columns:
+                msg = f"unknown column: {column!r}"
+                raise ValueError(msg)
+        return replace(self, columns=columns)
+
+    def filter(  # noqa: PLR0913
+        self,
+        *,
+        experiment: str | Iterable[str] | None = None,
+        plate: int | Iterable[int] | None = None,
+        formulation_number: int | Iterable[int] | None = None,
+        di_name: str | Iterable[str] | None = None,
+        tri_name: str | Iterable[str] | None = None,
+        start_time: datetime | None = None,
+        end_time: datetime | None = None,
+    ) -> "LazyQuery":
+        """Filter the rows of the query.
+
+        Filters given as an iterable match any of the values in it.
+        Filters applied with multiple calls are combined.
+
+        Parameters:
+            experiment: The experiment names to keep.
+            plate: The plate numbers to keep.
+            formulation_number: The formulation numbers to keep.
+            di_name: The names of di-topic precursors to keep.
+            tri_name: The names of tri-topic precursors to keep.
+            start_time: Keep measurements taken at or after this time.
+            end_time: Keep measurements taken before this time.
+
+        Returns:
+            A new query which returns only the matching rows.
+        """
+        predicates = list(self.predicates)
+        parameters = list(self.parameters)
+        for name, value in (
+            ("experiment", experiment),
+            ("plate", plate),
+            ("formulation_number", formulation_number),
+            ("di_name", di_name),
+            ("tri_name", tri_name),
+        ):
+            if value is None:
+                continue
+            expression = self.source.column(name).expression
+            if isinstance(value, str | int):
+                predicates.append(f"{expression} = ?")
+                parameters.append(value)
+            else:
+                values = tuple(value)
+                placeholders = ",".join("?" for _ in values)
+                predicates.append(f"{expression} IN ({placeholders})")
+                parameters.extend(values)
+        for operator, time in ((">=", start_time), ("<", end_time)):
+            if time is None:
+                continue
+            expression = _comparable(self.source.column("time"))
+            predicates.append(f"{expression} {operator} julianday(?)")
+            parameters.append(time.isoformat(" "))
+        return replace(
+            self,
+            predicates=tuple(predicates),
+            parameters=tuple(parameters),
+        )
+
+    def added_between(self, start: int, end: int) -> "LazyQuery":
+        """Keep only rows added to the database between two points.
+
+        Rows are identified by the ``rowid`` of :attr:`QuerySource.table`,
+        which only ever increases as rows are added.
+
+        Parameters:
+            start: Keep rows with a ``rowid`` greater than this.
+            end: Keep rows with a ``rowid`` less than or equal to this.
+
+        Returns:
+            A new query which returns only the matching rows.
+        """
+        return replace(
+            self,
+            predicates=(
+                *self.predicates,
+                f"{self.source.table}.rowid > ?",
+                f"{self.source.table}.rowid <= ?",
+            ),
+            parameters=(*self.parameters, start, end),
+        )
+
+    def head(self, n: int = 5) -> "LazyQuery":
+        """Limit the number of returned rows.
+
+        Parameters:
+            n: The maximum number of rows to return.
+
+        Returns:
+            A new query which returns at most `n` rows.
+        """
+        return replace(self, max_rows=n)
+
+    def sql(self) -> str:
+        """Get the SQL of the query.
+
+        Returns:
+            The SQL of the query. Its parameters are in
+            :attr:`parameters`.
+        """
+        select = ",\n    ".join(
+            f"{column.expression} AS {column.name}"
+            for column in map(self.source.column, self.columns)
+        )
+        order_by = ",\n    ".join(
+            _comparable(self.source.column(name))
+            for name in self.source.order_by
+        )
+        query = f"SELECT\n    {select}\n{self.source.tables}\n"
+        if self.predicates:
+            where = "\n    AND ".join(self.predicates)
+            query += f"WHERE\n    {where}\n"
+        query += f"ORDER BY\n    {order_by}"
+        if self.max_rows is not None:
+            query += f"\nLIMIT {int(self.max_rows)}"
+        return query
+
+    def collect(self) -> pl.DataFrame:
+        """Execute the query.
+
+        Returns:
+            The result of the query.
+        """
+        return self._to_df(
+            self.connection.execute(self.sql(), self.parameters).fetchall()
+        )
+
+    def iter_batches(self, batch_size: int) -> Iterator[pa.RecordBatch]:
+        """Execute the query and stream the result in batches.
+
+        At most `batch_size` rows are held in memory at any one time.
+
+        Parameters:
+            batch_size: The maximum number of rows in a batch.
+
+        Yields:
+            A batch of rows, in the order of the query.
+        """
+        for df in self.iter_frames(batch_size):
+            yield from df.to_arrow().combine_chunks().to_batches()
+
+    def iter_frames(self, batch_size: int) -> Iterator[pl.DataFrame]:
+        """Execute the query and stream the result in DataFrames.
+
+        At most `batch_size` rows are held in memory at any one time.
+
+        Parameters:
+            batch_size: The maximum number of rows in a DataFrame.
+
+        Yields:
+            A DataFrame of rows, in the order of the query.
+        """
+        cursor = self.connection.execute(self.sql(), self.parameters)
+        while rows := cursor.fetchmany(batch_size):
+            yield self._to_df(rows)
+
+    def arrow_schema(self) -> pa.Schema:
+        """Get the Arrow schema of the batches of the query.
+
+        Returns:
+            The schema of the batches yielded by :meth:`iter_batches`.
+        """
+        return self._to_df([]).to_arrow().schema
+
+    def _to_df(self, rows: list[tuple[Any, ...]]) -> pl.DataFrame:
+        schema = self.schema
+        datetime_columns = {
+            name: dtype
+            for name, dtype in schema.items()
+            if isinstance(dtype, pl.Datetime)
+        }
+        df = pl.DataFrame(
+            rows,
+            schema={
+                name: pl.Utf8 if name in datetime_columns else dtype
+                for name, dtype in schema.items()
+            },
+            orient="row",
+        )
+        if not datetime_columns:
+            return df
+        # Times are stored with their UTC offset, and are parsed into the
+        # time zone of the column, so every batch has the same schema.
+        df = df.with_columns(
+            pl.col(name).str.to_datetime(
+                time_unit=dtype.time_unit, time_zone=dtype.time_zone
+            )
+            for name, dtype in datetime_columns.items()
+        )
+        if not all(name in schema for name in self.source.order_by):
+            return df
+        return df.sort(list(self.source.order_by))
+
+
+def _comparable(column: Column) -> str:
+    # Times are stored with the UTC offset they were measured in, so
+    # they are compared as instants. Indexes on the times of a table
+    # must be on this expression to be used for filtering and sorting.
+    if isinstance(column.dtype, pl.Datetime):
+        return f"julianday({column.expression})"
+    return column.expression
@@ -0,0 +1,507 @@
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+import polars as pl
+
+from cagey._internal.tracing import Span
+
+_PROC = Path("/proc")
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+@dataclass(frozen=True, slots=True)
+class RssSample:
+    """The resident memory of a process at a point in time.
+
+    Parameters:
+        time_ns: When the sample was taken, on the monotonic clock.
+        pid: The process.
+        ppid: The parent of the process.
+        name: The name of the process, such as ``java``.
+        rss_bytes: The resident memory of the process.
+    """
+
+    time_ns: int
+    """When the sample was taken, on the monotonic clock."""
+    pid: int
+    """The process."""
+    ppid: int
+    """The parent of the process."""
+    name: str
+    """The name of the process, such as ``java``."""
+    rss_bytes: int
+    """The resident memory of the process."""
+
+
+@dataclass(frozen=True, slots=True)
+class StageAllocations:
+    """The Python memory allocated by a stage.
+
+    Parameters:
+        name: The name of the stage.
+        start_ns: When the stage started, on the monotonic clock.
+        duration_ns: How long the stage took.
+        peak_bytes:
+            The most Python memory allocated at once during the stage.
+        net_bytes:
+            The Python memory allocated by the stage and still held at
+            its end.
+        top_allocations:
+            The source lines which grew the most during the stage,
+            and by how many bytes.
+    """
+
+    name: str
+    """The name of the stage."""
+    start_ns: int
+    """When the stage started, on the monotonic clock."""
+    duration_ns: int
+    """How long the stage took."""
+    peak_bytes: int
+    """The most Python memory allocated at once during the stage."""
+    net_bytes: int
+    """The Python memory allocated by the stage and still held at its end."""
+    top_allocations: list[tuple[str, int]]
+    """The source lines which grew the most during the stage."""
+
+
+@dataclass(slots=True)
+class MemoryProfile:
+    """The memory used while profiling.
+
+    Parameters:
+        samples: The resident memory of each process, over time.
+        stages: The Python memory allocated by each stage.
+    """
+
+    samples: list[RssSample] = field(default_factory=list)
+    """The resident memory of each process, over time."""
+    stages: list[StageAllocations] = field(default_factory=list)
+    """The Python memory allocated by each stage."""
+
+
+@dataclass(slots=True)
+class ChildrenPeak:
+    """The peak resident memory of the programs run inside a block.
+
+    Parameters:
+        rss_bytes: The largest total resident memory of the
+            descendants of the process, or ``None`` if no descendant
+            was sampled.
+    """
+
+    rss_bytes: int | None = None
+    """The largest total resident memory of the descendants of the
+    process, or ``None`` if no descendant was sampled."""
+
+
+_profile: MemoryProfile | None = None
+"""The profile being collected, or ``None`` if not profiling."""
+_NO_STAGE = nullcontext()
+
+
+def rss_samples(pid: int | None = None) -> list[RssSample]:
+    """Sample the resident memory of a process and all its descendants.
+
+    Descendants include pool workers and the programs they run, such
+    as the MZmine JVM and the Docker client. Processes run inside
+    containers are children of the Docker daemon, not of cagey, and
+    are not included. Only Linux is supported, on other systems no
+    samples are returned.
+
+    Parameters:
+        pid: The process. Defaults to the current process.
+
+    Returns:
+        A sample of each process, all taken at the same time.
+    """
+    if not _PROC.exists():
+        return []
+    root = os.getpid() if pid is None else pid
+    now = time.perf_counter_ns()
+    processes: dict[int, tuple[int, str, int]] = {}
+    for path in _PROC.iterdir():
+        if not path.name.isdigit():
+            continue
+        try:
+            stat = (path / "stat").read_text()
+        except OSError:
+            # The process ended after it was listed.
+            continue
+        name, _, rest = stat.partition(" (")[2].rpartition(") ")
+        fields = rest.split()
+        processes[int(path.name)] = (
+            int(fields[1]),
+            name,
+            int(fields[21]) * _PAGE_SIZE,
+        )
+    children = defaultdict(list)
+    for child, (ppid, _, _) in processes.items():
+        children[ppid].append(child)
+    samples = []
+    pending = [root] if root in processes else []
+    while pending:
+        current = pending.pop()
+        ppid, name, rss = processes[current]
+        samples.append(RssSample(now, current, ppid, name, rss))
+        pending.extend(children[current])
+    return samples
+
+
+def is_enabled() -> bool:
+    """Check if memory is being profiled in this process.
+
+    Returns:
+        Whether memory is being profiled.
+    """
+    return _profile is not None
+
+
+@contextmanager
+def profile(
+    *,
+    enabled: bool = True,
+    interval: float = 0.1,
+) -> Iterator[MemoryProfile]:
+    """Profile the memory used by the work done inside the block.
+
+    The resident memory of this process and all its descendants is
+    sampled from a background thread, and :mod:`tracemalloc` tracks
+    the Python memory allocated by each :func:`stage`.
+
+    Parameters:
+        enabled:
+            Whether to profile memory. If ``False``, nothing is
+            collected and :func:`stage` costs next to nothing.
+        interval:
+            The number of seconds between samples of resident memory.
+
+    Yields:
+        The profile, which is filled in as the work is done.
+    """
+    global _profile  # noqa: PLW0603
+    memory_profile = MemoryProfile()
+    if not enabled:
+        yield memory_profile
+        return
+
+    previous = _profile
+    was_tracing = tracemalloc.is_tracing()
+    if not was_tracing:
+        tracemalloc.start()
+    stop = threading.Event()
+    sampler = threading.Thread(
+        target=_sample,
+        args=(memory_profile.samples, os.getpid(), interval, stop),
+        name="cagey-rss-sampler",
+        daemon=True,
+    )
+    _profile = memory_profile
+    sampler.start()
+    try:
+        yield memory_profile
+    finally:
+        stop.set()
+        sampler.join()
+        _profile = previous
+        if not was_tracing:
+            tracemalloc.stop()
+
+
+def _sample(
+    samples: list[RssSample],
+    pid: int,
+    interval: float,
+    stop: threading.Event,
+) -> None:
+    while True:
+        samples.extend(rss_samples(pid))
+        if stop.wait(interval):
+            return
+
+
+@contextmanager
+def children_peak(interval: float = 0.1) -> Iterator[ChildrenPeak]:
+    """Track the peak memory of the programs run inside the block.
+
+    The resident memory of the descendants of this process, such as
+    the MZmine JVM, is sampled from a background thread, so only the
+    programs run inside the block are measured, and programs which
+    finish between two samples are missed. Processes run inside
+    containers are children of the Docker daemon and are not included.
+
+    Parameters:
+        interval: The number of seconds between samples.
+
+    Yields:
+        The peak, which is filled in as the programs run.
+    """
+    peak = ChildrenPeak()
+    stop = threading.Event()
+    sampler = threading.Thread(
+        target=_sample_children,
+        args=(peak, os.getpid(), interval, stop),
+        name="cagey-children-sampler",
+        daemon=True,
+    )
+    sampler.start()
+    try:
+        yield peak
+    finally:
+        stop.set()
+        sampler.join()
+
+
+def _sample_children(
+    peak: ChildrenPeak,
+    pid: int,
+    interval: float,
+    stop: threading.Event,
+) -> None:
+    while True:
+        children = [sample for sample in rss_samples(pid) if sample.pid != pid]
+        if children:
+            peak.rss_bytes = max(
+                peak.rss_bytes or 0,
+                sum(sample.rss_bytes for sample in children),
+            )
+        if stop.wait(interval):
+            return
+
+
+def stage(name: str) -> AbstractContextManager[None]:
+    """Track the Python memory allocated by a stage of work.
+
+    Stages should not be nested, because each stage resets the peak
+    tracked by :mod:`tracemalloc`.
+
+    Parameters:
+        name: The name of the stage.
+
+    Returns:
+        A context manager tracking the allocations inside it.
+    """
+    if _profile is None:
+        return _NO_STAGE
+    return _stage(_profile, name)
+
+
+@contextmanager
+def _stage(memory_profile: MemoryProfile, name: str) -> Iterator[None]:
+    before = _snapshot()
+    start_size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        duration = time.perf_counter_ns() - start
+        end_size, peak = tracemalloc.get_traced_memory()
+        differences = _snapshot().compare_to(before, "lineno")
+        memory_profile.stages.append(
+            StageAllocations(
+                name=name,
+                start_ns=start,
+                duration_ns=duration,
+                peak_bytes=peak - start_size,
+                net_bytes=end_size - start_size,
+                top_allocations=[
+                    (str(difference.traceback[0]), difference.size_diff)
+                    for difference in differences[:5]
+                    if difference.size_diff > 0
+                ],
+            )
+        )
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces(
+        (
+            tracemalloc.Filter(inclusive=False, filename_pattern=__file__),
+            tracemalloc.Filter(
+                inclusive=False, filename_pattern=tracemalloc.__file__
+            ),
+        )
+    )
+
+
+def peak_rss(
+    samples: Iterable[RssSample],
+    pid: int,
+    start_ns: int,
+    end_ns: int,
+    *,
+    descendants: bool = True,
+) -> int | None:
+    """Get the peak resident memory of a process and its descendants.
+
+    Parameters:
+        samples: The samples.
+        pid: The process.
+        start_ns: The start of the time window.
+        end_ns: The end of the time window.
+        descendants: Whether to include the descendants of the process.
+
+    Returns:
+        The largest total resident memory of the process and its
+        descendants, or ``None`` if no sample was taken in the time
+        window.
+    """
+    by_time: dict[int, list[RssSample]] = defaultdict(list)
+    for sample in samples:
+        if start_ns <= sample.time_ns <= end_ns:
+            by_time[sample.time_ns].append(sample)
+    return max(
+        (
+            _tree_rss(sweep, pid, descendants=descendants)
+            for sweep in by_time.values()
+        ),
+        default=None,
+    )
+
+
+def _tree_rss(
+    sweep: list[RssSample],
+    pid: int,
+    *,
+    descendants: bool,
+) -> int:
+    children = defaultdict(list)
+    for sample in sweep:
+        children[sample.ppid].append(sample)
+    total = 0
+    pending = [sample for sample in sweep if sample.pid == pid]
+    while pending:
+        current = pending.pop()
+        total += current.rss_bytes
+        if descendants:
+            pending.extend(children[current.pid])
+    return total
+
+
+def summarize_stages(memory_profile: MemoryProfile) -> pl.DataFrame:
+    """Summarize the memory used by each stage.
+
+    Parameters:
+        memory_profile: The profile.
+
+    Returns:
+        The ``name`` and ``seconds`` of each stage, the
+        ``peak_rss_bytes`` of cagey and all its descendants during it,
+        and the ``python_peak_bytes`` and ``python_net_bytes``
+        allocated by it, in the order the stages ran.
+    """
+    pid = os.getpid()
+    return pl.DataFrame(
+        [
+            (
+                stage.name,
+                stage.duration_ns / 1e9,
+                peak_rss(
+                    memory_profile.samples,
+                    pid,
+                    stage.start_ns,
+                    stage.start_ns + stage.duration_ns,
+                ),
+                stage.peak_bytes,
+                stage.net_bytes,
+            )
+            for stage in memory_profile.stages
+        ],
+        schema={
+            "name": pl.Utf8,
+            "seconds": pl.Float64,
+            "peak_rss_bytes": pl.Int64,
+            "python_peak_bytes": pl.Int64,
+            "python_net_bytes": pl.Int64,
+        },
+        orient="row",
+    )
+
+
+def summarize_files(
+    memory_profile: MemoryProfile,
+    spans: Iterable[Span],
+) -> pl.DataFrame:
+    """Summarize the memory used while processing each file.
+
+    Files are found from the spans with a name ending in ``.file`` and
+    a ``path``. Files processed faster than the sampling interval may
+    have no sample, and so no peak. The peak of a file processed in a
+    worker includes the programs the worker ran, such as the MZmine
+    JVM. The peak of a file processed in this process does not include
+    the workers.
+
+    Parameters:
+        memory_profile: The profile.
+        spans: The spans collected while profiling.
+
+    Returns:
+        The ``stage`` and ``path`` of each file, the ``pid`` of the
+        process which handled it, the ``seconds`` it took and the
+        ``peak_rss_bytes`` of the process, largest first.
+    """
+    pid = os.getpid()
+    return pl.DataFrame(
+        [
+            (
+                span.name.removesuffix(".file"),
+                str(span.args["path"]),
+                span.pid,
+                span.duration_ns / 1e9,
+                peak_rss(
+                    memory_profile.samples,
+                    span.pid,
+                    span.start_ns,
+                    span.start_ns + span.duration_ns,
+                    descendants=span.pid != pid,
+                ),
+            )
+            for span in spans
+            if span.name.endswith(".file") and "path" in span.args
+        ],
+        schema={
+            "stage": pl.Utf8,
+            "path": pl.Utf8,
+            "pid": pl.Int64,
+            "seconds": pl.Float64,
+            "peak_rss_bytes": pl.Int64,
+        },
+        orient="row",
+    ).sort("peak_rss_bytes", descending=True, nulls_last=True)
+
+
+def write_report(
+    path: Path,
+    memory_profile: MemoryProfile,
+    spans: Iterable[Span],
+) -> None:
+    """Write a memory profile as JSON.
+
+    Parameters:
+        path: The path of the JSON file.
+        memory_profile: The profile.
+        spans: The spans collected while profiling.
+    """
+    report = {
+        "stages": summarize_stages(memory_profile).to_dicts(),
+        "files": summarize_files(memory_profile, spans).to_dicts(),
+        "allocations": [
+            {
+                "name": stage.name,
+                "top_allocations": stage.top_allocations,
+            }
+            for stage in memory_profile.stages
+        ],
+        "samples": [asdict(sample) for sample in memory_profile.samples],
+    }
+    with path.open("w") as file:
+        json.dump(report, file)
@@ -1,8 +1,11 @@
+import os
 import pkgutil
+import re
 import subprocess
 import tempfile
 from collections.abc import Iterable, Iterator
 from dataclasses import dataclass
+from functools import cache
 from itertools import product
 from pathlib import Path
 
@@ -82,6 +85,10 @@ CHARGE4_BANNED_ADDUCTS = {
         "K3",
     ]
 }
+_MZMINE_TASKS_NAME = "Number of concurrently running tasks"
+_MZMINE_TASKS = re.compile(
+    rf'<parameter[^>]*name="{_MZMINE_TASKS_NAME}">\d*</parameter>'
+)
 PRECURSOR_COUNTS = (
     (2, 3),
     (4, 6),
@@ -91,6 +98,27 @@ PRECURSOR_COUNTS = (
 )
 
 
+def read_features(path: Path, *, min_peak_height: float = 0) -> pl.DataFrame:
+    """Read the features of a mass spectrum.
+
+    Parameters:
+        path: The path to the mass spectrum csv file made by MZmine.
+        min_peak_height: The minimum peak height of the features to read.
+
+    Returns:
+        The ``mz`` and ``height`` of each feature, in the order of the
+        file.
+    """
+    return (
+        pl.scan_csv(path)
+        .select(
+            pl.col("mz").cast(pl.Float64), pl.col("height").cast(pl.Float64)
+        )
+        .filter(pl.col("height") > min_peak_height)
+        .collect()
+    )
+
+
 def get_peaks(  # noqa: PLR0913
     path: Path,
     di_smiles: str,
@@ -129,26 +157,66 @@ def get_peaks(  # noqa: PLR0913
     Yields:
         A mass spectrum peak.
     """
-    peaks = (
-        pl.scan_csv(path).filter(pl.col("height") > min_peak_height).collect()
+    yield from get_peaks_from_features(
+        read_features(path, min_peak_height=min_peak_height),
+        di_smiles,
+        tri_smiles,
+        calculated_peak_tolerance=calculated_peak_tolerance,
+        separation_peak_tolerance=separation_peak_tolerance,
+        max_ppm_error=max_ppm_error,
+        max_separation=max_separation,
+        min_peak_height=min_peak_height,
+        max_between_peak_height=max_between_peak_height,
     )
-    di_formula = _get_precursor_formula(di_smiles)
-    tri_formula = _get_precursor_formula(tri_smiles)
-    for adduct, charge, (tri_count, di_count) in product(
-        ADDUCTS, CHARGES, PRECURSOR_COUNTS
-    ):
-        if charge == 1 and str(adduct.toString()) in CHARGE1_BANNED_ADDUCTS:
-            continue
-        if charge == 2 and str(adduct.toString()) in CHARGE2_BANNED_ADDUCTS:  # noqa: PLR2004
-            continue
-        if charge == 3 and str(adduct.toString()) in CHARGE3_BANNED_ADDUCTS:  # noqa: PLR2004
-            continue
-        if charge == 4 and str(adduct.toString()) in CHARGE4_BANNED_ADDUCTS:  # noqa: PLR2004
-            continue
 
-        di_data = PrecursorData(di_formula, di_count, 2)
-        tri_data = PrecursorData(tri_formula, tri_count, 3)
-        cage_mz = _get_cage_mz(di_data, tri_data, adduct, charge)
+
+def get_peaks_from_features(  # noqa: PLR0913
+    features: pl.DataFrame,
+    di_smiles: str,
+    tri_smiles: str,
+    *,
+    calculated_peak_tolerance: float = 0.1,
+    separation_peak_tolerance: float = 0.1,
+    max_ppm_error: float = 10,
+    max_separation: float = 0.02,
+    min_peak_height: float = 1e4,
+    max_between_peak_height: float = 0.7,
+) -> Iterator[MassSpectrumPeak]:
+    """Yield the peaks of a mass spectrum from its features.
+
+    This is :func:`get_peaks` for features which have already been
+    read, for example by :func:`read_features` or from the database
+    with :func:`cagey.queries.mass_spectrum_features`, so that peaks can
+    be found again with different parameters without the csv file.
+
+    Parameters:
+        features: The ``mz`` and ``height`` of each feature.
+        di_smiles: The smiles string of the di-topic precursor.
+        tri_smiles: The smiles string of the tri-topic precursor.
+        calculated_peak_tolerance:
+            The delta to the predicted cage m/z in which the cage
+            peaks are found.
+        separation_peak_tolerance:
+            The delta to the predicted separation peak m/z
+            in which the separation peaks are found.
+        max_ppm_error:
+            The maximum allowed error in ppm between the calculated and
+            observed cage m/z.
+        max_separation:
+            The maximum allowed error in the separation between the cage
+            and separation peaks.
+        min_peak_height: The minimum peak height allowed.
+        max_between_peak_height:
+            The maximum allowed height for peaks between the cage and
+            separation peaks.
+
+    Yields:
+        A mass spectrum peak.
+    """
+    peaks = features.filter(pl.col("height") > min_peak_height)
+    for ion in get_cage_ions(di_smiles, tri_smiles):
+        cage_mz = ion.cage_mz
+        charge = ion.charge
         cage_peaks = peaks.filter(
             pl.col("mz").is_between(
                 cage_mz - calculated_peak_tolerance,
@@ -186,9 +254,9 @@ def get_peaks(  # noqa: PLR0913
                 and between_peaks.is_empty()
             ):
                 yield MassSpectrumPeak(
-                    di_count=di_count,
-                    tri_count=tri_count,
-                    adduct=str(adduct.toString()),
+                    di_count=ion.di_count,
+                    tri_count=ion.tri_count,
+                    adduct=ion.adduct,
                     charge=charge,
                     calculated_mz=cage_mz,
                     spectrum_mz=cage_peak["mz"],
@@ -201,6 +269,74 @@ def _get_precursor_formula(smiles: str) -> EmpiricalFormula:
     return EmpiricalFormula(rdkit.CalcMolFormula(rdkit.MolFromSmiles(smiles)))
 
 
+@dataclass(frozen=True, slots=True)
+class CageIon:
+    """An ion of a cage which can be found in a mass spectrum.
+
+    Parameters:
+        adduct: The adduct of the ion.
+        charge: The charge of the ion.
+        tri_count: The number of tri-topic precursors in the cage.
+        di_count: The number of di-topic precursors in the cage.
+        cage_mz: The calculated m/z of the ion.
+    """
+
+    adduct: str
+    """The adduct of the ion."""
+    charge: int
+    """The charge of the ion."""
+    tri_count: int
+    """The number of tri-topic precursors in the cage."""
+    di_count: int
+    """The number of di-topic precursors in the cage."""
+    cage_mz: float
+    """The calculated m/z of the ion."""
+
+
+_BANNED_ADDUCTS = {
+    1: CHARGE1_BANNED_ADDUCTS,
+    2: CHARGE2_BANNED_ADDUCTS,
+    3: CHARGE3_BANNED_ADDUCTS,
+    4: CHARGE4_BANNED_ADDUCTS,
+}
+
+
+@cache
+def get_cage_ions(di_smiles: str, tri_smiles: str) -> tuple[CageIon, ...]:
+    """Get the ions of every cage two precursors can form.
+
+    Results are cached, so the m/z of the cages are only calculated
+    once per pair of precursors in each process.
+
+    Parameters:
+        di_smiles: The smiles string of the di-topic precursor.
+        tri_smiles: The smiles string of the tri-topic precursor.
+
+    Returns:
+        The ions which peaks are looked for in a mass spectrum.
+    """
+    di_formula = _get_precursor_formula(di_smiles)
+    tri_formula = _get_precursor_formula(tri_smiles)
+    return tuple(
+        CageIon(
+            adduct=str(adduct.toString()),
+            charge=charge,
+            tri_count=tri_count,
+            di_count=di_count,
+            cage_mz=_get_cage_mz(
+                PrecursorData(di_formula, di_count, 2),
+                PrecursorData(tri_formula, tri_count, 3),
+                adduct,
+                charge,
+            ),
+        )
+        for adduct, charge, (tri_count, di_count) in product(
+            ADDUCTS, CHARGES, PRECURSOR_COUNTS
+        )
+        if str(adduct.toString()) not in _BANNED_ADDUCTS[charge]
+    )
+
+
 @dataclass(frozen=True, slots=True)
 class Peak:
     mz: float
@@ -326,11 +462,15 @@ def get_topologies(
 
 def machine_data_to_mzml(
     machine_data: Path,
+    *,
+    cpus: int | None = None,
 ) -> Path:
     """Convert the machine data to mzML.
 
     Parameters:
         machine_data: The path to the machine data.
+        cpus: The number of CPUs the container may use. If ``None``,
+            it may use every CPU.
 
     Returns:
         The path to the mzML file.
@@ -340,6 +480,7 @@ def machine_data_to_mzml(
             "docker",
             "run",
             "--rm",
+            *([] if cpus is None else ["--cpus", str(cpus)]),
             "--env",
             "WINEDEBUG=-all",
             "--volume",
@@ -357,12 +498,19 @@ def machine_data_to_mzml(
     return machine_data.parent / f"{machine_data.stem}.mzML"
 
 
-def mzml_to_csv(mzml: Path, mzmine: Path) -> Path:
+def mzml_to_csv(
+    mzml: Path,
+    mzmine: Path,
+    *,
+    threads: int | None = None,
+) -> Path:
     """Convert the mzML file to a csv file.
 
     Parameters:
         mzml: The path to the mzML file.
         mzmine: The path to the MZmine version 3.4.
+        threads: The number of threads MZmine may use. If ``None``,
+            MZmine uses every CPU.
 
     Returns:
         The path to the csv file.
@@ -389,13 +537,31 @@ def mzml_to_csv(mzml: Path, mzmine: Path) -> Path:
     if config is None:
         msg = "failed to load mzmine configuration"
         raise RuntimeError(msg)
+    config_content = config.decode()
+    env = None
+    if threads is not None:
+        config_content = _MZMINE_TASKS.sub(
+            f'<parameter isautomatic="false" name="{_MZMINE_TASKS_NAME}">'
+            f"{threads}</parameter>",
+            config_content,
+        )
+        # Limits the threads of the JVM itself, such as those of the
+        # garbage collector, which are sized to every CPU.
+        java_options = os.environ.get("JAVA_TOOL_OPTIONS", "")
+        env = {
+            **os.environ,
+            "JAVA_TOOL_OPTIONS": (
+                f"{java_options} -XX:ActiveProcessorCount={threads}"
+            ).strip(),
+        }
     with tempfile.NamedTemporaryFile(
         encoding="utf-8", mode="w", suffix=".conf", delete=False
     ) as config_file:
-        config_file.write(config.decode())
+        config_file.write(config_content)
     subprocess.run(
         [str(mzmine), "-batch", input_file.name, "--pref", config_file.name],  # noqa: S603
         check=True,
         capture_output=True,
+        env=env,
     )
     return mzml.with_suffix(".csv")
@@ -6,47 +6,167 @@ from pathlib import Path
 import nmrglue
 import numpy as np
 
-from cagey._internal.types import NmrPeak, NmrSpectrum
+from cagey._internal.types import NmrPeak, NmrRegion, NmrSpectrum
 
+CHLOROFORM_PEAKS = (7.26, 7.52, 7.00)
 
-def get_spectrum(spectrum_dir: Path) -> NmrSpectrum:
+
+def get_spectrum(  # noqa: PLR0913
+    spectrum_dir: Path,
+    *,
+    pthres: float = 1e4,
+    reference_ppm: float = 7.28,
+    reference_atol: float = 0.05,
+    solvent_ppm: float = 7.26,
+    solvent_peaks: Sequence[float] = CHLOROFORM_PEAKS,
+) -> NmrSpectrum:
     """Get NMR spectrum from the machine data directory.
 
     Parameters:
         spectrum_dir: Path to the directory containing the spectrum data.
+        pthres: The minimum intensity of a peak.
+        reference_ppm:
+            The ppm around which the solvent peak is looked for.
+        reference_atol:
+            The distance from `reference_ppm` within which the solvent
+            peak is looked for.
+        solvent_ppm: The ppm the solvent peak is referenced to.
+        solvent_peaks: The referenced ppm of peaks to ignore.
 
     Returns:
         The NMR spectrum.
     """
-    peaks = tuple(_pick_peaks(spectrum_dir))
+    return get_spectrum_from_region(
+        read_region(spectrum_dir),
+        pthres=pthres,
+        reference_ppm=reference_ppm,
+        reference_atol=reference_atol,
+        solvent_ppm=solvent_ppm,
+        solvent_peaks=solvent_peaks,
+    )
 
-    reference_peak_ppm = 7.28
-    possible_reference_peaks = filter(
-        lambda peak: peak.has_ppm(reference_peak_ppm),
-        peaks,
+
+def read_region(spectrum_dir: Path) -> NmrRegion:
+    """Read the processed data of an NMR spectrum.
+
+    Parameters:
+        spectrum_dir: Path to the directory containing the spectrum data.
+
+    Returns:
+        The whole processed spectrum.
+    """
+    metadata, data = nmrglue.bruker.read_pdata(str(spectrum_dir))
+    udic = nmrglue.bruker.guess_udic(metadata, data)
+    unit_conversion = nmrglue.fileio.fileiobase.uc_from_udic(udic)
+    # The step is computed as nmrglue does, so that peaks are given the
+    # same ppm as nmrglue's unit conversion would give them.
+    axis = udic[udic["ndim"] - 1]
+    return NmrRegion(
+        intensities=np.asarray(data, dtype=np.float64),
+        ppm_start=unit_conversion.ppm(0),
+        ppm_step=-float(axis["sw"]) / (int(axis["size"]) * float(axis["obs"])),
     )
-    reference_peak = max(
-        possible_reference_peaks,
-        key=attrgetter("amplitude"),
+
+
+def get_spectrum_from_region(  # noqa: PLR0913
+    region: NmrRegion,
+    *,
+    pthres: float = 1e4,
+    reference_ppm: float = 7.28,
+    reference_atol: float = 0.05,
+    solvent_ppm: float = 7.26,
+    solvent_peaks: Sequence[float] = CHLOROFORM_PEAKS,
+) -> NmrSpectrum:
+    """Get an NMR spectrum from its processed data.
+
+    This is :func:`get_spectrum` for data which has already been read,
+    for example by :func:`read_region` or from the database with
+    :func:`cagey.queries.nmr_spectrum_regions`, so that peaks can be
+    picked and referenced again with different parameters without the
+    machine data. The region must include the solvent peak and the
+    aldehyde and imine regions, between 6.5 and 11 ppm.
+
+    Parameters:
+        region: The processed data.
+        pthres: The minimum intensity of a peak.
+        reference_ppm:
+            The ppm around which the solvent peak is looked for.
+        reference_atol:
+            The distance from `reference_ppm` within which the solvent
+            peak is looked for.
+        solvent_ppm: The ppm the solvent peak is referenced to.
+        solvent_peaks: The referenced ppm of peaks to ignore.
+
+    Returns:
+        The NMR spectrum.
+    """
+    peaks = tuple(_pick_peaks(region, pthres))
+    reference_shift = _get_reference_shift(
+        peaks, reference_ppm, reference_atol, solvent_ppm
     )
-    reference_shift = 7.26 - reference_peak.ppm
-    chloroform_peaks = [7.26, 7.52, 7.00]
     return NmrSpectrum(
         aldehyde_peaks=tuple(
-            _get_aldehyde_peaks(peaks, reference_shift, chloroform_peaks)
+            _get_aldehyde_peaks(peaks, reference_shift, solvent_peaks)
         ),
         imine_peaks=tuple(
-            _get_imine_peaks(peaks, reference_shift, chloroform_peaks)
+            _get_imine_peaks(peaks, reference_shift, solvent_peaks)
         ),
     )
 
 
-def _pick_peaks(spectrum_dir: Path) -> Iterator[NmrPeak]:
-    metadata, data = nmrglue.bruker.read_pdata(str(spectrum_dir))
-    udic = nmrglue.bruker.guess_udic(metadata, data)
-    unit_conversion = nmrglue.fileio.fileiobase.uc_from_udic(udic)
-    for peak in nmrglue.peakpick.pick(data, pthres=1e4, nthres=None):
-        shift = unit_conversion.ppm(peak["X_AXIS"])
+def get_reference_shift(
+    region: NmrRegion,
+    *,
+    pthres: float = 1e4,
+    reference_ppm: float = 7.28,
+    reference_atol: float = 0.05,
+    solvent_ppm: float = 7.26,
+) -> float:
+    """Get the shift which references a spectrum to the solvent.
+
+    Parameters:
+        region: The processed data.
+        pthres: The minimum intensity of a peak.
+        reference_ppm:
+            The ppm around which the solvent peak is looked for.
+        reference_atol:
+            The distance from `reference_ppm` within which the solvent
+            peak is looked for.
+        solvent_ppm: The ppm the solvent peak is referenced to.
+
+    Returns:
+        The shift which is added to the ppm of the picked peaks.
+    """
+    return _get_reference_shift(
+        tuple(_pick_peaks(region, pthres)),
+        reference_ppm,
+        reference_atol,
+        solvent_ppm,
+    )
+
+
+def _get_reference_shift(
+    peaks: Iterable[NmrPeak],
+    reference_ppm: float,
+    reference_atol: float,
+    solvent_ppm: float,
+) -> float:
+    possible_reference_peaks = filter(
+        lambda peak: peak.has_ppm(reference_ppm, reference_atol),
+        peaks,
+    )
+    reference_peak = max(
+        possible_reference_peaks,
+        key=attrgetter("amplitude"),
+    )
+    return solvent_ppm - reference_peak.ppm
+
+
+def _pick_peaks(region: NmrRegion, pthres: float) -> Iterator[NmrPeak]:
+    for peak in nmrglue.peakpick.pick(
+        region.intensities, pthres=pthres, nthres=None
+    ):
+        shift = region.ppm_start + region.ppm_step * peak["X_AXIS"]
         amplitude = peak["VOL"]
         yield NmrPeak(shift, amplitude)
 
@@ -0,0 +1,244 @@
+import cProfile
+import pstats
+import signal
+import time
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from types import FrameType
+from typing import Any
+
+import polars as pl
+
+Frame = tuple[str, int, str]
+"""The file, first line and name of a function."""
+
+_HOTSPOTS_SCHEMA = {
+    "function": pl.Utf8,
+    "file": pl.Utf8,
+    "line": pl.Int64,
+    "calls": pl.Int64,
+    "self_seconds": pl.Float64,
+    "total_seconds": pl.Float64,
+}
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class DeterministicProfile:
+    """A profile of every function call.
+
+    Parameters:
+        seconds: The wall time of each profiled call.
+        stats: The statistics collected by :mod:`cProfile`.
+    """
+
+    seconds: list[float]
+    """The wall time of each profiled call."""
+    stats: pstats.Stats
+    """The statistics collected by :mod:`cProfile`."""
+
+    def hotspots(self) -> pl.DataFrame:
+        """Get the time spent in each function.
+
+        Returns:
+            The ``function``, ``file`` and ``line`` of each function,
+            the number of ``calls`` to it, the ``self_seconds`` spent
+            in it and the ``total_seconds`` including the functions it
+            called, slowest first.
+        """
+        # Maps (file, line, function) to (primitive calls, calls,
+        # self seconds, total seconds, callers).
+        stats: dict[Frame, tuple[Any, ...]]
+        stats = self.stats.stats  # type: ignore[attr-defined]
+        return pl.DataFrame(
+            [
+                (function, file, line, calls, self_seconds, total_seconds)
+                for (file, line, function), (
+                    _,
+                    calls,
+                    self_seconds,
+                    total_seconds,
+                    _,
+                ) in stats.items()
+            ],
+            schema=_HOTSPOTS_SCHEMA,
+            orient="row",
+        ).sort("self_seconds", descending=True)
+
+    def write(self, path: Path) -> None:
+        """Write the statistics as a :mod:`pstats` file.
+
+        The file can be read with :class:`pstats.Stats` or viewers such
+        as snakeviz.
+
+        Parameters:
+            path: The path of the file.
+        """
+        self.stats.dump_stats(path)
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class SamplingProfile:
+    """A profile of the call stacks sampled at regular intervals.
+
+    Parameters:
+        seconds: The wall time of each profiled call.
+        cpu_seconds: The CPU time used by all the profiled calls.
+        stacks: The number of times each call stack was sampled,
+            outermost function first.
+    """
+
+    seconds: list[float]
+    """The wall time of each profiled call."""
+    cpu_seconds: float
+    """The CPU time used by all the profiled calls."""
+    stacks: Counter[tuple[Frame, ...]]
+    """The number of times each call stack was sampled."""
+
+    def hotspots(self) -> pl.DataFrame:
+        """Get the time spent in each function.
+
+        Times are estimated by splitting the CPU time between the
+        samples, so time spent waiting, such as on a subprocess, is
+        not counted.
+
+        Returns:
+            The ``function``, ``file`` and ``line`` of each function,
+            ``null`` ``calls``, the ``self_seconds`` spent in it and
+            the ``total_seconds`` including the functions it called,
+            slowest first.
+        """
+        seconds_per_sample = self.cpu_seconds / max(self.stacks.total(), 1)
+        self_samples: Counter[Frame] = Counter()
+        total_samples: Counter[Frame] = Counter()
+        for stack, count in self.stacks.items():
+            self_samples[stack[-1]] += count
+            for frame in set(stack):
+                total_samples[frame] += count
+        return pl.DataFrame(
+            [
+                (
+                    function,
+                    file,
+                    line,
+                    None,
+                    self_samples[(file, line, function)] * seconds_per_sample,
+                    count * seconds_per_sample,
+                )
+                for (file, line, function), count in total_samples.items()
+            ],
+            schema=_HOTSPOTS_SCHEMA,
+            orient="row",
+        ).sort("self_seconds", "total_seconds", descending=True)
+
+    def write(self, path: Path) -> None:
+        """Write the stacks in the collapsed format of flame graphs.
+
+        The file can be read by ``flamegraph.pl``, speedscope or
+        Perfetto.
+
+        Parameters:
+            path: The path of the file.
+        """
+        with path.open("w") as file:
+            for stack, count in self.stacks.items():
+                frames = ";".join(
+                    f"{function} ({file}:{line})"
+                    for file, line, function in stack
+                )
+                file.write(f"{frames} {count}\n")
+
+
+def profile_deterministic(
+    function: Callable[[], Any],
+    *,
+    repeat: int = 5,
+    warmup: int = 1,
+) -> DeterministicProfile:
+    """Profile every function call made by a function.
+
+    Parameters:
+        function: The function to profile.
+        repeat: The number of times to call the function.
+        warmup:
+            The number of times to call the function before profiling,
+            so that imports and caches do not count.
+
+    Returns:
+        The profile.
+    """
+    for _ in range(warmup):
+        function()
+    profiler = cProfile.Profile()
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        profiler.runcall(function)
+        seconds.append(time.perf_counter() - start)
+    return DeterministicProfile(seconds, pstats.Stats(profiler))
+
+
+def profile_sampling(
+    function: Callable[[], Any],
+    *,
+    repeat: int = 5,
+    warmup: int = 1,
+    interval: float = 1e-3,
+) -> SamplingProfile:
+    """Profile a function by sampling its call stack.
+
+    Sampling adds much less overhead than
+    :func:`profile_deterministic`, so the time spent in small, often
+    called functions is not inflated. The call stack is sampled every
+    `interval` seconds of CPU time, using ``SIGPROF``, so this only
+    works in the main thread on Unix. Many systems cannot sample more
+    often than every few milliseconds, so repeat short functions
+    enough times to collect a useful number of samples.
+
+    Parameters:
+        function: The function to profile.
+        repeat: The number of times to call the function.
+        warmup:
+            The number of times to call the function before profiling,
+            so that imports and caches do not count.
+        interval: The seconds of CPU time between samples.
+
+    Returns:
+        The profile.
+    """
+    for _ in range(warmup):
+        function()
+    stacks: Counter[tuple[Frame, ...]] = Counter()
+
+    def sample(signum: int, frame: FrameType | None) -> None:  # noqa: ARG001
+        stack = []
+        while frame is not None and frame.f_code is not _sampled.__code__:
+            code = frame.f_code
+            stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+        if frame is not None and stack:
+            stacks[tuple(reversed(stack))] += 1
+
+    previous = signal.signal(signal.SIGPROF, sample)
+    # The timer runs across all the calls, because restarting it for
+    # each call would never sample calls shorter than the interval.
+    signal.setitimer(signal.ITIMER_PROF, interval, interval)
+    seconds = []
+    cpu_seconds = 0.0
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            cpu_start = time.process_time()
+            _sampled(function)
+            cpu_seconds += time.process_time() - cpu_start
+            seconds.append(time.perf_counter() - start)
+    finally:
+        signal.setitimer(signal.ITIMER_PROF, 0)
+        signal.signal(signal.SIGPROF, previous)
+    return SamplingProfile(seconds, cpu_seconds, stacks)
+
+
+def _sampled(function: Callable[[], Any]) -> None:
+    # Marks the bottom of the sampled call stacks.
+    function()
@@ -1,15 +1,34 @@
+import json
 import pkgutil
 from collections.abc import Iterable, Iterator, Sequence
 from dataclasses import asdict, astuple
 from datetime import datetime
 from sqlite3 import Connection
+from typing import Any, Literal
 
 import polars as pl
+import pyarrow as pa
 
+from cagey._internal.codecs import (
+    decode_features,
+    decode_intensities,
+    encode_features,
+    encode_intensities,
+)
+from cagey._internal.lazy import Column, LazyQuery, QuerySource
+from cagey._internal.tracing import traced
 from cagey._internal.types import (
+    AnalysisParameters,
+    IngestChange,
+    IngestFileMetrics,
+    IngestKind,
+    IngestRun,
     MassSpectrumId,
+    MassSpectrumParameters,
     MassSpectrumPeak,
     MassSpectrumTopologyAssignment,
+    NmrParameters,
+    NmrRegion,
     NmrSpectrum,
     NmrSpectrumId,
     Precursor,
@@ -17,6 +36,7 @@ from cagey._internal.types import (
     Reaction,
     ReactionKey,
     Row,
+    TurbidityParameters,
     TurbidState,
 )
 
@@ -25,6 +45,10 @@ class CreateTablesError(Exception):
     """Raised when the tables cannot be created."""
 
 
+class InsertIngestRunError(Exception):
+    """Raised when the metrics of a run cannot be inserted."""
+
+
 class InsertMassSpectrumError(Exception):
     """Raised when a mass spectrum cannot be inserted."""
 
@@ -40,11 +64,339 @@ def create_tables(connection: Connection) -> None:
         connection: A SQLite connection.
     """
     script = pkgutil.get_data("cagey", "_internal/sql/create_tables.sql")
-    if script is not None:
-        connection.executescript(script.decode())
-    else:
+    if script is None:
         msg = "failed to load create_tables.sql"
         raise CreateTablesError(msg)
+    tables = {
+        name
+        for (name,) in connection.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'"
+        )
+    }
+    connection.executescript(script.decode())
+    # Databases made before the summaries were kept get them for every
+    # reaction, not only for those added from now on.
+    if "reaction_summaries" not in tables:
+        rebuild_reaction_summaries(connection)
+    # CREATE TABLE IF NOT EXISTS leaves out the columns added to a table
+    # after the database was made.
+    ingest_file_metrics_columns = {
+        name
+        for _, name, *_ in connection.execute(
+            "PRAGMA table_info(ingest_file_metrics)"
+        )
+    }
+    if "memory_bytes" not in ingest_file_metrics_columns:
+        connection.execute(
+            "ALTER TABLE ingest_file_metrics ADD COLUMN memory_bytes INTEGER"
+        )
+        connection.commit()
+
+
+_REACTION_COLUMNS = (
+    Column("experiment", "reactions.experiment", pl.Utf8),
+    Column("plate", "reactions.plate", pl.Int64),
+    Column("formulation_number", "reactions.formulation_number", pl.Int64),
+    Column("di_name", "reactions.di_name", pl.Utf8),
+    Column("tri_name", "reactions.tri_name", pl.Utf8),
+)
+_REACTION_ORDER = ("experiment", "plate", "formulation_number")
+
+_PRECURSORS = QuerySource(
+    table="precursors",
+    columns=(
+        Column("name", "precursors.name", pl.Utf8),
+        Column("smiles", "precursors.smiles", pl.Utf8),
+    ),
+    tables="FROM\n    precursors",
+    order_by=("name",),
+)
+_REACTIONS = QuerySource(
+    table="reactions",
+    columns=_REACTION_COLUMNS,
+    tables="FROM\n    reactions",
+    order_by=(*_REACTION_ORDER, "di_name", "tri_name"),
+)
+# CROSS JOIN makes SQLite read the reactions first, here and in the
+# queries below, so that rows come out of the indexes in order and do
+# not have to be sorted as a whole.
+_ALDEHYDE_PEAKS = QuerySource(
+    table="nmr_aldehyde_peaks",
+    columns=(
+        *_REACTION_COLUMNS,
+        Column("ppm", "nmr_aldehyde_peaks.ppm", pl.Float64),
+        Column("amplitude", "nmr_aldehyde_peaks.amplitude", pl.Float64),
+    ),
+    tables="""FROM
+    reactions
+CROSS JOIN
+    nmr_spectra
+    ON nmr_spectra.reaction_id = reactions.id
+CROSS JOIN
+    nmr_aldehyde_peaks
+    ON nmr_aldehyde_peaks.nmr_spectrum_id = nmr_spectra.id""",
+    order_by=(*_REACTION_ORDER, "ppm"),
+)
+_IMINE_PEAKS = QuerySource(
+    table="nmr_imine_peaks",
+    columns=(
+        *_REACTION_COLUMNS,
+        Column("ppm", "nmr_imine_peaks.ppm", pl.Float64),
+        Column("amplitude", "nmr_imine_peaks.amplitude", pl.Float64),
+    ),
+    tables="""FROM
+    reactions
+CROSS JOIN
+    nmr_spectra
+    ON nmr_spectra.reaction_id = reactions.id
+CROSS JOIN
+    nmr_imine_peaks
+    ON nmr_imine_peaks.nmr_spectrum_id = nmr_spectra.id""",
+    order_by=(*_REACTION_ORDER, "ppm"),
+)
+_ALDEHYDE_PEAKS_BY_PPM = QuerySource(
+    table="nmr_aldehyde_peaks",
+    columns=_ALDEHYDE_PEAKS.columns,
+    tables="""FROM
+    nmr_aldehyde_peaks
+JOIN
+    nmr_spectra
+    ON nmr_aldehyde_peaks.nmr_spectrum_id = nmr_spectra.id
+JOIN
+    reactions
+    ON nmr_spectra.reaction_id = reactions.id""",
+    order_by=_ALDEHYDE_PEAKS.order_by,
+)
+_IMINE_PEAKS_BY_PPM = QuerySource(
+    table="nmr_imine_peaks",
+    columns=_IMINE_PEAKS.columns,
+    tables="""FROM
+    nmr_imine_peaks
+JOIN
+    nmr_spectra
+    ON nmr_imine_peaks.nmr_spectrum_id = nmr_spectra.id
+JOIN
+    reactions
+    ON nmr_spectra.reaction_id = reactions.id""",
+    order_by=_IMINE_PEAKS.order_by,
+)
+_MASS_SPECTRUM_PEAK_COLUMNS = (
+    *_REACTION_COLUMNS,
+    Column("tri_count", "mass_spectrum_peaks.tri_count", pl.Int64),
+    Column("di_count", "mass_spectrum_peaks.di_count", pl.Int64),
+    Column("adduct", "mass_spectrum_peaks.adduct", pl.Utf8),
+    Column("charge", "mass_spectrum_peaks.charge", pl.Int64),
+    Column("calculated_mz", "mass_spectrum_peaks.calculated_mz", pl.Float64),
+    Column("spectrum_mz", "mass_spectrum_peaks.spectrum_mz", pl.Float64),
+    Column("separation_mz", "mass_spectrum_peaks.separation_mz", pl.Float64),
+    Column("intensity", "mass_spectrum_peaks.intensity", pl.Float64),
+)
+_MASS_SPECTRUM_PEAKS = QuerySource(
+    table="mass_spectrum_peaks",
+    columns=_MASS_SPECTRUM_PEAK_COLUMNS,
+    tables="""FROM
+    reactions
+CROSS JOIN
+    mass_spectra
+    ON mass_spectra.reaction_id = reactions.id
+CROSS JOIN
+    mass_spectrum_peaks
+    ON mass_spectrum_peaks.mass_spectrum_id = mass_spectra.id""",
+    order_by=(*_REACTION_ORDER, "spectrum_mz"),
+)
+# Lookups by m/z or ppm start from the indexes of the peaks instead.
+_MASS_SPECTRUM_PEAKS_BY_MZ = QuerySource(
+    table="mass_spectrum_peaks",
+    columns=_MASS_SPECTRUM_PEAK_COLUMNS,
+    tables="""FROM
+    mass_spectrum_peaks
+JOIN
+    mass_spectra
+    ON mass_spectrum_peaks.mass_spectrum_id = mass_spectra.id
+JOIN
+    reactions
+    ON mass_spectra.reaction_id = reactions.id""",
+    order_by=(*_REACTION_ORDER, "spectrum_mz"),
+)
+_MASS_SPECTRUM_TOPOLOGY_ASSIGNMENTS = QuerySource(
+    table="mass_spectrum_topology_assignments",
+    columns=(
+        *_MASS_SPECTRUM_PEAK_COLUMNS,
+        Column(
+            "topology", "mass_spectrum_topology_assignments.topology", pl.Utf8
+        ),
+    ),
+    tables="""FROM
+    reactions
+CROSS JOIN
+    mass_spectra
+    ON mass_spectra.reaction_id = reactions.id
+CROSS JOIN
+    mass_spectrum_peaks
+    ON mass_spectrum_peaks.mass_spectrum_id = mass_spectra.id
+CROSS JOIN
+    mass_spectrum_topology_assignments
+    ON mass_spectrum_topology_assignments.mass_spectrum_peak_id =
+    mass_spectrum_peaks.id""",
+    order_by=(*_REACTION_ORDER, "spectrum_mz"),
+)
+_TURBIDITY_DISSOLVED_REFERENCES = QuerySource(
+    table="turbidity_dissolved_references",
+    columns=(
+        *_REACTION_COLUMNS,
+        Column(
+            "dissolved_reference",
+            "turbidity_dissolved_references.dissolved_reference",
+            pl.Float64,
+        ),
+    ),
+    tables="""FROM
+    reactions
+CROSS JOIN
+    turbidity_dissolved_references
+    ON turbidity_dissolved_references.reaction_id = reactions.id""",
+    order_by=_REACTION_ORDER,
+)
+_TURBIDITY_MEASUREMENTS = QuerySource(
+    table="turbidity_measurements",
+    columns=(
+        *_REACTION_COLUMNS,
+        Column(
+            "time", "turbidity_measurements.time", pl.Datetime("us", "UTC")
+        ),
+        Column("turbidity", "turbidity_measurements.turbidity", pl.Float64),
+    ),
+    tables="""FROM
+    reactions
+CROSS JOIN
+    turbidity_measurements
+    ON turbidity_measurements.reaction_id = reactions.id""",
+    order_by=(*_REACTION_ORDER, "time"),
+)
+_TURBIDITY_STATES = QuerySource(
+    table="turbidities",
+    columns=(
+        *_REACTION_COLUMNS,
+        Column("state", "turbidities.state", pl.Utf8),
+    ),
+    tables="""FROM
+    reactions
+CROSS JOIN
+    turbidities
+    ON turbidities.reaction_id = reactions.id""",
+    order_by=_REACTION_ORDER,
+)
+
+
+_REACTION_SUMMARIES = QuerySource(
+    table="reaction_summaries",
+    columns=(
+        *_REACTION_COLUMNS,
+        Column("topologies", "reaction_summaries.topologies", pl.Utf8),
+        *(
+            Column(
+                f"max_intensity_{topology}",
+                f"reaction_summaries.max_intensity_{topology}",
+                pl.Float64,
+            )
+            for topology in ("2_plus_3", "4_plus_6", "6_plus_9", "8_plus_12")
+        ),
+        Column(
+            "aldehyde_peak_count",
+            "reaction_summaries.aldehyde_peak_count",
+            pl.Int64,
+        ),
+        Column(
+            "max_aldehyde_amplitude",
+            "reaction_summaries.max_aldehyde_amplitude",
+            pl.Float64,
+        ),
+        Column(
+            "imine_peak_count", "reaction_summaries.imine_peak_count", pl.Int64
+        ),
+        Column(
+            "max_imine_amplitude",
+            "reaction_summaries.max_imine_amplitude",
+            pl.Float64,
+        ),
+        Column("turbid_state", "reaction_summaries.turbid_state", pl.Utf8),
+    ),
+    tables="""FROM
+    reactions
+CROSS JOIN
+    reaction_summaries
+    ON reaction_summaries.reaction_id = reactions.id""",
+    order_by=_REACTION_ORDER,
+)
+_REPROCESSED_REACTIONS = QuerySource(
+    table="reprocessed_reactions",
+    columns=_REACTION_COLUMNS,
+    tables="""FROM
+    reactions
+CROSS JOIN
+    reprocessed_reactions
+    ON reprocessed_reactions.reaction_id = reactions.id""",
+    order_by=_REACTION_ORDER,
+)
+_REPROCESSED_MASS_SPECTRUM_PEAKS = QuerySource(
+    table="reprocessed_mass_spectrum_peaks",
+    columns=(
+        *_REACTION_COLUMNS,
+        *(
+            Column(
+                column.name,
+                column.expression.replace(
+                    "mass_spectrum_peaks.",
+                    "reprocessed_mass_spectrum_peaks.",
+                ),
+                column.dtype,
+            )
+            for column in _MASS_SPECTRUM_PEAK_COLUMNS[len(_REACTION_COLUMNS) :]
+        ),
+        Column(
+            "topology", "reprocessed_mass_spectrum_peaks.topology", pl.Utf8
+        ),
+    ),
+    tables="""FROM
+    reactions
+CROSS JOIN
+    reprocessed_mass_spectrum_peaks
+    ON reprocessed_mass_spectrum_peaks.reaction_id = reactions.id""",
+    order_by=(*_REACTION_ORDER, "spectrum_mz"),
+)
+_REPROCESSED_NMR_PEAKS = QuerySource(
+    table="reprocessed_nmr_peaks",
+    columns=(
+        *_REACTION_COLUMNS,
+        Column("kind", "reprocessed_nmr_peaks.kind", pl.Utf8),
+        Column("ppm", "reprocessed_nmr_peaks.ppm", pl.Float64),
+        Column("amplitude", "reprocessed_nmr_peaks.amplitude", pl.Float64),
+    ),
+    tables="""FROM
+    reactions
+CROSS JOIN
+    reprocessed_nmr_peaks
+    ON reprocessed_nmr_peaks.reaction_id = reactions.id""",
+    order_by=(*_REACTION_ORDER, "kind", "ppm"),
+)
+_REPROCESSED_TURBIDITIES = QuerySource(
+    table="reprocessed_turbidities",
+    columns=(
+        *_REACTION_COLUMNS,
+        Column("state", "reprocessed_turbidities.state", pl.Utf8),
+    ),
+    tables="""FROM
+    reactions
+CROSS JOIN
+    reprocessed_turbidities
+    ON reprocessed_turbidities.reaction_id = reactions.id""",
+    order_by=_REACTION_ORDER,
+)
+_PARAMETER_KINDS: dict[type[AnalysisParameters], IngestKind] = {
+    MassSpectrumParameters: IngestKind.MASS_SPECTRUM,
+    NmrParameters: IngestKind.NMR_SPECTRUM,
+    TurbidityParameters: IngestKind.TURBIDITY,
+}
 
 
 def precursors_df(connection: Connection) -> pl.DataFrame:
@@ -56,18 +408,39 @@ def precursors_df(connection: Connection) -> pl.DataFrame:
     Returns:
         A DataFrame of precursors.
     """
-    return pl.read_database(
-        """
-      SELECT
-          precursors.name,
-          precursors.smiles
-      FROM
-          precursors
-      ORDER BY
-          precursors.name
-      """,
-        connection,
-    )
+    return precursors_lazy(connection).collect()
+
+
+def precursors_lazy(connection: Connection) -> LazyQuery:
+    """Return a lazy query of precursors.
+
+    Filters and column selections applied to the query are compiled
+    into its SQL, so only the requested data is read.
+
+    Parameters:
+        connection: A SQLite connection.
+
+    Returns:
+        A lazy query of precursors.
+    """
+    return LazyQuery(connection, _PRECURSORS)
+
+
+def iter_precursors_batches(
+    connection: Connection,
+    *,
+    batch_size: int = 100_000,
+) -> Iterator[pa.RecordBatch]:
+    """Stream precursors in batches.
+
+    Parameters:
+        connection: A SQLite connection.
+        batch_size: The maximum number of rows in a batch.
+
+    Yields:
+        A batch of precursors, ordered by name.
+    """
+    yield from precursors_lazy(connection).iter_batches(batch_size)
 
 
 def reactions_df(connection: Connection) -> pl.DataFrame:
@@ -79,31 +452,39 @@ def reactions_df(connection: Connection) -> pl.DataFrame:
     Returns:
         A DataFrame of reactions.
     """
-    return pl.read_database(
-        """
-      SELECT
-          reactions.experiment,
-          reactions.plate,
-          reactions.formulation_number,
-          di.name AS di_name,
-          tri.name AS tri_name
-      FROM
-          reactions
-      LEFT JOIN
-          precursors AS di
-          ON reactions.di_name = di.name
-      LEFT JOIN
-          precursors AS tri
-          ON reactions.tri_name = tri.name
-      ORDER BY
-          reactions.experiment,
-          reactions.plate,
-          reactions.formulation_number,
-          di.name,
-          tri.name
-      """,
-        connection,
-    )
+    return reactions_lazy(connection).collect()
+
+
+def reactions_lazy(connection: Connection) -> LazyQuery:
+    """Return a lazy query of reactions.
+
+    Filters and column selections applied to the query are compiled
+    into its SQL, so only the requested data is read.
+
+    Parameters:
+        connection: A SQLite connection.
+
+    Returns:
+        A lazy query of reactions.
+    """
+    return LazyQuery(connection, _REACTIONS)
+
+
+def iter_reactions_batches(
+    connection: Connection,
+    *,
+    batch_size: int = 100_000,
+) -> Iterator[pa.RecordBatch]:
+    """Stream reactions in batches.
+
+    Parameters:
+        connection: A SQLite connection.
+        batch_size: The maximum number of rows in a batch.
+
+    Yields:
+        A batch of reactions, ordered by reaction.
+    """
+    yield from reactions_lazy(connection).iter_batches(batch_size)
 
 
 def aldehyde_peaks_df(connection: Connection) -> pl.DataFrame:
@@ -115,38 +496,39 @@ def aldehyde_peaks_df(connection: Connection) -> pl.DataFrame:
     Returns:
         A DataFrame of aldehyde peaks.
     """
-    return pl.read_database(
-        """
-      SELECT
-          reactions.experiment,
-          reactions.plate,
-          reactions.formulation_number,
-          di.name AS di_name,
-          tri.name AS tri_name,
-          nmr_aldehyde_peaks.ppm,
-          nmr_aldehyde_peaks.amplitude
-      FROM
-          nmr_aldehyde_peaks
-      LEFT JOIN
-          nmr_spectra
-          ON nmr_aldehyde_peaks.nmr_spectrum_id = nmr_spectra.id
-      LEFT JOIN
-          reactions
-          ON nmr_spectra.reaction_id = reactions.id
-      LEFT JOIN
-          precursors AS di
-          ON reactions.di_name = di.name
-      LEFT JOIN
-          precursors AS tri
-          ON reactions.tri_name = tri.name
-      ORDER BY
-          reactions.experiment,
-          reactions.plate,
-          reactions.formulation_number,
-          nmr_aldehyde_peaks.ppm
-      """,
-        connection,
-    )
+    return aldehyde_peaks_lazy(connection).collect()
+
+
+def aldehyde_peaks_lazy(connection: Connection) -> LazyQuery:
+    """Return a lazy query of aldehyde peaks.
+
+    Filters and column selections applied to the query are compiled
+    into its SQL, so only the requested data is read.
+
+    Parameters:
+        connection: A SQLite connection.
+
+    Returns:
+        A lazy query of aldehyde peaks.
+    """
+    return LazyQuery(connection, _ALDEHYDE_PEAKS)
+
+
+def iter_aldehyde_peaks_batches(
+    connection: Connection,
+    *,
+    batch_size: int = 100_000,
+) -> Iterator[pa.RecordBatch]:
+    """Stream aldehyde peaks in batches.
+
+    Parameters:
+        connection: A SQLite connection.
+        batch_size: The maximum number of rows in a batch.
+
+    Yields:
+        A batch of aldehyde peaks, ordered by reaction.
+    """
+    yield from aldehyde_peaks_lazy(connection).iter_batches(batch_size)
 
 
 def imine_peaks_df(connection: Connection) -> pl.DataFrame:
@@ -156,269 +538,938 @@ def imine_peaks_df(connection: Connection) -> pl.DataFrame:
         connection: A SQLite connection.
 
     Returns:
-        A DataFrame of imine peaks.
+        A DataFrame of imine peaks.
+    """
+    return imine_peaks_lazy(connection).collect()
+
+
+def imine_peaks_lazy(connection: Connection) -> LazyQuery:
+    """Return a lazy query of imine peaks.
+
+    Filters and column selections applied to the query are compiled
+    into its SQL, so only the requested data is read.
+
+    Parameters:
+        connection: A SQLite connection.
+
+    Returns:
+        A lazy query of imine peaks.
+    """
+    return LazyQuery(connection, _IMINE_PEAKS)
+
+
+def iter_imine_peaks_batches(
+    connection: Connection,
+    *,
+    batch_size: int = 100_000,
+) -> Iterator[pa.RecordBatch]:
+    """Stream imine peaks in batches.
+
+    Parameters:
+        connection: A SQLite connection.
+        batch_size: The maximum number of rows in a batch.
+
+    Yields:
+        A batch of imine peaks, ordered by reaction.
+    """
+    yield from imine_peaks_lazy(connection).iter_batches(batch_size)
+
+
+def aldehyde_peaks_in_ppm_range(
+    connection: Connection,
+    low: float,
+    high: float,
+    *,
+    min_amplitude: float | None = None,
+) -> pl.DataFrame:
+    """Return a DataFrame of aldehyde peaks in a ppm range.
+
+    The peaks are found with an index, so the time taken grows with
+    the logarithm of the number of peaks in the database.
+
+    Parameters:
+        connection: A SQLite connection.
+        low: The lowest ppm to include.
+        high: The highest ppm to include.
+        min_amplitude: If given, only include peaks with at least this
+            amplitude.
+
+    Returns:
+        A DataFrame of the aldehyde peaks, with the same columns as
+        :func:`aldehyde_peaks_df`.
+    """
+    return _peaks_in_range(
+        connection, _ALDEHYDE_PEAKS_BY_PPM, "ppm", low, high, min_amplitude
+    )
+
+
+def imine_peaks_in_ppm_range(
+    connection: Connection,
+    low: float,
+    high: float,
+    *,
+    min_amplitude: float | None = None,
+) -> pl.DataFrame:
+    """Return a DataFrame of imine peaks in a ppm range.
+
+    The peaks are found with an index, so the time taken grows with
+    the logarithm of the number of peaks in the database.
+
+    Parameters:
+        connection: A SQLite connection.
+        low: The lowest ppm to include.
+        high: The highest ppm to include.
+        min_amplitude: If given, only include peaks with at least this
+            amplitude.
+
+    Returns:
+        A DataFrame of the imine peaks, with the same columns as
+        :func:`imine_peaks_df`.
+    """
+    return _peaks_in_range(
+        connection, _IMINE_PEAKS_BY_PPM, "ppm", low, high, min_amplitude
+    )
+
+
+def mass_spectrum_peaks_df(connection: Connection) -> pl.DataFrame:
+    """Return a DataFrame of mass spectrum peaks.
+
+    Parameters:
+        connection: A SQLite connection.
+
+    Returns:
+        A DataFrame of mass spectrum peaks.
+    """
+    return mass_spectrum_peaks_lazy(connection).collect()
+
+
+def mass_spectrum_peaks_lazy(connection: Connection) -> LazyQuery:
+    """Return a lazy query of mass spectrum peaks.
+
+    Filters and column selections applied to the query are compiled
+    into its SQL, so only the requested data is read.
+
+    Parameters:
+        connection: A SQLite connection.
+
+    Returns:
+        A lazy query of mass spectrum peaks.
+    """
+    return LazyQuery(connection, _MASS_SPECTRUM_PEAKS)
+
+
+def iter_mass_spectrum_peaks_batches(
+    connection: Connection,
+    *,
+    batch_size: int = 100_000,
+) -> Iterator[pa.RecordBatch]:
+    """Stream mass spectrum peaks in batches.
+
+    Parameters:
+        connection: A SQLite connection.
+        batch_size: The maximum number of rows in a batch.
+
+    Yields:
+        A batch of mass spectrum peaks, ordered by reaction.
+    """
+    yield from mass_spectrum_peaks_lazy(connection).iter_batches(batch_size)
+
+
+def peaks_in_mz_range(
+    connection: Connection,
+    low: float,
+    high: float,
+    *,
+    column: Literal["spectrum_mz", "calculated_mz"] = "spectrum_mz",
+) -> pl.DataFrame:
+    """Return a DataFrame of mass spectrum peaks in an m/z range.
+
+    The peaks are found with an index, so the time taken grows with
+    the logarithm of the number of peaks in the database.
+
+    Parameters:
+        connection: A SQLite connection.
+        low: The lowest m/z to include.
+        high: The highest m/z to include.
+        column: The m/z to search, either the m/z measured in the
+            spectrum or the m/z calculated for the peak.
+
+    Returns:
+        A DataFrame of the mass spectrum peaks, with the same columns
+        as :func:`mass_spectrum_peaks_df`.
+
+    Raises:
+        ValueError: If `column` is not an m/z column.
+    """
+    if column not in ("spectrum_mz", "calculated_mz"):
+        msg = f"not an m/z column: {column!r}"
+        raise ValueError(msg)
+    return _peaks_in_range(
+        connection, _MASS_SPECTRUM_PEAKS_BY_MZ, column, low, high
+    )
+
+
+def _peaks_in_range(  # noqa: PLR0913
+    connection: Connection,
+    source: QuerySource,
+    column: str,
+    low: float,
+    high: float,
+    min_amplitude: float | None = None,
+) -> pl.DataFrame:
+    predicates = [f"{source.column(column).expression} BETWEEN ? AND ?"]
+    parameters = [low, high]
+    if min_amplitude is not None:
+        predicates.append(f"{source.column('amplitude').expression} >= ?")
+        parameters.append(min_amplitude)
+    return LazyQuery(
+        connection,
+        source,
+        predicates=tuple(predicates),
+        parameters=tuple(parameters),
+    ).collect()
+
+
+def mass_spectrum_topology_assignments_df(
+    connection: Connection,
+) -> pl.DataFrame:
+    """Return a DataFrame of mass spectrum topology assignments.
+
+    Parameters:
+        connection: A SQLite connection.
+
+    Returns:
+        A DataFrame of mass spectrum topology assignments.
+    """
+    return mass_spectrum_topology_assignments_lazy(connection).collect()
+
+
+def mass_spectrum_topology_assignments_lazy(
+    connection: Connection,
+) -> LazyQuery:
+    """Return a lazy query of mass spectrum topology assignments.
+
+    Filters and column selections applied to the query are compiled
+    into its SQL, so only the requested data is read.
+
+    Parameters:
+        connection: A SQLite connection.
+
+    Returns:
+        A lazy query of mass spectrum topology assignments.
+    """
+    return LazyQuery(connection, _MASS_SPECTRUM_TOPOLOGY_ASSIGNMENTS)
+
+
+def iter_mass_spectrum_topology_assignments_batches(
+    connection: Connection,
+    *,
+    batch_size: int = 100_000,
+) -> Iterator[pa.RecordBatch]:
+    """Stream mass spectrum topology assignments in batches.
+
+    Parameters:
+        connection: A SQLite connection.
+        batch_size: The maximum number of rows in a batch.
+
+    Yields:
+        A batch of mass spectrum topology assignments, ordered by reaction.
+    """
+    yield from mass_spectrum_topology_assignments_lazy(
+        connection
+    ).iter_batches(batch_size)
+
+
+def turbidity_dissolved_references_df(connection: Connection) -> pl.DataFrame:
+    """Return a DataFrame of turbidity dissolved references.
+
+    Parameters:
+        connection: A SQLite connection.
+
+    Returns:
+        A DataFrame of turbidity dissolved references.
+    """
+    return turbidity_dissolved_references_lazy(connection).collect()
+
+
+def turbidity_dissolved_references_lazy(connection: Connection) -> LazyQuery:
+    """Return a lazy query of turbidity dissolved references.
+
+    Filters and column selections applied to the query are compiled
+    into its SQL, so only the requested data is read.
+
+    Parameters:
+        connection: A SQLite connection.
+
+    Returns:
+        A lazy query of turbidity dissolved references.
+    """
+    return LazyQuery(connection, _TURBIDITY_DISSOLVED_REFERENCES)
+
+
+def iter_turbidity_dissolved_references_batches(
+    connection: Connection,
+    *,
+    batch_size: int = 100_000,
+) -> Iterator[pa.RecordBatch]:
+    """Stream turbidity dissolved references in batches.
+
+    Parameters:
+        connection: A SQLite connection.
+        batch_size: The maximum number of rows in a batch.
+
+    Yields:
+        A batch of turbidity dissolved references, ordered by reaction.
+    """
+    yield from turbidity_dissolved_references_lazy(connection).iter_batches(
+        batch_size
+    )
+
+
+def turbidity_measurements_df(connection: Connection) -> pl.DataFrame:
+    """Return a DataFrame of turbidity measurements.
+
+    Parameters:
+        connection: A SQLite connection.
+
+    Returns:
+        A DataFrame of turbidity measurements.
+    """
+    return turbidity_measurements_lazy(connection).collect()
+
+
+def turbidity_measurements_lazy(connection: Connection) -> LazyQuery:
+    """Return a lazy query of turbidity measurements.
+
+    Filters and column selections applied to the query are compiled
+    into its SQL, so only the requested data is read.
+
+    Parameters:
+        connection: A SQLite connection.
+
+    Returns:
+        A lazy query of turbidity measurements.
+    """
+    return LazyQuery(connection, _TURBIDITY_MEASUREMENTS)
+
+
+def iter_turbidity_measurements_batches(
+    connection: Connection,
+    *,
+    batch_size: int = 100_000,
+) -> Iterator[pa.RecordBatch]:
+    """Stream turbidity measurements in batches.
+
+    Parameters:
+        connection: A SQLite connection.
+        batch_size: The maximum number of rows in a batch.
+
+    Yields:
+        A batch of turbidity measurements, ordered by reaction.
+    """
+    yield from turbidity_measurements_lazy(connection).iter_batches(batch_size)
+
+
+def turbidity_states_df(connection: Connection) -> pl.DataFrame:
+    """Return a DataFrame of turbidity states.
+
+    Parameters:
+        connection: A SQLite connection.
+
+    Returns:
+        A DataFrame of turbidity states.
+    """
+    return turbidity_states_lazy(connection).collect()
+
+
+def turbidity_states_lazy(connection: Connection) -> LazyQuery:
+    """Return a lazy query of turbidity states.
+
+    Filters and column selections applied to the query are compiled
+    into its SQL, so only the requested data is read.
+
+    Parameters:
+        connection: A SQLite connection.
+
+    Returns:
+        A lazy query of turbidity states.
+    """
+    return LazyQuery(connection, _TURBIDITY_STATES)
+
+
+def iter_turbidity_states_batches(
+    connection: Connection,
+    *,
+    batch_size: int = 100_000,
+) -> Iterator[pa.RecordBatch]:
+    """Stream turbidity states in batches.
+
+    Parameters:
+        connection: A SQLite connection.
+        batch_size: The maximum number of rows in a batch.
+
+    Yields:
+        A batch of turbidity states, ordered by reaction.
+    """
+    yield from turbidity_states_lazy(connection).iter_batches(batch_size)
+
+
+def reaction_summaries_df(connection: Connection) -> pl.DataFrame:
+    """Return a DataFrame of reaction summaries.
+
+    Each reaction has one row, which summarizes its mass spectrum
+    topologies, NMR peaks and turbidity state.
+
+    Parameters:
+        connection: A SQLite connection.
+
+    Returns:
+        A DataFrame of reaction summaries.
+    """
+    return reaction_summaries_lazy(connection).collect()
+
+
+def reaction_summaries_lazy(connection: Connection) -> LazyQuery:
+    """Return a lazy query of reaction summaries.
+
+    Filters and column selections applied to the query are compiled
+    into its SQL, so only the requested data is read.
+
+    Parameters:
+        connection: A SQLite connection.
+
+    Returns:
+        A lazy query of reaction summaries.
+    """
+    return LazyQuery(connection, _REACTION_SUMMARIES)
+
+
+def iter_reaction_summaries_batches(
+    connection: Connection,
+    *,
+    batch_size: int = 100_000,
+) -> Iterator[pa.RecordBatch]:
+    """Stream reaction summaries in batches.
+
+    Parameters:
+        connection: A SQLite connection.
+        batch_size: The maximum number of rows in a batch.
+
+    Yields:
+        A batch of reaction summaries, ordered by reaction.
+    """
+    yield from reaction_summaries_lazy(connection).iter_batches(batch_size)
+
+
+def rebuild_reaction_summaries(
+    connection: Connection,
+    *,
+    commit: bool = True,
+) -> None:
+    """Rebuild the reaction summaries from scratch.
+
+    The summaries are kept up to date by the ``insert_*`` functions,
+    and made for every reaction when :func:`create_tables` adds them
+    to a database made by an older version of :mod:`cagey`, so this is
+    only needed for databases modified by hand.
+
+    Parameters:
+        connection: A SQLite connection.
+        commit: Whether to commit the transaction.
+    """
+    connection.execute("DELETE FROM reaction_summaries")
+    _update_reaction_summaries(connection, "SELECT id FROM reactions")
+    if commit:
+        connection.commit()
+
+
+def _update_reaction_summaries(
+    connection: Connection,
+    reaction_ids: str,
+    parameters: dict[str, Any] | None = None,
+) -> None:
+    connection.execute(
+        f"""
+        WITH
+        targets AS (
+            {reaction_ids}
+        ),
+        topologies AS (
+            SELECT
+                mass_spectra.reaction_id,
+                max(
+                    CASE mass_spectrum_topology_assignments.topology
+                        WHEN '2+3' THEN mass_spectrum_peaks.intensity
+                    END
+                ) AS max_intensity_2_plus_3,
+                max(
+                    CASE mass_spectrum_topology_assignments.topology
+                        WHEN '4+6' THEN mass_spectrum_peaks.intensity
+                    END
+                ) AS max_intensity_4_plus_6,
+                max(
+                    CASE mass_spectrum_topology_assignments.topology
+                        WHEN '6+9' THEN mass_spectrum_peaks.intensity
+                    END
+                ) AS max_intensity_6_plus_9,
+                max(
+                    CASE mass_spectrum_topology_assignments.topology
+                        WHEN '8+12' THEN mass_spectrum_peaks.intensity
+                    END
+                ) AS max_intensity_8_plus_12
+            FROM
+                mass_spectrum_topology_assignments
+            JOIN
+                mass_spectrum_peaks
+                ON mass_spectrum_peaks.id =
+                mass_spectrum_topology_assignments.mass_spectrum_peak_id
+            JOIN
+                mass_spectra
+                ON mass_spectrum_peaks.mass_spectrum_id = mass_spectra.id
+            WHERE
+                mass_spectra.reaction_id IN targets
+            GROUP BY
+                mass_spectra.reaction_id
+        ),
+        aldehyde_peaks AS (
+            SELECT
+                nmr_spectra.reaction_id,
+                count(*) AS peak_count,
+                max(nmr_aldehyde_peaks.amplitude) AS max_amplitude
+            FROM
+                nmr_aldehyde_peaks
+            JOIN
+                nmr_spectra
+                ON nmr_aldehyde_peaks.nmr_spectrum_id = nmr_spectra.id
+            WHERE
+                nmr_spectra.reaction_id IN targets
+            GROUP BY
+                nmr_spectra.reaction_id
+        ),
+        imine_peaks AS (
+            SELECT
+                nmr_spectra.reaction_id,
+                count(*) AS peak_count,
+                max(nmr_imine_peaks.amplitude) AS max_amplitude
+            FROM
+                nmr_imine_peaks
+            JOIN
+                nmr_spectra
+                ON nmr_imine_peaks.nmr_spectrum_id = nmr_spectra.id
+            WHERE
+                nmr_spectra.reaction_id IN targets
+            GROUP BY
+                nmr_spectra.reaction_id
+        )
+        INSERT OR REPLACE INTO reaction_summaries (
+            reaction_id,
+            topologies,
+            max_intensity_2_plus_3,
+            max_intensity_4_plus_6,
+            max_intensity_6_plus_9,
+            max_intensity_8_plus_12,
+            aldehyde_peak_count,
+            max_aldehyde_amplitude,
+            imine_peak_count,
+            max_imine_amplitude,
+            turbid_state
+        )
+        SELECT
+            reactions.id,
+            rtrim(
+                iif(topologies.max_intensity_2_plus_3 IS NULL, '', '2+3,')
+                || iif(topologies.max_intensity_4_plus_6 IS NULL, '', '4+6,')
+                || iif(topologies.max_intensity_6_plus_9 IS NULL, '', '6+9,')
+                || iif(
+                    topologies.max_intensity_8_plus_12 IS NULL, '', '8+12,'
+                ),
+                ','
+            ),
+            topologies.max_intensity_2_plus_3,
+            topologies.max_intensity_4_plus_6,
+            topologies.max_intensity_6_plus_9,
+            topologies.max_intensity_8_plus_12,
+            coalesce(aldehyde_peaks.peak_count, 0),
+            aldehyde_peaks.max_amplitude,
+            coalesce(imine_peaks.peak_count, 0),
+            imine_peaks.max_amplitude,
+            turbidities.state
+        FROM
+            reactions
+        LEFT JOIN
+            topologies
+            ON reactions.id = topologies.reaction_id
+        LEFT JOIN
+            aldehyde_peaks
+            ON reactions.id = aldehyde_peaks.reaction_id
+        LEFT JOIN
+            imine_peaks
+            ON reactions.id = imine_peaks.reaction_id
+        LEFT JOIN
+            turbidities
+            ON reactions.id = turbidities.reaction_id
+        WHERE
+            reactions.id IN targets
+        """,  # noqa: S608
+        parameters or {},
+    )
+
+
+def _update_reaction_summary(
+    connection: Connection,
+    reaction_key: ReactionKey,
+) -> None:
+    _update_reaction_summaries(
+        connection,
+        """
+            SELECT
+                id
+            FROM
+                reactions
+            WHERE
+                experiment = :experiment
+                AND plate = :plate
+                AND formulation_number = :formulation_number
+        """,
+        asdict(reaction_key),
+    )
+
+
+def changes_since(
+    connection: Connection,
+    cursor: int = 0,
+    *,
+    limit: int | None = None,
+) -> Iterator[IngestChange]:
+    """Get the data added to reactions since a point in the change feed.
+
+    Every call to :func:`insert_mass_spectrum`,
+    :func:`insert_nmr_spectrum` and :func:`insert_turbidity` adds a
+    change to the feed. Pass the :attr:`~cagey.IngestChange.cursor` of
+    the last change you received to get only the changes made after it.
+
+    Parameters:
+        connection: A SQLite connection.
+        cursor: Get changes made after this cursor. Use ``0`` to get
+            every change, or :func:`latest_cursor` to get only future
+            changes.
+        limit: The maximum number of changes to get.
+
+    Yields:
+        A change, in the order they were made.
+    """
+    query = """
+        SELECT
+            ingest_log.id,
+            reactions.experiment,
+            reactions.plate,
+            reactions.formulation_number,
+            ingest_log.kind
+        FROM
+            ingest_log
+        JOIN
+            reactions
+            ON ingest_log.reaction_id = reactions.id
+        WHERE
+            ingest_log.id > ?
+        ORDER BY
+            ingest_log.id
+    """
+    if limit is not None:
+        query += f"LIMIT {int(limit)}"
+    for id_, experiment, plate, formulation_number, kind in connection.execute(
+        query, (cursor,)
+    ):
+        yield IngestChange(
+            cursor=id_,
+            reaction_key=ReactionKey(experiment, plate, formulation_number),
+            kind=IngestKind(kind),
+        )
+
+
+def latest_cursor(connection: Connection) -> int:
+    """Get the cursor of the latest change in the change feed.
+
+    Parameters:
+        connection: A SQLite connection.
+
+    Returns:
+        The cursor of the latest change, or ``0`` if there are no
+        changes.
     """
-    return pl.read_database(
-        """
-      SELECT
-          reactions.experiment,
-          reactions.plate,
-          reactions.formulation_number,
-          di.name AS di_name,
-          tri.name AS tri_name,
-          nmr_imine_peaks.ppm,
-          nmr_imine_peaks.amplitude
-      FROM
-          nmr_imine_peaks
-      LEFT JOIN
-          nmr_spectra
-          ON nmr_imine_peaks.nmr_spectrum_id = nmr_spectra.id
-      LEFT JOIN
-          reactions
-          ON nmr_spectra.reaction_id = reactions.id
-      LEFT JOIN
-          precursors AS di
-          ON reactions.di_name = di.name
-      LEFT JOIN
-          precursors AS tri
-          ON reactions.tri_name = tri.name
-      ORDER BY
-          reactions.experiment,
-          reactions.plate,
-          reactions.formulation_number,
-          nmr_imine_peaks.ppm
-      """,
-        connection,
+    ((cursor,),) = connection.execute(
+        "SELECT coalesce(max(id), 0) FROM ingest_log"
     )
+    return int(cursor)
 
 
-def mass_spectrum_peaks_df(connection: Connection) -> pl.DataFrame:
-    """Return a DataFrame of mass spectrum peaks.
+def insert_ingest_run(
+    connection: Connection,
+    run: IngestRun,
+    files: Iterable[IngestFileMetrics],
+    *,
+    commit: bool = True,
+) -> int:
+    """Record the metrics of a run which added data to the database.
+
+    Runs of :program:`cagey new` and :program:`cagey insert` are
+    recorded automatically.
 
     Parameters:
         connection: A SQLite connection.
+        run: The metrics of the run.
+        files: The metrics of each file added by the run.
+        commit: Whether to commit the transaction.
 
     Returns:
-        A DataFrame of mass spectrum peaks.
+        The id of the run.
+
+    Raises:
+        InsertIngestRunError: If the run could not be inserted.
     """
-    return pl.read_database(
+    cursor = connection.execute(
         """
-      SELECT
-          reactions.experiment,
-          reactions.plate,
-          reactions.formulation_number,
-          di.name AS di_name,
-          tri.name AS tri_name,
-          mass_spectrum_peaks.tri_count,
-          mass_spectrum_peaks.di_count,
-          mass_spectrum_peaks.adduct,
-          mass_spectrum_peaks.charge,
-          mass_spectrum_peaks.calculated_mz,
-          mass_spectrum_peaks.spectrum_mz,
-          mass_spectrum_peaks.separation_mz,
-          mass_spectrum_peaks.intensity
-      FROM
-          mass_spectrum_peaks
-      LEFT JOIN
-          mass_spectra
-          ON mass_spectrum_peaks.mass_spectrum_id = mass_spectra.id
-      LEFT JOIN
-          reactions
-          ON mass_spectra.reaction_id = reactions.id
-      LEFT JOIN
-          precursors AS di
-          ON reactions.di_name = di.name
-      LEFT JOIN
-          precursors AS tri
-          ON reactions.tri_name = tri.name
-      ORDER BY
-          reactions.experiment,
-          reactions.plate,
-          reactions.formulation_number,
-          mass_spectrum_peaks.spectrum_mz
-      """,
-        connection,
+        INSERT INTO ingest_runs (
+            command,
+            cagey_version,
+            started_at,
+            wall_seconds,
+            processes,
+            reactions_seconds,
+            mass_spectra_seconds,
+            nmr_seconds,
+            turbidity_seconds
+        ) VALUES (
+            :command,
+            :cagey_version,
+            :started_at,
+            :wall_seconds,
+            :processes,
+            :reactions_seconds,
+            :mass_spectra_seconds,
+            :nmr_seconds,
+            :turbidity_seconds
+        )
+        """,
+        asdict(run) | {"started_at": run.started_at.isoformat()},
+    )
+    run_id = cursor.lastrowid
+    if not isinstance(run_id, int):
+        msg = "failed to insert ingest run"
+        raise InsertIngestRunError(msg)
+    connection.executemany(
+        """
+        INSERT INTO ingest_file_metrics (
+            run_id,
+            kind,
+            path,
+            bytes_read,
+            seconds,
+            peaks,
+            failed,
+            memory_bytes
+        ) VALUES (
+            :run_id,
+            :kind,
+            :path,
+            :bytes_read,
+            :seconds,
+            :peaks,
+            :failed,
+            :memory_bytes
+        )
+        """,
+        (
+            asdict(file) | {"run_id": run_id, "kind": file.kind.value}
+            for file in files
+        ),
     )
+    if commit:
+        connection.commit()
+    return run_id
 
 
-def mass_spectrum_topology_assignments_df(
-    connection: Connection,
-) -> pl.DataFrame:
-    """Return a DataFrame of mass spectrum topology assignments.
+def ingest_runs_df(connection: Connection) -> pl.DataFrame:
+    """Return a DataFrame of the runs which added data to the database.
 
     Parameters:
         connection: A SQLite connection.
 
     Returns:
-        A DataFrame of mass spectrum topology assignments.
+        A DataFrame with the columns of the ``ingest_runs`` table, as
+        well as the number of ``files`` added by each run, how many of
+        them ``failures`` there were, the ``bytes_read`` and ``peaks``
+        found across them, and the ``worker_utilization``. The
+        utilization is the fraction of the time spent adding mass
+        spectra during which the worker processes were busy, or
+        ``null`` if the run added no mass spectra.
     """
-    return pl.read_database(
+    rows = connection.execute(
         """
-      SELECT
-          reactions.experiment,
-          reactions.plate,
-          reactions.formulation_number,
-          di.name AS di_name,
-          tri.name AS tri_name,
-          mass_spectrum_peaks.tri_count,
-          mass_spectrum_peaks.di_count,
-          mass_spectrum_peaks.adduct,
-          mass_spectrum_peaks.charge,
-          mass_spectrum_peaks.calculated_mz,
-          mass_spectrum_peaks.spectrum_mz,
-          mass_spectrum_peaks.separation_mz,
-          mass_spectrum_peaks.intensity,
-          mass_spectrum_topology_assignments.topology
-      FROM
-            mass_spectrum_topology_assignments
-      LEFT JOIN
-          mass_spectrum_peaks
-          ON mass_spectrum_peaks.id =
-            mass_spectrum_topology_assignments.mass_spectrum_peak_id
-      LEFT JOIN
-          mass_spectra
-          ON mass_spectrum_peaks.mass_spectrum_id = mass_spectra.id
-      LEFT JOIN
-          reactions
-          ON mass_spectra.reaction_id = reactions.id
-      LEFT JOIN
-          precursors AS di
-          ON reactions.di_name = di.name
-      LEFT JOIN
-          precursors AS tri
-          ON reactions.tri_name = tri.name
-      ORDER BY
-          reactions.experiment,
-          reactions.plate,
-          reactions.formulation_number,
-          mass_spectrum_peaks.spectrum_mz
-        """,
-        connection,
+        SELECT
+            ingest_runs.id,
+            ingest_runs.command,
+            ingest_runs.cagey_version,
+            ingest_runs.started_at,
+            ingest_runs.wall_seconds,
+            ingest_runs.processes,
+            ingest_runs.reactions_seconds,
+            ingest_runs.mass_spectra_seconds,
+            ingest_runs.nmr_seconds,
+            ingest_runs.turbidity_seconds,
+            COUNT(ingest_file_metrics.id),
+            COALESCE(SUM(ingest_file_metrics.failed), 0),
+            COALESCE(SUM(ingest_file_metrics.bytes_read), 0),
+            COALESCE(SUM(ingest_file_metrics.peaks), 0),
+            SUM(
+                CASE ingest_file_metrics.kind
+                    WHEN 'mass_spectrum' THEN ingest_file_metrics.seconds
+                END
+            )
+            / NULLIF(
+                ingest_runs.mass_spectra_seconds * ingest_runs.processes, 0
+            )
+        FROM
+            ingest_runs
+        LEFT JOIN
+            ingest_file_metrics
+            ON ingest_runs.id = ingest_file_metrics.run_id
+        GROUP BY
+            ingest_runs.id
+        ORDER BY
+            ingest_runs.id
+        """
+    ).fetchall()
+    return pl.DataFrame(
+        ((*row[:3], datetime.fromisoformat(row[3]), *row[4:]) for row in rows),
+        schema={
+            "id": pl.Int64,
+            "command": pl.Utf8,
+            "cagey_version": pl.Utf8,
+            "started_at": pl.Datetime("us", "UTC"),
+            "wall_seconds": pl.Float64,
+            "processes": pl.Int64,
+            "reactions_seconds": pl.Float64,
+            "mass_spectra_seconds": pl.Float64,
+            "nmr_seconds": pl.Float64,
+            "turbidity_seconds": pl.Float64,
+            "files": pl.Int64,
+            "failures": pl.Int64,
+            "bytes_read": pl.Int64,
+            "peaks": pl.Int64,
+            "worker_utilization": pl.Float64,
+        },
+        orient="row",
     )
 
 
-def turbidity_dissolved_references_df(connection: Connection) -> pl.DataFrame:
-    """Return a DataFrame of turbidity dissolved references.
+def ingest_file_metrics_df(connection: Connection) -> pl.DataFrame:
+    """Return a DataFrame of the files added to the database.
 
     Parameters:
         connection: A SQLite connection.
 
     Returns:
-        A DataFrame of turbidity dissolved references.
+        A DataFrame with the columns of the ``ingest_file_metrics``
+        table.
     """
-    return pl.read_database(
-        """
-      SELECT
-          reactions.experiment,
-          reactions.plate,
-          reactions.formulation_number,
-          di.name AS di_name,
-          tri.name AS tri_name,
-          turbidity_dissolved_references.dissolved_reference
-      FROM
-          turbidity_dissolved_references
-      LEFT JOIN
-          reactions
-          ON turbidity_dissolved_references.reaction_id = reactions.id
-      LEFT JOIN
-          precursors AS di
-          ON reactions.di_name = di.name
-      LEFT JOIN
-          precursors AS tri
-          ON reactions.tri_name = tri.name
-      ORDER BY
-          reactions.experiment,
-          reactions.plate,
-          reactions.formulation_number
-      """,
-        connection,
+    return pl.DataFrame(
+        connection.execute(
+            """
+            SELECT
+                id,
+                run_id,
+                kind,
+                path,
+                bytes_read,
+                seconds,
+                peaks,
+                failed,
+                memory_bytes
+            FROM
+                ingest_file_metrics
+            ORDER BY
+                id
+            """
+        ).fetchall(),
+        schema={
+            "id": pl.Int64,
+            "run_id": pl.Int64,
+            "kind": pl.Utf8,
+            "path": pl.Utf8,
+            "bytes_read": pl.Int64,
+            "seconds": pl.Float64,
+            "peaks": pl.Int64,
+            "failed": pl.Boolean,
+            "memory_bytes": pl.Int64,
+        },
+        orient="row",
     )
 
 
-def turbidity_measurements_df(connection: Connection) -> pl.DataFrame:
-    """Return a DataFrame of turbidity measurements.
+def ingest_throughput_df(
+    connection: Connection,
+    every: str = "1d",
+) -> pl.DataFrame:
+    """Return a DataFrame of how fast data was added over time.
 
     Parameters:
         connection: A SQLite connection.
+        every:
+            The length of each period, as a polars duration string,
+            such as ``"1d"`` or ``"1w"``.
 
     Returns:
-        A DataFrame of turbidity measurements.
+        A DataFrame with the start of each period holding a run, the
+        number of ``runs``, ``files``, ``failures`` and ``bytes_read``
+        in it, the ``wall_seconds`` the runs took, the
+        ``files_per_second`` and ``megabytes_per_second`` added, and
+        the mean ``worker_utilization``.
     """
     return (
-        pl.read_database(
-            """
-      SELECT
-          reactions.experiment,
-          reactions.plate,
-          reactions.formulation_number,
-          di.name AS di_name,
-          tri.name AS tri_name,
-          turbidity_measurements.time,
-          turbidity_measurements.turbidity
-      FROM
-          turbidity_measurements
-      LEFT JOIN
-          reactions
-          ON turbidity_measurements.reaction_id = reactions.id
-      LEFT JOIN
-          precursors AS di
-          ON reactions.di_name = di.name
-      LEFT JOIN
-          precursors AS tri
-          ON reactions.tri_name = tri.name
-      ORDER BY
-          reactions.experiment,
-          reactions.plate,
-          reactions.formulation_number,
-          turbidity_measurements.time
-      """,
-            connection,
+        ingest_runs_df(connection)
+        .sort("started_at")
+        .group_by_dynamic("started_at", every=every)
+        .agg(
+            runs=pl.len(),
+            files=pl.sum("files"),
+            failures=pl.sum("failures"),
+            bytes_read=pl.sum("bytes_read"),
+            wall_seconds=pl.sum("wall_seconds"),
+            worker_utilization=pl.mean("worker_utilization"),
         )
         .with_columns(
-            pl.col("time").str.to_datetime(),
+            files_per_second=pl.col("files") / pl.col("wall_seconds"),
+            megabytes_per_second=pl.col("bytes_read")
+            / 1e6
+            / pl.col("wall_seconds"),
         )
-        .sort(["experiment", "plate", "formulation_number", "time"])
     )
 
 
-def turbidity_states_df(connection: Connection) -> pl.DataFrame:
-    """Return a DataFrame of turbidity states.
-
-    Parameters:
-        connection: A SQLite connection.
-
-    Returns:
-        A DataFrame of turbidity states.
-    """
-    return pl.read_database(
+def _log_ingest(
+    connection: Connection,
+    reaction_key: ReactionKey,
+    kind: IngestKind,
+) -> None:
+    connection.execute(
         """
-      SELECT
-          reactions.experiment,
-          reactions.plate,
-          reactions.formulation_number,
-          di.name AS di_name,
-          tri.name AS tri_name,
-          turbidities.state
-      FROM
-          turbidities
-      LEFT JOIN
-          reactions
-          ON turbidities.reaction_id = reactions.id
-      LEFT JOIN
-          precursors AS di
-          ON reactions.di_name = di.name
-      LEFT JOIN
-          precursors AS tri
-          ON reactions.tri_name = tri.name
-      ORDER BY
-          reactions.experiment,
-          reactions.plate,
-          reactions.formulation_number
-      """,
-        connection,
+        INSERT INTO
+            ingest_log (reaction_id, kind)
+        SELECT
+            id, :kind
+        FROM
+            reactions
+        WHERE
+            experiment = :experiment
+            AND plate = :plate
+            AND formulation_number = :formulation_number
+        """,
+        asdict(reaction_key) | {"kind": kind.value},
     )
 
 
+@traced("queries.insert_precursors")
 def insert_precursors(
     connection: Connection,
     precursors: Iterable[Precursor],
@@ -440,6 +1491,7 @@ def insert_precursors(
         connection.commit()
 
 
+@traced("queries.insert_reactions")
 def insert_reactions(
     connection: Connection,
     reactions: Iterable[Reaction],
@@ -453,6 +1505,9 @@ def insert_reactions(
         reactions: The reactions to insert.
         commit: Whether to commit the transaction.
     """
+    ((last_id,),) = connection.execute(
+        "SELECT coalesce(max(id), 0) FROM reactions"
+    )
     connection.executemany(
         """
         INSERT INTO reactions (
@@ -471,15 +1526,29 @@ def insert_reactions(
         """,
         map(asdict, reactions),
     )
+    _update_reaction_summaries(
+        connection,
+        """
+            SELECT
+                id
+            FROM
+                reactions
+            WHERE
+                id > :last_id
+        """,
+        {"last_id": last_id},
+    )
     if commit:
         connection.commit()
 
 
+@traced("queries.insert_mass_spectrum")
 def insert_mass_spectrum(
     connection: Connection,
     reaction_key: ReactionKey,
     peaks: Sequence[MassSpectrumPeak],
     *,
+    features: pl.DataFrame | None = None,
     commit: bool = True,
 ) -> None:
     """Insert a mass spectrum into the database.
@@ -488,6 +1557,13 @@ def insert_mass_spectrum(
         connection: A SQLite connection.
         reaction_key: The reaction key.
         peaks: The mass spectrum peaks.
+        features:
+            The ``mz`` and ``height`` of the features the peaks were
+            found in, such as those read by
+            :func:`cagey.ms.read_features`. If given, they are stored
+            so that peaks can be found again with
+            :func:`cagey.ms.get_peaks_from_features`, without the
+            machine data.
         commit: Whether to commit the transaction.
     """
     cursor = connection.execute(
@@ -537,11 +1613,23 @@ def insert_mass_spectrum(
         """,  # noqa: S608
         map(asdict, peaks),
     )
+    if features is not None:
+        connection.execute(
+            """
+            INSERT INTO
+                mass_spectrum_features (mass_spectrum_id, features)
+            VALUES
+                (?, ?)
+            """,
+            (mass_spectrum_id, encode_features(features)),
+        )
+    _log_ingest(connection, reaction_key, IngestKind.MASS_SPECTRUM)
 
     if commit:
         connection.commit()
 
 
+@traced("queries.insert_mass_spectrum_topology_assignments")
 def insert_mass_spectrum_topology_assignments(
     connection: Connection,
     assignments: Iterable[MassSpectrumTopologyAssignment],
@@ -555,6 +1643,7 @@ def insert_mass_spectrum_topology_assignments(
         assignments: The mass spectrum topology assignments.
         commit: Whether to commit the transaction.
     """
+    assignments = tuple(assignments)
     connection.executemany(
         """
         INSERT INTO mass_spectrum_topology_assignments (
@@ -567,6 +1656,30 @@ def insert_mass_spectrum_topology_assignments(
         """,
         map(asdict, assignments),
     )
+    _update_reaction_summaries(
+        connection,
+        """
+            SELECT
+                mass_spectra.reaction_id
+            FROM
+                mass_spectrum_peaks
+            JOIN
+                mass_spectra
+                ON mass_spectrum_peaks.mass_spectrum_id = mass_spectra.id
+            WHERE
+                mass_spectrum_peaks.id IN (
+                    SELECT value FROM json_each(:peak_ids)
+                )
+        """,
+        {
+            "peak_ids": json.dumps(
+                [
+                    assignment.mass_spectrum_peak_id
+                    for assignment in assignments
+                ]
+            )
+        },
+    )
     if commit:
         connection.commit()
 
@@ -633,6 +1746,62 @@ def mass_spectrum_peaks(
         )
 
 
+def mass_spectrum_features(
+    connection: Connection,
+    reactions: Sequence[ReactionKey] | None = None,
+) -> Iterator[tuple[ReactionKey, pl.DataFrame]]:
+    """Get the stored features of mass spectra.
+
+    Only mass spectra inserted with `features` by
+    :func:`insert_mass_spectrum` have stored features.
+
+    Parameters:
+        connection: A SQLite connection.
+        reactions: The reactions. If ``None``, the features of every
+            reaction are returned.
+
+    Yields:
+        A reaction and the ``mz`` and ``height`` of each feature of its
+        mass spectrum.
+    """
+    query = """
+        SELECT
+            reactions.experiment,
+            reactions.plate,
+            reactions.formulation_number,
+            mass_spectrum_features.features
+        FROM
+            reactions
+        CROSS JOIN
+            mass_spectra
+            ON mass_spectra.reaction_id = reactions.id
+        CROSS JOIN
+            mass_spectrum_features
+            ON mass_spectrum_features.mass_spectrum_id = mass_spectra.id
+    """
+    parameters: tuple[Any, ...] = ()
+    if reactions is not None:
+        q = ",".join("(?,?,?)" for _ in range(len(reactions)))
+        query += f"""
+        WHERE
+            (
+                reactions.experiment,
+                reactions.plate,
+                reactions.formulation_number
+            ) IN ({q})
+        """
+        parameters = tuple(
+            value for reaction in reactions for value in astuple(reaction)
+        )
+    for experiment, plate, formulation_number, features in connection.execute(
+        query, parameters
+    ):
+        yield (
+            ReactionKey(experiment, plate, formulation_number),
+            decode_features(features),
+        )
+
+
 def reaction_precursors(
     connection: Connection,
     reactions: Sequence[ReactionKey],
@@ -681,11 +1850,13 @@ def reaction_precursors(
         )
 
 
+@traced("queries.insert_nmr_spectrum")
 def insert_nmr_spectrum(
     connection: Connection,
     reaction_key: ReactionKey,
     spectrum: NmrSpectrum,
     *,
+    region: NmrRegion | None = None,
     commit: bool = True,
 ) -> None:
     """Insert an NMR spectrum into the database.
@@ -694,6 +1865,13 @@ def insert_nmr_spectrum(
         connection: A SQLite connection.
         reaction_key: The reaction key.
         spectrum: The NMR spectrum.
+        region:
+            The processed data the peaks were picked from, such as a
+            region cropped from the data read by
+            :func:`cagey.nmr.read_region`. If given, it is stored so
+            that peaks can be picked again with
+            :func:`cagey.nmr.get_spectrum_from_region`, without the
+            machine data.
         commit: Whether to commit the transaction.
     """
     cursor = connection.execute(
@@ -732,11 +1910,102 @@ def insert_nmr_spectrum(
         """,  # noqa: S608
         map(asdict, spectrum.imine_peaks),
     )
+    if region is not None:
+        connection.execute(
+            """
+            INSERT INTO nmr_spectrum_regions (
+                nmr_spectrum_id,
+                ppm_start,
+                ppm_step,
+                reference_shift,
+                intensities
+            ) VALUES (?, ?, ?, ?, ?)
+            """,
+            (
+                nmr_spectrum_id,
+                region.ppm_start,
+                region.ppm_step,
+                region.reference_shift,
+                encode_intensities(region.intensities),
+            ),
+        )
+    _update_reaction_summary(connection, reaction_key)
+    _log_ingest(connection, reaction_key, IngestKind.NMR_SPECTRUM)
 
     if commit:
         connection.commit()
 
 
+def nmr_spectrum_regions(
+    connection: Connection,
+    reactions: Sequence[ReactionKey] | None = None,
+) -> Iterator[tuple[ReactionKey, NmrRegion]]:
+    """Get the stored processed data of NMR spectra.
+
+    Only NMR spectra inserted with `region` by
+    :func:`insert_nmr_spectrum` have stored data.
+
+    Parameters:
+        connection: A SQLite connection.
+        reactions: The reactions. If ``None``, the data of every
+            reaction is returned.
+
+    Yields:
+        A reaction and the processed data of its NMR spectrum.
+    """
+    query = """
+        SELECT
+            reactions.experiment,
+            reactions.plate,
+            reactions.formulation_number,
+            nmr_spectrum_regions.ppm_start,
+            nmr_spectrum_regions.ppm_step,
+            nmr_spectrum_regions.reference_shift,
+            nmr_spectrum_regions.intensities
+        FROM
+            reactions
+        CROSS JOIN
+            nmr_spectra
+            ON nmr_spectra.reaction_id = reactions.id
+        CROSS JOIN
+            nmr_spectrum_regions
+            ON nmr_spectrum_regions.nmr_spectrum_id = nmr_spectra.id
+    """
+    parameters: tuple[Any, ...] = ()
+    if reactions is not None:
+        q = ",".join("(?,?,?)" for _ in range(len(reactions)))
+        query += f"""
+        WHERE
+            (
+                reactions.experiment,
+                reactions.plate,
+                reactions.formulation_number
+            ) IN ({q})
+        """
+        parameters = tuple(
+            value for reaction in reactions for value in astuple(reaction)
+        )
+    for (
+        experiment,
+        plate,
+        formulation_number,
+        ppm_start,
+        ppm_step,
+        reference_shift,
+        intensities,
+    ) in connection.execute(query, parameters):
+        yield (
+            ReactionKey(experiment, plate, formulation_number),
+            NmrRegion(
+                intensities=decode_intensities(intensities),
+                ppm_start=ppm_start,
+                ppm_step=ppm_step,
+                reference_shift=reference_shift,
+            ),
+        )
+
+
+@traced("queries.insert_turbidity")
 def insert_turbidity(  # noqa: PLR0913
     connection: Connection,
     reaction_key: ReactionKey,
@@ -811,6 +2080,227 @@ def insert_turbidity(  # noqa: PLR0913
             """,
         reaction | {"state": turbidity_state.value},
     )
+    _update_reaction_summary(connection, reaction_key)
+    _log_ingest(connection, reaction_key, IngestKind.TURBIDITY)
+
+    if commit:
+        connection.commit()
+
+
+@traced("queries.insert_parameter_set")
+def insert_parameter_set(
+    connection: Connection,
+    parameters: AnalysisParameters,
+    *,
+    commit: bool = True,
+) -> int:
+    """Get the id of a parameter set, inserting it if it is new.
+
+    Parameter sets are stored as JSON with sorted keys and every
+    number written as a float, so equal parameters always get the same
+    id.
+
+    Parameters:
+        connection: A SQLite connection.
+        parameters: The analysis parameters.
+        commit: Whether to commit the transaction.
 
+    Returns:
+        The id of the parameter set.
+    """
+    kind = _PARAMETER_KINDS[type(parameters)].value
+    encoded = json.dumps(
+        {
+            name: _canonical_parameter(value)
+            for name, value in asdict(parameters).items()
+        },
+        sort_keys=True,
+    )
+    connection.execute(
+        """
+        INSERT OR IGNORE INTO
+            analysis_parameter_sets (kind, parameters)
+        VALUES
+            (?, ?)
+        """,
+        (kind, encoded),
+    )
+    (parameter_set_id,) = connection.execute(
+        """
+        SELECT id
+        FROM analysis_parameter_sets
+        WHERE kind = ? AND parameters = ?
+        """,
+        (kind, encoded),
+    ).fetchone()
     if commit:
         connection.commit()
+    return int(parameter_set_id)
+
+
+def _canonical_parameter(value: Any) -> Any:
+    if isinstance(value, tuple | list):
+        return [float(item) for item in value]
+    return float(value)
+
+
+def parameter_set(
+    connection: Connection,
+    parameter_set_id: int,
+) -> AnalysisParameters:
+    """Get the parameters of a parameter set.
+
+    Parameters:
+        connection: A SQLite connection.
+        parameter_set_id: The id of the parameter set.
+
+    Returns:
+        The analysis parameters.
+
+    Raises:
+        KeyError: If there is no parameter set with the id.
+    """
+    row = connection.execute(
+        "SELECT kind, parameters FROM analysis_parameter_sets WHERE id = ?",
+        (parameter_set_id,),
+    ).fetchone()
+    if row is None:
+        msg = f"no parameter set with id {parameter_set_id}"
+        raise KeyError(msg)
+    kind, encoded = row
+    parameters = json.loads(encoded)
+    match IngestKind(kind):
+        case IngestKind.MASS_SPECTRUM:
+            return MassSpectrumParameters(**parameters)
+        case IngestKind.NMR_SPECTRUM:
+            parameters["solvent_peaks"] = tuple(parameters["solvent_peaks"])
+            return NmrParameters(**parameters)
+        case IngestKind.TURBIDITY:
+            return TurbidityParameters(**parameters)
+
+
+def parameter_sets_df(connection: Connection) -> pl.DataFrame:
+    """Return a DataFrame of analysis parameter sets.
+
+    Parameters:
+        connection: A SQLite connection.
+
+    Returns:
+        A DataFrame with the id, kind and JSON encoded parameters of
+        each parameter set, as well as the number of reactions which
+        were reprocessed with it.
+    """
+    return pl.DataFrame(
+        connection.execute(
+            """
+            SELECT
+                analysis_parameter_sets.id,
+                analysis_parameter_sets.kind,
+                analysis_parameter_sets.parameters,
+                (
+                    SELECT COUNT(*)
+                    FROM reprocessed_reactions
+                    WHERE
+                        reprocessed_reactions.parameter_set_id =
+                        analysis_parameter_sets.id
+                ) AS reactions
+            FROM
+                analysis_parameter_sets
+            ORDER BY
+                analysis_parameter_sets.id
+            """
+        ).fetchall(),
+        schema={
+            "id": pl.Int64,
+            "kind": pl.Utf8,
+            "parameters": pl.Utf8,
+            "reactions": pl.Int64,
+        },
+        orient="row",
+    )
+
+
+def reprocessed_reactions_df(
+    connection: Connection,
+    parameter_set_id: int,
+) -> pl.DataFrame:
+    """Return a DataFrame of the reactions reprocessed with a parameter set.
+
+    Reactions without any peaks are included, so this tells apart
+    reactions in which no peaks were found from reactions which were
+    not reprocessed.
+
+    Parameters:
+        connection: A SQLite connection.
+        parameter_set_id: The parameter set.
+
+    Returns:
+        A DataFrame with the same columns as :func:`reactions_df`.
+    """
+    return _reprocessed(connection, _REPROCESSED_REACTIONS, parameter_set_id)
+
+
+def reprocessed_mass_spectrum_peaks_df(
+    connection: Connection,
+    parameter_set_id: int,
+) -> pl.DataFrame:
+    """Return a DataFrame of reprocessed mass spectrum peaks.
+
+    Parameters:
+        connection: A SQLite connection.
+        parameter_set_id: The parameter set the peaks were found with.
+
+    Returns:
+        A DataFrame with the columns of :func:`mass_spectrum_peaks_df`
+        and the topology assigned to each peak, which is null for
+        peaks without a topology.
+    """
+    return _reprocessed(
+        connection, _REPROCESSED_MASS_SPECTRUM_PEAKS, parameter_set_id
+    )
+
+
+def reprocessed_nmr_peaks_df(
+    connection: Connection,
+    parameter_set_id: int,
+) -> pl.DataFrame:
+    """Return a DataFrame of reprocessed NMR peaks.
+
+    Parameters:
+        connection: A SQLite connection.
+        parameter_set_id: The parameter set the peaks were picked with.
+
+    Returns:
+        A DataFrame of the peaks, where the kind of each peak is
+        either ``"aldehyde"`` or ``"imine"``.
+    """
+    return _reprocessed(connection, _REPROCESSED_NMR_PEAKS, parameter_set_id)
+
+
+def reprocessed_turbidities_df(
+    connection: Connection,
+    parameter_set_id: int,
+) -> pl.DataFrame:
+    """Return a DataFrame of reprocessed turbidity states.
+
+    Parameters:
+        connection: A SQLite connection.
+        parameter_set_id: The parameter set the states were found with.
+
+    Returns:
+        A DataFrame with the same columns as :func:`turbidity_states_df`.
+    """
+    return _reprocessed(connection, _REPROCESSED_TURBIDITIES, parameter_set_id)
+
+
+def _reprocessed(
+    connection: Connection,
+    source: QuerySource,
+    parameter_set_id: int,
+) -> pl.DataFrame:
+    return LazyQuery(
+        connection,
+        source,
+        predicates=(f"{source.table}.parameter_set_id = ?",),
+        parameters=(parameter_set_id,),
+    ).collect()
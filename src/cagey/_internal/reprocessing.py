@@ -0,0 +1,346 @@
+import itertools
+from collections.abc import Callable, Iterable, Iterator, Sequence
+from dataclasses import asdict, astuple
+from multiprocessing.pool import Pool
+from sqlite3 import Connection
+from typing import Any, TypeVar
+
+import polars as pl
+
+from cagey._internal.codecs import decode_features, decode_intensities
+from cagey._internal.ms import get_peaks_from_features, get_topologies
+from cagey._internal.nmr import get_spectrum_from_region
+from cagey._internal.queries import insert_parameter_set
+from cagey._internal.turbidity import get_turbid_state_from_measurements
+from cagey._internal.types import (
+    AnalysisParameters,
+    MassSpectrumParameters,
+    NmrParameters,
+    NmrRegion,
+    ReactionKey,
+    Row,
+    TurbidityParameters,
+)
+
+T = TypeVar("T")
+Job = tuple[tuple[Any, ...], T]
+Result = tuple[int, list[dict[str, Any]] | None]
+
+# Keeps the number of parameters of a query below the SQLite limit.
+_MAX_REACTIONS_PER_QUERY = 999
+
+_MASS_SPECTRUM_QUERY = """
+    SELECT
+        reactions.id,
+        di.smiles,
+        tri.smiles,
+        mass_spectrum_features.features
+    FROM
+        reactions
+    CROSS JOIN
+        mass_spectra
+        ON mass_spectra.reaction_id = reactions.id
+    CROSS JOIN
+        mass_spectrum_features
+        ON mass_spectrum_features.mass_spectrum_id = mass_spectra.id
+    JOIN
+        precursors AS di
+        ON reactions.di_name = di.name
+    JOIN
+        precursors AS tri
+        ON reactions.tri_name = tri.name
+    {where}
+"""
+_NMR_QUERY = """
+    SELECT
+        reactions.id,
+        nmr_spectrum_regions.ppm_start,
+        nmr_spectrum_regions.ppm_step,
+        nmr_spectrum_regions.reference_shift,
+        nmr_spectrum_regions.intensities
+    FROM
+        reactions
+    CROSS JOIN
+        nmr_spectra
+        ON nmr_spectra.reaction_id = reactions.id
+    CROSS JOIN
+        nmr_spectrum_regions
+        ON nmr_spectrum_regions.nmr_spectrum_id = nmr_spectra.id
+    {where}
+"""
+_TURBIDITY_QUERY = """
+    SELECT
+        reactions.id,
+        turbidity_dissolved_references.dissolved_reference,
+        turbidity_measurements.time,
+        turbidity_measurements.turbidity
+    FROM
+        reactions
+    CROSS JOIN
+        turbidity_dissolved_references
+        ON turbidity_dissolved_references.reaction_id = reactions.id
+    CROSS JOIN
+        turbidity_measurements
+        ON turbidity_measurements.reaction_id = reactions.id
+    {where}
+    ORDER BY
+        reactions.id,
+        julianday(turbidity_measurements.time)
+"""
+
+
+def reprocess(  # noqa: PLR0913
+    connection: Connection,
+    parameters: AnalysisParameters,
+    reactions: Sequence[ReactionKey] | None = None,
+    *,
+    pool: Pool | None = None,
+    batch_size: int = 1000,
+    commit: bool = True,
+) -> int:
+    """Analyse stored data again with new parameters.
+
+    The kind of analysis is chosen by the type of `parameters`:
+
+    * :class:`.MassSpectrumParameters` finds mass spectrum peaks and
+      their topologies from the features stored by
+      :func:`cagey.queries.insert_mass_spectrum`.
+    * :class:`.NmrParameters` picks NMR peaks from the processed data
+      stored by :func:`cagey.queries.insert_nmr_spectrum`.
+    * :class:`.TurbidityParameters` finds turbidity states from the
+      stored turbidity measurements.
+
+    Results are written to the ``reprocessed_*`` tables under the id
+    of the parameter set, and can be read with
+    :func:`cagey.queries.reprocessed_mass_spectrum_peaks_df`,
+    :func:`cagey.queries.reprocessed_nmr_peaks_df` and
+    :func:`cagey.queries.reprocessed_turbidities_df`. The results of
+    other parameter sets, and the data added when the database was
+    built, are left untouched. Reprocessing reactions with a parameter
+    set they were already reprocessed with replaces their results.
+
+    Reactions without stored data, and NMR spectra in which the
+    solvent peak cannot be found with the new parameters, are skipped.
+    The reactions which were reprocessed with each parameter set are
+    counted by :func:`cagey.queries.parameter_sets_df`.
+
+    Parameters:
+        connection: A SQLite connection.
+        parameters: The analysis parameters.
+        reactions: The reactions to reprocess. If ``None``, every
+            reaction is reprocessed.
+        pool: The processes which analyse the data. If ``None``, the
+            data is analysed in this process. Processes forked after
+            polars has started its threads can deadlock, so the pool
+            should either be created before any data is read, or use
+            the ``"spawn"`` or ``"forkserver"`` start method.
+        batch_size:
+            The number of reactions read from the database and sent to
+            `pool` at a time.
+        commit: Whether to commit the transaction.
+
+    Returns:
+        The id of the parameter set.
+    """
+    parameter_set_id = insert_parameter_set(
+        connection, parameters, commit=False
+    )
+    worker: Callable[[Any], Result]
+    match parameters:
+        case MassSpectrumParameters():
+            table = "reprocessed_mass_spectrum_peaks"
+            rows = _select(connection, _MASS_SPECTRUM_QUERY, reactions)
+            worker = _find_mass_spectrum_peaks
+        case NmrParameters():
+            table = "reprocessed_nmr_peaks"
+            rows = _select(connection, _NMR_QUERY, reactions)
+            worker = _pick_nmr_peaks
+        case TurbidityParameters():
+            table = "reprocessed_turbidities"
+            rows = _group_measurements(
+                _select(connection, _TURBIDITY_QUERY, reactions)
+            )
+            worker = _find_turbid_state
+
+    for deleted in (table, "reprocessed_reactions"):
+        _delete(connection, deleted, parameter_set_id, reactions)
+    jobs: Iterator[Job[Any]] = ((row, parameters) for row in rows)
+    while batch := list(itertools.islice(jobs, batch_size)):
+        results = (
+            map(worker, batch)
+            if pool is None
+            else pool.imap_unordered(worker, batch, chunksize=16)
+        )
+        for reaction_id, result in results:
+            if result is None:
+                continue
+            _insert(connection, table, parameter_set_id, reaction_id, result)
+
+    if commit:
+        connection.commit()
+    return parameter_set_id
+
+
+def _select(
+    connection: Connection,
+    query: str,
+    reactions: Sequence[ReactionKey] | None,
+) -> Iterator[tuple[Any, ...]]:
+    if reactions is None:
+        yield from connection.execute(query.format(where=""))
+        return
+    for start in range(0, len(reactions), _MAX_REACTIONS_PER_QUERY):
+        chunk = reactions[start : start + _MAX_REACTIONS_PER_QUERY]
+        yield from connection.execute(
+            query.format(where=_where_reactions(len(chunk))),
+            tuple(value for reaction in chunk for value in astuple(reaction)),
+        )
+
+
+def _where_reactions(num_reactions: int) -> str:
+    q = ",".join("(?,?,?)" for _ in range(num_reactions))
+    return f"""
+    WHERE
+        (
+            reactions.experiment,
+            reactions.plate,
+            reactions.formulation_number
+        ) IN ({q})
+    """
+
+
+def _group_measurements(
+    rows: Iterable[tuple[Any, ...]],
+) -> Iterator[tuple[Any, ...]]:
+    for (reaction_id, dissolved_reference), measurements in itertools.groupby(
+        rows, key=lambda row: (row[0], row[1])
+    ):
+        _, _, times, turbidities = zip(*measurements, strict=True)
+        yield reaction_id, dissolved_reference, times, turbidities
+
+
+def _delete(
+    connection: Connection,
+    table: str,
+    parameter_set_id: int,
+    reactions: Sequence[ReactionKey] | None,
+) -> None:
+    query = f"DELETE FROM {table} WHERE parameter_set_id = ?"  # noqa: S608
+    if reactions is None:
+        connection.execute(query, (parameter_set_id,))
+        return
+    for start in range(0, len(reactions), _MAX_REACTIONS_PER_QUERY):
+        chunk = reactions[start : start + _MAX_REACTIONS_PER_QUERY]
+        connection.execute(
+            f"""
+            {query}
+            AND reaction_id IN (
+                SELECT reactions.id
+                FROM reactions
+                {_where_reactions(len(chunk))}
+            )
+            """,  # noqa: S608
+            (
+                parameter_set_id,
+                *(value for reaction in chunk for value in astuple(reaction)),
+            ),
+        )
+
+
+def _insert(
+    connection: Connection,
+    table: str,
+    parameter_set_id: int,
+    reaction_id: int,
+    rows: list[dict[str, Any]],
+) -> None:
+    ids = {"parameter_set_id": parameter_set_id, "reaction_id": reaction_id}
+    # A reaction can have more than one spectrum, whose results are all
+    # kept for the reaction.
+    connection.execute(
+        """
+        INSERT OR IGNORE INTO
+            reprocessed_reactions (parameter_set_id, reaction_id)
+        VALUES
+            (:parameter_set_id, :reaction_id)
+        """,
+        ids,
+    )
+    if not rows:
+        return
+    columns = ", ".join(["parameter_set_id", "reaction_id", *rows[0]])
+    values = ", ".join(
+        f":{column}"
+        for column in ["parameter_set_id", "reaction_id", *rows[0]]
+    )
+    connection.executemany(
+        f"INSERT INTO {table} ({columns}) VALUES ({values})",  # noqa: S608
+        (ids | row for row in rows),
+    )
+
+
+def _find_mass_spectrum_peaks(job: Job[MassSpectrumParameters]) -> Result:
+    (reaction_id, di_smiles, tri_smiles, features), parameters = job
+    peaks = tuple(
+        get_peaks_from_features(
+            decode_features(features),
+            di_smiles,
+            tri_smiles,
+            **asdict(parameters),
+        )
+    )
+    topologies = {
+        assignment.mass_spectrum_peak_id: assignment.topology
+        for assignment in get_topologies(
+            Row(i, peak) for i, peak in enumerate(peaks)
+        )
+    }
+    return reaction_id, [
+        asdict(peak) | {"topology": topologies.get(i)}
+        for i, peak in enumerate(peaks)
+    ]
+
+
+def _pick_nmr_peaks(job: Job[NmrParameters]) -> Result:
+    (
+        (
+            reaction_id,
+            ppm_start,
+            ppm_step,
+            reference_shift,
+            intensities,
+        ),
+        parameters,
+    ) = job
+    region = NmrRegion(
+        intensities=decode_intensities(intensities),
+        ppm_start=ppm_start,
+        ppm_step=ppm_step,
+        reference_shift=reference_shift,
+    )
+    try:
+        spectrum = get_spectrum_from_region(region, **asdict(parameters))
+    except ValueError:
+        # The solvent peak was not found, so the spectrum cannot be
+        # referenced.
+        return reaction_id, None
+    return reaction_id, [
+        {"kind": kind, "ppm": peak.ppm, "amplitude": peak.amplitude}
+        for kind, peaks in (
+            ("aldehyde", spectrum.aldehyde_peaks),
+            ("imine", spectrum.imine_peaks),
+        )
+        for peak in peaks
+    ]
+
+
+def _find_turbid_state(job: Job[TurbidityParameters]) -> Result:
+    (reaction_id, dissolved_reference, times, turbidities), parameters = job
+    measurements = pl.DataFrame(
+        {"time": times, "turbidity": turbidities},
+        schema={"time": pl.Utf8, "turbidity": pl.Float64},
+    ).with_columns(pl.col("time").str.to_datetime())
+    state = get_turbid_state_from_measurements(
+        measurements, dissolved_reference, **asdict(parameters)
+    )
+    return reaction_id, [{"state": state.value}]
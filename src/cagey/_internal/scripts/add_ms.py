@@ -1,17 +1,26 @@
 import textwrap
+import time
 from collections.abc import Sequence
 from dataclasses import dataclass
 from functools import partial
-from multiprocessing.pool import Pool
 from pathlib import Path
 from sqlite3 import Connection
 from typing import assert_never
 
+import polars as pl
 from rich import print
 from rich.progress import Progress, TaskID
 
 import cagey
-from cagey import MassSpectrumPeak, Precursors, ReactionKey
+from cagey import (
+    IngestFileMetrics,
+    IngestKind,
+    MassSpectrumPeak,
+    Precursors,
+    ReactionKey,
+)
+from cagey._internal.scripts.metrics import bytes_in
+from cagey.workers import MemoryAdmission, WorkerPool
 
 
 def main(  # noqa: PLR0913
@@ -20,25 +29,40 @@ def main(  # noqa: PLR0913
     mzmine: Path,
     progress: Progress,
     task_id: TaskID,
-    pool: Pool,
-) -> None:
+    pool: WorkerPool,
+    max_memory_bytes: int | None = None,
+) -> list[IngestFileMetrics]:
     reaction_keys = tuple(map(ReactionKey.from_ms_path, machine_data))
     paths = dict(zip(reaction_keys, machine_data, strict=True))
     precursors = cagey.queries.reaction_precursors(connection, reaction_keys)
+    admission = _memory_admission(connection, max_memory_bytes)
 
     failures = []
     spectrums = []
+    metrics = []
     progress.start_task(task_id)
-    for result in progress.track(
+    for result, file_metrics, spans in progress.track(
         pool.imap_unordered(
-            partial(_get_mass_spectrum, mzmine),
+            partial(
+                _get_mass_spectrum,
+                mzmine,
+                pool.threads,
+                cagey.tracing.is_enabled(),
+            ),
             (
                 (reaction_key, precursors, paths[reaction_key])
                 for reaction_key, precursors in precursors
             ),
+            admission=admission,
         ),
         task_id=task_id,
     ):
+        cagey.tracing.record(spans)
+        metrics.append(file_metrics)
+        if file_metrics.memory_bytes is not None:
+            admission.observe(
+                file_metrics.bytes_read, file_metrics.memory_bytes
+            )
         match result:
             case MassSpectrum():
                 spectrums.append(result)
@@ -55,18 +79,51 @@ def main(  # noqa: PLR0913
         print(f"failed to process ms spectra: [\n{failures_repr}\n]")
     for spectrum in spectrums:
         cagey.queries.insert_mass_spectrum(
-            connection, spectrum.reaction_key, spectrum.peaks, commit=False
-        )
-        cagey.queries.insert_mass_spectrum_topology_assignments(
             connection,
-            cagey.ms.get_topologies(
-                cagey.queries.mass_spectrum_peaks(
-                    connection, spectrum.reaction_key
-                )
-            ),
+            spectrum.reaction_key,
+            spectrum.peaks,
+            features=spectrum.features,
             commit=False,
         )
-    connection.commit()
+        with cagey.tracing.span("ms.get_topologies"):
+            assignments = list(
+                cagey.ms.get_topologies(
+                    cagey.queries.mass_spectrum_peaks(
+                        connection, spectrum.reaction_key
+                    )
+                )
+            )
+        cagey.queries.insert_mass_spectrum_topology_assignments(
+            connection, assignments, commit=False
+        )
+    with cagey.tracing.span("sqlite.commit"):
+        connection.commit()
+    return metrics
+
+
+def _memory_admission(
+    connection: Connection,
+    max_memory_bytes: int | None,
+) -> MemoryAdmission[tuple[ReactionKey, Precursors, Path]]:
+    admission = MemoryAdmission[tuple[ReactionKey, Precursors, Path]](
+        lambda spectrum_data: bytes_in(spectrum_data[2]),
+        budget_bytes=max_memory_bytes,
+    )
+    # Earlier runs give the memory estimates something to start from,
+    # so that the first files are not run with the default estimate.
+    history = (
+        cagey.queries.ingest_file_metrics_df(connection)
+        .filter(
+            pl.col("kind") == IngestKind.MASS_SPECTRUM.value,
+            pl.col("memory_bytes").is_not_null(),
+        )
+        .tail(1000)
+    )
+    for bytes_read, memory_bytes in history.select(
+        "bytes_read", "memory_bytes"
+    ).iter_rows():
+        admission.observe(bytes_read, memory_bytes)
+    return admission
 
 
 @dataclass(frozen=True, slots=True)
@@ -86,26 +143,66 @@ class MassSpectrumError:
 class MassSpectrum:
     reaction_key: ReactionKey
     peaks: list[MassSpectrumPeak]
+    features: pl.DataFrame
 
 
 def _get_mass_spectrum(
     mzmine: Path,
+    threads: int,
+    trace: bool,  # noqa: FBT001
+    spectrum_data: tuple[ReactionKey, Precursors, Path],
+) -> tuple[
+    MassSpectrum | MassSpectrumError,
+    IngestFileMetrics,
+    list[cagey.tracing.Span],
+]:
+    # Spans are collected here and sent back, because the worker
+    # process does not share the spans of the parent process.
+    _, _, machine_data = spectrum_data
+    start = time.perf_counter()
+    with (
+        cagey.tracing.collect(enabled=trace) as spans,
+        cagey.tracing.span("ms.file", path=machine_data),
+        cagey.memory.children_peak() as children,
+    ):
+        result = _get_traced_mass_spectrum(mzmine, threads, spectrum_data)
+    metrics = IngestFileMetrics(
+        kind=IngestKind.MASS_SPECTRUM,
+        path=str(machine_data),
+        bytes_read=bytes_in(machine_data),
+        seconds=time.perf_counter() - start,
+        peaks=len(result.peaks) if isinstance(result, MassSpectrum) else None,
+        failed=isinstance(result, MassSpectrumError),
+        memory_bytes=children.rss_bytes,
+    )
+    return result, metrics, spans
+
+
+def _get_traced_mass_spectrum(
+    mzmine: Path,
+    threads: int,
     spectrum_data: tuple[ReactionKey, Precursors, Path],
 ) -> MassSpectrum | MassSpectrumError:
     try:
         reaction_key, precursors, machine_data = spectrum_data
-        mzml = cagey.ms.machine_data_to_mzml(machine_data)
-        csv = cagey.ms.mzml_to_csv(mzml, mzmine)
-        return MassSpectrum(
-            reaction_key,
-            list(
-                cagey.ms.get_peaks(
-                    csv,
+        with cagey.tracing.span("ms.msconvert", path=machine_data):
+            mzml = cagey.ms.machine_data_to_mzml(machine_data, cpus=threads)
+        with cagey.tracing.span("ms.mzmine", path=mzml):
+            csv = cagey.ms.mzml_to_csv(mzml, mzmine, threads=threads)
+        # Only the features which can be peaks are kept, so that peaks
+        # can be found again from the database with any minimum peak
+        # height at or above the default.
+        with cagey.tracing.span("ms.read_features", path=csv):
+            features = cagey.ms.read_features(csv, min_peak_height=1e4)
+        with cagey.tracing.span("ms.get_peaks", path=csv):
+            peaks = list(
+                cagey.ms.get_peaks_from_features(
+                    features,
                     precursors.di_smiles,
                     precursors.tri_smiles,
                 )
-            ),
-        )
+            )
+        return MassSpectrum(reaction_key, peaks, features)
     # catch any exception here because the function get called in a
     # process pool
     except Exception as ex:  # noqa: BLE001
@@ -1,25 +1,152 @@
-from collections.abc import Iterable
+import textwrap
+import time
+from collections.abc import Sequence
+from dataclasses import dataclass, replace
+from functools import partial
 from pathlib import Path
 from sqlite3 import Connection
+from typing import assert_never
 
+from rich import print
 from rich.progress import Progress, TaskID
 
 import cagey
-from cagey import ReactionKey
+from cagey import (
+    IngestFileMetrics,
+    IngestKind,
+    NmrRegion,
+    NmrSpectrum,
+    ReactionKey,
+)
+from cagey._internal.scripts.metrics import bytes_in
+from cagey.workers import WorkerPool
 
+STORED_MIN_PPM = 6.0
+STORED_MAX_PPM = 11.5
 
-def main(
+
+def main(  # noqa: PLR0913
     connection: Connection,
-    title_files: Iterable[Path],
+    title_files: Sequence[Path],
     progress: Progress,
     task_id: TaskID,
-) -> None:
+    pool: WorkerPool,
+    *,
+    store_arrays: bool = False,
+) -> list[IngestFileMetrics]:
+    failures = []
+    metrics = []
     progress.start_task(task_id)
-    for path in progress.track(title_files, task_id=task_id):
-        cagey.queries.insert_nmr_spectrum(
-            connection,
-            ReactionKey.from_title_file(path),
-            cagey.nmr.get_spectrum(path.parent),
-            commit=False,
+    for result, file_metrics, spans in progress.track(
+        pool.imap_unordered(
+            partial(
+                _get_nmr_spectrum, cagey.tracing.is_enabled(), store_arrays
+            ),
+            title_files,
+        ),
+        total=len(title_files),
+        task_id=task_id,
+    ):
+        cagey.tracing.record(spans)
+        metrics.append(file_metrics)
+        match result:
+            case NmrResult():
+                cagey.queries.insert_nmr_spectrum(
+                    connection,
+                    result.reaction_key,
+                    result.spectrum,
+                    region=result.region,
+                    commit=False,
+                )
+            case NmrError():
+                failures.append(result)
+            case _ as unreachable:
+                assert_never(unreachable)
+
+    if failures:
+        failures_repr = textwrap.indent(
+            text="\n".join(failure.to_str() for failure in failures),
+            prefix="\t",
+        )
+        print(f"failed to process nmr spectra: [\n{failures_repr}\n]")
+    with cagey.tracing.span("sqlite.commit"):
+        connection.commit()
+    return metrics
+
+
+@dataclass(frozen=True, slots=True)
+class NmrResult:
+    reaction_key: ReactionKey
+    spectrum: NmrSpectrum
+    region: NmrRegion | None
+
+
+@dataclass(frozen=True, slots=True)
+class NmrError:
+    path: Path
+    exception: Exception
+
+    def to_str(self) -> str:
+        error_str = textwrap.indent(
+            text=str(self.exception),
+            prefix="\t",
         )
-    connection.commit()
+        return f"{self.path}:\n{error_str}"
+
+
+def _get_nmr_spectrum(
+    trace: bool,  # noqa: FBT001
+    store_arrays: bool,  # noqa: FBT001
+    path: Path,
+) -> tuple[NmrResult | NmrError, IngestFileMetrics, list[cagey.tracing.Span]]:
+    # Spans are collected here and sent back, because the worker
+    # process does not share the spans of the parent process.
+    start = time.perf_counter()
+    with (
+        cagey.tracing.collect(enabled=trace) as spans,
+        cagey.tracing.span("nmr.file", path=path.parent),
+    ):
+        result = _get_traced_nmr_spectrum(path, store_arrays=store_arrays)
+    metrics = IngestFileMetrics(
+        kind=IngestKind.NMR_SPECTRUM,
+        path=str(path.parent),
+        bytes_read=bytes_in(path.parent),
+        seconds=time.perf_counter() - start,
+        peaks=(
+            len(result.spectrum.aldehyde_peaks)
+            + len(result.spectrum.imine_peaks)
+            if isinstance(result, NmrResult)
+            else None
+        ),
+        failed=isinstance(result, NmrError),
+    )
+    return result, metrics, spans
+
+
+def _get_traced_nmr_spectrum(
+    path: Path,
+    *,
+    store_arrays: bool,
+) -> NmrResult | NmrError:
+    try:
+        with cagey.tracing.span("nmr.read_region", path=path.parent):
+            region = cagey.nmr.read_region(path.parent)
+        with cagey.tracing.span("nmr.get_spectrum", path=path.parent):
+            spectrum = cagey.nmr.get_spectrum_from_region(region)
+            stored_region = _stored_region(region) if store_arrays else None
+        return NmrResult(
+            ReactionKey.from_title_file(path), spectrum, stored_region
+        )
+    # catch any exception here because the function get called in a
+    # process pool
+    except Exception as ex:  # noqa: BLE001
+        return NmrError(path.parent, ex)
+
+
+def _stored_region(region: NmrRegion) -> NmrRegion:
+    # The stored region covers the solvent, imine and aldehyde peaks,
+    # with a margin so that peaks at the edges are picked in full.
+    return replace(
+        region.crop(STORED_MIN_PPM, STORED_MAX_PPM),
+        reference_shift=cagey.nmr.get_reference_shift(region),
+    )
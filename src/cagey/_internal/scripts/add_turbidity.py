@@ -1,13 +1,20 @@
 import json
+import textwrap
+import time
 from collections.abc import Sequence
+from dataclasses import dataclass
+from functools import partial
 from pathlib import Path
 from sqlite3 import Connection
-from typing import TypedDict
+from typing import TypedDict, assert_never
 
+from rich import print
 from rich.progress import Progress, TaskID
 
 import cagey
-from cagey import ReactionKey
+from cagey import IngestFileMetrics, IngestKind, ReactionKey, TurbidState
+from cagey._internal.scripts.metrics import bytes_in
+from cagey.workers import WorkerPool
 
 
 def main(
@@ -15,25 +22,49 @@ def main(
     data_files: Sequence[Path],
     progress: Progress,
     task_id: TaskID,
-) -> None:
+    pool: WorkerPool,
+) -> list[IngestFileMetrics]:
+    failures = []
+    metrics = []
     progress.start_task(task_id)
-    for path in progress.track(data_files, task_id=task_id):
-        data = _read_json(path)
-        dissolved_reference = data["turbidity_dissolved_reference"]
-        cagey.queries.insert_turbidity(
-            connection,
-            ReactionKey(
-                experiment=data["experiment"],
-                plate=data["plate"],
-                formulation_number=data["formulation_number"],
-            ),
-            data["turbidity_dissolved_reference"],
-            data["turbidity_data"],
-            cagey.turbidity.get_turbid_state(
-                data["turbidity_data"], dissolved_reference
-            ),
+    for result, file_metrics, spans in progress.track(
+        pool.imap_unordered(
+            partial(_get_turbid_state, cagey.tracing.is_enabled()),
+            data_files,
+        ),
+        total=len(data_files),
+        task_id=task_id,
+    ):
+        cagey.tracing.record(spans)
+        metrics.append(file_metrics)
+        match result:
+            case TurbidityResult(data=data, turbid_state=turbid_state):
+                cagey.queries.insert_turbidity(
+                    connection,
+                    ReactionKey(
+                        experiment=data["experiment"],
+                        plate=data["plate"],
+                        formulation_number=data["formulation_number"],
+                    ),
+                    data["turbidity_dissolved_reference"],
+                    data["turbidity_data"],
+                    turbid_state,
+                    commit=False,
+                )
+            case TurbidityError():
+                failures.append(result)
+            case _ as unreachable:
+                assert_never(unreachable)
+
+    if failures:
+        failures_repr = textwrap.indent(
+            text="\n".join(failure.to_str() for failure in failures),
+            prefix="\t",
         )
-    connection.commit()
+        print(f"failed to process turbidity data: [\n{failures_repr}\n]")
+    with cagey.tracing.span("sqlite.commit"):
+        connection.commit()
+    return metrics
 
 
 class TurbidityData(TypedDict):
@@ -44,6 +75,67 @@ class TurbidityData(TypedDict):
     turbidity_dissolved_reference: float
 
 
+@dataclass(frozen=True, slots=True)
+class TurbidityResult:
+    data: TurbidityData
+    turbid_state: TurbidState
+
+
+@dataclass(frozen=True, slots=True)
+class TurbidityError:
+    path: Path
+    exception: Exception
+
+    def to_str(self) -> str:
+        error_str = textwrap.indent(
+            text=str(self.exception),
+            prefix="\t",
+        )
+        return f"{self.path}:\n{error_str}"
+
+
+def _get_turbid_state(
+    trace: bool,  # noqa: FBT001
+    path: Path,
+) -> tuple[
+    TurbidityResult | TurbidityError,
+    IngestFileMetrics,
+    list[cagey.tracing.Span],
+]:
+    # Spans are collected here and sent back, because the worker
+    # process does not share the spans of the parent process.
+    start = time.perf_counter()
+    with (
+        cagey.tracing.collect(enabled=trace) as spans,
+        cagey.tracing.span("turbidity.file", path=path),
+    ):
+        result = _get_traced_turbid_state(path)
+    metrics = IngestFileMetrics(
+        kind=IngestKind.TURBIDITY,
+        path=str(path),
+        bytes_read=bytes_in(path),
+        seconds=time.perf_counter() - start,
+        peaks=None,
+        failed=isinstance(result, TurbidityError),
+    )
+    return result, metrics, spans
+
+
+def _get_traced_turbid_state(path: Path) -> TurbidityResult | TurbidityError:
+    try:
+        with cagey.tracing.span("turbidity.read_json", path=path):
+            data = _read_json(path)
+        with cagey.tracing.span("turbidity.get_turbid_state", path=path):
+            turbid_state = cagey.turbidity.get_turbid_state(
+                data["turbidity_data"], data["turbidity_dissolved_reference"]
+            )
+        return TurbidityResult(data, turbid_state)
+    # catch any exception here because the function get called in a
+    # process pool
+    except Exception as ex:  # noqa: BLE001
+        return TurbidityError(path, ex)
+
+
 def _read_json(path: Path) -> TurbidityData:
     with path.open() as file:
         return json.load(file)
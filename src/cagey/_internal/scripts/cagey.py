@@ -1,10 +1,11 @@
+import importlib
 from enum import StrEnum
 from typing import assert_never
 
 import typer
+from click import Command, Context
 from rich.console import Console
-
-from cagey._internal.scripts import cagey_insert, cagey_new, ms, nmr
+from typer.core import TyperGroup
 
 
 class Topic(StrEnum):
@@ -12,16 +13,69 @@ class Topic(StrEnum):
     NEW = "new"
 
 
+# Maps each sub-command to the module and attribute holding it. A
+# sub-command is either a function or a Typer app of its own.
+SUB_COMMANDS = {
+    "new": ("cagey_new", "main"),
+    "insert": ("cagey_insert", "main"),
+    "ms": ("ms", "app"),
+    "nmr": ("nmr", "main"),
+    "export": ("export", "main"),
+    "rebuild": ("rebuild", "main"),
+    "reprocess": ("reprocess", "app"),
+    "stats": ("stats", "main"),
+    "profile": ("profile", "app"),
+}
+
+
+class LazyGroup(TyperGroup):
+    """Imports the module of a sub-command only when it is used.
+
+    Sub-commands import RDKit, pyopenms, nmrglue and polars, which
+    take seconds to import, so running one sub-command should not
+    import the modules of the others.
+    """
+
+    def list_commands(self, ctx: Context) -> list[str]:
+        return [*SUB_COMMANDS, *super().list_commands(ctx)]
+
+    def get_command(
+        self,
+        ctx: Context,
+        cmd_name: str,
+    ) -> Command | None:
+        if cmd_name in SUB_COMMANDS and cmd_name not in self.commands:
+            self.add_command(_load_command(cmd_name), cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+
+def _load_command(name: str) -> Command:
+    module_name, attribute = SUB_COMMANDS[name]
+    command = getattr(
+        importlib.import_module(f"cagey._internal.scripts.{module_name}"),
+        attribute,
+    )
+    parent = typer.Typer(add_completion=False, rich_markup_mode="rich")
+    if isinstance(command, typer.Typer):
+        parent.add_typer(command, name=name)
+    else:
+        parent.command(no_args_is_help=True, name=name)(command)
+    # A callback makes Typer build a group even for a single command.
+    parent.callback()(lambda: None)
+    group = typer.main.get_command(parent)
+    if not isinstance(group, TyperGroup):
+        msg = f"expected a Typer group for {name!r}, got {group!r}"
+        raise TypeError(msg)
+    return group.commands[name]
+
+
 console = Console()
 
 app = typer.Typer(
+    cls=LazyGroup,
     no_args_is_help=True,
     rich_markup_mode="rich",
 )
-app.command(no_args_is_help=True, name="new")(cagey_new.main)
-app.command(no_args_is_help=True, name="insert")(cagey_insert.main)
-app.add_typer(ms.app, name="ms")
-app.command(no_args_is_help=True, name="nmr")(nmr.main)
 
 
 @app.callback()
@@ -39,6 +93,8 @@ def help(topic: Topic) -> None:  # noqa: A001
     """Get help on how to use [bright_magenta]cagey[/]."""
     match topic:
         case Topic.NEW:
+            from cagey._internal.scripts import cagey_new  # noqa: PLC0415
+
             cagey_new.help()
         case Topic.INTRO:
             print_help()
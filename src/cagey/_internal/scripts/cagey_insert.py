@@ -1,7 +1,9 @@
+import shutil
 import sqlite3
 import subprocess
+import time
 from collections.abc import Iterator
-from multiprocessing import Pool
+from datetime import UTC, datetime
 from pathlib import Path
 from sqlite3 import Connection
 from typing import Annotated
@@ -15,16 +17,66 @@ from rich.progress import (
     TimeElapsedColumn,
 )
 
+import cagey
 from cagey import ReactionKey
 from cagey._internal.scripts import add_ms, add_nmr, add_turbidity
+from cagey._internal.scripts.metrics import record_run, stage
+from cagey._internal.scripts.trace import write_memory_report, write_trace
+from cagey.workers import WorkerPool
 
 
-def main(
+def main(  # noqa: PLR0913
     data: Annotated[Path, typer.Argument(help="Folder holding the data.")],
     database: Annotated[Path, typer.Argument(help="Database file to create.")],
     mzmine: Annotated[
         Path, typer.Option(help="Path to MZmine version 3.4.")
     ] = Path("MZmine"),
+    store_nmr_arrays: Annotated[  # noqa: FBT002
+        bool,
+        typer.Option(
+            help="Store the processed NMR data between 6 and 11.5 ppm, "
+            "so that NMR peaks can be picked again without the machine "
+            "data."
+        ),
+    ] = False,
+    trace: Annotated[
+        Path | None,
+        typer.Option(
+            help="Write a Chrome trace of the time spent in each stage "
+            "to this file, and print a summary of it.",
+        ),
+    ] = None,
+    memory: Annotated[
+        Path | None,
+        typer.Option(
+            help="Sample the memory used by cagey, its workers and the "
+            "programs they run, write a JSON report of the peak memory "
+            "of each stage and file to this file, and print a summary "
+            "of it.",
+        ),
+    ] = None,
+    processes: Annotated[
+        int | None,
+        typer.Option(
+            help="Number of processes. Defaults to one for each CPU.",
+        ),
+    ] = None,
+    cpus: Annotated[
+        int | None,
+        typer.Option(
+            help="Number of CPUs to use, which are shared between the "
+            "processes and the programs they run, such as MZmine. "
+            "Defaults to the CPUs cagey may run on.",
+        ),
+    ] = None,
+    max_memory: Annotated[
+        float | None,
+        typer.Option(
+            help="Memory in GiB which the programs run for mass spectra, "
+            "such as MZmine, may use at once. Defaults to the memory "
+            "available when cagey starts, less a tenth of the total.",
+        ),
+    ] = None,
 ) -> None:
     """Insert new data into the [bright_magenta]cagey[/] database.
 
@@ -33,8 +85,9 @@ skips data from reaction reactions already in the database.
     """
     console = Console()
     has_docker = (
-        subprocess.run(
-            ["/usr/bin/docker", "ps"],  # noqa: S603
+        shutil.which("docker") is not None
+        and subprocess.run(
+            ["docker", "ps"],  # noqa: S607
             capture_output=True,
             check=False,
         ).returncode
@@ -46,7 +99,14 @@ skips data from reaction reactions already in the database.
             "try again."
         )
         raise typer.Abort
+    stage_seconds: dict[str, float] = {}
+    started_at = datetime.now(UTC)
+    start = time.perf_counter()
     with (
+        cagey.tracing.collect(
+            enabled=trace is not None or memory is not None
+        ) as spans,
+        cagey.memory.profile(enabled=memory is not None) as memory_profile,
         Progress(
             SpinnerColumn(
                 finished_text="[green]:heavy_check_mark:",
@@ -56,9 +116,10 @@ skips data from reaction reactions already in the database.
             MofNCompleteColumn(),
             transient=False,
         ) as progress,
-        Pool() as pool,
+        WorkerPool(processes, cpus=cpus) as pool,
     ):
         connection = sqlite3.connect(database, check_same_thread=False)
+        cagey.queries.create_tables(connection)
         existing_ms = set(_existing_ms(connection))
         ms_data = tuple(
             path
@@ -92,26 +153,48 @@ skips data from reaction reactions already in the database.
             total=len(turbidity_data),
             start=False,
         )
-        add_ms.main(
+        with stage("add_ms", stage_seconds):
+            ms_metrics = add_ms.main(
+                connection,
+                ms_data,
+                mzmine,
+                progress,
+                ms_task,
+                pool,
+                max_memory_bytes=(
+                    None if max_memory is None else int(max_memory * 2**30)
+                ),
+            )
+        with stage("add_nmr", stage_seconds):
+            nmr_metrics = add_nmr.main(
+                connection,
+                nmr_data,
+                progress,
+                nmr_task,
+                pool,
+                store_arrays=store_nmr_arrays,
+            )
+        with stage("add_turbidity", stage_seconds):
+            turbidity_metrics = add_turbidity.main(
+                connection,
+                turbidity_data,
+                progress,
+                turbidity_task,
+                pool,
+            )
+        record_run(
             connection,
-            ms_data,
-            mzmine,
-            progress,
-            ms_task,
-            pool,
-        )
-        add_nmr.main(
-            connection,
-            nmr_data,
-            progress,
-            nmr_task,
-        )
-        add_turbidity.main(
-            connection,
-            turbidity_data,
-            progress,
-            turbidity_task,
+            "insert",
+            started_at,
+            time.perf_counter() - start,
+            pool.processes,
+            stage_seconds,
+            [*ms_metrics, *nmr_metrics, *turbidity_metrics],
         )
+    if trace is not None:
+        write_trace(console, trace, spans)
+    if memory is not None:
+        write_memory_report(console, memory, memory_profile, spans)
 
 
 def _existing_ms(connection: Connection) -> Iterator[ReactionKey]:
@@ -0,0 +1,33 @@
+import sqlite3
+from pathlib import Path
+from typing import Annotated
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+import cagey
+
+
+def main(
+    database: Annotated[Path, typer.Argument(help="Database file to export.")],
+    directory: Annotated[
+        Path, typer.Argument(help="Folder holding the exported data.")
+    ],
+) -> None:
+    """Export the database as a Parquet dataset.
+
+    Running the command again with the same [blue]DIRECTORY[/] only \
+exports data added to the database since the previous export.
+    """
+    console = Console()
+    connection = sqlite3.connect(database)
+    with console.status("[bold green]Exporting database..."):
+        exported = cagey.export.export_dataset(connection, directory)
+
+    table = Table(title="Exported Rows", header_style="bold magenta")
+    table.add_column("dataset", style="green")
+    table.add_column("rows", style="blue")
+    for dataset, num_rows in exported.items():
+        table.add_row(dataset, str(num_rows))
+    console.print(table)
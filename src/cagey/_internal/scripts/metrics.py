@@ -0,0 +1,59 @@
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from datetime import datetime
+from importlib.metadata import version
+from pathlib import Path
+from sqlite3 import Connection
+
+import cagey
+from cagey import IngestFileMetrics, IngestRun
+
+
+def bytes_in(path: Path) -> int:
+    """Get the size of a file, or of every file in a folder."""
+    if path.is_dir():
+        return sum(
+            child.stat().st_size
+            for child in path.rglob("*")
+            if child.is_file()
+        )
+    return path.stat().st_size
+
+
+@contextmanager
+def stage(name: str, seconds: dict[str, float]) -> Iterator[None]:
+    """Trace a stage of a run and record how many seconds it took."""
+    start = time.perf_counter()
+    try:
+        with cagey.tracing.span(name), cagey.memory.stage(name):
+            yield
+    finally:
+        seconds[name] = time.perf_counter() - start
+
+
+def record_run(  # noqa: PLR0913
+    connection: Connection,
+    command: str,
+    started_at: datetime,
+    wall_seconds: float,
+    processes: int,
+    stage_seconds: dict[str, float],
+    files: Iterable[IngestFileMetrics],
+) -> None:
+    """Add the metrics of a run to the database."""
+    cagey.queries.insert_ingest_run(
+        connection,
+        IngestRun(
+            command=command,
+            cagey_version=version("cagey"),
+            started_at=started_at,
+            wall_seconds=wall_seconds,
+            processes=processes,
+            reactions_seconds=stage_seconds.get("add_reactions"),
+            mass_spectra_seconds=stage_seconds["add_ms"],
+            nmr_seconds=stage_seconds["add_nmr"],
+            turbidity_seconds=stage_seconds["add_turbidity"],
+        ),
+        files,
+    )
@@ -1,14 +1,27 @@
+import shutil
 import sqlite3
 import subprocess
+import time
+from collections.abc import Iterable, Sequence
+from dataclasses import asdict, fields, replace
 from pathlib import Path
 from typing import Annotated
 
+import polars as pl
 import typer
 from rich.console import Console
 from rich.table import Table
 
 import cagey
-from cagey import Precursors, ReactionKey, Row
+from cagey import (
+    MassSpectrumParameters,
+    MassSpectrumPeak,
+    MassSpectrumTopologyAssignment,
+    Precursors,
+    ReactionKey,
+    Row,
+)
+from cagey.workers import WorkerPool
 
 app = typer.Typer(
     help="Mass spectrum analysis.",
@@ -43,8 +56,9 @@ instead print the results to the console.
     console = Console()
 
     has_docker = (
-        subprocess.run(
-            ["/usr/bin/docker", "ps"],  # noqa: S603
+        shutil.which("docker") is not None
+        and subprocess.run(
+            ["docker", "ps"],  # noqa: S607
             capture_output=True,
             check=False,
         ).returncode
@@ -69,7 +83,9 @@ instead print the results to the console.
 
     console.print(
         _get_table(
-            csv=csv,
+            features=cagey.ms.read_features(
+                csv, min_peak_height=min_peak_height
+            ),
             precursors=precursors,
             calculated_peak_tolerance=calculated_peak_tolerance,
             separation_peak_tolerance=separation_peak_tolerance,
@@ -106,7 +122,9 @@ instead print the results to the console.
     )
     console.print(
         _get_table(
-            csv=csv,
+            features=cagey.ms.read_features(
+                csv, min_peak_height=min_peak_height
+            ),
             precursors=precursors,
             calculated_peak_tolerance=calculated_peak_tolerance,
             separation_peak_tolerance=separation_peak_tolerance,
@@ -117,8 +135,434 @@ instead print the results to the console.
     )
 
 
+@app.command(no_args_is_help=True)
+def from_database(  # noqa: PLR0913
+    database: Annotated[
+        Path,
+        typer.Argument(help="Database file holding the mass spectra."),
+    ],
+    experiment: str,
+    plate: int,
+    formulation_number: int,
+    calculated_peak_tolerance: float = 0.1,
+    separation_peak_tolerance: float = 0.1,
+    max_ppm_error: float = 10,
+    max_separation: float = 0.02,
+    min_peak_height: float = 1e4,
+) -> None:
+    """Perform analysis on a mass spectrum stored in the database.
+
+    The features of the mass spectrum must have been stored when it \
+was added to the database. This command will not add the results to \
+the database, but will instead print the results to the console.
+    """
+    console = Console()
+    reaction_key = ReactionKey(experiment, plate, formulation_number)
+    connection = sqlite3.connect(database)
+    spectra = list(
+        cagey.queries.mass_spectrum_features(connection, [reaction_key])
+    )
+    if not spectra:
+        console.print(
+            "[bold red]No mass spectrum features stored for:[/] "
+            f"{reaction_key}"
+        )
+        raise typer.Exit(1)
+    ((_, precursors),) = cagey.queries.reaction_precursors(
+        connection, [reaction_key]
+    )
+    for _, features in spectra:
+        console.print(
+            _get_table(
+                features=features,
+                precursors=precursors,
+                calculated_peak_tolerance=calculated_peak_tolerance,
+                separation_peak_tolerance=separation_peak_tolerance,
+                max_ppm_error=max_ppm_error,
+                max_separation=max_separation,
+                min_peak_height=min_peak_height,
+            )
+        )
+
+
+@app.command(no_args_is_help=True)
+def tune(  # noqa: PLR0913
+    database: Annotated[
+        Path,
+        typer.Argument(help="Database file holding reactions and precursors."),
+    ],
+    csv: Annotated[
+        list[Path] | None,
+        typer.Argument(
+            help="Paths to csv files. If not given, the features stored "
+            "in the database are used.",
+        ),
+    ] = None,
+    experiment: Annotated[
+        list[str] | None,
+        typer.Option(help="Only use stored spectra of these experiments."),
+    ] = None,
+    plate: Annotated[
+        list[int] | None,
+        typer.Option(help="Only use stored spectra of these plates."),
+    ] = None,
+    formulation_number: Annotated[
+        list[int] | None,
+        typer.Option(
+            help="Only use stored spectra of these formulation numbers."
+        ),
+    ] = None,
+    calculated_peak_tolerance: float = 0.1,
+    separation_peak_tolerance: float = 0.1,
+    max_ppm_error: float = 10,
+    max_separation: float = 0.02,
+    min_peak_height: float = 1e4,
+    max_between_peak_height: float = 0.7,
+) -> None:
+    """Tune the peak parameters interactively.
+
+    The mass spectra are read once and their peaks are shown again \
+every time the parameters are changed. Enter [green]name=value[/] to \
+change a parameter, for example [green]max_ppm_error=5[/], \
+[green]reset[/] to go back to the starting parameters and \
+[green]quit[/] to stop. This command will not add the results to the \
+database.
+    """
+    console = Console()
+    connection = sqlite3.connect(database)
+    with console.status("[bold green]Reading mass spectra..."):
+        if csv:
+            session = cagey.ms.SpectrumSession.from_csv(connection, csv)
+        else:
+            reactions = _stored_reactions(
+                connection,
+                experiment=experiment,
+                plate=plate,
+                formulation_number=formulation_number,
+            )
+            session = (
+                cagey.ms.SpectrumSession.from_database(connection, reactions)
+                if reactions != []
+                else cagey.ms.SpectrumSession()
+            )
+    if not session:
+        console.print("[bold red]No mass spectra to tune.")
+        raise typer.Exit(1)
+
+    initial = MassSpectrumParameters(
+        calculated_peak_tolerance=calculated_peak_tolerance,
+        separation_peak_tolerance=separation_peak_tolerance,
+        max_ppm_error=max_ppm_error,
+        max_separation=max_separation,
+        min_peak_height=min_peak_height,
+        max_between_peak_height=max_between_peak_height,
+    )
+    parameters = initial
+    names = {field.name for field in fields(MassSpectrumParameters)}
+    show = True
+    while True:
+        if show:
+            _print_session(console, session, parameters)
+        try:
+            command = console.input("[bold magenta]tune>[/] ").strip()
+        except EOFError:
+            break
+        show = False
+        if command in {"quit", "exit"}:
+            break
+        if command == "reset":
+            parameters = initial
+            show = True
+            continue
+        try:
+            changes = {
+                name.strip(): float(value)
+                for name, value in (
+                    change.split("=") for change in command.split()
+                )
+            }
+        except ValueError:
+            console.print(f"[bold red]Not understood:[/] {command}")
+            continue
+        if unknown := changes.keys() - names:
+            console.print(
+                f"[bold red]Unknown parameters:[/] {', '.join(unknown)}"
+            )
+            continue
+        parameters = replace(parameters, **changes)
+        show = True
+
+
+@app.command(no_args_is_help=True)
+def index(  # noqa: PLR0913
+    database: Annotated[
+        Path,
+        typer.Argument(help="Database file holding the mass spectra."),
+    ],
+    index: Annotated[
+        Path, typer.Argument(help="Directory to write the index to.")
+    ],
+    min_mz: float = 100.0,
+    max_mz: float = 4100.0,
+    num_bins: int = 512,
+    num_lists: Annotated[
+        int,
+        typer.Option(
+            help="Number of lists for approximate searches. "
+            "0 allows only exact searches."
+        ),
+    ] = 0,
+) -> None:
+    """Build an index of the mass spectra for similarity searches.
+
+    The index is not updated when new spectra are added to the \
+database, so it has to be built again to include them.
+    """
+    console = Console()
+    connection = sqlite3.connect(database)
+    with console.status("[bold green]Building index..."):
+        spectrum_index = cagey.queries.SpectrumIndex.build(
+            connection,
+            index,
+            min_mz=min_mz,
+            max_mz=max_mz,
+            num_bins=num_bins,
+            num_lists=num_lists,
+        )
+    console.print(
+        "[bold green]:heavy_check_mark: Indexed "
+        f"{len(spectrum_index)} spectra:[/] {index}"
+    )
+
+
+@app.command(no_args_is_help=True)
+def similar(  # noqa: PLR0913
+    index: Annotated[Path, typer.Argument(help="Directory of the index.")],
+    experiment: str,
+    plate: int,
+    formulation_number: int,
+    k: Annotated[
+        int, typer.Option("-k", help="Number of reactions to find.")
+    ] = 10,
+    num_probes: Annotated[
+        int | None,
+        typer.Option(
+            help="Number of lists to search. Searches every spectrum "
+            "if not given."
+        ),
+    ] = None,
+) -> None:
+    """Find the reactions with the most similar mass spectra."""
+    console = Console()
+    spectrum_index = cagey.queries.SpectrumIndex(index)
+    reaction_key = ReactionKey(experiment, plate, formulation_number)
+    try:
+        similar_reactions = spectrum_index.similar_reactions(
+            reaction_key, k, num_probes=num_probes
+        )
+    except KeyError:
+        console.print(f"[bold red]Reaction not in index:[/] {reaction_key}")
+        raise typer.Exit(1) from None
+
+    table = Table(title="Similar Reactions", header_style="bold magenta")
+    table.add_column("experiment", style="green")
+    table.add_column("plate", style="blue")
+    table.add_column("formulation_number", style="blue")
+    table.add_column("similarity", style="blue")
+    for similar_reaction in similar_reactions:
+        table.add_row(
+            similar_reaction.reaction_key.experiment,
+            str(similar_reaction.reaction_key.plate),
+            str(similar_reaction.reaction_key.formulation_number),
+            f"{similar_reaction.similarity:.3f}",
+        )
+    console.print(table)
+
+
+@app.command(no_args_is_help=True)
+def sweep(  # noqa: PLR0913
+    database: Annotated[
+        Path,
+        typer.Argument(help="Database file holding reactions and precursors."),
+    ],
+    csv: Annotated[
+        list[Path] | None,
+        typer.Argument(
+            help="Paths to csv files. If not given, the features stored "
+            "in the database are used.",
+        ),
+    ] = None,
+    experiment: Annotated[
+        list[str] | None,
+        typer.Option(help="Only use stored spectra of these experiments."),
+    ] = None,
+    plate: Annotated[
+        list[int] | None,
+        typer.Option(help="Only use stored spectra of these plates."),
+    ] = None,
+    output: Annotated[
+        Path | None,
+        typer.Option(help="Write the counts to a parquet or csv file."),
+    ] = None,
+    processes: Annotated[
+        int | None,
+        typer.Option(
+            help="Number of processes. Defaults to the number of CPUs.",
+        ),
+    ] = None,
+    calculated_peak_tolerance: list[float] | None = None,
+    separation_peak_tolerance: list[float] | None = None,
+    max_ppm_error: list[float] | None = None,
+    max_separation: list[float] | None = None,
+    min_peak_height: list[float] | None = None,
+    max_between_peak_height: list[float] | None = None,
+) -> None:
+    """Count the topologies found for many peak parameters.
+
+    Each parameter option can be given many times, and every \
+combination of the given values is tried. Parameters which are not \
+given keep their default value. This command will not add the results \
+to the database.
+    """
+    console = Console()
+    values = {
+        "calculated_peak_tolerance": calculated_peak_tolerance,
+        "separation_peak_tolerance": separation_peak_tolerance,
+        "max_ppm_error": max_ppm_error,
+        "max_separation": max_separation,
+        "min_peak_height": min_peak_height,
+        "max_between_peak_height": max_between_peak_height,
+    }
+    grid = cagey.ms.parameter_grid(
+        **{name: value for name, value in values.items() if value}
+    )
+    with WorkerPool(processes) as workers:
+        connection = sqlite3.connect(database)
+        with console.status("[bold green]Reading mass spectra..."):
+            if csv:
+                features = [
+                    (
+                        ReactionKey.from_ms_path(path),
+                        cagey.ms.read_features(path),
+                    )
+                    for path in csv
+                ]
+            else:
+                reactions = _stored_reactions(
+                    connection, experiment=experiment, plate=plate
+                )
+                features = (
+                    list(
+                        cagey.queries.mass_spectrum_features(
+                            connection, reactions
+                        )
+                    )
+                    if reactions != []
+                    else []
+                )
+        if not features:
+            console.print("[bold red]No mass spectra to sweep.")
+            raise typer.Exit(1)
+        precursors = dict(
+            cagey.queries.reaction_precursors(
+                connection, [reaction_key for reaction_key, _ in features]
+            )
+        )
+        with console.status(
+            f"[bold green]Sweeping {len(grid)} parameter sets over "
+            f"{len(features)} mass spectra..."
+        ):
+            counts = cagey.ms.sweep_peaks(
+                (
+                    (spectrum, precursors[reaction_key])
+                    for reaction_key, spectrum in features
+                ),
+                grid,
+                pool=workers.pool,
+            )
+
+    if output is None:
+        console.print(_get_sweep_table(counts))
+        return
+    if output.suffix == ".csv":
+        counts.write_csv(output)
+    else:
+        counts.write_parquet(output)
+    console.print(f"[bold green]:heavy_check_mark: Wrote counts:[/] {output}")
+
+
+def _print_session(
+    console: Console,
+    session: "cagey.ms.SpectrumSession",
+    parameters: MassSpectrumParameters,
+) -> None:
+    start = time.perf_counter()
+    tables = [
+        _get_peaks_table(
+            *session.topologies(reaction_key, parameters),
+            title=f"Mass Spectrum Peaks: {reaction_key}",
+        )
+        for reaction_key in session.reactions
+    ]
+    milliseconds = (time.perf_counter() - start) * 1000
+    for table in tables:
+        console.print(table)
+    console.print(
+        ", ".join(
+            f"[blue]{name}[/]={value}"
+            for name, value in asdict(parameters).items()
+        )
+    )
+    console.print(f"Found peaks in {milliseconds:.1f} ms.")
+
+
+def _stored_reactions(
+    connection: sqlite3.Connection,
+    *,
+    experiment: list[str] | None,
+    plate: list[int] | None,
+    formulation_number: list[int] | None = None,
+) -> list[ReactionKey] | None:
+    if not (experiment or plate or formulation_number):
+        return None
+    return [
+        ReactionKey(*row)
+        for row in cagey.queries.reactions_lazy(connection)
+        .filter(
+            experiment=experiment or None,
+            plate=plate or None,
+            formulation_number=formulation_number or None,
+        )
+        .select("experiment", "plate", "formulation_number")
+        .collect()
+        .iter_rows()
+    ]
+
+
+def _get_sweep_table(counts: pl.DataFrame) -> Table:
+    parameters = [
+        column
+        for column in counts.columns
+        if column not in {"topology", "num_reactions", "num_peaks"}
+    ]
+    reactions = counts.pivot(
+        index=parameters,
+        columns="topology",
+        values="num_reactions",
+        maintain_order=True,
+    )
+    table = Table(title="Reactions per Topology", header_style="bold magenta")
+    for column in parameters:
+        table.add_column(column, style="blue")
+    for column in reactions.columns[len(parameters) :]:
+        table.add_column(column, style="green")
+    for row in reactions.iter_rows():
+        table.add_row(*map(str, row))
+    return table
+
+
 def _get_table(  # noqa: PLR0913
-    csv: Path,
+    features: pl.DataFrame,
     precursors: Precursors,
     *,
     calculated_peak_tolerance: float,
@@ -127,23 +571,11 @@ def _get_table(  # noqa: PLR0913
     max_separation: float,
     min_peak_height: float,
 ) -> Table:
-    table = Table(title="Mass Spectrum Peaks", header_style="bold magenta")
-    table.add_column("id", style="cyan")
-    table.add_column("tri_count", style="blue")
-    table.add_column("di_count", style="blue")
-    table.add_column("adduct", style="green")
-    table.add_column("charge", style="blue")
-    table.add_column("calculated_mz", style="blue")
-    table.add_column("spectrum_mz", style="blue")
-    table.add_column("separation_mz", style="blue")
-    table.add_column("intensity", style="blue")
-    table.add_column("topology", style="green")
-
     rows = tuple(
         Row(id=id_, item=peak)
         for id_, peak in enumerate(
-            cagey.ms.get_peaks(
-                path=csv,
+            cagey.ms.get_peaks_from_features(
+                features=features,
                 di_smiles=precursors.di_smiles,
                 tri_smiles=precursors.tri_smiles,
                 calculated_peak_tolerance=calculated_peak_tolerance,
@@ -154,9 +586,30 @@ def _get_table(  # noqa: PLR0913
             )
         )
     )
+    return _get_peaks_table(rows, cagey.ms.get_topologies(rows))
+
+
+def _get_peaks_table(
+    rows: Sequence[Row[MassSpectrumPeak]],
+    assignments: Iterable[MassSpectrumTopologyAssignment],
+    *,
+    title: str = "Mass Spectrum Peaks",
+) -> Table:
+    table = Table(title=title, header_style="bold magenta")
+    table.add_column("id", style="cyan")
+    table.add_column("tri_count", style="blue")
+    table.add_column("di_count", style="blue")
+    table.add_column("adduct", style="green")
+    table.add_column("charge", style="blue")
+    table.add_column("calculated_mz", style="blue")
+    table.add_column("spectrum_mz", style="blue")
+    table.add_column("separation_mz", style="blue")
+    table.add_column("intensity", style="blue")
+    table.add_column("topology", style="green")
+
     topologies = {
         assignment.mass_spectrum_peak_id: assignment.topology
-        for assignment in cagey.ms.get_topologies(rows)
+        for assignment in assignments
     }
     for row in rows:
         table.add_row(
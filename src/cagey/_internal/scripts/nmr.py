@@ -12,10 +12,14 @@ def main(
     title_file: Annotated[
         Path, typer.Argument(help="Path to an NMR title file.")
     ],
+    pthres: float = 1e4,
+    reference_ppm: float = 7.28,
 ) -> None:
     """Extract NMR peaks."""
     console = Console()
-    spectrum = cagey.nmr.get_spectrum(title_file.parent)
+    spectrum = cagey.nmr.get_spectrum(
+        title_file.parent, pthres=pthres, reference_ppm=reference_ppm
+    )
 
     aldehyde_table = Table(title="Aldehyde Peaks", header_style="bold magenta")
     aldehyde_table.add_column("id", style="cyan")
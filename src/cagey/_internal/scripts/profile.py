@@ -0,0 +1,250 @@
+import inspect
+import json
+import sqlite3
+import statistics
+from collections.abc import Callable
+from enum import StrEnum
+from pathlib import Path
+from typing import Annotated, Any, TypeGuard
+
+import polars as pl
+import typer
+from rich.console import Console
+from rich.table import Table
+
+import cagey
+from cagey import ReactionKey
+
+app = typer.Typer(
+    help="Find the hot spots of an analysis.",
+    no_args_is_help=True,
+    rich_markup_mode="rich",
+)
+
+
+class Profiler(StrEnum):
+    DETERMINISTIC = "deterministic"
+    SAMPLING = "sampling"
+
+
+ProfilerOption = Annotated[
+    Profiler,
+    typer.Option(
+        help="Profile every function call with cProfile, or sample the "
+        "call stack, which adds less overhead to small, often called "
+        "functions."
+    ),
+]
+Repeat = Annotated[
+    int, typer.Option(help="Number of times to run the analysis.")
+]
+Warmup = Annotated[
+    int,
+    typer.Option(help="Number of times to run the analysis before profiling."),
+]
+Top = Annotated[int, typer.Option(help="Number of hot spots to show.")]
+Output = Annotated[
+    Path | None,
+    typer.Option(
+        help="Save the profile to this file, as pstats for the "
+        "deterministic profiler, or as collapsed stacks for flame graphs "
+        "for the sampling profiler."
+    ),
+]
+
+
+@app.command(no_args_is_help=True, name="ms-csv")
+def ms_csv(  # noqa: PLR0913
+    database: Annotated[
+        Path,
+        typer.Argument(help="Database file holding reactions and precursors."),
+    ],
+    csv: Annotated[Path, typer.Argument(help="Path to csv file.")],
+    profiler: ProfilerOption = Profiler.DETERMINISTIC,
+    repeat: Repeat = 5,
+    warmup: Warmup = 1,
+    top: Top = 20,
+    output: Output = None,
+) -> None:
+    """Profile finding the peaks of a mass spectrum csv file."""
+    connection = sqlite3.connect(database)
+    ((_, precursors),) = cagey.queries.reaction_precursors(
+        connection, [ReactionKey.from_ms_path(csv)]
+    )
+    _profile(
+        lambda: list(
+            cagey.ms.get_peaks(
+                csv, precursors.di_smiles, precursors.tri_smiles
+            )
+        ),
+        profiler=profiler,
+        repeat=repeat,
+        warmup=warmup,
+        top=top,
+        output=output,
+    )
+
+
+@app.command(no_args_is_help=True)
+def nmr(  # noqa: PLR0913
+    title_file: Annotated[
+        Path, typer.Argument(help="Path to an NMR title file.")
+    ],
+    profiler: ProfilerOption = Profiler.DETERMINISTIC,
+    repeat: Repeat = 5,
+    warmup: Warmup = 1,
+    top: Top = 20,
+    output: Output = None,
+) -> None:
+    """Profile reading an NMR spectrum and picking its peaks."""
+    _profile(
+        lambda: cagey.nmr.get_spectrum(title_file.parent),
+        profiler=profiler,
+        repeat=repeat,
+        warmup=warmup,
+        top=top,
+        output=output,
+    )
+
+
+@app.command(no_args_is_help=True)
+def turbidity(  # noqa: PLR0913
+    data_file: Annotated[
+        Path, typer.Argument(help="Path to a turbidity_data.json file.")
+    ],
+    profiler: ProfilerOption = Profiler.DETERMINISTIC,
+    repeat: Repeat = 5,
+    warmup: Warmup = 1,
+    top: Top = 20,
+    output: Output = None,
+) -> None:
+    """Profile getting the turbid state of a turbidity measurement."""
+    with data_file.open() as file:
+        data = json.load(file)
+    _profile(
+        lambda: cagey.turbidity.get_turbid_state(
+            data["turbidity_data"], data["turbidity_dissolved_reference"]
+        ),
+        profiler=profiler,
+        repeat=repeat,
+        warmup=warmup,
+        top=top,
+        output=output,
+    )
+
+
+@app.command(no_args_is_help=True)
+def query(  # noqa: PLR0913
+    database: Annotated[Path, typer.Argument(help="Database file to query.")],
+    name: Annotated[
+        str,
+        typer.Argument(
+            help="Name of a query in cagey.queries which takes only a "
+            "connection, such as reaction_summaries_df."
+        ),
+    ],
+    profiler: ProfilerOption = Profiler.DETERMINISTIC,
+    repeat: Repeat = 5,
+    warmup: Warmup = 1,
+    top: Top = 20,
+    output: Output = None,
+) -> None:
+    """Profile a database query."""
+    function = getattr(cagey.queries, name, None)
+    if not _takes_only_connection(function):
+        names = ", ".join(
+            query_name
+            for query_name in cagey.queries.__all__
+            if _takes_only_connection(getattr(cagey.queries, query_name))
+        )
+        msg = (
+            f"{name!r} is not a query taking a connection, use one of: {names}"
+        )
+        raise typer.BadParameter(msg)
+    connection = sqlite3.connect(database)
+    _profile(
+        lambda: function(connection),
+        profiler=profiler,
+        repeat=repeat,
+        warmup=warmup,
+        top=top,
+        output=output,
+    )
+
+
+def _takes_only_connection(
+    function: Any,
+) -> TypeGuard[Callable[[sqlite3.Connection], Any]]:
+    if not inspect.isfunction(function):
+        return False
+    parameters = [
+        parameter
+        for parameter in inspect.signature(function).parameters.values()
+        if parameter.default is inspect.Parameter.empty
+    ]
+    return [parameter.name for parameter in parameters] == ["connection"]
+
+
+def _profile(  # noqa: PLR0913
+    function: Callable[[], Any],
+    *,
+    profiler: Profiler,
+    repeat: int,
+    warmup: int,
+    top: int,
+    output: Path | None,
+) -> None:
+    console = Console()
+    with console.status(f"[bold green]Profiling {repeat} runs..."):
+        match profiler:
+            case Profiler.DETERMINISTIC:
+                profile: (
+                    cagey.profiling.DeterministicProfile
+                    | cagey.profiling.SamplingProfile
+                ) = cagey.profiling.profile_deterministic(
+                    function, repeat=repeat, warmup=warmup
+                )
+            case Profiler.SAMPLING:
+                profile = cagey.profiling.profile_sampling(
+                    function, repeat=repeat, warmup=warmup
+                )
+    console.print(_hotspots_table(profile.hotspots().head(top)))
+    console.print(
+        f"{len(profile.seconds)} runs, "
+        f"median {statistics.median(profile.seconds) * 1e3:.2f} ms, "
+        f"min {min(profile.seconds) * 1e3:.2f} ms, "
+        f"max {max(profile.seconds) * 1e3:.2f} ms, "
+        f"with the {profiler} profiler."
+    )
+    if output is not None:
+        profile.write(output)
+        console.print(f"Profile written to [yellow2]{output}[/].")
+
+
+def _hotspots_table(hotspots: pl.DataFrame) -> Table:
+    table = Table(title="Hot spots", header_style="bold magenta")
+    table.add_column("Function", style="cyan", overflow="fold")
+    table.add_column("Location", overflow="fold")
+    table.add_column("Calls", justify="right")
+    table.add_column("Self (s)", justify="right")
+    table.add_column("Total (s)", justify="right")
+    for row in hotspots.iter_rows(named=True):
+        table.add_row(
+            row["function"],
+            _location(row["file"], row["line"]),
+            "-" if row["calls"] is None else str(row["calls"]),
+            f"{row['self_seconds']:.4f}",
+            f"{row['total_seconds']:.4f}",
+        )
+    return table
+
+
+def _location(file: str, line: int) -> str:
+    # Built-in functions have no file.
+    if file == "~":
+        return ""
+    path = Path(file)
+    parts = path.parts
+    if "site-packages" in parts:
+        path = Path(*parts[parts.index("site-packages") + 1 :])
+    return f"{path}:{line}"
@@ -0,0 +1,27 @@
+import sqlite3
+from pathlib import Path
+from typing import Annotated
+
+import typer
+from rich.console import Console
+
+import cagey
+
+
+def main(
+    database: Annotated[
+        Path, typer.Argument(help="Database file to rebuild.")
+    ],
+) -> None:
+    """Rebuild the derived tables of the database.
+
+    Derived tables, such as the reaction summaries, are kept up to \
+date when data is inserted. Use this command on databases created by \
+older versions of [bright_magenta]cagey[/].
+    """
+    console = Console()
+    connection = sqlite3.connect(database)
+    with console.status("[bold green]Rebuilding derived tables..."):
+        cagey.queries.create_tables(connection)
+        cagey.queries.rebuild_reaction_summaries(connection)
+    console.print("[bold green]:heavy_check_mark: Rebuilt derived tables.")
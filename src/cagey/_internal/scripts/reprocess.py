@@ -0,0 +1,337 @@
+import sqlite3
+from pathlib import Path
+from typing import Annotated, Any
+
+import polars as pl
+import typer
+from rich.console import Console
+from rich.table import Table
+
+import cagey
+from cagey import (
+    MassSpectrumParameters,
+    NmrParameters,
+    ReactionKey,
+    TurbidityParameters,
+)
+from cagey._internal.types import AnalysisParameters
+from cagey.workers import WorkerPool
+
+app = typer.Typer(
+    help="Analyse stored data again with new parameters.",
+    no_args_is_help=True,
+    rich_markup_mode="rich",
+)
+
+Database = Annotated[
+    Path, typer.Argument(help="Database file holding the stored data.")
+]
+Experiments = Annotated[
+    list[str] | None, typer.Option(help="Only reprocess these experiments.")
+]
+Plates = Annotated[
+    list[int] | None, typer.Option(help="Only reprocess these plates.")
+]
+FormulationNumbers = Annotated[
+    list[int] | None,
+    typer.Option(help="Only reprocess these formulation numbers."),
+]
+DiNames = Annotated[
+    list[str] | None,
+    typer.Option(
+        help="Only reprocess reactions of these di-topic precursors."
+    ),
+]
+TriNames = Annotated[
+    list[str] | None,
+    typer.Option(
+        help="Only reprocess reactions of these tri-topic precursors."
+    ),
+]
+Processes = Annotated[
+    int | None,
+    typer.Option(
+        help="Number of processes. Defaults to the number of CPUs.",
+    ),
+]
+
+
+@app.command(no_args_is_help=True)
+def ms(  # noqa: PLR0913
+    database: Database,
+    experiment: Experiments = None,
+    plate: Plates = None,
+    formulation_number: FormulationNumbers = None,
+    di_name: DiNames = None,
+    tri_name: TriNames = None,
+    processes: Processes = None,
+    calculated_peak_tolerance: float = 0.1,
+    separation_peak_tolerance: float = 0.1,
+    max_ppm_error: float = 10,
+    max_separation: float = 0.02,
+    min_peak_height: float = 1e4,
+    max_between_peak_height: float = 0.7,
+) -> None:
+    """Find mass spectrum peaks again from the stored features.
+
+    Only mass spectra added by this version of [bright_magenta]cagey[/] \
+have stored features.
+    """
+    _reprocess(
+        database,
+        MassSpectrumParameters(
+            calculated_peak_tolerance=calculated_peak_tolerance,
+            separation_peak_tolerance=separation_peak_tolerance,
+            max_ppm_error=max_ppm_error,
+            max_separation=max_separation,
+            min_peak_height=min_peak_height,
+            max_between_peak_height=max_between_peak_height,
+        ),
+        processes,
+        experiment=experiment,
+        plate=plate,
+        formulation_number=formulation_number,
+        di_name=di_name,
+        tri_name=tri_name,
+    )
+
+
+@app.command(no_args_is_help=True)
+def nmr(  # noqa: PLR0913
+    database: Database,
+    experiment: Experiments = None,
+    plate: Plates = None,
+    formulation_number: FormulationNumbers = None,
+    di_name: DiNames = None,
+    tri_name: TriNames = None,
+    processes: Processes = None,
+    pthres: float = 1e4,
+    reference_ppm: float = 7.28,
+    reference_atol: float = 0.05,
+    solvent_ppm: float = 7.26,
+) -> None:
+    """Pick NMR peaks again from the stored processed data.
+
+    Only NMR spectra added with [green]--store-nmr-arrays[/] have \
+stored processed data.
+    """
+    _reprocess(
+        database,
+        NmrParameters(
+            pthres=pthres,
+            reference_ppm=reference_ppm,
+            reference_atol=reference_atol,
+            solvent_ppm=solvent_ppm,
+        ),
+        processes,
+        experiment=experiment,
+        plate=plate,
+        formulation_number=formulation_number,
+        di_name=di_name,
+        tri_name=tri_name,
+    )
+
+
+@app.command(no_args_is_help=True)
+def turbidity(  # noqa: PLR0913
+    database: Database,
+    experiment: Experiments = None,
+    plate: Plates = None,
+    formulation_number: FormulationNumbers = None,
+    di_name: DiNames = None,
+    tri_name: TriNames = None,
+    processes: Processes = None,
+    window_seconds: float = 60,
+    num_std: float = 3,
+    min_stable_seconds: float = 60,
+    dissolved_margin: float = 1,
+) -> None:
+    """Find turbidity states again from the stored measurements."""
+    _reprocess(
+        database,
+        TurbidityParameters(
+            window_seconds=window_seconds,
+            num_std=num_std,
+            min_stable_seconds=min_stable_seconds,
+            dissolved_margin=dissolved_margin,
+        ),
+        processes,
+        experiment=experiment,
+        plate=plate,
+        formulation_number=formulation_number,
+        di_name=di_name,
+        tri_name=tri_name,
+    )
+
+
+@app.command(no_args_is_help=True)
+def sets(database: Database) -> None:
+    """List the parameter sets used to reprocess the database."""
+    console = Console()
+    connection = sqlite3.connect(database)
+    cagey.queries.create_tables(connection)
+    table = Table(title="Parameter Sets", header_style="bold magenta")
+    table.add_column("id", style="cyan")
+    table.add_column("kind", style="green")
+    table.add_column("reactions", style="blue")
+    table.add_column("parameters")
+    for id_, kind, parameters, reactions in cagey.queries.parameter_sets_df(
+        connection
+    ).iter_rows():
+        table.add_row(str(id_), kind, str(reactions), parameters)
+    console.print(table)
+
+
+@app.command(no_args_is_help=True)
+def compare(
+    database: Database,
+    first: Annotated[int, typer.Argument(help="Id of a parameter set.")],
+    second: Annotated[
+        int, typer.Argument(help="Id of a parameter set of the same kind.")
+    ],
+) -> None:
+    """Show the reactions with different results in two parameter sets.
+
+    Only reactions reprocessed with both parameter sets are compared. \
+Mass spectra are compared by the topologies found, NMR spectra by the \
+number of aldehyde and imine peaks and turbidity by the state.
+    """
+    console = Console()
+    connection = sqlite3.connect(database)
+    cagey.queries.create_tables(connection)
+    try:
+        first_parameters = cagey.queries.parameter_set(connection, first)
+        second_parameters = cagey.queries.parameter_set(connection, second)
+    except KeyError as error:
+        raise typer.BadParameter(str(error)) from None
+    if type(first_parameters) is not type(second_parameters):
+        msg = "parameter sets are of different kinds"
+        raise typer.BadParameter(msg)
+
+    key = ["experiment", "plate", "formulation_number"]
+    first_results = _results(connection, first, first_parameters)
+    second_results = _results(connection, second, second_parameters)
+    reactions = (
+        cagey.queries.reprocessed_reactions_df(connection, first)
+        .join(
+            cagey.queries.reprocessed_reactions_df(connection, second),
+            on=key,
+        )
+        .select(key)
+    )
+    different = (
+        reactions.join(first_results, on=key, how="left")
+        .join(second_results, on=key, how="left", suffix="_second")
+        .fill_null("-")
+        .filter(pl.col("result") != pl.col("result_second"))
+    )
+
+    table = Table(
+        title=f"Parameter Set {first} vs {second}",
+        header_style="bold magenta",
+    )
+    table.add_column("experiment", style="green")
+    table.add_column("plate", style="green")
+    table.add_column("formulation_number", style="green")
+    table.add_column(str(first), style="blue")
+    table.add_column(str(second), style="blue")
+    for row in different.iter_rows():
+        table.add_row(*map(str, row))
+    console.print(table)
+    console.print(f"{len(different)} of {len(reactions)} reactions differ.")
+
+
+def _reprocess(  # noqa: PLR0913
+    database: Path,
+    parameters: AnalysisParameters,
+    processes: int | None,
+    *,
+    experiment: list[str] | None,
+    plate: list[int] | None,
+    formulation_number: list[int] | None,
+    di_name: list[str] | None,
+    tri_name: list[str] | None,
+) -> None:
+    console = Console()
+    with WorkerPool(processes) as workers:
+        connection = sqlite3.connect(database)
+        cagey.queries.create_tables(connection)
+        filters: dict[str, Any] = {
+            "experiment": experiment,
+            "plate": plate,
+            "formulation_number": formulation_number,
+            "di_name": di_name,
+            "tri_name": tri_name,
+        }
+        reactions = (
+            [
+                ReactionKey(*row)
+                for row in cagey.queries.reactions_lazy(connection)
+                .filter(**filters)
+                .select("experiment", "plate", "formulation_number")
+                .collect()
+                .iter_rows()
+            ]
+            if any(values for values in filters.values())
+            else None
+        )
+        if reactions == []:
+            console.print("No reactions match the filters.")
+            return
+        with console.status("[bold green]Reprocessing..."):
+            parameter_set_id = cagey.reprocessing.reprocess(
+                connection, parameters, reactions, pool=workers.pool
+            )
+    num_reactions = (
+        cagey.queries.parameter_sets_df(connection)
+        .filter(pl.col("id") == parameter_set_id)
+        .item(0, "reactions")
+    )
+    console.print(
+        "[bold green]:heavy_check_mark: Reprocessed with parameter set "
+        f"{parameter_set_id}, which now holds results for {num_reactions} "
+        "reactions."
+    )
+
+
+def _results(
+    connection: sqlite3.Connection,
+    parameter_set_id: int,
+    parameters: AnalysisParameters,
+) -> pl.DataFrame:
+    key = ["experiment", "plate", "formulation_number"]
+    match parameters:
+        case MassSpectrumParameters():
+            results = (
+                cagey.queries.reprocessed_mass_spectrum_peaks_df(
+                    connection, parameter_set_id
+                )
+                .group_by(key)
+                .agg(
+                    result=pl.col("topology")
+                    .drop_nulls()
+                    .unique()
+                    .sort()
+                    .str.concat(", ")
+                )
+                .filter(pl.col("result") != "")
+            )
+        case NmrParameters():
+            results = (
+                cagey.queries.reprocessed_nmr_peaks_df(
+                    connection, parameter_set_id
+                )
+                .group_by(key)
+                .agg(
+                    result=pl.format(
+                        "{} aldehyde, {} imine",
+                        (pl.col("kind") == "aldehyde").sum(),
+                        (pl.col("kind") == "imine").sum(),
+                    )
+                )
+            )
+        case TurbidityParameters():
+            results = cagey.queries.reprocessed_turbidities_df(
+                connection, parameter_set_id
+            ).select(*key, result="state")
+    return results
@@ -0,0 +1,93 @@
+import sqlite3
+from pathlib import Path
+from typing import Annotated
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+import cagey
+
+
+def main(
+    database: Annotated[
+        Path, typer.Argument(help="Database file to summarize.")
+    ],
+    every: Annotated[
+        str,
+        typer.Option(
+            help="Length of each period of the throughput trend, such as "
+            "1d, 1w or 1mo."
+        ),
+    ] = "1d",
+    last: Annotated[
+        int, typer.Option(help="Number of recent runs to show.")
+    ] = 10,
+) -> None:
+    """Summarize how fast data has been added to the database.
+
+    Every run of [bright_magenta]cagey[/] [green]new[/] and \
+[bright_magenta]cagey[/] [green]insert[/] records the time spent in each \
+stage and on each file it adds.
+    """
+    console = Console()
+    connection = sqlite3.connect(database)
+    cagey.queries.create_tables(connection)
+
+    throughput = Table(title="Throughput", header_style="bold magenta")
+    throughput.add_column("Period")
+    throughput.add_column("Runs", justify="right")
+    throughput.add_column("Files", justify="right")
+    throughput.add_column("Failures", justify="right")
+    throughput.add_column("Files/s", justify="right")
+    throughput.add_column("MB/s", justify="right")
+    throughput.add_column("Utilization", justify="right")
+    for row in cagey.queries.ingest_throughput_df(connection, every).iter_rows(
+        named=True
+    ):
+        throughput.add_row(
+            f"{row['started_at']:%Y-%m-%d %H:%M}",
+            str(row["runs"]),
+            str(row["files"]),
+            str(row["failures"]),
+            f"{row['files_per_second']:.2f}",
+            f"{row['megabytes_per_second']:.2f}",
+            _percent(row["worker_utilization"]),
+        )
+    console.print(throughput)
+
+    runs = Table(title="Recent runs", header_style="bold magenta")
+    runs.add_column("Id", justify="right")
+    runs.add_column("Started")
+    runs.add_column("Command")
+    runs.add_column("Version")
+    runs.add_column("Files", justify="right")
+    runs.add_column("Failures", justify="right")
+    runs.add_column("Wall (s)", justify="right")
+    runs.add_column("MS (s)", justify="right")
+    runs.add_column("NMR (s)", justify="right")
+    runs.add_column("Turbidity (s)", justify="right")
+    runs.add_column("Utilization", justify="right")
+    for row in (
+        cagey.queries.ingest_runs_df(connection)
+        .tail(last)
+        .iter_rows(named=True)
+    ):
+        runs.add_row(
+            str(row["id"]),
+            f"{row['started_at']:%Y-%m-%d %H:%M}",
+            row["command"],
+            row["cagey_version"],
+            str(row["files"]),
+            str(row["failures"]),
+            f"{row['wall_seconds']:.1f}",
+            f"{row['mass_spectra_seconds']:.1f}",
+            f"{row['nmr_seconds']:.1f}",
+            f"{row['turbidity_seconds']:.1f}",
+            _percent(row["worker_utilization"]),
+        )
+    console.print(runs)
+
+
+def _percent(fraction: float | None) -> str:
+    return "-" if fraction is None else f"{fraction:.0%}"
@@ -0,0 +1,80 @@
+from pathlib import Path
+
+from rich.console import Console
+from rich.table import Table
+
+import cagey
+
+
+def write_trace(
+    console: Console, path: Path, spans: list[cagey.tracing.Span]
+) -> None:
+    """Write a Chrome trace and print the time spent in each stage."""
+    cagey.tracing.write_chrome_trace(path, spans)
+    table = Table(title="Stages", header_style="bold magenta")
+    table.add_column("Stage", overflow="fold")
+    table.add_column("Calls", justify="right")
+    table.add_column("Total (s)", justify="right")
+    table.add_column("Mean (ms)", justify="right")
+    table.add_column("Max (ms)", justify="right")
+    for row in cagey.tracing.summarize(spans).iter_rows(named=True):
+        table.add_row(
+            row["name"],
+            str(row["calls"]),
+            f"{row['total_seconds']:.3f}",
+            f"{row['mean_seconds'] * 1e3:.2f}",
+            f"{row['max_seconds'] * 1e3:.2f}",
+        )
+    console.print(table)
+    console.print(f"Trace written to [yellow2]{path}[/].")
+
+
+def write_memory_report(
+    console: Console,
+    path: Path,
+    profile: cagey.memory.MemoryProfile,
+    spans: list[cagey.tracing.Span],
+    *,
+    num_files: int = 10,
+) -> None:
+    """Write a memory report and print the peak memory of each stage."""
+    cagey.memory.write_report(path, profile, spans)
+    stages = Table(title="Memory per stage", header_style="bold magenta")
+    stages.add_column("Stage")
+    stages.add_column("Time (s)", justify="right")
+    stages.add_column("Peak RSS (MB)", justify="right")
+    stages.add_column("Python peak (MB)", justify="right")
+    stages.add_column("Python held (MB)", justify="right")
+    for row in cagey.memory.summarize_stages(profile).iter_rows(named=True):
+        stages.add_row(
+            row["name"],
+            f"{row['seconds']:.1f}",
+            _megabytes(row["peak_rss_bytes"]),
+            _megabytes(row["python_peak_bytes"]),
+            _megabytes(row["python_net_bytes"]),
+        )
+    console.print(stages)
+    files = Table(
+        title="Largest files by peak RSS", header_style="bold magenta"
+    )
+    files.add_column("Stage")
+    files.add_column("File", overflow="fold")
+    files.add_column("Time (s)", justify="right")
+    files.add_column("Peak RSS (MB)", justify="right")
+    for row in (
+        cagey.memory.summarize_files(profile, spans)
+        .head(num_files)
+        .iter_rows(named=True)
+    ):
+        files.add_row(
+            row["stage"],
+            row["path"],
+            f"{row['seconds']:.2f}",
+            _megabytes(row["peak_rss_bytes"]),
+        )
+    console.print(files)
+    console.print(f"Memory report written to [yellow2]{path}[/].")
+
+
+def _megabytes(num_bytes: int | None) -> str:
+    return "-" if num_bytes is None else f"{num_bytes / 1e6:.1f}"
@@ -0,0 +1,292 @@
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+from sqlite3 import Connection
+
+import numpy as np
+import polars as pl
+
+from cagey._internal.ms import get_topologies, read_features
+from cagey._internal.queries import mass_spectrum_features, reaction_precursors
+from cagey._internal.sweep import (
+    Candidates,
+    SortedFeatures,
+    get_candidates,
+    keep_peaks,
+)
+from cagey._internal.types import (
+    MassSpectrumParameters,
+    MassSpectrumPeak,
+    MassSpectrumTopologyAssignment,
+    Precursors,
+    ReactionKey,
+    Row,
+)
+
+
+@dataclass(slots=True)
+class _Spectrum:
+    features: pl.DataFrame
+    precursors: Precursors
+    candidates: Candidates
+    sorted_features: tuple[float, SortedFeatures] | None = None
+    """The last minimum peak height and the features above it."""
+
+
+class SpectrumSession:
+    """Mass spectra held in memory, to find their peaks many times.
+
+    Finding the peaks of a mass spectrum with :func:`get_peaks` reads
+    its csv file and works out the formulas of its precursors every
+    time. A session does both once when a spectrum is added, and keeps
+    the features sorted by m/z, so finding the peaks again with new
+    parameters takes milliseconds. This makes it suited to tuning the
+    parameters interactively.
+
+    The peaks found are the same as those of
+    :func:`get_peaks_from_features`, in the same order.
+
+    Examples:
+        .. code-block:: python
+
+            import sqlite3
+            import cagey
+
+            connection = sqlite3.connect("path/to/cagey.db")
+            session = cagey.ms.SpectrumSession.from_csv(
+                connection, ["path/to/AB-02-005_01_01.csv"]
+            )
+            reaction_key = cagey.ReactionKey("AB-02-005", 1, 1)
+            for max_ppm_error in [5, 10, 20]:
+                peaks = session.peaks(
+                    reaction_key,
+                    cagey.MassSpectrumParameters(max_ppm_error=max_ppm_error),
+                )
+                print(max_ppm_error, len(peaks))
+    """
+
+    def __init__(self) -> None:
+        self._spectra: dict[ReactionKey, _Spectrum] = {}
+
+    @staticmethod
+    def from_csv(
+        connection: Connection, paths: Iterable[Path | str]
+    ) -> "SpectrumSession":
+        """Start a session with mass spectra from csv files.
+
+        Parameters:
+            connection:
+                A SQLite connection to the database holding the
+                precursors of the reactions.
+            paths:
+                The paths to the mass spectrum csv files made by MZmine,
+                named after their reactions.
+
+        Returns:
+            The session.
+        """
+        features = {
+            ReactionKey.from_ms_path(Path(path)): read_features(Path(path))
+            for path in paths
+        }
+        return SpectrumSession._from_features(connection, features)
+
+    @staticmethod
+    def from_database(
+        connection: Connection,
+        reactions: Sequence[ReactionKey] | None = None,
+    ) -> "SpectrumSession":
+        """Start a session with the stored features of mass spectra.
+
+        Only mass spectra inserted with `features` by
+        :func:`cagey.queries.insert_mass_spectrum` have stored features.
+
+        Parameters:
+            connection: A SQLite connection.
+            reactions:
+                The reactions. If ``None``, the mass spectra of every
+                reaction are added.
+
+        Returns:
+            The session.
+        """
+        return SpectrumSession._from_features(
+            connection, dict(mass_spectrum_features(connection, reactions))
+        )
+
+    @staticmethod
+    def _from_features(
+        connection: Connection,
+        features: dict[ReactionKey, pl.DataFrame],
+    ) -> "SpectrumSession":
+        session = SpectrumSession()
+        if features:
+            for reaction_key, precursors in reaction_precursors(
+                connection, list(features)
+            ):
+                session.add(reaction_key, features[reaction_key], precursors)
+        return session
+
+    def __len__(self) -> int:
+        return len(self._spectra)
+
+    @property
+    def reactions(self) -> list[ReactionKey]:
+        """The reactions of the mass spectra, in the order they were added."""
+        return list(self._spectra)
+
+    def add(
+        self,
+        reaction_key: ReactionKey,
+        features: pl.DataFrame,
+        precursors: Precursors,
+    ) -> None:
+        """Add a mass spectrum to the session.
+
+        Any mass spectrum of the reaction already in the session is
+        replaced.
+
+        Parameters:
+            reaction_key: The reaction.
+            features: The ``mz`` and ``height`` of each feature.
+            precursors: The precursors of the reaction.
+        """
+        self._spectra[reaction_key] = _Spectrum(
+            features=features.select(
+                pl.col("mz").cast(pl.Float64),
+                pl.col("height").cast(pl.Float64),
+            ),
+            precursors=precursors,
+            candidates=get_candidates(
+                precursors.di_smiles, precursors.tri_smiles
+            ),
+        )
+
+    def features(self, reaction_key: ReactionKey) -> pl.DataFrame:
+        """Get the features of a mass spectrum.
+
+        Parameters:
+            reaction_key: The reaction.
+
+        Returns:
+            The ``mz`` and ``height`` of each feature.
+
+        Raises:
+            KeyError: If the reaction is not in the session.
+        """
+        return self._spectra[reaction_key].features
+
+    def precursors(self, reaction_key: ReactionKey) -> Precursors:
+        """Get the precursors of a reaction.
+
+        Parameters:
+            reaction_key: The reaction.
+
+        Returns:
+            The precursors.
+
+        Raises:
+            KeyError: If the reaction is not in the session.
+        """
+        return self._spectra[reaction_key].precursors
+
+    def peaks(
+        self,
+        reaction_key: ReactionKey,
+        parameters: MassSpectrumParameters | None = None,
+    ) -> list[MassSpectrumPeak]:
+        """Find the peaks of a mass spectrum.
+
+        Parameters:
+            reaction_key: The reaction.
+            parameters:
+                The parameters to find peaks with. If ``None``, the
+                default parameters are used.
+
+        Returns:
+            The peaks.
+
+        Raises:
+            KeyError: If the reaction is not in the session.
+        """
+        if parameters is None:
+            parameters = MassSpectrumParameters()
+        spectrum = self._spectra[reaction_key]
+        candidates = spectrum.candidates
+        sorted_features = _sorted_features(
+            spectrum, parameters.min_peak_height
+        )
+        peaks = sorted_features.find_peaks(
+            candidates,
+            parameters.calculated_peak_tolerance,
+            parameters.separation_peak_tolerance,
+        )
+        (found,) = np.nonzero(
+            keep_peaks(
+                peaks,
+                candidates,
+                parameters.max_ppm_error,
+                parameters.max_separation,
+                parameters.max_between_peak_height,
+            )
+        )
+        return [
+            MassSpectrumPeak(
+                di_count=int(candidates.di_count[i]),
+                tri_count=int(candidates.tri_count[i]),
+                adduct=candidates.adduct[i],
+                charge=int(candidates.charge[i]),
+                calculated_mz=float(candidates.cage_mz[i]),
+                spectrum_mz=float(peaks.spectrum_mz[i]),
+                separation_mz=float(peaks.separation_mz[i]),
+                intensity=float(peaks.intensity[i]),
+            )
+            for i in found
+        ]
+
+    def topologies(
+        self,
+        reaction_key: ReactionKey,
+        parameters: MassSpectrumParameters | None = None,
+    ) -> tuple[
+        list[Row[MassSpectrumPeak]], list[MassSpectrumTopologyAssignment]
+    ]:
+        """Find the peaks of a mass spectrum and assign their topologies.
+
+        Parameters:
+            reaction_key: The reaction.
+            parameters:
+                The parameters to find peaks with. If ``None``, the
+                default parameters are used.
+
+        Returns:
+            The peaks, with their index as their id, and the topologies
+            assigned to them by :func:`get_topologies`.
+
+        Raises:
+            KeyError: If the reaction is not in the session.
+        """
+        rows = [
+            Row(id=id_, item=peak)
+            for id_, peak in enumerate(self.peaks(reaction_key, parameters))
+        ]
+        return rows, list(get_topologies(rows))
+
+
+def _sorted_features(
+    spectrum: _Spectrum, min_peak_height: float
+) -> SortedFeatures:
+    # Only the features for the last minimum peak height are kept, as
+    # it changes rarely while tuning.
+    if (
+        spectrum.sorted_features is None
+        or spectrum.sorted_features[0] != min_peak_height
+    ):
+        height = spectrum.features.get_column("height").to_numpy()
+        mz = spectrum.features.get_column("mz").to_numpy()
+        above = height > min_peak_height
+        spectrum.sorted_features = (
+            min_peak_height,
+            SortedFeatures(mz[above], height[above]),
+        )
+    return spectrum.sorted_features[1]
@@ -0,0 +1,399 @@
+import json
+from pathlib import Path
+from sqlite3 import Connection
+
+import numpy as np
+import numpy.typing as npt
+import polars as pl
+
+from cagey._internal.types import ReactionKey, SimilarReaction
+
+
+def spectrum_vectors(
+    connection: Connection,
+    *,
+    min_mz: float = 100.0,
+    max_mz: float = 4100.0,
+    num_bins: int = 512,
+) -> tuple[pl.DataFrame, npt.NDArray[np.float32]]:
+    """Bin the mass spectrum peaks of every reaction into vectors.
+
+    The peaks of each mass spectrum are binned by m/z into `num_bins`
+    equal bins between `min_mz` and `max_mz`, weighted by the square
+    root of their intensity. Each vector is scaled to unit length, so
+    that the dot product of two vectors is their cosine similarity.
+    Peaks outside of the m/z range are ignored.
+
+    Parameters:
+        connection: A SQLite connection.
+        min_mz: The lower edge of the first bin.
+        max_mz: The upper edge of the last bin.
+        num_bins: The length of the vectors.
+
+    Returns:
+        The reactions, with an ``experiment``, ``plate`` and
+        ``formulation_number`` column, and a matrix holding the vector
+        of each reaction in the same order. Reactions without mass
+        spectrum peaks are left out.
+
+    Raises:
+        ValueError: If the m/z range is empty or `num_bins` is not
+            positive.
+    """
+    if not min_mz < max_mz:
+        msg = f"min_mz must be less than max_mz: {min_mz} >= {max_mz}"
+        raise ValueError(msg)
+    if num_bins < 1:
+        msg = f"num_bins must be positive: {num_bins}"
+        raise ValueError(msg)
+    peaks = np.array(
+        connection.execute(
+            """
+            SELECT
+                mass_spectra.reaction_id,
+                mass_spectrum_peaks.spectrum_mz,
+                mass_spectrum_peaks.intensity
+            FROM
+                mass_spectrum_peaks
+            JOIN
+                mass_spectra
+                ON mass_spectrum_peaks.mass_spectrum_id = mass_spectra.id
+            """
+        ).fetchall(),
+        dtype=np.float64,
+    ).reshape(-1, 3)
+    reaction_ids = peaks[:, 0].astype(np.int64)
+    reactions = pl.DataFrame(
+        connection.execute(
+            """
+            SELECT
+                id, experiment, plate, formulation_number
+            FROM
+                reactions
+            ORDER BY
+                experiment, plate, formulation_number
+            """
+        ).fetchall(),
+        schema={
+            "id": pl.Int64,
+            "experiment": pl.Utf8,
+            "plate": pl.Int64,
+            "formulation_number": pl.Int64,
+        },
+        orient="row",
+    ).filter(pl.col("id").is_in(pl.Series(np.unique(reaction_ids))))
+
+    ids = reactions["id"].to_numpy()
+    order = np.argsort(ids)
+    rows = order[np.searchsorted(ids, reaction_ids, sorter=order)]
+    in_range = (min_mz <= peaks[:, 1]) & (peaks[:, 1] < max_mz)
+    bins = np.clip(
+        (peaks[in_range, 1] - min_mz) // ((max_mz - min_mz) / num_bins),
+        0,
+        num_bins - 1,
+    ).astype(np.int64)
+    vectors = np.zeros((len(reactions), num_bins), dtype=np.float32)
+    np.add.at(
+        vectors,
+        (rows[in_range], bins),
+        np.sqrt(np.clip(peaks[in_range, 2], 0, None)),
+    )
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return reactions.drop("id"), vectors
+
+
+class SpectrumIndex:
+    """A nearest neighbour index of binned mass spectra.
+
+    The index is a directory holding the vectors made by
+    :func:`spectrum_vectors` as a NumPy file, which is memory-mapped
+    when the index is opened, so that only the pages a search touches
+    are read from disk. By default every vector is compared with the
+    query, which takes a few milliseconds for ``10**5`` spectra.
+
+    For larger databases, build the index with `num_lists` to partition
+    the vectors around that many centroids, and search with
+    `num_probes` to compare the query only with the vectors of the
+    closest lists. The search is then approximate, and can miss
+    neighbours which were assigned to a list which was not probed.
+
+    The index is not updated when spectra are added to the database,
+    and has to be built again to include them.
+
+    Examples:
+        .. code-block:: python
+
+            import sqlite3
+            import cagey
+
+            connection = sqlite3.connect("path/to/cagey.db")
+            index = cagey.queries.SpectrumIndex.build(
+                connection, "path/to/index"
+            )
+            for similar in index.similar_reactions(
+                cagey.ReactionKey("AB-02-005", 1, 1), k=5
+            ):
+                print(similar.reaction_key, similar.similarity)
+
+    Parameters:
+        path: The directory of the index.
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        """The directory of the index."""
+        parameters = json.loads((self.path / "index.json").read_text())
+        self.min_mz: float = parameters["min_mz"]
+        """The lower edge of the first bin."""
+        self.max_mz: float = parameters["max_mz"]
+        """The upper edge of the last bin."""
+        self.num_bins: int = parameters["num_bins"]
+        """The length of the vectors."""
+        self.vectors: npt.NDArray[np.float32] = np.load(
+            self.path / "vectors.npy", mmap_mode="r"
+        )
+        """The vector of each reaction."""
+        self.reactions = pl.read_ipc(
+            self.path / "reactions.arrow", memory_map=False
+        )
+        """The reactions, in the order of :attr:`vectors`."""
+        self._centroids: npt.NDArray[np.float32] = np.load(
+            self.path / "centroids.npy"
+        )
+        self._offsets: npt.NDArray[np.int64] = np.load(
+            self.path / "offsets.npy"
+        )
+        self._rows: dict[ReactionKey, int] | None = None
+
+    @staticmethod
+    def build(  # noqa: PLR0913
+        connection: Connection,
+        path: Path | str,
+        *,
+        min_mz: float = 100.0,
+        max_mz: float = 4100.0,
+        num_bins: int = 512,
+        num_lists: int = 0,
+    ) -> "SpectrumIndex":
+        """Build an index of the mass spectra in a database.
+
+        Parameters:
+            connection: A SQLite connection.
+            path:
+                The directory to write the index to. Any index already
+                in it is replaced.
+            min_mz: The lower edge of the first bin.
+            max_mz: The upper edge of the last bin.
+            num_bins: The length of the vectors.
+            num_lists:
+                The number of lists to partition the vectors into, for
+                approximate searches. ``0`` builds an index which can
+                only be searched exactly.
+
+        Returns:
+            The index.
+        """
+        keys, vectors = spectrum_vectors(
+            connection, min_mz=min_mz, max_mz=max_mz, num_bins=num_bins
+        )
+        num_lists = min(num_lists, len(keys))
+        if num_lists > 0:
+            centroids, lists = _partition(vectors, num_lists)
+            order = np.argsort(lists, kind="stable")
+            vectors = vectors[order]
+            keys = keys[order]
+            offsets = np.searchsorted(lists[order], np.arange(num_lists + 1))
+        else:
+            centroids = np.zeros((0, num_bins), dtype=np.float32)
+            offsets = np.zeros(0, dtype=np.int64)
+
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        np.save(path / "vectors.npy", vectors)
+        np.save(path / "centroids.npy", centroids)
+        np.save(path / "offsets.npy", offsets.astype(np.int64))
+        keys.write_ipc(path / "reactions.arrow")
+        (path / "index.json").write_text(
+            json.dumps(
+                {"min_mz": min_mz, "max_mz": max_mz, "num_bins": num_bins}
+            )
+        )
+        return SpectrumIndex(path)
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def vector(self, reaction_key: ReactionKey) -> npt.NDArray[np.float32]:
+        """Get the vector of a reaction.
+
+        Parameters:
+            reaction_key: The reaction.
+
+        Returns:
+            The vector.
+
+        Raises:
+            KeyError: If the reaction is not in the index.
+        """
+        return np.asarray(self.vectors[self._row(reaction_key)])
+
+    def search(
+        self,
+        vector: npt.ArrayLike,
+        k: int = 10,
+        *,
+        num_probes: int | None = None,
+    ) -> list[SimilarReaction]:
+        """Find the reactions most similar to a vector.
+
+        Parameters:
+            vector:
+                A vector of length :attr:`num_bins`, such as one made by
+                :meth:`vector`. It does not have to be normalized.
+            k: The number of reactions to find.
+            num_probes:
+                The number of lists to search. If ``None``, or if the
+                index was built without lists, every vector is
+                searched.
+
+        Returns:
+            The most similar reactions, most similar first.
+
+        Raises:
+            ValueError: If the vector has the wrong length.
+        """
+        query = np.asarray(vector, dtype=np.float32)
+        if query.shape != (self.num_bins,):
+            msg = (
+                f"vector must have shape ({self.num_bins},), not {query.shape}"
+            )
+            raise ValueError(msg)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+        rows, similarities = self._search(query, k, num_probes)
+        return [
+            SimilarReaction(
+                reaction_key=ReactionKey(*self.reactions.row(int(row))),
+                similarity=float(similarity),
+            )
+            for row, similarity in zip(rows, similarities, strict=True)
+        ]
+
+    def similar_reactions(
+        self,
+        reaction_key: ReactionKey,
+        k: int = 10,
+        *,
+        num_probes: int | None = None,
+    ) -> list[SimilarReaction]:
+        """Find the reactions with mass spectra most similar to a reaction.
+
+        Parameters:
+            reaction_key: The reaction.
+            k: The number of reactions to find.
+            num_probes:
+                The number of lists to search. If ``None``, or if the
+                index was built without lists, every vector is
+                searched.
+
+        Returns:
+            The most similar reactions, most similar first. The reaction
+            itself is not included.
+
+        Raises:
+            KeyError: If the reaction is not in the index.
+        """
+        return [
+            similar
+            for similar in self.search(
+                self.vector(reaction_key), k + 1, num_probes=num_probes
+            )
+            if similar.reaction_key != reaction_key
+        ][:k]
+
+    def _row(self, reaction_key: ReactionKey) -> int:
+        if self._rows is None:
+            self._rows = {
+                ReactionKey(*row): i
+                for i, row in enumerate(self.reactions.iter_rows())
+            }
+        try:
+            return self._rows[reaction_key]
+        except KeyError:
+            msg = f"reaction not in index: {reaction_key}"
+            raise KeyError(msg) from None
+
+    def _search(
+        self,
+        query: npt.NDArray[np.float32],
+        k: int,
+        num_probes: int | None,
+    ) -> tuple[npt.NDArray[np.int64], npt.NDArray[np.float32]]:
+        if num_probes is None or len(self._centroids) == 0:
+            candidates = np.arange(len(self.vectors))
+            similarities = self.vectors @ query
+        else:
+            lists = [
+                slice(self._offsets[probe], self._offsets[probe + 1])
+                for probe in _top_k(self._centroids @ query, num_probes)
+            ]
+            candidates = np.concatenate(
+                [np.arange(rows.start, rows.stop) for rows in lists]
+            )
+            similarities = np.concatenate(
+                [self.vectors[rows] @ query for rows in lists]
+            )
+        top = _top_k(similarities, k)
+        return candidates[top], similarities[top]
+
+
+def _top_k(
+    values: npt.NDArray[np.float32],
+    k: int,
+) -> npt.NDArray[np.int64]:
+    k = min(k, len(values))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    top = np.argpartition(-values, k - 1)[:k]
+    return top[np.argsort(-values[top], kind="stable")]
+
+
+def _partition(
+    vectors: npt.NDArray[np.float32],
+    num_lists: int,
+    num_iterations: int = 10,
+    batch_size: int = 8192,
+) -> tuple[npt.NDArray[np.float32], npt.NDArray[np.int64]]:
+    # Spherical k-means: the centroids are kept at unit length so that
+    # vectors are assigned to the centroid with the highest similarity.
+    # They are fit to a sample of the vectors, which is enough to place
+    # them and keeps building the index fast.
+    rng = np.random.default_rng(0)
+    sample = vectors[
+        rng.choice(
+            len(vectors), min(len(vectors), 64 * num_lists), replace=False
+        )
+    ]
+    centroids = sample[:num_lists].copy()
+    for _ in range(num_iterations):
+        sums = np.zeros_like(centroids)
+        for start in range(0, len(sample), batch_size):
+            batch = sample[start : start + batch_size]
+            members = np.zeros((len(batch), num_lists), dtype=np.float32)
+            members[
+                np.arange(len(batch)), np.argmax(batch @ centroids.T, axis=1)
+            ] = 1
+            sums += members.T @ batch
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        # Empty lists keep their old centroid.
+        np.divide(sums, norms, out=centroids, where=norms > 0)
+    return centroids, np.concatenate(
+        [
+            np.argmax(
+                vectors[start : start + batch_size] @ centroids.T, axis=1
+            )
+            for start in range(0, len(vectors), batch_size)
+        ]
+    )
@@ -16,8 +16,11 @@ CREATE TABLE IF NOT EXISTS reactions (
     FOREIGN KEY (tri_name) REFERENCES precursors (name),
     UNIQUE (experiment, plate, formulation_number)
 );
-CREATE INDEX IF NOT EXISTS reaction_index
-ON reactions (experiment, plate, formulation_number);
+DROP INDEX IF EXISTS reaction_index;
+CREATE INDEX IF NOT EXISTS reaction_di_name_index
+ON reactions (di_name);
+CREATE INDEX IF NOT EXISTS reaction_tri_name_index
+ON reactions (tri_name);
 
 CREATE TABLE IF NOT EXISTS nmr_spectra (
     id INTEGER PRIMARY KEY,
@@ -27,6 +30,15 @@ CREATE TABLE IF NOT EXISTS nmr_spectra (
 CREATE INDEX IF NOT EXISTS nmr_spectrum_index
 ON nmr_spectra (reaction_id);
 
+CREATE TABLE IF NOT EXISTS nmr_spectrum_regions (
+    nmr_spectrum_id INTEGER PRIMARY KEY,
+    ppm_start REAL NOT NULL,
+    ppm_step REAL NOT NULL,
+    reference_shift REAL,
+    intensities BLOB NOT NULL,
+    FOREIGN KEY (nmr_spectrum_id) REFERENCES nmr_spectra (id)
+);
+
 CREATE TABLE IF NOT EXISTS nmr_aldehyde_peaks (
     id INTEGER PRIMARY KEY,
     nmr_spectrum_id INTEGER NOT NULL,
@@ -34,8 +46,11 @@ CREATE TABLE IF NOT EXISTS nmr_aldehyde_peaks (
     amplitude REAL NOT NULL,
     FOREIGN KEY (nmr_spectrum_id) REFERENCES nmr_spectra (id)
 );
-CREATE INDEX IF NOT EXISTS nmr_aldehyde_peak_index
-ON nmr_aldehyde_peaks (nmr_spectrum_id);
+DROP INDEX IF EXISTS nmr_aldehyde_peak_index;
+CREATE INDEX IF NOT EXISTS nmr_aldehyde_peak_ppm_index
+ON nmr_aldehyde_peaks (nmr_spectrum_id, ppm, amplitude);
+CREATE INDEX IF NOT EXISTS nmr_aldehyde_peak_ppm_amplitude_index
+ON nmr_aldehyde_peaks (ppm, amplitude, nmr_spectrum_id);
 
 CREATE TABLE IF NOT EXISTS nmr_imine_peaks (
     id INTEGER PRIMARY KEY,
@@ -44,8 +59,11 @@ CREATE TABLE IF NOT EXISTS nmr_imine_peaks (
     amplitude REAL NOT NULL,
     FOREIGN KEY (nmr_spectrum_id) REFERENCES nmr_spectra (id)
 );
-CREATE INDEX IF NOT EXISTS nmr_imine_peak_index
-ON nmr_imine_peaks (nmr_spectrum_id);
+DROP INDEX IF EXISTS nmr_imine_peak_index;
+CREATE INDEX IF NOT EXISTS nmr_imine_peak_ppm_index
+ON nmr_imine_peaks (nmr_spectrum_id, ppm, amplitude);
+CREATE INDEX IF NOT EXISTS nmr_imine_peak_ppm_amplitude_index
+ON nmr_imine_peaks (ppm, amplitude, nmr_spectrum_id);
 
 CREATE TABLE IF NOT EXISTS mass_spectra (
     id INTEGER PRIMARY KEY,
@@ -68,8 +86,19 @@ CREATE TABLE IF NOT EXISTS mass_spectrum_peaks (
     intensity REAL NOT NULL,
     FOREIGN KEY (mass_spectrum_id) REFERENCES mass_spectra (id)
 );
-CREATE INDEX IF NOT EXISTS mass_spectrum_peak_index
-ON mass_spectrum_peaks (mass_spectrum_id);
+DROP INDEX IF EXISTS mass_spectrum_peak_index;
+CREATE INDEX IF NOT EXISTS mass_spectrum_peak_spectrum_mz_index
+ON mass_spectrum_peaks (mass_spectrum_id, spectrum_mz);
+CREATE INDEX IF NOT EXISTS mass_spectrum_peak_mz_index
+ON mass_spectrum_peaks (spectrum_mz);
+CREATE INDEX IF NOT EXISTS mass_spectrum_peak_calculated_mz_index
+ON mass_spectrum_peaks (calculated_mz);
+
+CREATE TABLE IF NOT EXISTS mass_spectrum_features (
+    mass_spectrum_id INTEGER PRIMARY KEY,
+    features BLOB NOT NULL,
+    FOREIGN KEY (mass_spectrum_id) REFERENCES mass_spectra (id)
+);
 
 CREATE TABLE IF NOT EXISTS mass_spectrum_topology_assignments (
     id INTEGER PRIMARY KEY,
@@ -77,8 +106,9 @@ CREATE TABLE IF NOT EXISTS mass_spectrum_topology_assignments (
     topology TEXT NOT NULL,
     FOREIGN KEY (mass_spectrum_peak_id) REFERENCES mass_spectrum_peaks (id)
 );
-CREATE INDEX IF NOT EXISTS mass_spectrum_topology_assignment_index
-ON mass_spectrum_topology_assignments (mass_spectrum_peak_id);
+DROP INDEX IF EXISTS mass_spectrum_topology_assignment_index;
+CREATE INDEX IF NOT EXISTS mass_spectrum_topology_assignment_topology_index
+ON mass_spectrum_topology_assignments (mass_spectrum_peak_id, topology);
 
 CREATE TABLE IF NOT EXISTS turbidity_dissolved_references (
     id INTEGER PRIMARY KEY,
@@ -87,8 +117,7 @@ CREATE TABLE IF NOT EXISTS turbidity_dissolved_references (
     FOREIGN KEY (reaction_id) REFERENCES reactions (id),
     UNIQUE (reaction_id)
 );
-CREATE INDEX IF NOT EXISTS turbidity_dissolved_reference_index
-ON turbidity_dissolved_references (reaction_id);
+DROP INDEX IF EXISTS turbidity_dissolved_reference_index;
 
 CREATE TABLE IF NOT EXISTS turbidity_measurements (
     id INTEGER PRIMARY KEY,
@@ -97,8 +126,10 @@ CREATE TABLE IF NOT EXISTS turbidity_measurements (
     turbidity REAL NOT NULL,
     FOREIGN KEY (reaction_id) REFERENCES reactions (id)
 );
-CREATE INDEX IF NOT EXISTS turbidity_measurement_index
-ON turbidity_measurements (reaction_id);
+DROP INDEX IF EXISTS turbidity_measurement_index;
+DROP INDEX IF EXISTS turbidity_measurement_time_index;
+CREATE INDEX IF NOT EXISTS turbidity_measurement_julianday_index
+ON turbidity_measurements (reaction_id, julianday(time), time, turbidity);
 
 CREATE TABLE IF NOT EXISTS turbidities (
     id INTEGER PRIMARY KEY,
@@ -107,7 +138,121 @@ CREATE TABLE IF NOT EXISTS turbidities (
     FOREIGN KEY (reaction_id) REFERENCES reactions (id),
     UNIQUE (reaction_id)
 );
-CREATE INDEX IF NOT EXISTS turbidity_index
-ON turbidities (reaction_id);
+DROP INDEX IF EXISTS turbidity_index;
+
+CREATE TABLE IF NOT EXISTS reaction_summaries (
+    reaction_id INTEGER PRIMARY KEY,
+    topologies TEXT NOT NULL,
+    max_intensity_2_plus_3 REAL,
+    max_intensity_4_plus_6 REAL,
+    max_intensity_6_plus_9 REAL,
+    max_intensity_8_plus_12 REAL,
+    aldehyde_peak_count INTEGER NOT NULL,
+    max_aldehyde_amplitude REAL,
+    imine_peak_count INTEGER NOT NULL,
+    max_imine_amplitude REAL,
+    turbid_state TEXT CHECK (
+        turbid_state IN ('dissolved', 'turbid', 'unstable')
+    ),
+    FOREIGN KEY (reaction_id) REFERENCES reactions (id)
+);
+
+CREATE TABLE IF NOT EXISTS ingest_log (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    reaction_id INTEGER NOT NULL,
+    kind TEXT CHECK (
+        kind IN ('mass_spectrum', 'nmr_spectrum', 'turbidity')
+    ) NOT NULL,
+    FOREIGN KEY (reaction_id) REFERENCES reactions (id)
+);
+
+CREATE TABLE IF NOT EXISTS ingest_runs (
+    id INTEGER PRIMARY KEY,
+    command TEXT CHECK (command IN ('new', 'insert')) NOT NULL,
+    cagey_version TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    wall_seconds REAL NOT NULL,
+    processes INTEGER NOT NULL,
+    reactions_seconds REAL,
+    mass_spectra_seconds REAL NOT NULL,
+    nmr_seconds REAL NOT NULL,
+    turbidity_seconds REAL NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS ingest_file_metrics (
+    id INTEGER PRIMARY KEY,
+    run_id INTEGER NOT NULL,
+    kind TEXT CHECK (
+        kind IN ('mass_spectrum', 'nmr_spectrum', 'turbidity')
+    ) NOT NULL,
+    path TEXT NOT NULL,
+    bytes_read INTEGER NOT NULL,
+    seconds REAL NOT NULL,
+    peaks INTEGER,
+    failed INTEGER CHECK (failed IN (0, 1)) NOT NULL,
+    memory_bytes INTEGER,
+    FOREIGN KEY (run_id) REFERENCES ingest_runs (id)
+);
+CREATE INDEX IF NOT EXISTS ingest_file_metrics_index
+ON ingest_file_metrics (run_id, kind);
+
+
+CREATE TABLE IF NOT EXISTS analysis_parameter_sets (
+    id INTEGER PRIMARY KEY,
+    kind TEXT CHECK (
+        kind IN ('mass_spectrum', 'nmr_spectrum', 'turbidity')
+    ) NOT NULL,
+    parameters TEXT NOT NULL,
+    UNIQUE (kind, parameters)
+);
+
+CREATE TABLE IF NOT EXISTS reprocessed_reactions (
+    parameter_set_id INTEGER NOT NULL,
+    reaction_id INTEGER NOT NULL,
+    PRIMARY KEY (reaction_id, parameter_set_id),
+    FOREIGN KEY (parameter_set_id) REFERENCES analysis_parameter_sets (id),
+    FOREIGN KEY (reaction_id) REFERENCES reactions (id)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS reprocessed_mass_spectrum_peaks (
+    id INTEGER PRIMARY KEY,
+    parameter_set_id INTEGER NOT NULL,
+    reaction_id INTEGER NOT NULL,
+    di_count INTEGER NOT NULL,
+    tri_count INTEGER NOT NULL,
+    adduct TEXT NOT NULL,
+    charge INTEGER NOT NULL,
+    calculated_mz REAL NOT NULL,
+    spectrum_mz REAL NOT NULL,
+    separation_mz REAL NOT NULL,
+    intensity REAL NOT NULL,
+    topology TEXT,
+    FOREIGN KEY (parameter_set_id) REFERENCES analysis_parameter_sets (id),
+    FOREIGN KEY (reaction_id) REFERENCES reactions (id)
+);
+CREATE INDEX IF NOT EXISTS reprocessed_mass_spectrum_peak_index
+ON reprocessed_mass_spectrum_peaks (reaction_id, parameter_set_id);
+
+CREATE TABLE IF NOT EXISTS reprocessed_nmr_peaks (
+    id INTEGER PRIMARY KEY,
+    parameter_set_id INTEGER NOT NULL,
+    reaction_id INTEGER NOT NULL,
+    kind TEXT CHECK (kind IN ('aldehyde', 'imine')) NOT NULL,
+    ppm REAL NOT NULL,
+    amplitude REAL NOT NULL,
+    FOREIGN KEY (parameter_set_id) REFERENCES analysis_parameter_sets (id),
+    FOREIGN KEY (reaction_id) REFERENCES reactions (id)
+);
+CREATE INDEX IF NOT EXISTS reprocessed_nmr_peak_index
+ON reprocessed_nmr_peaks (reaction_id, parameter_set_id);
+
+CREATE TABLE IF NOT EXISTS reprocessed_turbidities (
+    parameter_set_id INTEGER NOT NULL,
+    reaction_id INTEGER NOT NULL,
+    state TEXT CHECK (state IN ('dissolved', 'turbid', 'unstable')) NOT NULL,
+    PRIMARY KEY (reaction_id, parameter_set_id),
+    FOREIGN KEY (parameter_set_id) REFERENCES analysis_parameter_sets (id),
+    FOREIGN KEY (reaction_id) REFERENCES reactions (id)
+) WITHOUT ROWID;
 
 COMMIT;
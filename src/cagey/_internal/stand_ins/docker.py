@@ -0,0 +1,31 @@
+"""A stand-in for docker, which runs msconvert without a container.
+
+Only ``docker ps`` and the msconvert run of
+:func:`cagey.ms.machine_data_to_mzml` are supported. The machine data
+must hold the features of the mass spectrum in ``AcqData/features.csv``,
+which are copied to the mzML file.
+
+It imports nothing from :mod:`cagey`, so that it starts quickly.
+"""
+
+import shutil
+import sys
+from pathlib import Path
+
+
+def main(args: list[str]) -> None:
+    """Run a docker command."""
+    if args == ["ps"]:
+        return
+    if args[:1] != ["run"] or "msconvert" not in args:
+        sys.exit(f"unsupported docker command: {' '.join(args)}")
+    volume = Path(args[args.index("--volume") + 1].rsplit(":", 1)[0])
+    name = Path(args[args.index("msconvert") + 1])
+    shutil.copyfile(
+        volume / name / "AcqData" / "features.csv",
+        volume / f"{name.stem}.mzML",
+    )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,25 @@
+"""A stand-in for MZmine, which runs a batch file made by cagey.
+
+The input file of the batch is copied to its output csv file, so it
+must be an mzML file written by the docker stand-in.
+
+It imports nothing from :mod:`cagey`, so that it starts quickly.
+"""
+
+import shutil
+import sys
+import xml.etree.ElementTree as ET
+
+
+def main(args: list[str]) -> None:
+    """Run a batch file."""
+    batch = ET.parse(args[args.index("-batch") + 1])  # noqa: S314
+    infile = batch.findtext(".//file")
+    outfile = batch.findtext(".//current_file")
+    if infile is None or outfile is None:
+        sys.exit("batch file has no input or output file")
+    shutil.copyfile(infile, f"/{outfile.lstrip('/')}.csv")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
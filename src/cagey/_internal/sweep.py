@@ -0,0 +1,450 @@
+from collections.abc import Callable, Iterable, Sequence
+from dataclasses import astuple, dataclass, fields
+from functools import cache
+from itertools import product
+from multiprocessing.pool import Pool
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+import polars as pl
+
+from cagey._internal.ms import (
+    H_MONO_WEIGHT,
+    PRECURSOR_COUNTS,
+    get_cage_ions,
+)
+from cagey._internal.types import MassSpectrumParameters, Precursors
+
+TOPOLOGIES = tuple(
+    f"{tri_count}+{di_count}"
+    for tri_count, di_count in PRECURSOR_COUNTS
+    if (tri_count, di_count) != (3, 5)
+)
+"""The topologies which can be assigned to mass spectrum peaks."""
+
+_PARAMETER_NAMES = tuple(
+    field.name for field in fields(MassSpectrumParameters)
+)
+
+FloatArray = npt.NDArray[np.float64]
+IntArray = npt.NDArray[np.int64]
+Spectrum = tuple[pl.DataFrame, Precursors]
+
+
+def parameter_grid(  # noqa: PLR0913
+    *,
+    calculated_peak_tolerance: Sequence[float] = (0.1,),
+    separation_peak_tolerance: Sequence[float] = (0.1,),
+    max_ppm_error: Sequence[float] = (10,),
+    max_separation: Sequence[float] = (0.02,),
+    min_peak_height: Sequence[float] = (1e4,),
+    max_between_peak_height: Sequence[float] = (0.7,),
+) -> list[MassSpectrumParameters]:
+    """Get every combination of the values of the peak parameters.
+
+    See :func:`get_peaks` for a description of each parameter.
+
+    Parameters:
+        calculated_peak_tolerance: The values of `calculated_peak_tolerance`.
+        separation_peak_tolerance: The values of `separation_peak_tolerance`.
+        max_ppm_error: The values of `max_ppm_error`.
+        max_separation: The values of `max_separation`.
+        min_peak_height: The values of `min_peak_height`.
+        max_between_peak_height: The values of `max_between_peak_height`.
+
+    Returns:
+        The parameters of every point of the grid.
+    """
+    return [
+        MassSpectrumParameters(*values)
+        for values in product(
+            calculated_peak_tolerance,
+            separation_peak_tolerance,
+            max_ppm_error,
+            max_separation,
+            min_peak_height,
+            max_between_peak_height,
+        )
+    ]
+
+
+def sweep_peaks(
+    spectra: Iterable[Spectrum],
+    grid: Sequence[MassSpectrumParameters],
+    *,
+    pool: Pool | None = None,
+) -> pl.DataFrame:
+    """Count the topologies found in mass spectra for many parameters.
+
+    Gives the same peaks and topologies as running
+    :func:`get_peaks_from_features` and :func:`get_topologies` on every
+    spectrum for every point of `grid`, but each feature list is sorted
+    once and every point of the grid is evaluated at the same time
+    with numpy, so large sweeps take minutes rather than days.
+
+    Parameters:
+        spectra:
+            The ``mz`` and ``height`` of each feature of a mass
+            spectrum, in the order of the csv file, and the precursors
+            of its reaction. Features can be read with
+            :func:`read_features` or
+            :func:`cagey.queries.mass_spectrum_features`.
+        grid:
+            The parameters to find peaks with, for example made by
+            :func:`parameter_grid`.
+        pool: The processes which analyse the spectra. If ``None``,
+            the spectra are analysed in this process. Processes forked
+            after polars has started its threads can deadlock, so the
+            pool should either be created before any data is read, or
+            use the ``"spawn"`` or ``"forkserver"`` start method.
+
+    Returns:
+        A DataFrame with a row for every point of the grid and every
+        topology in :data:`TOPOLOGIES`, holding the parameters, the
+        ``topology``, the number of reactions it was assigned to in
+        ``num_reactions`` and the number of peaks it was assigned to in
+        ``num_peaks``.
+    """
+    parameters = np.array([astuple(point) for point in grid], dtype=float)
+    parameters = parameters.reshape(len(grid), len(_PARAMETER_NAMES))
+    jobs = (
+        (
+            features.get_column("mz").to_numpy().astype(np.float64),
+            features.get_column("height").to_numpy().astype(np.float64),
+            precursors,
+            parameters,
+        )
+        for features, precursors in spectra
+    )
+    num_peaks = np.zeros((len(grid), len(TOPOLOGIES)), dtype=np.int64)
+    num_reactions = np.zeros_like(num_peaks)
+    results = (
+        map(_sweep_spectrum, jobs)
+        if pool is None
+        else pool.imap_unordered(_sweep_spectrum, jobs, chunksize=4)
+    )
+    for counts in results:
+        num_peaks += counts
+        num_reactions += counts > 0
+
+    return pl.DataFrame(
+        {
+            **{
+                name: np.repeat(parameters[:, i], len(TOPOLOGIES))
+                for i, name in enumerate(_PARAMETER_NAMES)
+            },
+            "topology": np.tile(TOPOLOGIES, len(grid)),
+            "num_reactions": num_reactions.ravel(),
+            "num_peaks": num_peaks.ravel(),
+        },
+        schema={
+            **dict.fromkeys(_PARAMETER_NAMES, pl.Float64),
+            "topology": pl.Utf8,
+            "num_reactions": pl.Int64,
+            "num_peaks": pl.Int64,
+        },
+    )
+
+
+def _sweep_spectrum(
+    job: tuple[FloatArray, FloatArray, Precursors, FloatArray],
+) -> IntArray:
+    mz, height, precursors, parameters = job
+    candidates = get_candidates(precursors.di_smiles, precursors.tri_smiles)
+    counts = np.zeros((len(parameters), len(TOPOLOGIES)), dtype=np.int64)
+    (
+        calculated_peak_tolerance,
+        separation_peak_tolerance,
+        max_ppm_error,
+        max_separation,
+        min_peak_height,
+        max_between_peak_height,
+    ) = parameters.T
+    # The peaks found depend on these three parameters, the remaining
+    # ones only decide which of them are kept.
+    groups = np.stack(
+        [
+            calculated_peak_tolerance,
+            separation_peak_tolerance,
+            min_peak_height,
+        ],
+        axis=1,
+    )
+    unique_groups, group_of_point = np.unique(
+        groups, axis=0, return_inverse=True
+    )
+    for group, (
+        calculated_tolerance,
+        separation_tolerance,
+        min_height,
+    ) in enumerate(unique_groups):
+        points = np.flatnonzero(group_of_point.ravel() == group)
+        peaks = SortedFeatures(
+            mz[height > min_height], height[height > min_height]
+        ).find_peaks(candidates, calculated_tolerance, separation_tolerance)
+        found = keep_peaks(
+            peaks,
+            candidates,
+            max_ppm_error[points, np.newaxis],
+            max_separation[points, np.newaxis],
+            max_between_peak_height[points, np.newaxis],
+        )
+        counts[points] = _count_topologies(found, candidates)
+    return counts
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Candidates:
+    """The cages which may be found in a mass spectrum."""
+
+    cage_mz: FloatArray
+    adduct: tuple[str, ...]
+    charge: IntArray
+    tri_count: IntArray
+    di_count: IntArray
+    topology: IntArray
+    """The index of the topology in TOPOLOGIES, or -1 for 3+5 cages."""
+
+
+@cache
+def get_candidates(di_smiles: str, tri_smiles: str) -> Candidates:
+    """Get the cages which may be found in a mass spectrum.
+
+    The result is cached, as a set of precursors is shared by many
+    mass spectra.
+
+    Parameters:
+        di_smiles: The SMILES of the di-topic precursor.
+        tri_smiles: The SMILES of the tri-topic precursor.
+
+    Returns:
+        The candidate cages.
+    """
+    rows = [
+        (ion.cage_mz, ion.adduct, ion.charge, ion.tri_count, ion.di_count)
+        for ion in get_cage_ions(di_smiles, tri_smiles)
+    ]
+    cage_mz, adduct, charge, tri_count, di_count = zip(*rows, strict=True)
+    topologies = [
+        f"{tri}+{di}" for tri, di in zip(tri_count, di_count, strict=True)
+    ]
+    return Candidates(
+        cage_mz=np.array(cage_mz, dtype=np.float64),
+        adduct=adduct,
+        charge=np.array(charge, dtype=np.int64),
+        tri_count=np.array(tri_count, dtype=np.int64),
+        di_count=np.array(di_count, dtype=np.int64),
+        topology=np.array(
+            [
+                TOPOLOGIES.index(topology) if topology in TOPOLOGIES else -1
+                for topology in topologies
+            ],
+            dtype=np.int64,
+        ),
+    )
+
+
+@dataclass(frozen=True, slots=True, eq=False)
+class Peaks:
+    """The peaks of each candidate cage in a mass spectrum."""
+
+    found: npt.NDArray[np.bool_]
+    spectrum_mz: FloatArray
+    separation_mz: FloatArray
+    intensity: FloatArray
+    ppm_error: FloatArray
+    separation: FloatArray
+    separation_height: FloatArray
+    max_between_height: FloatArray
+
+
+class SortedFeatures:
+    """The features of a mass spectrum sorted by m/z."""
+
+    def __init__(self, mz: FloatArray, height: FloatArray) -> None:
+        self.mz = mz
+        self.height = height
+        # get_peaks_from_features takes the first feature in file order
+        # inside each window, which is the smallest index among the
+        # features in a range of the sorted m/z.
+        order = np.argsort(mz, kind="stable")
+        self._sorted_mz = mz[order]
+        self._first_index = _RangeQuery(order, np.minimum, len(mz))
+        self._max_height = _RangeQuery(height[order], np.maximum, -np.inf)
+
+    def find_peaks(
+        self,
+        candidates: Candidates,
+        calculated_peak_tolerance: float,
+        separation_peak_tolerance: float,
+    ) -> Peaks:
+        """Find the peaks of each candidate cage.
+
+        Parameters:
+            candidates: The candidate cages.
+            calculated_peak_tolerance: The tolerance of the cage peak
+                around the m/z of the cage.
+            separation_peak_tolerance: The tolerance of the separation
+                peak around the m/z expected from the cage peak.
+
+        Returns:
+            The peaks of each candidate, before they are checked
+            with :func:`keep_peaks`.
+        """
+        mz = self.mz
+        height = self.height
+        if len(mz) == 0:
+            nothing = np.zeros(len(candidates.cage_mz))
+            return Peaks(
+                found=nothing.astype(np.bool_),
+                spectrum_mz=nothing,
+                separation_mz=nothing,
+                intensity=nothing,
+                ppm_error=nothing,
+                separation=nothing,
+                separation_height=nothing,
+                max_between_height=nothing,
+            )
+        cage_mz = candidates.cage_mz
+        cage = self._first_index_between(
+            cage_mz - calculated_peak_tolerance,
+            cage_mz + calculated_peak_tolerance,
+        )
+        has_cage = cage < len(mz)
+        cage = np.where(has_cage, cage, 0)
+        cage_peak_mz = mz[cage]
+        separation_mz = cage_peak_mz + H_MONO_WEIGHT / candidates.charge
+        separation = self._first_index_between(
+            separation_mz - separation_peak_tolerance,
+            separation_mz + separation_peak_tolerance,
+        )
+        has_separation = separation < len(mz)
+        separation = np.where(has_separation, separation, 0)
+        separation_peak_mz = mz[separation]
+        return Peaks(
+            found=has_cage & has_separation,
+            spectrum_mz=cage_peak_mz,
+            separation_mz=separation_peak_mz,
+            intensity=height[cage],
+            ppm_error=np.abs((cage_mz - cage_peak_mz) / cage_mz * 1e6),
+            separation=separation_peak_mz - cage_peak_mz,
+            separation_height=height[separation],
+            max_between_height=self._max_height(
+                np.searchsorted(self._sorted_mz, cage_peak_mz, "right"),
+                np.searchsorted(self._sorted_mz, separation_peak_mz, "left"),
+            ),
+        )
+
+    def _first_index_between(
+        self, lower: FloatArray, upper: FloatArray
+    ) -> IntArray:
+        # The index of the first feature with m/z in [lower, upper],
+        # or the number of features if there is none.
+        return self._first_index(
+            np.searchsorted(self._sorted_mz, lower, "left"),
+            np.searchsorted(self._sorted_mz, upper, "right"),
+        )
+
+
+def keep_peaks(
+    peaks: Peaks,
+    candidates: Candidates,
+    max_ppm_error: FloatArray | float,
+    max_separation: FloatArray | float,
+    max_between_peak_height: FloatArray | float,
+) -> npt.NDArray[np.bool_]:
+    """Check the peaks found for each candidate cage.
+
+    These are the checks of :func:`.get_peaks_from_features`, for one
+    set of parameters, or for many given as columns.
+
+    Parameters:
+        peaks: The peaks found by :meth:`SortedFeatures.find_peaks`.
+        candidates: The candidate cages.
+        max_ppm_error: The largest error of the cage peak.
+        max_separation: The largest difference between the separation
+            of the peaks and the separation expected from the charge.
+        max_between_peak_height: The largest height of a feature
+            between the peaks, as a fraction of the separation peak.
+
+    Returns:
+        Which of the peaks are kept.
+    """
+    return (
+        peaks.found
+        & (peaks.ppm_error <= max_ppm_error)
+        & (np.abs(peaks.separation - 1 / candidates.charge) <= max_separation)
+        & ~(
+            peaks.max_between_height
+            > peaks.separation_height * max_between_peak_height
+        )
+    )
+
+
+class _RangeQuery:
+    """Reduces ranges of an array in constant time with a sparse table."""
+
+    def __init__(
+        self,
+        values: npt.NDArray[Any],
+        reduce: Callable[[Any, Any], Any],
+        empty: float,
+    ) -> None:
+        self._reduce = reduce
+        self._empty = empty
+        self._levels = [values]
+        width = 1
+        while 2 * width <= len(values):
+            previous = self._levels[-1]
+            self._levels.append(reduce(previous[:-width], previous[width:]))
+            width *= 2
+
+    def __call__(self, start: IntArray, stop: IntArray) -> npt.NDArray[Any]:
+        result = np.full(len(start), self._empty, dtype=self._levels[0].dtype)
+        length = stop - start
+        (nonempty,) = np.nonzero(length > 0)
+        level = np.floor(np.log2(length[nonempty])).astype(np.int64)
+        for value in np.unique(level):
+            queries = nonempty[level == value]
+            values = self._levels[value]
+            result[queries] = self._reduce(
+                values[start[queries]],
+                values[stop[queries] - (1 << value)],
+            )
+        return result
+
+
+def _count_topologies(
+    found: npt.NDArray[np.bool_],
+    candidates: Candidates,
+) -> IntArray:
+    # get_topologies for every row of found at once.
+    tri_count = candidates.tri_count
+    di_count = candidates.di_count
+    charge = candidates.charge
+    valid = (
+        found
+        & ~((tri_count == 3) & (di_count == 5))  # noqa: PLR2004
+        & np.isin(charge, (1, 2))
+    )
+    is_2_plus_3 = (tri_count == 2) & (di_count == 3)  # noqa: PLR2004
+    is_4_plus_6 = (tri_count == 4) & (di_count == 6)  # noqa: PLR2004
+    is_8_plus_12 = (tri_count == 8) & (di_count == 12)  # noqa: PLR2004
+    avoid_2_plus_3 = (
+        (valid & is_4_plus_6).any(axis=1)
+        & (valid & is_2_plus_3 & (charge == 1)).any(axis=1)
+        & ~(valid & is_2_plus_3 & (charge == 2)).any(axis=1)  # noqa: PLR2004
+    )
+    avoid_4_plus_6 = (
+        (valid & is_8_plus_12).any(axis=1)
+        & (valid & is_4_plus_6 & (charge == 1)).any(axis=1)
+        & ~(valid & is_4_plus_6 & (charge == 2)).any(axis=1)  # noqa: PLR2004
+    )
+    assigned = (
+        valid
+        & ~(avoid_2_plus_3[:, np.newaxis] & is_2_plus_3)
+        & ~(avoid_4_plus_6[:, np.newaxis] & is_4_plus_6)
+    )
+    one_hot = candidates.topology[:, np.newaxis] == np.arange(len(TOPOLOGIES))
+    return assigned.astype(np.int64) @ one_hot.astype(np.int64)
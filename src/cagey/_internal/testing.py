@@ -0,0 +1,462 @@
+import json
+import math
+import pkgutil
+import sys
+from collections.abc import Sequence
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from sqlite3 import Connection
+
+import nmrglue
+import numpy as np
+import numpy.typing as npt
+import polars as pl
+from rdkit import Chem
+
+from cagey._internal.ms import get_cage_ions
+from cagey._internal.queries import (
+    insert_reactions,
+    precursors_df,
+    reactions_df,
+)
+from cagey._internal.sweep import TOPOLOGIES
+from cagey._internal.types import Reaction, ReactionKey, TurbidState
+
+C13_SEPARATION = 1.0033548
+"""The m/z between isotope peaks of a singly charged ion."""
+SPECTROMETER_FREQUENCY = 400.13
+"""The proton frequency of the NMR spectrometer in MHz."""
+
+_ALDEHYDE = Chem.MolFromSmarts("[CX3H1](=O)[#6]")
+_NMR_POINTS = 2**15
+_NMR_START_PPM = 14.0
+_NMR_WIDTH_PPM = 20.0
+_NMR_LINE_WIDTH_PPM = 0.0015
+_TURBIDITY_START = datetime(2023, 2, 21)  # noqa: DTZ001
+
+
+@dataclass(frozen=True, slots=True)
+class SyntheticReaction:
+    """What was put into the synthetic data of a reaction.
+
+    These are the results the analysis of the data is expected to give.
+    """
+
+    reaction_key: ReactionKey
+    """The reaction."""
+    topologies: tuple[str, ...]
+    """The topologies of the cages in the mass spectrum."""
+    aldehyde_ppm: tuple[float, ...]
+    """The shifts of the aldehyde peaks in the NMR spectrum."""
+    imine_ppm: tuple[float, ...]
+    """The shifts of the imine peaks in the NMR spectrum."""
+    turbid_state: TurbidState
+    """The turbidity state of the reaction."""
+
+
+def write_ms_csv(  # noqa: PLR0913
+    path: Path,
+    di_smiles: str,
+    tri_smiles: str,
+    topologies: Sequence[str],
+    *,
+    seed: int | np.random.Generator = 0,
+    num_features: int = 1000,
+) -> None:
+    """Write a mass spectrum csv file like those made by MZmine.
+
+    Each cage is given the isotope peaks of its singly and doubly
+    protonated ions, a few ppm from their calculated m/z. The remaining
+    features are noise, kept away from the m/z of every cage the
+    precursors can form, so that only the given cages are found.
+
+    Parameters:
+        path: The path of the csv file.
+        di_smiles: The smiles string of the di-topic precursor.
+        tri_smiles: The smiles string of the tri-topic precursor.
+        topologies: The topologies of the cages in the spectrum.
+        seed: The seed or generator of the random numbers.
+        num_features: The number of noise features.
+    """
+    rng = np.random.default_rng(seed)
+    ions = get_cage_ions(di_smiles, tri_smiles)
+    mz: list[float] = []
+    height: list[float] = []
+    for ion in ions:
+        if (
+            f"{ion.tri_count}+{ion.di_count}" not in topologies
+            or ion.adduct != f"H{ion.charge}"
+            or ion.charge > 2  # noqa: PLR2004
+        ):
+            continue
+        charge = ion.charge
+        cage_mz = ion.cage_mz * (1 + rng.normal(0, 2e-6))
+        # A Poisson envelope, as most of the isotopes are carbon-13.
+        mean_isotopes = cage_mz * charge * 5.5e-4
+        mono_height = rng.lognormal(np.log(1e6), 0.5)
+        for num_isotopes in range(4):
+            mz.append(cage_mz + num_isotopes * C13_SEPARATION / charge)
+            height.append(
+                mono_height
+                * mean_isotopes**num_isotopes
+                / math.factorial(num_isotopes)
+            )
+    noise_mz = rng.uniform(100, 4000, 2 * num_features)
+    cages_mz = np.array([ion.cage_mz for ion in ions])
+    nearest = np.abs(noise_mz[:, np.newaxis] - cages_mz).min(axis=1)
+    noise_mz = noise_mz[nearest > 1.5][:num_features]  # noqa: PLR2004
+    mz.extend(noise_mz)
+    height.extend(rng.lognormal(np.log(3e3), 1.5, len(noise_mz)))
+    order = rng.permutation(len(mz))
+    pl.DataFrame(
+        {
+            "id": np.arange(1, len(mz) + 1),
+            "rt": rng.uniform(0.5, 3.0, len(mz)).round(4),
+            "mz": np.array(mz)[order],
+            "height": np.array(height)[order].round(1),
+            "area": (
+                np.array(height)[order] * rng.uniform(5, 20, len(mz))
+            ).round(1),
+        }
+    ).write_csv(path)
+
+
+def write_nmr_pdata(  # noqa: PLR0913
+    directory: Path,
+    reaction_key: ReactionKey,
+    *,
+    aldehyde_ppm: Sequence[float] = (),
+    imine_ppm: Sequence[float] = (),
+    seed: int | np.random.Generator = 0,
+    reference_error: float = 0.0,
+) -> Path:
+    """Write the processed data of a Bruker NMR experiment.
+
+    The spectrum has a chloroform peak and its side peaks, the given
+    aldehyde and imine peaks, a few alkyl peaks and noise. The acqus
+    file is written to `directory` and the pdata files, including the
+    title naming the reaction, to ``directory/pdata/1``.
+
+    Parameters:
+        directory: The experiment directory.
+        reaction_key: The reaction written in the title file.
+        aldehyde_ppm: The shifts of the aldehyde peaks.
+        imine_ppm: The shifts of the imine peaks.
+        seed: The seed or generator of the random numbers.
+        reference_error:
+            How far the spectrum is from being referenced to the
+            chloroform peak at 7.26 ppm. Every peak is moved up by it.
+
+    Returns:
+        The pdata directory.
+    """
+    rng = np.random.default_rng(seed)
+    ppm = _NMR_START_PPM - np.arange(_NMR_POINTS, dtype=np.float64) * (
+        _NMR_WIDTH_PPM / _NMR_POINTS
+    )
+    intensities = rng.normal(0, 500, _NMR_POINTS)
+    peaks = {7.26: 2e7, 7.52: 2e5, 7.00: 2e5}
+    peaks.update(dict.fromkeys(rng.uniform(0.5, 4.5, rng.integers(2, 6)), 3e6))
+    peaks.update(dict.fromkeys(aldehyde_ppm, 5e5))
+    peaks.update(dict.fromkeys(imine_ppm, 1e6))
+    for center, height in peaks.items():
+        intensities += _line(
+            ppm, center + reference_error, height * rng.uniform(0.8, 1.2)
+        )
+
+    pdata = directory / "pdata" / "1"
+    pdata.mkdir(parents=True, exist_ok=True)
+    width_hz = _NMR_WIDTH_PPM * SPECTROMETER_FREQUENCY
+    carrier_hz = _NMR_START_PPM * SPECTROMETER_FREQUENCY - width_hz / 2
+    nmrglue.bruker.write_jcamp(
+        {
+            "_coreheader": ["##TITLE= Parameter file", "##JCAMPDX= 5.0"],
+            "_comments": [],
+            "AQ_mod": 3,
+            "BF1": SPECTROMETER_FREQUENCY,
+            "NUC1": "1H",
+            "O1": carrier_hz,
+            "SFO1": SPECTROMETER_FREQUENCY + carrier_hz * 1e-6,
+            "SW": _NMR_WIDTH_PPM,
+            "SW_h": width_hz,
+            "TD": _NMR_POINTS,
+        },
+        str(directory / "acqus"),
+        overwrite=True,
+    )
+    nmrglue.bruker.write_jcamp(
+        {
+            "_coreheader": ["##TITLE= Parameter file", "##JCAMPDX= 5.0"],
+            "_comments": [],
+            "AXNUC": "1H",
+            "BYTORDP": 0,
+            "DTYPP": 0,
+            "FTSIZE": _NMR_POINTS,
+            "NC_proc": 0,
+            "OFFSET": _NMR_START_PPM,
+            "SF": SPECTROMETER_FREQUENCY,
+            "SI": _NMR_POINTS,
+            "SW_p": width_hz,
+            "XDIM": _NMR_POINTS,
+        },
+        str(pdata / "procs"),
+        overwrite=True,
+    )
+    intensities.round().astype("<i4").tofile(pdata / "1r")
+    (pdata / "title").write_text(_reaction_name(reaction_key))
+    return pdata
+
+
+def _line(
+    ppm: npt.NDArray[np.float64], center: float, height: float
+) -> npt.NDArray[np.float64]:
+    # A Gaussian, rather than a Lorentzian, so that the tails of tall
+    # peaks do not rise above the picking threshold.
+    return height * np.exp(-(((ppm - center) / _NMR_LINE_WIDTH_PPM) ** 2) / 2)
+
+
+def write_turbidity_json(
+    path: Path,
+    reaction_key: ReactionKey,
+    turbid_state: TurbidState,
+    *,
+    seed: int | np.random.Generator = 0,
+    dissolved_reference: float = 20.0,
+) -> None:
+    """Write the turbidity measurements of a reaction.
+
+    There is one measurement a second. The measurements alternate
+    between unstable segments, where the turbidity jumps every 15 to 30
+    seconds, and stable segments of at least two minutes. A turbid or
+    dissolved reaction has one to three stable segments, all at the
+    same turbidity, while an unstable reaction has none.
+
+    Parameters:
+        path: The path of the json file.
+        reaction_key: The reaction.
+        turbid_state: The turbidity state of the reaction.
+        seed: The seed or generator of the random numbers.
+        dissolved_reference:
+            The turbidity at which the solution is considered dissolved.
+    """
+    rng = np.random.default_rng(seed)
+    match turbid_state:
+        case TurbidState.DISSOLVED:
+            level = dissolved_reference + rng.uniform(-0.5, 0.5)
+        case TurbidState.TURBID | TurbidState.UNSTABLE:
+            level = dissolved_reference + rng.uniform(5, 80)
+    segments = []
+    for _ in range(rng.integers(1, 4)):
+        unstable = level + rng.normal(0, 0.2, rng.integers(60, 300))
+        jump = int(rng.integers(0, 10))
+        while jump < len(unstable):
+            unstable[jump] += rng.uniform(40, 50)
+            jump += int(rng.integers(15, 30))
+        segments.append(unstable)
+        if turbid_state is not TurbidState.UNSTABLE:
+            segments.append(level + rng.normal(0, 0.2, rng.integers(120, 600)))
+    turbidities = np.concatenate(segments)
+    data = {
+        "experiment": reaction_key.experiment,
+        "plate": reaction_key.plate,
+        "formulation_number": reaction_key.formulation_number,
+        "turbidity_data": {
+            (_TURBIDITY_START + timedelta(seconds=second)).strftime(
+                "%Y_%m_%d_%H_%M_%S_%f"
+            ): turbidity
+            for second, turbidity in enumerate(turbidities.tolist())
+        },
+        "turbidity_dissolved_reference": dissolved_reference,
+    }
+    with path.open("w") as file:
+        json.dump(data, file)
+
+
+def add_plates(
+    connection: Connection,
+    num_plates: int,
+    *,
+    experiment: str = "SY-01-001",
+    seed: int = 0,
+    commit: bool = True,
+) -> list[ReactionKey]:
+    """Add reactions on synthetic plates to the database.
+
+    Each plate pairs 8 di-topic with 6 tri-topic precursors, like the
+    plates added by :mod:`cagey.reactions`, for 48 reactions. The
+    precursors are picked at random from those in the database, so that
+    every reaction has an aldehyde and an amine.
+
+    Parameters:
+        connection: The SQLite database connection.
+        num_plates: The number of plates.
+        experiment: The experiment of the plates.
+        seed: The seed of the random numbers.
+        commit: Whether to commit the transaction.
+
+    Returns:
+        The added reactions.
+    """
+    rng = np.random.default_rng(seed)
+    groups: dict[tuple[str, bool], list[str]] = {}
+    for name, smiles in precursors_df(connection).iter_rows():
+        topicity = "Tri" if name.startswith("Tri") else "Di"
+        has_aldehyde = Chem.MolFromSmiles(smiles).HasSubstructMatch(_ALDEHYDE)
+        groups.setdefault((topicity, has_aldehyde), []).append(name)
+    reactions: list[Reaction] = []
+    for plate in range(1, num_plates + 1):
+        has_aldehyde = bool(rng.integers(2))
+        dis = rng.choice(groups["Di", has_aldehyde], 8, replace=False)
+        tris = rng.choice(groups["Tri", not has_aldehyde], 6, replace=False)
+        reactions.extend(
+            Reaction(
+                experiment=experiment,
+                plate=plate,
+                formulation_number=(di_index + 1) + (tri_index * 8),
+                di_name=str(di),
+                tri_name=str(tri),
+            )
+            for tri_index, tri in enumerate(tris)
+            for di_index, di in enumerate(dis)
+        )
+    insert_reactions(connection, reactions, commit=commit)
+    return [
+        ReactionKey(
+            reaction.experiment, reaction.plate, reaction.formulation_number
+        )
+        for reaction in reactions
+    ]
+
+
+def write_data(
+    directory: Path,
+    connection: Connection,
+    *,
+    reactions: Sequence[ReactionKey] | None = None,
+    seed: int = 0,
+) -> list[SyntheticReaction]:
+    """Write synthetic machine data for reactions in the database.
+
+    The data is laid out as :program:`cagey new` expects it, with one
+    mass spectrum, NMR experiment and turbidity file for each reaction.
+    The mass spectra are written as csv files, which the stand-ins of
+    :func:`write_tools` turn into the csv files of MZmine.
+
+    Parameters:
+        directory: The folder to write the data to.
+        connection: The SQLite database connection.
+        reactions:
+            The reactions. If ``None``, data is written for every
+            reaction in the database.
+        seed: The seed of the random numbers.
+
+    Returns:
+        What was put into the data of each reaction.
+    """
+    precursors = dict(
+        precursors_df(connection).select("name", "smiles").iter_rows()
+    )
+    reaction_rows = {
+        ReactionKey(experiment, plate, formulation_number): (di, tri)
+        for experiment, plate, formulation_number, di, tri in reactions_df(
+            connection
+        ).iter_rows()
+    }
+    if reactions is None:
+        reactions = sorted(
+            reaction_rows,
+            key=lambda key: (
+                key.experiment,
+                key.plate,
+                key.formulation_number,
+            ),
+        )
+    synthetic_reactions = []
+    for index, reaction_key in enumerate(reactions):
+        rng = np.random.default_rng([seed, index])
+        di_name, tri_name = reaction_rows[reaction_key]
+        synthetic_reaction = SyntheticReaction(
+            reaction_key=reaction_key,
+            topologies=tuple(
+                sorted(
+                    rng.choice(
+                        TOPOLOGIES, rng.integers(0, 3), replace=False
+                    ).tolist()
+                )
+            ),
+            aldehyde_ppm=_shifts(rng, 9.6, 10.4, int(rng.integers(0, 3))),
+            imine_ppm=_shifts(rng, 7.8, 8.8, int(rng.integers(0, 4))),
+            turbid_state=list(TurbidState)[rng.integers(3)],
+        )
+        name = _reaction_name(reaction_key)
+
+        machine_data = directory / "ms" / f"{name}.d" / "AcqData"
+        machine_data.mkdir(parents=True)
+        write_ms_csv(
+            machine_data / "features.csv",
+            precursors[di_name],
+            precursors[tri_name],
+            synthetic_reaction.topologies,
+            seed=rng,
+        )
+        write_nmr_pdata(
+            directory
+            / "nmr"
+            / f"{reaction_key.experiment}_{reaction_key.plate:02d}"
+            / str(reaction_key.formulation_number),
+            reaction_key,
+            aldehyde_ppm=synthetic_reaction.aldehyde_ppm,
+            imine_ppm=synthetic_reaction.imine_ppm,
+            seed=rng,
+            reference_error=rng.uniform(-0.02, 0.02),
+        )
+        turbidity = directory / "turbidity" / name
+        turbidity.mkdir(parents=True)
+        write_turbidity_json(
+            turbidity / "turbidity_data.json",
+            reaction_key,
+            synthetic_reaction.turbid_state,
+            seed=rng,
+        )
+        synthetic_reactions.append(synthetic_reaction)
+    return synthetic_reactions
+
+
+def _shifts(
+    rng: np.random.Generator, low: float, high: float, num_shifts: int
+) -> tuple[float, ...]:
+    # The shifts are spread out, so that each is picked as its own peak.
+    slots = rng.choice(int((high - low) / 0.05), num_shifts, replace=False)
+    return tuple(sorted(round(low + 0.05 * slot, 3) for slot in slots))
+
+
+def _reaction_name(reaction_key: ReactionKey) -> str:
+    return (
+        f"{reaction_key.experiment}_{reaction_key.plate:02d}"
+        f"_{reaction_key.formulation_number:02d}"
+    )
+
+
+def write_tools(directory: Path) -> None:
+    """Write stand-ins for the tools which convert mass spectra.
+
+    Two executables are written: ``docker``, which runs msconvert
+    without a container, and ``MZmine``. Together they turn the mass
+    spectra written by :func:`write_data` into the csv files
+    :program:`cagey new` reads, so that it can run without docker and
+    MZmine when `directory` is first on the ``PATH`` and passed as
+    ``--mzmine directory/MZmine``.
+
+    Parameters:
+        directory: The folder to write the executables to.
+    """
+    directory.mkdir(parents=True, exist_ok=True)
+    for name, script in [("docker", "docker.py"), ("MZmine", "mzmine.py")]:
+        source = pkgutil.get_data("cagey", f"_internal/stand_ins/{script}")
+        if source is None:
+            msg = f"failed to load stand-in {name}"
+            raise RuntimeError(msg)
+        path = directory / name
+        path.write_bytes(f"#!{sys.executable}\n".encode() + source)
+        path.chmod(0o755)
@@ -0,0 +1,222 @@
+import json
+import os
+import threading
+import time
+from collections.abc import Callable, Iterable, Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from dataclasses import dataclass, field
+from functools import wraps
+from pathlib import Path
+from typing import Any, ParamSpec, TypeVar
+
+import polars as pl
+
+_P = ParamSpec("_P")
+_T = TypeVar("_T")
+
+
+@dataclass(frozen=True, slots=True)
+class Span:
+    """A timed stage of work.
+
+    Parameters:
+        name: The name of the stage.
+        start_ns: When the stage started, on the monotonic clock.
+        duration_ns: How long the stage took.
+        pid: The process the stage ran in.
+        tid: The thread the stage ran in.
+        args: Details of the stage, such as the file it worked on.
+    """
+
+    name: str
+    """The name of the stage."""
+    start_ns: int
+    """When the stage started, on the monotonic clock."""
+    duration_ns: int
+    """How long the stage took."""
+    pid: int
+    """The process the stage ran in."""
+    tid: int
+    """The thread the stage ran in."""
+    args: dict[str, Any] = field(default_factory=dict)
+    """Details of the stage, such as the file it worked on."""
+
+
+_spans: list[Span] | None = None
+"""The spans collected in this process, or ``None`` if not tracing."""
+_NO_SPAN = nullcontext()
+
+
+def is_enabled() -> bool:
+    """Check if spans are being collected in this process.
+
+    Returns:
+        Whether spans are being collected.
+    """
+    return _spans is not None
+
+
+@contextmanager
+def collect(*, enabled: bool = True) -> Iterator[list[Span]]:
+    """Collect the spans of the work done inside the block.
+
+    Work done in a process pool is not collected by the parent process.
+    Pool workers collect their own spans, by passing the result of
+    :func:`is_enabled` to the worker, and send them back to be added
+    with :func:`record`.
+
+    Parameters:
+        enabled:
+            Whether to collect spans. If ``False``, nothing is
+            collected and :func:`span` costs next to nothing.
+
+    Yields:
+        The list the spans are added to, as they end.
+    """
+    global _spans  # noqa: PLW0603
+    previous = _spans
+    spans: list[Span] = []
+    _spans = spans if enabled else None
+    try:
+        yield spans
+    finally:
+        _spans = previous
+
+
+def span(name: str, **args: Any) -> AbstractContextManager[None]:
+    """Time a stage of work.
+
+    Parameters:
+        name: The name of the stage.
+        **args: Details of the stage, such as the file it worked on.
+
+    Returns:
+        A context manager timing the work inside it.
+    """
+    if _spans is None:
+        return _NO_SPAN
+    return _span(_spans, name, args)
+
+
+@contextmanager
+def _span(
+    spans: list[Span], name: str, args: dict[str, Any]
+) -> Iterator[None]:
+    start = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        spans.append(
+            Span(
+                name=name,
+                start_ns=start,
+                duration_ns=time.perf_counter_ns() - start,
+                pid=os.getpid(),
+                tid=threading.get_native_id(),
+                args=args,
+            )
+        )
+
+
+def traced(name: str) -> Callable[[Callable[_P, _T]], Callable[_P, _T]]:
+    """Time every call of a function as a span.
+
+    Parameters:
+        name: The name of the span.
+
+    Returns:
+        A decorator.
+    """
+
+    def decorator(function: Callable[_P, _T]) -> Callable[_P, _T]:
+        @wraps(function)
+        def wrapper(*args: _P.args, **kwargs: _P.kwargs) -> _T:
+            if _spans is None:
+                return function(*args, **kwargs)
+            with _span(_spans, name, {}):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def record(spans: Iterable[Span]) -> None:
+    """Add spans collected elsewhere, such as in a pool worker.
+
+    Nothing is added if spans are not being collected.
+
+    Parameters:
+        spans: The spans.
+    """
+    if _spans is not None:
+        _spans.extend(spans)
+
+
+def write_chrome_trace(path: Path, spans: Iterable[Span]) -> None:
+    """Write spans as a Chrome trace.
+
+    The trace can be opened with Perfetto or ``chrome://tracing``.
+
+    Parameters:
+        path: The path of the JSON file.
+        spans: The spans.
+    """
+    spans = list(spans)
+    start = min((span.start_ns for span in spans), default=0)
+    main_pid = os.getpid()
+    events: list[dict[str, Any]] = [
+        {
+            "name": "process_name",
+            "ph": "M",
+            "pid": pid,
+            "args": {"name": "cagey" if pid == main_pid else f"worker {pid}"},
+        }
+        for pid in sorted({span.pid for span in spans})
+    ]
+    events.extend(
+        {
+            "name": span.name,
+            "cat": span.name.split(".")[0],
+            "ph": "X",
+            "ts": (span.start_ns - start) / 1e3,
+            "dur": span.duration_ns / 1e3,
+            "pid": span.pid,
+            "tid": span.tid,
+            "args": {key: str(value) for key, value in span.args.items()},
+        }
+        for span in spans
+    )
+    with path.open("w") as file:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+
+def summarize(spans: Iterable[Span]) -> pl.DataFrame:
+    """Summarize the time spent in each stage.
+
+    Parameters:
+        spans: The spans.
+
+    Returns:
+        The ``name`` of each stage, its number of ``calls``, and the
+        ``total_seconds``, ``mean_seconds`` and ``max_seconds`` spent in
+        it, slowest stage first.
+    """
+    spans = list(spans)
+    return (
+        pl.DataFrame(
+            {
+                "name": [span.name for span in spans],
+                "seconds": [span.duration_ns / 1e9 for span in spans],
+            },
+            schema={"name": pl.Utf8, "seconds": pl.Float64},
+        )
+        .group_by("name")
+        .agg(
+            calls=pl.len(),
+            total_seconds=pl.sum("seconds"),
+            mean_seconds=pl.mean("seconds"),
+            max_seconds=pl.max("seconds"),
+        )
+        .sort("total_seconds", "name", descending=[True, False])
+    )
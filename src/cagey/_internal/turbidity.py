@@ -1,10 +1,18 @@
+from datetime import timedelta
+
 import polars as pl
 
 from cagey._internal.queries import TurbidState
 
 
-def get_turbid_state(
-    turbidities: dict[str, float], dissolved_reference: float
+def get_turbid_state(  # noqa: PLR0913
+    turbidities: dict[str, float],
+    dissolved_reference: float,
+    *,
+    window_seconds: float = 60,
+    num_std: float = 3,
+    min_stable_seconds: float = 60,
+    dissolved_margin: float = 1,
 ) -> TurbidState:
     """Get the turbidity state of an experiment.
 
@@ -13,29 +21,102 @@ def get_turbid_state(
             Maps a timestamp to a turbidity measurement.
         dissolved_reference:
             The turbidity at which the solution is considered dissolved.
+        window_seconds:
+            The length of the rolling window used to decide if a
+            measurement is stable.
+        num_std:
+            The number of standard deviations from the mean of its
+            window within which a measurement is stable.
+        min_stable_seconds:
+            The minimum length of a stable window.
+        dissolved_margin:
+            How far above `dissolved_reference` the mean turbidity of
+            a stable window may be for the solution to be dissolved.
+
+    Returns:
+        The turbidity state of the experiment.
+    """
+    return get_turbid_state_from_measurements(
+        _turbidity_from_json(turbidities),
+        dissolved_reference,
+        window_seconds=window_seconds,
+        num_std=num_std,
+        min_stable_seconds=min_stable_seconds,
+        dissolved_margin=dissolved_margin,
+    )
+
+
+def get_turbid_state_from_measurements(  # noqa: PLR0913
+    measurements: pl.DataFrame | pl.LazyFrame,
+    dissolved_reference: float,
+    *,
+    window_seconds: float = 60,
+    num_std: float = 3,
+    min_stable_seconds: float = 60,
+    dissolved_margin: float = 1,
+) -> TurbidState:
+    """Get the turbidity state of an experiment from its measurements.
+
+    This is :func:`get_turbid_state` for measurements which have
+    already been read, for example from the database with
+    :func:`cagey.queries.turbidity_measurements_df`.
+
+    Parameters:
+        measurements:
+            A DataFrame with columns time and turbidity.
+        dissolved_reference:
+            The turbidity at which the solution is considered dissolved.
+        window_seconds:
+            The length of the rolling window used to decide if a
+            measurement is stable.
+        num_std:
+            The number of standard deviations from the mean of its
+            window within which a measurement is stable.
+        min_stable_seconds:
+            The minimum length of a stable window.
+        dissolved_margin:
+            How far above `dissolved_reference` the mean turbidity of
+            a stable window may be for the solution to be dissolved.
 
     Returns:
         The turbidity state of the experiment.
     """
-    turbidity = _turbidity_from_json(turbidities)
-    turbidity = get_stability_windows(turbidity)
-    turbidity = get_aggregated_stability_windows(turbidity)
+    turbidity = get_stability_windows(
+        measurements.lazy().select("time", "turbidity").sort("time"),
+        window_seconds=window_seconds,
+        num_std=num_std,
+    )
+    turbidity = get_aggregated_stability_windows(
+        turbidity, min_stable_seconds=min_stable_seconds
+    )
     result = turbidity.collect()
     if result.is_empty():
         return TurbidState.UNSTABLE
-    if result.row(0, named=True)["mean_turbidity"] < dissolved_reference + 1:
+    if (
+        result.row(0, named=True)["mean_turbidity"]
+        < dissolved_reference + dissolved_margin
+    ):
         return TurbidState.DISSOLVED
     return TurbidState.TURBID
 
 
 def get_stability_windows(
     turbidity: pl.LazyFrame,
+    *,
+    window_seconds: float = 60,
+    num_std: float = 3,
 ) -> pl.LazyFrame:
     """Get the stability windows for a turbidity measurement.
 
     Parameters:
         turbidity:
             A DataFrame with columns time and turbidity.
+        window_seconds:
+            The length of the rolling window used to decide if a
+            measurement is stable.
+        num_std:
+            The number of standard deviations from the mean of its
+            window within which a measurement is stable.
 
     Returns:
         A new DataFrame which groups the turbidity measurements into
@@ -43,7 +124,7 @@ def get_stability_windows(
         based on the mean turbidity and the standard deviation.
     """
     return (
-        _average_turbidity(turbidity)
+        _average_turbidity(turbidity, window_seconds, num_std)
         .with_columns(
             stable=pl.col("turbidity")
             .is_between(pl.col("lower_bound"), pl.col("upper_bound"))
@@ -61,6 +142,8 @@ def get_stability_windows(
 
 def get_aggregated_stability_windows(
     turbidity: pl.LazyFrame,
+    *,
+    min_stable_seconds: float = 60,
 ) -> pl.LazyFrame:
     """Join adjacent windows with the same stability label.
 
@@ -68,6 +151,8 @@ def get_aggregated_stability_windows(
         turbidity:
             A DataFrame with rows representing 1 minute long windows
             each labeled according to stability.
+        min_stable_seconds:
+            The minimum length of a stable window.
 
     Returns:
         A new DataFrame which joins adjacent stability windows if
@@ -82,7 +167,8 @@ def get_aggregated_stability_windows(
         )
         .filter(
             pl.col("stable").eq(other=True),
-            pl.col("time_delta") >= pl.duration(minutes=1),
+            pl.col("time_delta")
+            >= pl.lit(timedelta(seconds=min_stable_seconds)),
         )
     )
 
@@ -105,15 +191,24 @@ def _turbidity_from_json(turbidity_json: dict[str, float]) -> pl.LazyFrame:
     )
 
 
-def _average_turbidity(turbidity: pl.LazyFrame) -> pl.LazyFrame:
+def _average_turbidity(
+    turbidity: pl.LazyFrame,
+    window_seconds: float,
+    num_std: float,
+) -> pl.LazyFrame:
     return (
-        turbidity.rolling("time", period="1m", offset="0", closed="both")
+        turbidity.rolling(
+            "time",
+            period=timedelta(seconds=window_seconds),
+            offset=timedelta(0),
+            closed="both",
+        )
         .agg(
             turbidities=pl.col("turbidity"),
             mean=pl.mean("turbidity"),
             std=pl.std("turbidity"),
-            lower_bound=pl.mean("turbidity") - 3 * pl.std("turbidity"),
-            upper_bound=pl.mean("turbidity") + 3 * pl.std("turbidity"),
+            lower_bound=pl.mean("turbidity") - num_std * pl.std("turbidity"),
+            upper_bound=pl.mean("turbidity") + num_std * pl.std("turbidity"),
         )
         .join(turbidity, on="time")
     )
@@ -1,9 +1,13 @@
 import json
 from collections.abc import Sequence
 from dataclasses import dataclass
+from datetime import datetime
 from enum import Enum
 from pathlib import Path
-from typing import Generic, NewType, TypeVar
+from typing import Generic, NewType, TypeAlias, TypeVar
+
+import numpy as np
+import numpy.typing as npt
 
 
 @dataclass(frozen=True, slots=True)
@@ -247,6 +251,76 @@ NmrAldehydePeakId = NewType("NmrAldehydePeakId", int)
 NmrIminePeakId = NewType("NmrIminePeakId", int)
 
 
+@dataclass(frozen=True, slots=True, eq=False)
+class NmrRegion:
+    """A region of a processed NMR spectrum.
+
+    Parameters:
+        intensities: The intensity of each point.
+        ppm_start: The ppm of the first point.
+        ppm_step:
+            The change in ppm from one point to the next. It is negative
+            when the ppm decreases along the points, as it does in
+            Bruker data.
+        reference_shift:
+            The shift which was added to the ppm of picked peaks to
+            reference the spectrum to the solvent, if known.
+    """
+
+    intensities: npt.NDArray[np.float64]
+    """The intensity of each point."""
+    ppm_start: float
+    """The ppm of the first point."""
+    ppm_step: float
+    """The change in ppm from one point to the next."""
+    reference_shift: float | None = None
+    """The shift which was added to the ppm of picked peaks."""
+
+    def ppm(self) -> npt.NDArray[np.float64]:
+        """Get the ppm of each point.
+
+        Returns:
+            The ppm axis of the region.
+        """
+        return np.asarray(
+            self.ppm_start + self.ppm_step * np.arange(len(self.intensities)),
+            dtype=np.float64,
+        )
+
+    def crop(
+        self,
+        min_ppm: float,
+        max_ppm: float,
+        *,
+        downsample: int = 1,
+    ) -> "NmrRegion":
+        """Get a smaller region of the spectrum.
+
+        Parameters:
+            min_ppm: The minimum ppm of the region.
+            max_ppm: The maximum ppm of the region.
+            downsample:
+                Keep only every `downsample`-th point. Peaks picked
+                from a downsampled region have smaller amplitudes, and
+                may be missed if they are narrower than the new
+                spacing of the points.
+
+        Returns:
+            The points of the spectrum between `min_ppm` and `max_ppm`.
+        """
+        ppm = self.ppm()
+        (points,) = np.nonzero((min_ppm <= ppm) & (ppm <= max_ppm))
+        start, stop = (
+            (int(points[0]), int(points[-1]) + 1) if len(points) else (0, 0)
+        )
+        return NmrRegion(
+            intensities=self.intensities[start:stop:downsample].copy(),
+            ppm_start=self.ppm_start + self.ppm_step * start,
+            ppm_step=self.ppm_step * downsample,
+            reference_shift=self.reference_shift,
+        )
+
+
 @dataclass(frozen=True, slots=True)
 class NmrSpectrum:
     """An NMR spectrum.
@@ -271,3 +345,220 @@ class TurbidState(Enum):
     """The solution is turbid."""
     UNSTABLE = "unstable"
     """The solution state could not be determined."""
+
+
+class IngestKind(Enum):
+    """The kind of data added to a reaction."""
+
+    MASS_SPECTRUM = "mass_spectrum"
+    """A mass spectrum was added."""
+    NMR_SPECTRUM = "nmr_spectrum"
+    """An NMR spectrum was added."""
+    TURBIDITY = "turbidity"
+    """Turbidity measurements and a turbidity state were added."""
+
+
+@dataclass(frozen=True, slots=True)
+class IngestChange:
+    """Data added to a reaction.
+
+    Parameters:
+        cursor: The position of the change in the change feed.
+        reaction_key: The reaction the data was added to.
+        kind: The kind of data added.
+    """
+
+    cursor: int
+    """The position of the change in the change feed."""
+    reaction_key: ReactionKey
+    """The reaction the data was added to."""
+    kind: IngestKind
+    """The kind of data added."""
+
+
+@dataclass(frozen=True, slots=True)
+class IngestFileMetrics:
+    """Metrics of a machine data file added to the database.
+
+    Parameters:
+        kind: The kind of data in the file.
+        path: The path to the file or folder.
+        bytes_read: The size of the file or folder.
+        seconds: The time taken to process the file.
+        peaks: The number of peaks found, or ``None`` for turbidity.
+        failed: Whether the file could not be processed.
+        memory_bytes: The peak resident memory of the programs run to
+            process the file, such as MZmine, or ``None`` if no
+            programs were run.
+    """
+
+    kind: IngestKind
+    """The kind of data in the file."""
+    path: str
+    """The path to the file or folder."""
+    bytes_read: int
+    """The size of the file or folder."""
+    seconds: float
+    """The time taken to process the file."""
+    peaks: int | None
+    """The number of peaks found, or ``None`` for turbidity."""
+    failed: bool = False
+    """Whether the file could not be processed."""
+    memory_bytes: int | None = None
+    """The peak resident memory of the programs run to process the file."""
+
+
+@dataclass(frozen=True, slots=True)
+class IngestRun:
+    """Metrics of a run of :program:`cagey new` or :program:`cagey insert`.
+
+    Parameters:
+        command: The command, ``"new"`` or ``"insert"``.
+        cagey_version: The version of cagey.
+        started_at: When the run started.
+        wall_seconds: The time taken by the whole run.
+        processes: The number of worker processes.
+        reactions_seconds:
+            The time taken to add the reactions, or ``None`` if no
+            reactions were added.
+        mass_spectra_seconds: The time taken to add the mass spectra.
+        nmr_seconds: The time taken to add the NMR spectra.
+        turbidity_seconds: The time taken to add the turbidities.
+    """
+
+    command: str
+    """The command, ``"new"`` or ``"insert"``."""
+    cagey_version: str
+    """The version of cagey."""
+    started_at: datetime
+    """When the run started."""
+    wall_seconds: float
+    """The time taken by the whole run."""
+    processes: int
+    """The number of worker processes."""
+    reactions_seconds: float | None
+    """The time taken to add the reactions."""
+    mass_spectra_seconds: float
+    """The time taken to add the mass spectra."""
+    nmr_seconds: float
+    """The time taken to add the NMR spectra."""
+    turbidity_seconds: float
+    """The time taken to add the turbidities."""
+
+
+@dataclass(frozen=True, slots=True)
+class SimilarReaction:
+    """A reaction with a similar mass spectrum.
+
+    Parameters:
+        reaction_key: The reaction.
+        similarity: The cosine similarity of the binned mass spectra,
+            between ``0`` and ``1``.
+    """
+
+    reaction_key: ReactionKey
+    """The reaction."""
+    similarity: float
+    """The cosine similarity of the binned mass spectra."""
+
+
+@dataclass(frozen=True, slots=True)
+class MassSpectrumParameters:
+    """The parameters used to find the peaks of a mass spectrum.
+
+    See :func:`cagey.ms.get_peaks` for a description of each parameter.
+
+    Parameters:
+        calculated_peak_tolerance:
+            The delta to the predicted cage m/z in which the cage
+            peaks are found.
+        separation_peak_tolerance:
+            The delta to the predicted separation peak m/z
+            in which the separation peaks are found.
+        max_ppm_error:
+            The maximum allowed error in ppm between the calculated and
+            observed cage m/z.
+        max_separation:
+            The maximum allowed error in the separation between the cage
+            and separation peaks.
+        min_peak_height: The minimum peak height allowed.
+        max_between_peak_height:
+            The maximum allowed height for peaks between the cage and
+            separation peaks.
+    """
+
+    calculated_peak_tolerance: float = 0.1
+    """The delta to the predicted cage m/z."""
+    separation_peak_tolerance: float = 0.1
+    """The delta to the predicted separation peak m/z."""
+    max_ppm_error: float = 10
+    """The maximum allowed error in ppm of the cage m/z."""
+    max_separation: float = 0.02
+    """The maximum allowed error in the separation."""
+    min_peak_height: float = 1e4
+    """The minimum peak height allowed."""
+    max_between_peak_height: float = 0.7
+    """The maximum allowed height for peaks between the peaks."""
+
+
+@dataclass(frozen=True, slots=True)
+class NmrParameters:
+    """The parameters used to pick the peaks of an NMR spectrum.
+
+    See :func:`cagey.nmr.get_spectrum` for a description of each
+    parameter.
+
+    Parameters:
+        pthres: The minimum intensity of a picked peak.
+        reference_ppm: The ppm the solvent peak is expected at.
+        reference_atol:
+            How far from `reference_ppm` the solvent peak may be.
+        solvent_ppm: The ppm the solvent peak is referenced to.
+        solvent_peaks: The ppm of peaks which are removed as solvent.
+    """
+
+    pthres: float = 1e4
+    """The minimum intensity of a picked peak."""
+    reference_ppm: float = 7.28
+    """The ppm the solvent peak is expected at."""
+    reference_atol: float = 0.05
+    """How far from `reference_ppm` the solvent peak may be."""
+    solvent_ppm: float = 7.26
+    """The ppm the solvent peak is referenced to."""
+    solvent_peaks: tuple[float, ...] = (7.26, 7.52, 7.00)
+    """The ppm of peaks which are removed as solvent."""
+
+
+@dataclass(frozen=True, slots=True)
+class TurbidityParameters:
+    """The parameters used to find the turbidity state of a reaction.
+
+    See :func:`cagey.turbidity.get_turbid_state` for a description of
+    each parameter.
+
+    Parameters:
+        window_seconds:
+            The length of the rolling window used to decide if a
+            measurement is stable.
+        num_std:
+            The number of standard deviations from the mean of its
+            window within which a measurement is stable.
+        min_stable_seconds: The minimum length of a stable window.
+        dissolved_margin:
+            How far above the dissolved reference the mean turbidity of
+            a stable window may be for the solution to be dissolved.
+    """
+
+    window_seconds: float = 60
+    """The length of the rolling window."""
+    num_std: float = 3
+    """The number of standard deviations a stable measurement is within."""
+    min_stable_seconds: float = 60
+    """The minimum length of a stable window."""
+    dissolved_margin: float = 1
+    """How far above the dissolved reference a dissolved solution may be."""
+
+
+AnalysisParameters: TypeAlias = (
+    MassSpectrumParameters | NmrParameters | TurbidityParameters
+)
@@ -0,0 +1,464 @@
+import importlib
+import math
+import multiprocessing
+import multiprocessing.forkserver
+import os
+import queue
+import statistics
+import time
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator, Sequence, Sized
+from contextlib import contextmanager
+from functools import partial
+from itertools import islice
+from multiprocessing.pool import Pool
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Generic, Self, TypeVar
+
+_T = TypeVar("_T")
+_R = TypeVar("_R")
+
+_MEMINFO = Path("/proc/meminfo")
+
+WORKER_MODULES = (
+    "cagey._internal.ms",
+    "cagey._internal.nmr",
+    "cagey._internal.turbidity",
+)
+"""The modules imported once for every worker of a :class:`WorkerPool`."""
+
+THREAD_VARIABLES = (
+    "POLARS_MAX_THREADS",
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+"""The environment variables which set the threads of polars and BLAS."""
+
+
+class WorkerPool:
+    """A pool of processes which stay warm between tasks.
+
+    The modules in `modules` are imported once, before any worker
+    starts, so that workers do not each spend seconds importing RDKit,
+    pyopenms and nmrglue. Where available, workers are forked from a
+    server process which holds these modules and nothing else, so the
+    pool can be created at any time, even after polars has started its
+    threads, and workers which are replaced start warm too.
+
+    Tasks are sent to workers in chunks. The size of the chunks is
+    chosen from the time taken by the tasks which have finished, so
+    that each chunk takes about `chunk_seconds`: slow tasks, such as
+    running MZmine, are sent one at a time so that workers finish
+    together, and fast tasks are batched so that sending them does
+    not take longer than running them.
+
+    Workers are replaced after running `max_chunks_per_worker` chunks,
+    so that memory leaked by a worker, or held by its caches, is given
+    back to the system.
+
+    The `cpus` are shared between the workers: each worker gets
+    :attr:`threads` of them, and polars and the BLAS libraries used by
+    numpy in the worker are limited to that many threads. Otherwise
+    each of them starts a thread for every CPU in every worker, and
+    the workers spend more time switching between threads than
+    working. Programs run by the workers, such as MZmine, should be
+    told to use :attr:`threads` threads too. The server which workers
+    are forked from keeps the thread counts of the first pool which
+    started it.
+
+    Examples:
+        .. code-block:: python
+
+            import cagey
+
+            with cagey.workers.WorkerPool() as pool:
+                results = list(pool.imap_unordered(str, range(100)))
+
+    Parameters:
+        processes: The number of workers. If ``None``, one for each
+            of the `cpus`.
+        cpus: The number of CPUs the workers may use. If ``None``, the
+            CPUs this process may run on, see :func:`available_cpus`.
+        modules: The modules to import before any worker starts.
+        chunk_seconds: The time each chunk of tasks should take.
+        max_chunk_size: The maximum number of tasks in a chunk.
+        max_chunks_per_worker: The number of chunks a worker runs
+            before it is replaced. If ``None``, workers are never
+            replaced.
+    """
+
+    def __init__(  # noqa: PLR0913
+        self,
+        processes: int | None = None,
+        *,
+        cpus: int | None = None,
+        modules: Sequence[str] = WORKER_MODULES,
+        chunk_seconds: float = 0.1,
+        max_chunk_size: int = 256,
+        max_chunks_per_worker: int | None = 100,
+    ) -> None:
+        self.cpus = cpus or available_cpus()
+        """The number of CPUs the workers may use."""
+        self.processes = processes or self.cpus
+        """The number of workers."""
+        self.threads = max(1, self.cpus // self.processes)
+        """The number of threads each worker may use."""
+        self.chunk_seconds = chunk_seconds
+        """The time each chunk of tasks should take."""
+        self.max_chunk_size = max_chunk_size
+        """The maximum number of tasks in a chunk."""
+        start_method = (
+            "forkserver"
+            if "forkserver" in multiprocessing.get_all_start_methods()
+            else None
+        )
+        environment = dict.fromkeys(THREAD_VARIABLES, str(self.threads))
+        # Libraries read the variables when they are imported, so they
+        # are set for the server, which imports them before forking
+        # the workers, as well as in each worker.
+        with _environment(environment):
+            if start_method == "forkserver":
+                # __main__ is preloaded by default, and is needed to
+                # unpickle functions defined in scripts.
+                multiprocessing.forkserver.set_forkserver_preload(
+                    ["__main__", *modules]
+                )
+                multiprocessing.forkserver.ensure_running()
+            self._pool = multiprocessing.get_context(start_method).Pool(
+                self.processes,
+                initializer=_warm_worker,
+                initargs=(environment, tuple(modules)),
+                maxtasksperchild=max_chunks_per_worker,
+            )
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self._pool.terminate()
+        self._pool.join()
+
+    @property
+    def pool(self) -> Pool:
+        """The underlying :class:`multiprocessing.pool.Pool`.
+
+        It can be passed to functions which take a pool, such as
+        :func:`cagey.reprocessing.reprocess`.
+        """
+        return self._pool
+
+    def imap_unordered(
+        self,
+        function: Callable[[_T], _R],
+        items: Iterable[_T],
+        *,
+        admission: "MemoryAdmission[_T] | None" = None,
+    ) -> Iterator[_R]:
+        """Apply a function to every item, in the workers.
+
+        Items are taken from `items` as they are needed, so at most a
+        few chunks for each worker are held in memory at a time.
+
+        Parameters:
+            function: The function, which must be picklable.
+            items: The items, which must be picklable.
+            admission: Decides whether there is enough memory to start
+                each chunk. If ``None``, chunks are started whenever a
+                worker is free.
+
+        Yields:
+            The result of `function` for each item, in the order in
+            which they finish.
+        """
+        # A chunk never holds more than a quarter of the tasks each
+        # worker is expected to run, so that the last chunks do not
+        # leave workers idle.
+        max_chunk_size = self.max_chunk_size
+        if isinstance(items, Sized):
+            max_chunk_size = min(
+                max_chunk_size,
+                max(1, math.ceil(len(items) / (self.processes * 4))),
+            )
+        finished: queue.SimpleQueue[
+            tuple[int, tuple[list[_R], float] | BaseException]
+        ] = queue.SimpleQueue()
+        iterator = iter(items)
+        seconds_per_task: float | None = None
+        waiting: list[_T] = []
+        running = 0
+        exhausted = False
+        while True:
+            while running < self.processes * 2:
+                if not waiting:
+                    chunk_size = (
+                        1
+                        if seconds_per_task is None
+                        else _chunk_size(
+                            seconds_per_task,
+                            self.chunk_seconds,
+                            max_chunk_size,
+                        )
+                    )
+                    waiting = list(islice(iterator, chunk_size))
+                if not waiting:
+                    exhausted = True
+                    break
+                # A chunk is always started when nothing is running, so
+                # that every item is eventually run.
+                job_bytes = _admit(admission, waiting, force=running == 0)
+                if job_bytes is None:
+                    break
+                self._pool.apply_async(
+                    _run_chunk,
+                    (function, waiting),
+                    callback=partial(_put, finished, job_bytes),
+                    error_callback=partial(_put, finished, job_bytes),
+                )
+                waiting = []
+                running += 1
+            if running == 0 and exhausted:
+                return
+            job_bytes, result = finished.get()
+            running -= 1
+            if admission is not None:
+                admission.release(job_bytes)
+            if isinstance(result, BaseException):
+                raise result
+            results, seconds = result
+            # Recent chunks count the most, so that the chunk size
+            # follows the tasks when they get slower or faster.
+            task_seconds = seconds / len(results)
+            seconds_per_task = (
+                task_seconds
+                if seconds_per_task is None
+                else 0.5 * seconds_per_task + 0.5 * task_seconds
+            )
+            yield from results
+
+
+class MemoryAdmission(Generic[_T]):
+    """Admits jobs only while there is memory for them.
+
+    Jobs such as MZmine runs use far more memory than the workers which
+    start them, so running one for every worker can run out of memory.
+    The memory of a job is estimated from the size of its input,
+    using the peak memory of earlier jobs given to :meth:`observe`. A
+    job is started only if the estimated memory of the running jobs
+    stays within `budget_bytes`, and if at least `reserve_bytes` of
+    memory would still be available to the system after it starts, so
+    that fewer jobs run at once when other programs need memory.
+
+    Parameters:
+        input_bytes: Gets the size of the input of a job.
+        budget_bytes: The memory the running jobs may use. If ``None``,
+            the memory available when the admission is made, less
+            `reserve_bytes`.
+        reserve_bytes: The memory to leave for the rest of the system.
+            If ``None``, a tenth of the memory of the machine.
+        default_job_bytes: The estimated memory of a job before any
+            job has been observed.
+        max_history: The number of jobs to base estimates on, most
+            recent first.
+    """
+
+    def __init__(
+        self,
+        input_bytes: Callable[[_T], int],
+        *,
+        budget_bytes: int | None = None,
+        reserve_bytes: int | None = None,
+        default_job_bytes: int = 2 * 2**30,
+        max_history: int = 1000,
+    ) -> None:
+        memory = _memory_info()
+        self.input_bytes = input_bytes
+        """Gets the size of the input of a job."""
+        self.reserve_bytes = (
+            reserve_bytes
+            if reserve_bytes is not None
+            else memory.get("MemTotal", 0) // 10
+        )
+        """The memory to leave for the rest of the system."""
+        self.budget_bytes = budget_bytes
+        """The memory the running jobs may use."""
+        if budget_bytes is None and "MemAvailable" in memory:
+            self.budget_bytes = max(
+                0, memory["MemAvailable"] - self.reserve_bytes
+            )
+        self.default_job_bytes = default_job_bytes
+        """The estimated memory of a job before any job is observed."""
+        self.in_use_bytes = 0
+        """The estimated memory of the running jobs."""
+        self.deferred = 0
+        """The number of times a job was not admitted."""
+        self._history: deque[tuple[int, int]] = deque(maxlen=max_history)
+
+    def observe(self, input_bytes: int, peak_bytes: int) -> None:
+        """Record the peak memory of a job which finished.
+
+        Parameters:
+            input_bytes: The size of the input of the job.
+            peak_bytes: The peak memory of the job.
+        """
+        self._history.append((input_bytes, peak_bytes))
+
+    def estimate(self, job: _T) -> int:
+        """Estimate the peak memory of a job.
+
+        A line is fitted to the peak memory of the observed jobs
+        against the size of their input, and moved up so that no
+        observed job is above it, so estimates err on the side of too
+        much memory.
+
+        Parameters:
+            job: The job.
+
+        Returns:
+            The estimated peak memory of the job.
+        """
+        if not self._history:
+            return self.default_job_bytes
+        sizes, peaks = zip(*self._history, strict=True)
+        if len(set(sizes)) < 2:  # noqa: PLR2004
+            return max(peaks)
+        slope, intercept = statistics.linear_regression(sizes, peaks)
+        slope = max(slope, 0.0)
+        intercept = max(peak - slope * size for size, peak in self._history)
+        return round(intercept + slope * self.input_bytes(job))
+
+    def admit(self, job_bytes: int, *, force: bool = False) -> bool:
+        """Start a job if there is memory for it.
+
+        Parameters:
+            job_bytes: The estimated memory of the job.
+            force: Whether to start the job even without memory for it.
+
+        Returns:
+            Whether the job was admitted, in which case it must be
+            given to :meth:`release` once it finishes.
+        """
+        if not force and (
+            (
+                self.budget_bytes is not None
+                and self.in_use_bytes + job_bytes > self.budget_bytes
+            )
+            or _available_memory() - job_bytes < self.reserve_bytes
+        ):
+            self.deferred += 1
+            return False
+        self.in_use_bytes += job_bytes
+        return True
+
+    def release(self, job_bytes: int) -> None:
+        """Mark an admitted job as finished.
+
+        Parameters:
+            job_bytes: The estimated memory the job was admitted with.
+        """
+        self.in_use_bytes -= job_bytes
+
+
+def _memory_info() -> dict[str, int]:
+    try:
+        lines = _MEMINFO.read_text().splitlines()
+    except OSError:
+        return {}
+    memory = {}
+    for line in lines:
+        name, _, value = line.partition(":")
+        fields = value.split()
+        if fields and fields[0].isdigit():
+            # Values are in kibibytes.
+            memory[name] = int(fields[0]) * 1024
+    return memory
+
+
+def _available_memory() -> float:
+    available = _memory_info().get("MemAvailable")
+    return math.inf if available is None else available
+
+
+def _admit(
+    admission: MemoryAdmission[_T] | None,
+    chunk: list[_T],
+    *,
+    force: bool,
+) -> int | None:
+    if admission is None:
+        return 0
+    job_bytes = sum(map(admission.estimate, chunk))
+    return job_bytes if admission.admit(job_bytes, force=force) else None
+
+
+def _put(
+    finished: queue.SimpleQueue[tuple[int, Any]],
+    job_bytes: int,
+    result: object,
+) -> None:
+    finished.put((job_bytes, result))
+
+
+def _chunk_size(
+    seconds_per_task: float,
+    chunk_seconds: float,
+    max_chunk_size: int,
+) -> int:
+    if seconds_per_task <= 0:
+        return max_chunk_size
+    return max(1, min(max_chunk_size, int(chunk_seconds / seconds_per_task)))
+
+
+def _run_chunk(
+    function: Callable[[_T], _R],
+    chunk: list[_T],
+) -> tuple[list[_R], float]:
+    start = time.perf_counter()
+    results = [function(item) for item in chunk]
+    return results, time.perf_counter() - start
+
+
+def available_cpus() -> int:
+    """Get the number of CPUs this process may run on.
+
+    Returns:
+        The number of CPUs in the affinity mask of this process, which
+        can be fewer than the CPUs of the machine, for example when
+        running under :program:`taskset` or in a container.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+@contextmanager
+def _environment(variables: dict[str, str]) -> Iterator[None]:
+    previous = {name: os.environ.get(name) for name in variables}
+    os.environ.update(variables)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            if value is None:
+                del os.environ[name]
+            else:
+                os.environ[name] = value
+
+
+def _warm_worker(
+    environment: dict[str, str],
+    modules: tuple[str, ...],
+) -> None:
+    os.environ.update(environment)
+    # The modules are already imported if the worker was forked from
+    # a process which imported them.
+    for module in modules:
+        importlib.import_module(module)
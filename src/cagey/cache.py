@@ -0,0 +1,8 @@
+"""Cache the results of database queries."""
+
+from cagey._internal.cache import CacheInfo, QueryCache
+
+__all__ = [
+    "CacheInfo",
+    "QueryCache",
+]
@@ -0,0 +1,7 @@
+"""Export the database to other formats."""
+
+from cagey._internal.export import export_dataset
+
+__all__ = [
+    "export_dataset",
+]
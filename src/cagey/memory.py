@@ -0,0 +1,33 @@
+"""Profiling the memory used by data processing."""
+
+from cagey._internal.memory import (
+    ChildrenPeak,
+    MemoryProfile,
+    RssSample,
+    StageAllocations,
+    children_peak,
+    is_enabled,
+    peak_rss,
+    profile,
+    rss_samples,
+    stage,
+    summarize_files,
+    summarize_stages,
+    write_report,
+)
+
+__all__ = [
+    "ChildrenPeak",
+    "MemoryProfile",
+    "RssSample",
+    "StageAllocations",
+    "children_peak",
+    "is_enabled",
+    "peak_rss",
+    "profile",
+    "rss_samples",
+    "stage",
+    "summarize_files",
+    "summarize_stages",
+    "write_report",
+]
@@ -1,15 +1,29 @@
 """Mass spectrum analysis."""
 
 from cagey._internal.ms import (
+    CageIon,
+    get_cage_ions,
     get_peaks,
+    get_peaks_from_features,
     get_topologies,
     machine_data_to_mzml,
     mzml_to_csv,
+    read_features,
 )
+from cagey._internal.session import SpectrumSession
+from cagey._internal.sweep import TOPOLOGIES, parameter_grid, sweep_peaks
 
 __all__ = [
+    "TOPOLOGIES",
+    "CageIon",
+    "SpectrumSession",
+    "get_cage_ions",
     "get_peaks",
+    "get_peaks_from_features",
     "get_topologies",
     "machine_data_to_mzml",
     "mzml_to_csv",
+    "parameter_grid",
+    "read_features",
+    "sweep_peaks",
 ]
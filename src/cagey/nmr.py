@@ -1,7 +1,17 @@
 """NMR analysis."""
 
-from cagey._internal.nmr import get_spectrum
+from cagey._internal.nmr import (
+    CHLOROFORM_PEAKS,
+    get_reference_shift,
+    get_spectrum,
+    get_spectrum_from_region,
+    read_region,
+)
 
 __all__ = [
+    "CHLOROFORM_PEAKS",
+    "get_reference_shift",
     "get_spectrum",
+    "get_spectrum_from_region",
+    "read_region",
 ]
@@ -0,0 +1,17 @@
+"""Finding the hot spots of data processing."""
+
+from cagey._internal.profiling import (
+    DeterministicProfile,
+    Frame,
+    SamplingProfile,
+    profile_deterministic,
+    profile_sampling,
+)
+
+__all__ = [
+    "DeterministicProfile",
+    "Frame",
+    "SamplingProfile",
+    "profile_deterministic",
+    "profile_sampling",
+]
@@ -2,48 +2,135 @@
 
 from cagey._internal.queries import (
     CreateTablesError,
+    InsertIngestRunError,
     InsertMassSpectrumError,
     InsertNmrSpectrumError,
+    LazyQuery,
     aldehyde_peaks_df,
+    aldehyde_peaks_in_ppm_range,
+    aldehyde_peaks_lazy,
+    changes_since,
     create_tables,
     imine_peaks_df,
+    imine_peaks_in_ppm_range,
+    imine_peaks_lazy,
+    ingest_file_metrics_df,
+    ingest_runs_df,
+    ingest_throughput_df,
+    insert_ingest_run,
     insert_mass_spectrum,
     insert_mass_spectrum_topology_assignments,
     insert_nmr_spectrum,
+    insert_parameter_set,
     insert_precursors,
     insert_reactions,
     insert_turbidity,
+    iter_aldehyde_peaks_batches,
+    iter_imine_peaks_batches,
+    iter_mass_spectrum_peaks_batches,
+    iter_mass_spectrum_topology_assignments_batches,
+    iter_precursors_batches,
+    iter_reaction_summaries_batches,
+    iter_reactions_batches,
+    iter_turbidity_dissolved_references_batches,
+    iter_turbidity_measurements_batches,
+    iter_turbidity_states_batches,
+    latest_cursor,
+    mass_spectrum_features,
     mass_spectrum_peaks,
     mass_spectrum_peaks_df,
+    mass_spectrum_peaks_lazy,
     mass_spectrum_topology_assignments_df,
+    mass_spectrum_topology_assignments_lazy,
+    nmr_spectrum_regions,
+    parameter_set,
+    parameter_sets_df,
+    peaks_in_mz_range,
     precursors_df,
+    precursors_lazy,
     reaction_precursors,
+    reaction_summaries_df,
+    reaction_summaries_lazy,
     reactions_df,
+    reactions_lazy,
+    rebuild_reaction_summaries,
+    reprocessed_mass_spectrum_peaks_df,
+    reprocessed_nmr_peaks_df,
+    reprocessed_reactions_df,
+    reprocessed_turbidities_df,
     turbidity_dissolved_references_df,
+    turbidity_dissolved_references_lazy,
     turbidity_measurements_df,
+    turbidity_measurements_lazy,
     turbidity_states_df,
+    turbidity_states_lazy,
 )
+from cagey._internal.similarity import SpectrumIndex, spectrum_vectors
 
 __all__ = [
     "CreateTablesError",
+    "InsertIngestRunError",
     "InsertMassSpectrumError",
     "InsertNmrSpectrumError",
+    "LazyQuery",
+    "SpectrumIndex",
     "aldehyde_peaks_df",
+    "aldehyde_peaks_in_ppm_range",
+    "aldehyde_peaks_lazy",
+    "changes_since",
     "create_tables",
     "imine_peaks_df",
+    "imine_peaks_in_ppm_range",
+    "imine_peaks_lazy",
+    "ingest_file_metrics_df",
+    "ingest_runs_df",
+    "ingest_throughput_df",
+    "insert_ingest_run",
     "insert_mass_spectrum",
     "insert_mass_spectrum_topology_assignments",
     "insert_nmr_spectrum",
+    "insert_parameter_set",
     "insert_precursors",
     "insert_reactions",
     "insert_turbidity",
+    "iter_aldehyde_peaks_batches",
+    "iter_imine_peaks_batches",
+    "iter_mass_spectrum_peaks_batches",
+    "iter_mass_spectrum_topology_assignments_batches",
+    "iter_precursors_batches",
+    "iter_reaction_summaries_batches",
+    "iter_reactions_batches",
+    "iter_turbidity_dissolved_references_batches",
+    "iter_turbidity_measurements_batches",
+    "iter_turbidity_states_batches",
+    "latest_cursor",
+    "mass_spectrum_features",
     "mass_spectrum_peaks",
     "mass_spectrum_peaks_df",
+    "mass_spectrum_peaks_lazy",
     "mass_spectrum_topology_assignments_df",
+    "mass_spectrum_topology_assignments_lazy",
+    "nmr_spectrum_regions",
+    "parameter_set",
+    "parameter_sets_df",
+    "peaks_in_mz_range",
     "precursors_df",
+    "precursors_lazy",
     "reaction_precursors",
+    "reaction_summaries_df",
+    "reaction_summaries_lazy",
     "reactions_df",
+    "reactions_lazy",
+    "rebuild_reaction_summaries",
+    "reprocessed_mass_spectrum_peaks_df",
+    "reprocessed_nmr_peaks_df",
+    "reprocessed_reactions_df",
+    "reprocessed_turbidities_df",
+    "spectrum_vectors",
     "turbidity_dissolved_references_df",
+    "turbidity_dissolved_references_lazy",
     "turbidity_measurements_df",
+    "turbidity_measurements_lazy",
     "turbidity_states_df",
+    "turbidity_states_lazy",
 ]
@@ -0,0 +1,7 @@
+"""Analyse stored data again with new parameters."""
+
+from cagey._internal.reprocessing import reprocess
+
+__all__ = [
+    "reprocess",
+]
@@ -0,0 +1,21 @@
+"""Synthetic machine data for testing and benchmarking."""
+
+from cagey._internal.testing import (
+    SyntheticReaction,
+    add_plates,
+    write_data,
+    write_ms_csv,
+    write_nmr_pdata,
+    write_tools,
+    write_turbidity_json,
+)
+
+__all__ = [
+    "SyntheticReaction",
+    "add_plates",
+    "write_data",
+    "write_ms_csv",
+    "write_nmr_pdata",
+    "write_tools",
+    "write_turbidity_json",
+]
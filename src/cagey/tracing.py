@@ -0,0 +1,23 @@
+"""Timing the stages of data processing."""
+
+from cagey._internal.tracing import (
+    Span,
+    collect,
+    is_enabled,
+    record,
+    span,
+    summarize,
+    traced,
+    write_chrome_trace,
+)
+
+__all__ = [
+    "Span",
+    "collect",
+    "is_enabled",
+    "record",
+    "span",
+    "summarize",
+    "traced",
+    "write_chrome_trace",
+]
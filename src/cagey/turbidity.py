@@ -4,10 +4,12 @@ from cagey._internal.turbidity import (
     get_aggregated_stability_windows,
     get_stability_windows,
     get_turbid_state,
+    get_turbid_state_from_measurements,
 )
 
 __all__ = [
     "get_aggregated_stability_windows",
     "get_stability_windows",
     "get_turbid_state",
+    "get_turbid_state_from_measurements",
 ]
@@ -0,0 +1,17 @@
+"""Processes which analyse data in parallel."""
+
+from cagey._internal.workers import (
+    THREAD_VARIABLES,
+    WORKER_MODULES,
+    MemoryAdmission,
+    WorkerPool,
+    available_cpus,
+)
+
+__all__ = [
+    "THREAD_VARIABLES",
+    "WORKER_MODULES",
+    "MemoryAdmission",
+    "WorkerPool",
+    "available_cpus",
+]
@@ -0,0 +1,41 @@
+import sqlite3
+
+import pytest
+
+import cagey
+from cagey import Precursor, Reaction, ReactionKey, TurbidState
+
+
+@pytest.fixture
+def connection() -> sqlite3.Connection:
+    connection = sqlite3.connect(":memory:")
+    cagey.queries.create_tables(connection)
+    cagey.queries.insert_precursors(
+        connection,
+        [
+            Precursor("Di1", "O=Cc1cccc(C=O)c1"),
+            Precursor("TriA", "NCCN(CCN)CCN"),
+            Precursor("TriB", "NCCCN(CCCN)CCCN"),
+        ],
+    )
+    cagey.queries.insert_reactions(
+        connection,
+        [
+            Reaction("AB-02-005", 1, 1, "Di1", "TriA"),
+            Reaction("AB-02-005", 1, 2, "Di1", "TriB"),
+            Reaction("AB-02-005", 2, 1, "Di1", "TriA"),
+            Reaction("AB-02-007", 1, 1, "Di1", "TriB"),
+        ],
+    )
+    for plate, formulation_number, hour in ((1, 1, 1), (2, 1, 3)):
+        cagey.queries.insert_turbidity(
+            connection,
+            ReactionKey("AB-02-005", plate, formulation_number),
+            50.0,
+            {
+                f"2023_02_21_{hour:02}_00_00_000000": 10.0,
+                f"2023_02_21_{hour:02}_30_00_000000": 20.0,
+            },
+            TurbidState.DISSOLVED,
+        )
+    return connection
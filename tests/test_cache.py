@@ -0,0 +1,64 @@
+import sqlite3
+from pathlib import Path
+
+import cagey
+from cagey import Precursor
+from cagey.cache import QueryCache
+
+
+def test_cache_hit_and_invalidation(connection: sqlite3.Connection) -> None:
+    cache = QueryCache()
+    first = cache.collect(cagey.queries.precursors_lazy(connection))
+    second = cache.collect(cagey.queries.precursors_lazy(connection))
+    assert first.equals(second)
+    assert cache.info().hits == 1
+    assert cache.info().misses == 1
+
+    cagey.queries.insert_precursors(connection, [Precursor("Di2", "C")])
+    third = cache.collect(cagey.queries.precursors_lazy(connection))
+    assert len(third) == len(first) + 1
+    assert cache.info().misses == 2  # noqa: PLR2004
+
+
+def test_cache_keys_on_filters(connection: sqlite3.Connection) -> None:
+    cache = QueryCache()
+    query = cagey.queries.reactions_lazy(connection)
+    assert len(cache.collect(query.filter(plate=1))) == 3  # noqa: PLR2004
+    assert len(cache.collect(query.filter(plate=2))) == 1
+    assert cache.info().misses == 2  # noqa: PLR2004
+
+
+def test_cache_shared_between_connections(tmp_path: Path) -> None:
+    database = tmp_path / "cagey.db"
+    writer = sqlite3.connect(database)
+    cagey.queries.create_tables(writer)
+    cache = QueryCache()
+    reader = sqlite3.connect(database)
+    assert cache.collect(cagey.queries.precursors_lazy(reader)).is_empty()
+    cache.collect(cagey.queries.precursors_lazy(sqlite3.connect(database)))
+    assert cache.info().hits == 1
+
+    cagey.queries.insert_precursors(writer, [Precursor("Di1", "C")])
+    assert len(cache.collect(cagey.queries.precursors_lazy(reader))) == 1
+
+
+def test_cache_spills_to_disk(
+    connection: sqlite3.Connection,
+    tmp_path: Path,
+) -> None:
+    cache = QueryCache(max_bytes=0, spill_directory=tmp_path)
+    first = cache.collect(
+        cagey.queries.turbidity_measurements_lazy(connection)
+    )
+    assert cache.info().memory_bytes == 0
+    assert cache.info().spilled_bytes > 0
+    assert len(list(tmp_path.iterdir())) == 1
+
+    second = cache.collect(
+        cagey.queries.turbidity_measurements_lazy(connection)
+    )
+    assert first.equals(second)
+    assert cache.info().hits == 1
+
+    cache.clear()
+    assert not list(tmp_path.iterdir())
@@ -0,0 +1,69 @@
+import sqlite3
+from pathlib import Path
+
+import polars as pl
+
+import cagey
+from cagey import Reaction
+
+
+def test_export_dataset(
+    connection: sqlite3.Connection, tmp_path: Path
+) -> None:
+    exported = cagey.export.export_dataset(connection, tmp_path)
+    assert exported["reactions"] == 4  # noqa: PLR2004
+    assert exported["turbidity_measurements"] == 4  # noqa: PLR2004
+    assert (
+        tmp_path / "reactions" / "experiment=AB-02-005" / "plate=1"
+    ).is_dir()
+
+    exported = cagey.export.export_dataset(connection, tmp_path)
+    assert set(exported.values()) == {0}
+
+    cagey.queries.insert_reactions(
+        connection, [Reaction("AB-02-009", 1, 1, "Di1", "TriA")]
+    )
+    exported = cagey.export.export_dataset(connection, tmp_path)
+    assert exported["reactions"] == 1
+
+    reactions = (
+        pl.scan_parquet(
+            tmp_path / "reactions" / "**" / "*.parquet",
+            hive_partitioning=True,
+        )
+        .select(cagey.queries.reactions_df(connection).columns)
+        .sort(["experiment", "plate", "formulation_number"])
+        .collect()
+    )
+    assert reactions.equals(cagey.queries.reactions_df(connection))
+
+
+def test_export_dataset_schema(
+    connection: sqlite3.Connection, tmp_path: Path
+) -> None:
+    cagey.export.export_dataset(connection, tmp_path)
+    measurements = pl.scan_parquet(
+        tmp_path / "turbidity_measurements" / "**" / "*.parquet",
+        hive_partitioning=True,
+    ).collect()
+    df = cagey.queries.turbidity_measurements_df(connection)
+    assert measurements.select(df.columns).schema == df.schema
+
+
+def test_export_dataset_interrupted(
+    connection: sqlite3.Connection, tmp_path: Path
+) -> None:
+    cagey.export.export_dataset(connection, tmp_path)
+    reactions = tmp_path / "reactions"
+    parts = sorted(reactions.rglob("*.parquet"))
+    # A part of a run which did not update the state file is removed,
+    # and a part of the run which did is renamed.
+    orphan = parts[0].with_name("part-0.parquet.tmp")
+    orphan.write_bytes(parts[0].read_bytes())
+    parts[0].rename(parts[0].with_suffix(".parquet.tmp"))
+
+    exported = cagey.export.export_dataset(connection, tmp_path)
+    assert exported["reactions"] == 0
+    assert not orphan.exists()
+    assert sorted(reactions.rglob("*.parquet")) == parts
+    assert not list(reactions.rglob("*.tmp"))
@@ -0,0 +1,27 @@
+import subprocess
+import sys
+
+import cagey
+
+HEAVY_MODULES = ("nmrglue", "polars", "pyopenms", "rdkit")
+
+
+def test_import_is_lazy() -> None:
+    code = (
+        "import sys, cagey; "
+        "from cagey import ReactionKey; "
+        f"print(*(name for name in {HEAVY_MODULES} if name in sys.modules))"
+    )
+    process = subprocess.run(  # noqa: S603
+        [sys.executable, "-c", code],
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+    assert process.stdout.split() == []
+
+
+def test_getattr() -> None:
+    assert cagey.queries.create_tables is not None
+    assert "queries" in dir(cagey)
+    assert all(hasattr(cagey, name) for name in cagey.__all__)
@@ -0,0 +1,102 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import cagey
+from cagey.memory import RssSample
+from cagey.tracing import Span
+
+pytestmark = pytest.mark.skipif(
+    not Path("/proc").exists(), reason="needs /proc"
+)
+
+
+def test_rss_samples() -> None:
+    with subprocess.Popen(
+        [sys.executable, "-c", "import time; time.sleep(10)"]
+    ) as child:
+        try:
+            samples = cagey.memory.rss_samples()
+        finally:
+            child.kill()
+    pids = {sample.pid: sample for sample in samples}
+    assert pids[os.getpid()].rss_bytes > 0
+    assert pids[child.pid].ppid == os.getpid()
+    assert len({sample.time_ns for sample in samples}) == 1
+
+
+def test_children_peak() -> None:
+    def run(num_bytes: int) -> int | None:
+        code = f"data = b'x' * {num_bytes}; import time; time.sleep(0.5)"
+        with cagey.memory.children_peak(interval=0.01) as peak:
+            subprocess.run([sys.executable, "-c", code], check=True)  # noqa: S603
+        return peak.rss_bytes
+
+    large = run(200_000_000)
+    assert large is not None
+    assert large > 200_000_000  # noqa: PLR2004
+    # Each block only measures the programs run inside it.
+    small = run(0)
+    assert small is not None
+    assert small < 100_000_000  # noqa: PLR2004
+
+
+def test_profile(tmp_path: Path) -> None:
+    with cagey.memory.profile(enabled=False) as profile:
+        with cagey.memory.stage("unprofiled"):
+            pass
+        assert not cagey.memory.is_enabled()
+    assert profile.stages == []
+    assert profile.samples == []
+
+    with cagey.memory.profile(interval=0.01) as profile:
+        assert cagey.memory.is_enabled()
+        with cagey.memory.stage("allocate"):
+            held = bytearray(10_000_000)
+    assert not cagey.memory.is_enabled()
+    (stage,) = profile.stages
+    assert stage.name == "allocate"
+    assert stage.peak_bytes >= len(held)
+    assert stage.net_bytes >= len(held)
+    assert stage.top_allocations[0][1] >= len(held)
+    assert profile.samples
+
+    summary = cagey.memory.summarize_stages(profile)
+    assert summary.get_column("name").to_list() == ["allocate"]
+
+    path = tmp_path / "memory.json"
+    cagey.memory.write_report(path, profile, [])
+    with path.open() as file:
+        report = json.load(file)
+    assert report["stages"][0]["name"] == "allocate"
+
+
+def test_summarize_files() -> None:
+    pid = os.getpid()
+    worker = pid + 1
+    jvm = pid + 2
+    profile = cagey.memory.MemoryProfile(
+        samples=[
+            RssSample(10, pid, 1, "cagey", 100),
+            RssSample(10, worker, pid, "cagey", 10),
+            RssSample(10, jvm, worker, "java", 1000),
+            RssSample(20, pid, 1, "cagey", 200),
+            RssSample(20, worker, pid, "cagey", 20),
+        ]
+    )
+    spans = [
+        Span("ms.file", 5, 10, worker, worker, {"path": "a.d"}),
+        Span("ms.get_peaks", 5, 10, worker, worker, {"path": "a.csv"}),
+        Span("nmr.file", 15, 10, pid, pid, {"path": "b"}),
+        Span("turbidity.file", 30, 10, pid, pid, {"path": "c.json"}),
+    ]
+    summary = cagey.memory.summarize_files(profile, spans)
+    assert summary.select("stage", "path", "peak_rss_bytes").rows() == [
+        ("ms", "a.d", 1010),
+        ("nmr", "b", 200),
+        ("turbidity", "c.json", None),
+    ]
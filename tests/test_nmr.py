@@ -1,7 +1,11 @@
 from operator import attrgetter
 from pathlib import Path
 
+import numpy as np
+import pytest
+
 import cagey
+from cagey import NmrRegion
 
 
 def test_nmr_extraction(datadir: Path) -> None:
@@ -26,3 +30,35 @@ def test_nmr_extraction(datadir: Path) -> None:
             (7.384695669802092, 384487.59375),
         ]
     )
+
+
+def _lorentzian_spectrum(peaks: dict[float, float]) -> NmrRegion:
+    region = NmrRegion(np.zeros(20_000), ppm_start=12.0, ppm_step=-0.0005)
+    ppm = region.ppm()
+    for center, height in peaks.items():
+        region.intensities[:] += height / (1 + ((ppm - center) / 0.002) ** 2)
+    return region
+
+
+def test_get_spectrum_from_region() -> None:
+    region = _lorentzian_spectrum({7.30: 1e7, 8.22: 1e6, 10.02: 2e5})
+    spectrum = cagey.nmr.get_spectrum_from_region(region)
+    assert [peak.ppm for peak in spectrum.imine_peaks] == pytest.approx(
+        [8.18], abs=1e-3
+    )
+    assert [peak.ppm for peak in spectrum.aldehyde_peaks] == pytest.approx(
+        [9.98], abs=1e-3
+    )
+    assert cagey.nmr.get_reference_shift(region) == pytest.approx(
+        -0.04, abs=1e-3
+    )
+
+    cropped = cagey.nmr.get_spectrum_from_region(region.crop(6.0, 11.5))
+    assert cropped == spectrum
+
+    shifted = cagey.nmr.get_spectrum_from_region(
+        region, reference_ppm=8.2, solvent_peaks=[]
+    )
+    assert [peak.ppm for peak in shifted.imine_peaks] == pytest.approx(
+        [7.26, 7.30 - 8.22 + 7.26], abs=1e-3
+    )
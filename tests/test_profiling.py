@@ -0,0 +1,59 @@
+import pstats
+import signal
+import time
+from pathlib import Path
+
+import pytest
+
+import cagey
+
+
+def _spin(seconds: float) -> None:
+    end = time.process_time() + seconds
+    while time.process_time() < end:
+        pass
+
+
+def _work() -> None:
+    _spin(0.02)
+
+
+def test_profile_deterministic(tmp_path: Path) -> None:
+    profile = cagey.profiling.profile_deterministic(_work, repeat=3)
+    assert len(profile.seconds) == 3  # noqa: PLR2004
+    hotspots = profile.hotspots()
+    spin = hotspots.filter(function="_spin").row(0, named=True)
+    assert spin["calls"] == 3  # noqa: PLR2004
+    assert spin["file"] == __file__
+    work = hotspots.filter(function="_work").row(0, named=True)
+    assert work["total_seconds"] >= spin["total_seconds"]
+
+    path = tmp_path / "profile.pstats"
+    profile.write(path)
+    assert pstats.Stats(str(path)).total_calls > 0  # type: ignore[attr-defined]
+
+
+@pytest.mark.skipif(
+    not hasattr(signal, "setitimer"), reason="needs signal.setitimer"
+)
+def test_profile_sampling(tmp_path: Path) -> None:
+    profile = cagey.profiling.profile_sampling(_work, repeat=5)
+    assert len(profile.seconds) == 5  # noqa: PLR2004
+    assert profile.stacks
+    assert all(
+        [function for _, _, function in stack[:2]] == ["_work", "_spin"]
+        for stack in profile.stacks
+    )
+    hotspots = profile.hotspots()
+    assert hotspots.get_column("function").to_list() == ["_spin", "_work"]
+    assert hotspots.get_column("total_seconds").sum() == pytest.approx(
+        2 * profile.cpu_seconds
+    )
+    assert signal.getsignal(signal.SIGPROF) == signal.SIG_DFL
+
+    path = tmp_path / "profile.folded"
+    profile.write(path)
+    line = path.read_text().splitlines()[0]
+    stack, count = line.rsplit(" ", 1)
+    assert stack.startswith(f"_work ({__file__}:")
+    assert int(count) > 0
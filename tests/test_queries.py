@@ -0,0 +1,402 @@
+import sqlite3
+from datetime import UTC, datetime
+from pathlib import Path
+
+import numpy as np
+import polars as pl
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+import cagey
+from cagey import (
+    IngestFileMetrics,
+    IngestKind,
+    IngestRun,
+    MassSpectrumPeak,
+    MassSpectrumTopologyAssignment,
+    NmrPeak,
+    NmrRegion,
+    NmrSpectrum,
+    ReactionKey,
+)
+
+
+def test_lazy_filter(connection: sqlite3.Connection) -> None:
+    query = cagey.queries.reactions_lazy(connection).filter(
+        experiment="AB-02-005",
+        plate=1,
+        tri_name=["TriB", "TriC"],
+    )
+    assert "WHERE" in query.sql()
+    df = query.collect()
+    assert df.rows() == [("AB-02-005", 1, 2, "Di1", "TriB")]
+
+
+def test_lazy_select(connection: sqlite3.Connection) -> None:
+    df = (
+        cagey.queries.reactions_lazy(connection)
+        .select("plate", "formulation_number")
+        .filter(experiment="AB-02-005")
+        .collect()
+    )
+    assert df.columns == ["plate", "formulation_number"]
+    assert df.rows() == [(1, 1), (1, 2), (2, 1)]
+
+
+def test_lazy_time_range(connection: sqlite3.Connection) -> None:
+    df = (
+        cagey.queries.turbidity_measurements_lazy(connection)
+        .filter(
+            start_time=datetime(2023, 2, 21, 1, 15, tzinfo=UTC).astimezone(),
+            end_time=datetime(2023, 2, 21, 3, 15, tzinfo=UTC).astimezone(),
+        )
+        .select("plate", "turbidity")
+        .collect()
+    )
+    assert df.rows() == [(1, 20.0), (2, 10.0)]
+
+
+def test_lazy_collect_matches_df(connection: sqlite3.Connection) -> None:
+    assert (
+        cagey.queries.turbidity_measurements_lazy(connection)
+        .collect()
+        .equals(cagey.queries.turbidity_measurements_df(connection))
+    )
+
+
+def test_lazy_unknown_column(connection: sqlite3.Connection) -> None:
+    query = cagey.queries.reactions_lazy(connection)
+    with pytest.raises(ValueError, match="unknown column"):
+        query.select("ppm")
+    with pytest.raises(ValueError, match="unknown column"):
+        query.filter(start_time=datetime.now(tz=UTC))
+
+
+def test_iter_batches(connection: sqlite3.Connection) -> None:
+    batches = list(
+        cagey.queries.iter_turbidity_measurements_batches(
+            connection, batch_size=3
+        )
+    )
+    assert [batch.num_rows for batch in batches] == [3, 1]
+    df = pl.from_arrow(pa.Table.from_batches(batches))
+    assert isinstance(df, pl.DataFrame)
+    assert df.equals(cagey.queries.turbidity_measurements_df(connection))
+
+
+def test_iter_batches_parquet(
+    connection: sqlite3.Connection, tmp_path: Path
+) -> None:
+    query = cagey.queries.turbidity_measurements_lazy(connection)
+    path = tmp_path / "turbidity_measurements.parquet"
+    with pq.ParquetWriter(path, query.arrow_schema()) as writer:
+        for batch in query.iter_batches(3):
+            writer.write_batch(batch)
+    assert pl.read_parquet(path).equals(
+        cagey.queries.turbidity_measurements_df(connection)
+    )
+
+
+def test_reaction_summaries(connection: sqlite3.Connection) -> None:
+    reaction_key = ReactionKey("AB-02-005", 1, 2)
+    cagey.queries.insert_mass_spectrum(
+        connection,
+        reaction_key,
+        [
+            MassSpectrumPeak(6, 4, "H2", 2, 500.0, 500.0, 500.5, 2e5),
+            MassSpectrumPeak(6, 4, "H1", 1, 999.0, 999.0, 1000.0, 3e5),
+        ],
+    )
+    cagey.queries.insert_mass_spectrum_topology_assignments(
+        connection,
+        (
+            MassSpectrumTopologyAssignment(peak.id, "4+6")
+            for peak in cagey.queries.mass_spectrum_peaks(
+                connection, reaction_key
+            )
+        ),
+    )
+    cagey.queries.insert_nmr_spectrum(
+        connection,
+        reaction_key,
+        NmrSpectrum(
+            aldehyde_peaks=[],
+            imine_peaks=[NmrPeak(8.2, 10.0), NmrPeak(8.3, 20.0)],
+        ),
+    )
+    expected = pl.DataFrame(
+        {
+            "formulation_number": [1, 2, 1, 1],
+            "topologies": ["", "4+6", "", ""],
+            "max_intensity_4_plus_6": [None, 3e5, None, None],
+            "imine_peak_count": [0, 2, 0, 0],
+            "max_imine_amplitude": [None, 20.0, None, None],
+            "turbid_state": ["dissolved", None, "dissolved", None],
+        }
+    )
+    summaries = cagey.queries.reaction_summaries_lazy(connection).select(
+        *expected.columns
+    )
+    assert summaries.collect().equals(expected)
+
+    connection.execute("DELETE FROM reaction_summaries")
+    cagey.queries.rebuild_reaction_summaries(connection)
+    assert summaries.collect().equals(expected)
+
+
+def test_reaction_summaries_added_to_old_database(
+    connection: sqlite3.Connection,
+) -> None:
+    expected = cagey.queries.reaction_summaries_df(connection)
+    connection.execute("DROP TABLE reaction_summaries")
+    cagey.queries.create_tables(connection)
+    assert cagey.queries.reaction_summaries_df(connection).equals(expected)
+
+
+def test_changes_since(connection: sqlite3.Connection) -> None:
+    changes = list(cagey.queries.changes_since(connection))
+    assert [(change.reaction_key, change.kind) for change in changes] == [
+        (ReactionKey("AB-02-005", 1, 1), IngestKind.TURBIDITY),
+        (ReactionKey("AB-02-005", 2, 1), IngestKind.TURBIDITY),
+    ]
+    cursor = cagey.queries.latest_cursor(connection)
+    assert cursor == changes[-1].cursor
+    assert not list(cagey.queries.changes_since(connection, cursor))
+
+    reaction_key = ReactionKey("AB-02-007", 1, 1)
+    cagey.queries.insert_mass_spectrum(connection, reaction_key, [])
+    cagey.queries.insert_nmr_spectrum(
+        connection,
+        reaction_key,
+        NmrSpectrum(aldehyde_peaks=[], imine_peaks=[]),
+    )
+    new_changes = list(cagey.queries.changes_since(connection, cursor))
+    assert [(change.reaction_key, change.kind) for change in new_changes] == [
+        (reaction_key, IngestKind.MASS_SPECTRUM),
+        (reaction_key, IngestKind.NMR_SPECTRUM),
+    ]
+    assert [
+        change.kind
+        for change in cagey.queries.changes_since(connection, cursor, limit=1)
+    ] == [IngestKind.MASS_SPECTRUM]
+
+
+def test_peaks_in_mz_range(connection: sqlite3.Connection) -> None:
+    for reaction_key, mzs in (
+        (ReactionKey("AB-02-005", 1, 1), (500.0, 1234.49)),
+        (ReactionKey("AB-02-007", 1, 1), (1234.51, 1234.6)),
+    ):
+        cagey.queries.insert_mass_spectrum(
+            connection,
+            reaction_key,
+            [
+                MassSpectrumPeak(6, 4, "H1", 1, mz - 0.1, mz, 0.5, 1e5)
+                for mz in mzs
+            ],
+        )
+    peaks = cagey.queries.peaks_in_mz_range(connection, 1234.48, 1234.52)
+    assert (
+        peaks.columns
+        == cagey.queries.mass_spectrum_peaks_df(connection).columns
+    )
+    assert peaks.select(
+        "experiment", "formulation_number", "spectrum_mz"
+    ).rows() == [("AB-02-005", 1, 1234.49), ("AB-02-007", 1, 1234.51)]
+    calculated = cagey.queries.peaks_in_mz_range(
+        connection, 1234.38, 1234.42, column="calculated_mz"
+    )
+    assert calculated["spectrum_mz"].to_list() == [1234.49, 1234.51]
+    with pytest.raises(ValueError, match="not an m/z column"):
+        cagey.queries.peaks_in_mz_range(
+            connection,
+            0,
+            1,
+            column="experiment",  # type: ignore[arg-type]
+        )
+
+
+def test_nmr_peaks_in_ppm_range(connection: sqlite3.Connection) -> None:
+    for reaction_key, imine_peaks in (
+        (
+            ReactionKey("AB-02-005", 1, 1),
+            [NmrPeak(8.0, 50.0), NmrPeak(8.2, 10.0)],
+        ),
+        (
+            ReactionKey("AB-02-007", 1, 1),
+            [NmrPeak(8.25, 30.0), NmrPeak(8.4, 30.0)],
+        ),
+    ):
+        cagey.queries.insert_nmr_spectrum(
+            connection,
+            reaction_key,
+            NmrSpectrum(
+                aldehyde_peaks=[NmrPeak(9.9, 5.0)], imine_peaks=imine_peaks
+            ),
+        )
+    peaks = cagey.queries.imine_peaks_in_ppm_range(connection, 8.1, 8.3)
+    assert peaks.columns == cagey.queries.imine_peaks_df(connection).columns
+    assert peaks.select("experiment", "ppm").rows() == [
+        ("AB-02-005", 8.2),
+        ("AB-02-007", 8.25),
+    ]
+    strong = cagey.queries.imine_peaks_in_ppm_range(
+        connection, 8.1, 8.3, min_amplitude=20.0
+    )
+    assert strong["ppm"].to_list() == [8.25]
+    aldehyde = cagey.queries.aldehyde_peaks_in_ppm_range(connection, 9.8, 10)
+    assert len(aldehyde) == 2  # noqa: PLR2004
+
+
+def test_mass_spectrum_features(connection: sqlite3.Connection) -> None:
+    features = pl.DataFrame({"mz": [500.0, 1000.5], "height": [2e4, 3e5]})
+    reaction_key = ReactionKey("AB-02-005", 1, 1)
+    cagey.queries.insert_mass_spectrum(
+        connection, reaction_key, [], features=features
+    )
+    cagey.queries.insert_mass_spectrum(
+        connection, ReactionKey("AB-02-005", 1, 2), []
+    )
+    ((stored_key, stored),) = cagey.queries.mass_spectrum_features(connection)
+    assert stored_key == reaction_key
+    assert stored.equals(features)
+    assert not list(
+        cagey.queries.mass_spectrum_features(
+            connection, [ReactionKey("AB-02-007", 1, 1)]
+        )
+    )
+
+
+def test_nmr_spectrum_regions(connection: sqlite3.Connection) -> None:
+    region = NmrRegion(
+        np.linspace(0, 1e5, 101), ppm_start=11.0, ppm_step=-0.05
+    )
+    reaction_key = ReactionKey("AB-02-005", 1, 1)
+    cagey.queries.insert_nmr_spectrum(
+        connection,
+        reaction_key,
+        NmrSpectrum(aldehyde_peaks=[], imine_peaks=[]),
+        region=region,
+    )
+    ((stored_key, stored),) = cagey.queries.nmr_spectrum_regions(connection)
+    assert stored_key == reaction_key
+    assert np.array_equal(stored.intensities, region.intensities)
+    assert (stored.ppm_start, stored.ppm_step) == (11.0, -0.05)
+    assert stored.reference_shift is None
+
+
+def test_ingest_runs(connection: sqlite3.Connection) -> None:
+    started_at = datetime(2024, 1, 1, 12, tzinfo=UTC)
+    run_id = cagey.queries.insert_ingest_run(
+        connection,
+        IngestRun(
+            command="new",
+            cagey_version="1.0",
+            started_at=started_at,
+            wall_seconds=10.0,
+            processes=2,
+            reactions_seconds=1.0,
+            mass_spectra_seconds=4.0,
+            nmr_seconds=3.0,
+            turbidity_seconds=2.0,
+        ),
+        [
+            IngestFileMetrics(
+                IngestKind.MASS_SPECTRUM, "a.d", 100, 3.0, 2, memory_bytes=10
+            ),
+            IngestFileMetrics(
+                IngestKind.MASS_SPECTRUM, "b.d", 200, 1.0, None, failed=True
+            ),
+            IngestFileMetrics(IngestKind.TURBIDITY, "c.json", 50, 0.5, None),
+        ],
+    )
+    cagey.queries.insert_ingest_run(
+        connection,
+        IngestRun(
+            command="insert",
+            cagey_version="1.0",
+            started_at=datetime(2024, 1, 1, 18, tzinfo=UTC),
+            wall_seconds=2.0,
+            processes=2,
+            reactions_seconds=None,
+            mass_spectra_seconds=0.0,
+            nmr_seconds=0.0,
+            turbidity_seconds=0.0,
+        ),
+        [],
+    )
+
+    runs = cagey.queries.ingest_runs_df(connection)
+    assert runs.row(0, named=True) == {
+        "id": run_id,
+        "command": "new",
+        "cagey_version": "1.0",
+        "started_at": started_at,
+        "wall_seconds": 10.0,
+        "processes": 2,
+        "reactions_seconds": 1.0,
+        "mass_spectra_seconds": 4.0,
+        "nmr_seconds": 3.0,
+        "turbidity_seconds": 2.0,
+        "files": 3,
+        "failures": 1,
+        "bytes_read": 350,
+        "peaks": 2,
+        "worker_utilization": 0.5,
+    }
+    assert runs.row(1, named=True)["worker_utilization"] is None
+
+    files = cagey.queries.ingest_file_metrics_df(connection)
+    assert files.get_column("failed").to_list() == [False, True, False]
+    assert files.get_column("memory_bytes").to_list() == [10, None, None]
+
+    throughput = cagey.queries.ingest_throughput_df(connection, "1d")
+    assert throughput.select(
+        "runs", "files", "wall_seconds", "files_per_second"
+    ).rows() == [(2, 3, 12.0, 0.25)]
+
+
+def test_memory_bytes_added_to_old_database(
+    connection: sqlite3.Connection,
+) -> None:
+    # The table as it was made before memory was measured.
+    connection.executescript(
+        """
+        DROP TABLE ingest_file_metrics;
+        CREATE TABLE ingest_file_metrics (
+            id INTEGER PRIMARY KEY,
+            run_id INTEGER NOT NULL,
+            kind TEXT CHECK (
+                kind IN ('mass_spectrum', 'nmr_spectrum', 'turbidity')
+            ) NOT NULL,
+            path TEXT NOT NULL,
+            bytes_read INTEGER NOT NULL,
+            seconds REAL NOT NULL,
+            peaks INTEGER,
+            failed INTEGER CHECK (failed IN (0, 1)) NOT NULL,
+            FOREIGN KEY (run_id) REFERENCES ingest_runs (id)
+        );
+        """
+    )
+    cagey.queries.create_tables(connection)
+    cagey.queries.insert_ingest_run(
+        connection,
+        IngestRun(
+            command="new",
+            cagey_version="1.0",
+            started_at=datetime(2024, 1, 1, 12, tzinfo=UTC),
+            wall_seconds=10.0,
+            processes=2,
+            reactions_seconds=1.0,
+            mass_spectra_seconds=4.0,
+            nmr_seconds=3.0,
+            turbidity_seconds=2.0,
+        ),
+        [
+            IngestFileMetrics(
+                IngestKind.MASS_SPECTRUM, "a.d", 100, 3.0, 2, memory_bytes=10
+            ),
+        ],
+    )
+    files = cagey.queries.ingest_file_metrics_df(connection)
+    assert files.get_column("memory_bytes").to_list() == [10]
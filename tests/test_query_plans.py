@@ -0,0 +1,73 @@
+import sqlite3
+from datetime import UTC, datetime
+from typing import Any
+
+import pytest
+
+import cagey
+
+LAZY_QUERIES = sorted(
+    name for name in cagey.queries.__all__ if name.endswith("_lazy")
+)
+
+
+def query_plan(query: cagey.queries.LazyQuery) -> list[str]:
+    return [
+        detail
+        for _, _, _, detail in query.connection.execute(
+            f"EXPLAIN QUERY PLAN {query.sql()}", query.parameters
+        )
+    ]
+
+
+@pytest.mark.parametrize("name", LAZY_QUERIES)
+def test_no_table_scans(connection: sqlite3.Connection, name: str) -> None:
+    query = getattr(cagey.queries, name)(connection)
+    for detail in query_plan(query):
+        assert not detail.startswith("SCAN ") or " USING " in detail, detail
+
+
+FILTERS: list[dict[str, Any]] = [
+    {"experiment": "AB-02-005"},
+    {"di_name": "Di1"},
+    {"tri_name": ["TriA", "TriB"]},
+]
+
+
+def _filtered_queries() -> list[tuple[str, dict[str, Any]]]:
+    # Queries are only built to find their columns, so they need no
+    # tables.
+    connection = sqlite3.connect(":memory:")
+    return [
+        (name, filters)
+        for name in LAZY_QUERIES
+        for filters in FILTERS
+        if set(filters).issubset(
+            getattr(cagey.queries, name)(connection).columns
+        )
+    ]
+
+
+@pytest.mark.parametrize(("name", "filters"), _filtered_queries())
+def test_no_scans_when_filtered(
+    connection: sqlite3.Connection,
+    name: str,
+    filters: dict[str, Any],
+) -> None:
+    query = getattr(cagey.queries, name)(connection)
+    for detail in query_plan(query.filter(**filters)):
+        assert not detail.startswith("SCAN "), detail
+
+
+def test_time_filter_uses_index(connection: sqlite3.Connection) -> None:
+    query = cagey.queries.turbidity_measurements_lazy(connection).filter(
+        start_time=datetime(2023, 2, 21, 1, 15, tzinfo=UTC),
+        end_time=datetime(2023, 2, 21, 3, 15, tzinfo=UTC),
+    )
+    plan = query_plan(query)
+    assert any(
+        "turbidity_measurement_julianday_index" in detail
+        and "<expr>>? AND <expr><?" in detail
+        for detail in plan
+    ), plan
+    assert not any("TEMP B-TREE" in detail for detail in plan), plan
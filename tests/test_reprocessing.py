@@ -0,0 +1,188 @@
+import multiprocessing
+import sqlite3
+from dataclasses import asdict
+
+import numpy as np
+import polars as pl
+import pytest
+
+import cagey
+from cagey import (
+    MassSpectrumParameters,
+    NmrParameters,
+    NmrRegion,
+    NmrSpectrum,
+    ReactionKey,
+    Row,
+    TurbidityParameters,
+    TurbidState,
+)
+
+# A cage peak and its separation peak. Any cage is found in them when
+# the tolerances are loose enough, and none with the default ones.
+FEATURES = pl.DataFrame({"mz": [1000.0, 1001.0078], "height": [1e5, 1e5]})
+LOOSE = MassSpectrumParameters(
+    calculated_peak_tolerance=1e4, max_ppm_error=1e12
+)
+
+
+def test_parameter_sets(connection: sqlite3.Connection) -> None:
+    nmr = cagey.queries.insert_parameter_set(
+        connection, NmrParameters(pthres=1e5)
+    )
+    turbidity = cagey.queries.insert_parameter_set(
+        connection, TurbidityParameters(num_std=2)
+    )
+    assert nmr != turbidity
+    assert nmr == cagey.queries.insert_parameter_set(
+        connection, NmrParameters(pthres=100_000)
+    )
+    assert cagey.queries.parameter_set(connection, nmr) == NmrParameters(
+        pthres=1e5
+    )
+    assert cagey.queries.parameter_sets_df(connection)["kind"].to_list() == [
+        "nmr_spectrum",
+        "turbidity",
+    ]
+    with pytest.raises(KeyError):
+        cagey.queries.parameter_set(connection, 100)
+
+
+def test_reprocess_mass_spectra(connection: sqlite3.Connection) -> None:
+    reactions = [
+        ReactionKey("AB-02-005", 1, 1),
+        ReactionKey("AB-02-005", 1, 2),
+    ]
+    for reaction_key in reactions:
+        cagey.queries.insert_mass_spectrum(
+            connection, reaction_key, [], features=FEATURES
+        )
+
+    default = cagey.reprocessing.reprocess(
+        connection, MassSpectrumParameters()
+    )
+    loose = cagey.reprocessing.reprocess(connection, LOOSE)
+    assert cagey.queries.reprocessed_mass_spectrum_peaks_df(
+        connection, default
+    ).is_empty()
+    assert len(
+        cagey.queries.reprocessed_reactions_df(connection, default)
+    ) == len(reactions)
+
+    peaks = cagey.queries.reprocessed_mass_spectrum_peaks_df(connection, loose)
+    expected = list(
+        cagey.ms.get_peaks_from_features(
+            FEATURES, "O=Cc1cccc(C=O)c1", "NCCN(CCN)CCN", **asdict(LOOSE)
+        )
+    )
+    topologies = {
+        assignment.topology
+        for assignment in cagey.ms.get_topologies(
+            Row(i, peak) for i, peak in enumerate(expected)
+        )
+    }
+    assert topologies
+    first = peaks.filter(pl.col("formulation_number") == 1)
+    assert sorted(
+        first.select("tri_count", "di_count", "adduct", "charge").rows()
+    ) == sorted(
+        (peak.tri_count, peak.di_count, peak.adduct, peak.charge)
+        for peak in expected
+    )
+    assert set(first["topology"].drop_nulls()) == topologies
+
+    # Reprocessing again replaces the results.
+    cagey.reprocessing.reprocess(connection, LOOSE, reactions[:1])
+    assert cagey.queries.reprocessed_mass_spectrum_peaks_df(
+        connection, loose
+    ).equals(peaks)
+
+
+def test_reprocess_reaction_with_two_spectra(
+    connection: sqlite3.Connection,
+) -> None:
+    reaction_key = ReactionKey("AB-02-005", 1, 1)
+    for _ in range(2):
+        cagey.queries.insert_mass_spectrum(
+            connection, reaction_key, [], features=FEATURES
+        )
+
+    default = cagey.reprocessing.reprocess(
+        connection, MassSpectrumParameters()
+    )
+    loose = cagey.reprocessing.reprocess(connection, LOOSE)
+    assert (
+        len(cagey.queries.reprocessed_reactions_df(connection, default)) == 1
+    )
+    peaks = cagey.queries.reprocessed_mass_spectrum_peaks_df(connection, loose)
+    expected = list(
+        cagey.ms.get_peaks_from_features(
+            FEATURES, "O=Cc1cccc(C=O)c1", "NCCN(CCN)CCN", **asdict(LOOSE)
+        )
+    )
+    assert len(peaks) == 2 * len(expected)
+
+
+def test_reprocess_nmr_spectra(connection: sqlite3.Connection) -> None:
+    region = NmrRegion(np.zeros(20_000), ppm_start=12.0, ppm_step=-0.0005)
+    ppm = region.ppm()
+    for center, height in {7.30: 1e7, 8.22: 1e6, 10.02: 2e5}.items():
+        region.intensities[:] += height / (1 + ((ppm - center) / 0.002) ** 2)
+    cagey.queries.insert_nmr_spectrum(
+        connection,
+        ReactionKey("AB-02-005", 1, 1),
+        NmrSpectrum(aldehyde_peaks=[], imine_peaks=[]),
+        region=region.crop(6.0, 11.5),
+    )
+
+    default = cagey.reprocessing.reprocess(connection, NmrParameters())
+    peaks = cagey.queries.reprocessed_nmr_peaks_df(connection, default)
+    assert peaks["kind"].to_list() == ["aldehyde", "imine"]
+    assert peaks["ppm"].to_list() == pytest.approx([9.98, 8.18], abs=1e-3)
+
+    # The solvent peak cannot be found, so the spectrum is skipped.
+    missing = cagey.reprocessing.reprocess(
+        connection, NmrParameters(reference_ppm=6.5)
+    )
+    assert cagey.queries.reprocessed_reactions_df(
+        connection, missing
+    ).is_empty()
+
+
+def test_reprocess_turbidities(connection: sqlite3.Connection) -> None:
+    default = cagey.reprocessing.reprocess(connection, TurbidityParameters())
+    states = cagey.queries.reprocessed_turbidities_df(connection, default)
+    expected = cagey.turbidity.get_turbid_state(
+        {
+            "2023_02_21_01_00_00_000000": 10.0,
+            "2023_02_21_01_30_00_000000": 20.0,
+        },
+        50.0,
+    )
+    assert states["state"].to_list() == [expected.value] * 2
+
+    dissolved = cagey.reprocessing.reprocess(
+        connection,
+        TurbidityParameters(min_stable_seconds=0),
+        [ReactionKey("AB-02-005", 2, 1)],
+    )
+    assert cagey.queries.reprocessed_turbidities_df(
+        connection, dissolved
+    ).select("plate", "state").rows() == [(2, TurbidState.DISSOLVED.value)]
+    assert cagey.queries.reprocessed_turbidities_df(
+        connection, default
+    ).equals(states)
+
+
+def test_reprocess_in_pool(connection: sqlite3.Connection) -> None:
+    serial = cagey.reprocessing.reprocess(
+        connection, TurbidityParameters(), commit=False
+    )
+    expected = cagey.queries.reprocessed_turbidities_df(connection, serial)
+    with multiprocessing.get_context("spawn").Pool(2) as pool:
+        cagey.reprocessing.reprocess(
+            connection, TurbidityParameters(), pool=pool, batch_size=1
+        )
+    assert cagey.queries.reprocessed_turbidities_df(connection, serial).equals(
+        expected
+    )
@@ -0,0 +1,82 @@
+import sqlite3
+from dataclasses import asdict
+from pathlib import Path
+
+import polars as pl
+import pytest
+
+import cagey
+from cagey import MassSpectrumParameters, ReactionKey, Row
+
+# A cage peak and its separation peak, among features which get in the
+# way when the tolerances are loose.
+FEATURES = pl.DataFrame(
+    {
+        "mz": [1000.0, 1001.0078, 1000.5, 1000.25, 1200.0],
+        "height": [1e5, 1e5, 2e4, 8e4, 5e5],
+    }
+)
+PARAMETERS = [
+    MassSpectrumParameters(),
+    MassSpectrumParameters(calculated_peak_tolerance=1e4, max_ppm_error=1e12),
+    MassSpectrumParameters(
+        calculated_peak_tolerance=1e4,
+        max_ppm_error=1e12,
+        max_between_peak_height=0.1,
+    ),
+    MassSpectrumParameters(
+        calculated_peak_tolerance=1e4,
+        separation_peak_tolerance=0.3,
+        max_ppm_error=1e12,
+        max_separation=1.0,
+        min_peak_height=5e4,
+    ),
+]
+
+
+def test_spectrum_session(connection: sqlite3.Connection) -> None:
+    reaction_key = ReactionKey("AB-02-005", 1, 1)
+    cagey.queries.insert_mass_spectrum(
+        connection, reaction_key, [], features=FEATURES
+    )
+    session = cagey.ms.SpectrumSession.from_database(connection)
+    assert session.reactions == [reaction_key]
+    assert session.features(reaction_key).equals(FEATURES)
+    precursors = session.precursors(reaction_key)
+
+    for parameters in PARAMETERS:
+        expected = list(
+            cagey.ms.get_peaks_from_features(
+                FEATURES,
+                precursors.di_smiles,
+                precursors.tri_smiles,
+                **asdict(parameters),
+            )
+        )
+        assert session.peaks(reaction_key, parameters) == expected
+        rows, assignments = session.topologies(reaction_key, parameters)
+        assert rows == [Row(i, peak) for i, peak in enumerate(expected)]
+        assert assignments == list(cagey.ms.get_topologies(rows))
+    assert any(session.peaks(reaction_key, PARAMETERS[1]))
+
+    with pytest.raises(KeyError):
+        session.peaks(ReactionKey("AB-02-005", 1, 2))
+
+
+def test_spectrum_session_from_csv(
+    connection: sqlite3.Connection, tmp_path: Path
+) -> None:
+    path = tmp_path / "AB-02-005_01_02.csv"
+    FEATURES.write_csv(path)
+    session = cagey.ms.SpectrumSession.from_csv(connection, [path])
+    reaction_key = ReactionKey("AB-02-005", 1, 2)
+    assert session.reactions == [reaction_key]
+    precursors = session.precursors(reaction_key)
+    assert session.peaks(reaction_key, PARAMETERS[1]) == list(
+        cagey.ms.get_peaks(
+            path,
+            precursors.di_smiles,
+            precursors.tri_smiles,
+            **asdict(PARAMETERS[1]),
+        )
+    )
@@ -0,0 +1,70 @@
+import sqlite3
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import cagey
+from cagey import MassSpectrumPeak, ReactionKey
+
+SPECTRA = {
+    ReactionKey("AB-02-005", 1, 1): (500.0, 1000.0, 1500.0),
+    ReactionKey("AB-02-005", 1, 2): (500.0, 1000.0, 2500.0),
+    ReactionKey("AB-02-005", 2, 1): (500.0, 1000.0, 1500.0),
+    ReactionKey("AB-02-007", 1, 1): (3000.0, 3500.0),
+}
+
+
+@pytest.fixture
+def spectra(connection: sqlite3.Connection) -> sqlite3.Connection:
+    for reaction_key, mzs in SPECTRA.items():
+        cagey.queries.insert_mass_spectrum(
+            connection,
+            reaction_key,
+            [
+                MassSpectrumPeak(6, 4, "H1", 1, mz, mz, mz + 1, 1e4)
+                for mz in mzs
+            ],
+        )
+    return connection
+
+
+def test_spectrum_vectors(spectra: sqlite3.Connection) -> None:
+    reactions, vectors = cagey.queries.spectrum_vectors(
+        spectra, min_mz=0, max_mz=4000, num_bins=8
+    )
+    assert [ReactionKey(*row) for row in reactions.iter_rows()] == list(
+        SPECTRA
+    )
+    assert vectors.shape == (4, 8)
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1)
+    assert np.allclose(vectors[0], vectors[2])
+
+
+@pytest.mark.parametrize("num_lists", [0, 2])
+def test_similar_reactions(
+    spectra: sqlite3.Connection,
+    tmp_path: Path,
+    num_lists: int,
+) -> None:
+    cagey.queries.SpectrumIndex.build(
+        spectra, tmp_path, num_bins=64, num_lists=num_lists
+    )
+    index = cagey.queries.SpectrumIndex(tmp_path)
+    assert len(index) == len(SPECTRA)
+    similar = index.similar_reactions(ReactionKey("AB-02-005", 1, 1), k=2)
+    assert [s.reaction_key for s in similar] == [
+        ReactionKey("AB-02-005", 2, 1),
+        ReactionKey("AB-02-005", 1, 2),
+    ]
+    assert similar[0].similarity == pytest.approx(1)
+    assert similar[1].similarity == pytest.approx(2 / 3)
+
+    approximate = index.similar_reactions(
+        ReactionKey("AB-02-007", 1, 1), k=3, num_probes=1
+    )
+    exact = index.similar_reactions(ReactionKey("AB-02-007", 1, 1), k=3)
+    assert len(approximate) <= len(exact) == 3  # noqa: PLR2004
+
+    with pytest.raises(KeyError):
+        index.similar_reactions(ReactionKey("AB-02-009", 1, 1))
@@ -0,0 +1,126 @@
+import multiprocessing
+from collections import Counter
+from dataclasses import asdict, astuple
+
+import numpy as np
+import polars as pl
+
+import cagey
+from cagey import MassSpectrumParameters, Precursors, Row
+
+PRECURSORS = Precursors("O=Cc1cccc(C=O)c1", "NCCN(CCN)CCN")
+H_MONO_WEIGHT = 1.00782503207
+
+
+def _spectrum(rng: np.random.Generator, cage_mz: list[float]) -> pl.DataFrame:
+    mz = list(rng.uniform(300, 3000, 100))
+    height = list(rng.uniform(5e3, 1e6, 100))
+    for mz_ in rng.choice(cage_mz, 10):
+        charge = rng.choice([1, 2, 3, 4])
+        peak = mz_ * (1 + rng.normal(0, 5e-6))
+        mz += [
+            peak,
+            peak + H_MONO_WEIGHT / charge + rng.normal(0, 0.01),
+            peak + 0.3 * H_MONO_WEIGHT / charge,
+        ]
+        height += list(rng.uniform(5e3, 1e6, 3))
+    order = rng.permutation(len(mz))
+    return pl.DataFrame(
+        {"mz": np.array(mz)[order], "height": np.array(height)[order]}
+    )
+
+
+def _expected(
+    spectra: list[pl.DataFrame], parameters: MassSpectrumParameters
+) -> list[tuple[str, int, int]]:
+    num_reactions: Counter[str] = Counter()
+    num_peaks: Counter[str] = Counter()
+    for features in spectra:
+        peaks = cagey.ms.get_peaks_from_features(
+            features,
+            PRECURSORS.di_smiles,
+            PRECURSORS.tri_smiles,
+            **asdict(parameters),
+        )
+        topologies = [
+            assignment.topology
+            for assignment in cagey.ms.get_topologies(
+                Row(i, peak) for i, peak in enumerate(peaks)
+            )
+        ]
+        num_peaks.update(topologies)
+        num_reactions.update(set(topologies))
+    return [
+        (topology, num_reactions[topology], num_peaks[topology])
+        for topology in cagey.ms.TOPOLOGIES
+    ]
+
+
+def test_sweep_peaks() -> None:
+    # The m/z of every cage, found by matching one with each charge
+    # using very loose parameters.
+    probe = pl.DataFrame(
+        {
+            "mz": [1000 + H_MONO_WEIGHT / charge for charge in (4, 3, 2, 1)]
+            + [1000.0],
+            "height": [1e5] * 5,
+        }
+    )
+    cage_mz = sorted(
+        {
+            peak.calculated_mz
+            for peak in cagey.ms.get_peaks_from_features(
+                probe,
+                PRECURSORS.di_smiles,
+                PRECURSORS.tri_smiles,
+                calculated_peak_tolerance=1e5,
+                separation_peak_tolerance=0.01,
+                max_ppm_error=1e12,
+                max_between_peak_height=1e3,
+            )
+        }
+    )
+    rng = np.random.default_rng(0)
+    spectra = [_spectrum(rng, cage_mz) for _ in range(4)]
+    grid = cagey.ms.parameter_grid(
+        calculated_peak_tolerance=[0.02, 0.5],
+        separation_peak_tolerance=[0.01, 0.1],
+        max_ppm_error=[2, 10],
+        max_separation=[0.005, 0.02],
+        min_peak_height=[1e4, 2e5],
+        max_between_peak_height=[0.3, 0.7],
+    )
+    counts = cagey.ms.sweep_peaks(
+        ((features, PRECURSORS) for features in spectra), grid
+    )
+    assert len(counts) == len(grid) * len(cagey.ms.TOPOLOGIES)
+    assert counts["num_peaks"].sum() > 0
+    points = counts.iter_slices(len(cagey.ms.TOPOLOGIES))
+    for parameters, point in zip(grid, points, strict=True):
+        assert point.row(0)[:6] == astuple(parameters)
+        assert point.select(
+            "topology", "num_reactions", "num_peaks"
+        ).rows() == _expected(spectra, parameters)
+
+
+def test_sweep_peaks_in_pool() -> None:
+    rng = np.random.default_rng(1)
+    spectra = [
+        pl.DataFrame(
+            {
+                "mz": rng.uniform(300, 3000, 1000),
+                "height": rng.uniform(5e3, 1e6, 1000),
+            }
+        )
+        for _ in range(4)
+    ]
+    grid = cagey.ms.parameter_grid(
+        calculated_peak_tolerance=[0.1, 1.0], max_ppm_error=[10, 1000]
+    )
+    serial = cagey.ms.sweep_peaks(
+        ((features, PRECURSORS) for features in spectra), grid
+    )
+    with multiprocessing.get_context("spawn").Pool(2) as pool:
+        assert cagey.ms.sweep_peaks(
+            ((features, PRECURSORS) for features in spectra), grid, pool=pool
+        ).equals(serial)
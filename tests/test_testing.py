@@ -0,0 +1,108 @@
+import json
+import os
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+import cagey
+from cagey import ReactionKey, Row, TurbidState
+
+
+@pytest.fixture
+def plates() -> sqlite3.Connection:
+    connection = sqlite3.connect(":memory:")
+    cagey.queries.create_tables(connection)
+    cagey.reactions.add_precursors(connection)
+    cagey.testing.add_plates(connection, 2, seed=1)
+    return connection
+
+
+def test_add_plates(plates: sqlite3.Connection) -> None:
+    reactions = cagey.queries.reactions_df(plates)
+    assert len(reactions) == 96  # noqa: PLR2004
+    assert reactions.get_column("plate").unique().to_list() == [1, 2]
+    assert reactions.get_column("formulation_number").max() == 48  # noqa: PLR2004
+
+
+def test_write_data(plates: sqlite3.Connection, tmp_path: Path) -> None:
+    reactions = [ReactionKey("SY-01-001", plate, 1) for plate in (1, 2)]
+    reactions += [ReactionKey("SY-01-001", 1, i) for i in range(2, 12)]
+    synthetic_reactions = cagey.testing.write_data(
+        tmp_path, plates, reactions=reactions, seed=3
+    )
+    precursors = dict(cagey.queries.reaction_precursors(plates, reactions))
+    for synthetic_reaction in synthetic_reactions:
+        reaction_key = synthetic_reaction.reaction_key
+        name = (
+            f"{reaction_key.experiment}_{reaction_key.plate:02d}"
+            f"_{reaction_key.formulation_number:02d}"
+        )
+
+        peaks = cagey.ms.get_peaks(
+            tmp_path / "ms" / f"{name}.d" / "AcqData" / "features.csv",
+            precursors[reaction_key].di_smiles,
+            precursors[reaction_key].tri_smiles,
+        )
+        topologies = {
+            assignment.topology
+            for assignment in cagey.ms.get_topologies(
+                Row(id_, peak) for id_, peak in enumerate(peaks)
+            )
+        }
+        assert sorted(topologies) == list(synthetic_reaction.topologies)
+
+        title = (
+            tmp_path
+            / "nmr"
+            / name[:-3]
+            / str(reaction_key.formulation_number)
+            / "pdata"
+            / "1"
+            / "title"
+        )
+        assert ReactionKey.from_title_file(title) == reaction_key
+        spectrum = cagey.nmr.get_spectrum(title.parent)
+        assert [peak.ppm for peak in spectrum.aldehyde_peaks] == pytest.approx(
+            sorted(synthetic_reaction.aldehyde_ppm, reverse=True), abs=1e-3
+        )
+        assert [peak.ppm for peak in spectrum.imine_peaks] == pytest.approx(
+            sorted(synthetic_reaction.imine_ppm, reverse=True), abs=1e-3
+        )
+
+        with (
+            tmp_path / "turbidity" / name / "turbidity_data.json"
+        ).open() as f:
+            turbidity = json.load(f)
+        assert (
+            cagey.turbidity.get_turbid_state(
+                turbidity["turbidity_data"],
+                turbidity["turbidity_dissolved_reference"],
+            )
+            is synthetic_reaction.turbid_state
+        )
+
+    assert {len(r.topologies) for r in synthetic_reactions} == {0, 1, 2}
+    assert {r.turbid_state for r in synthetic_reactions} == set(TurbidState)
+
+
+def test_write_tools(
+    plates: sqlite3.Connection,
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    reaction_key = ReactionKey("SY-01-001", 1, 1)
+    cagey.testing.write_data(tmp_path, plates, reactions=[reaction_key])
+    cagey.testing.write_tools(tmp_path / "bin")
+    monkeypatch.setenv(
+        "PATH", f"{tmp_path / 'bin'}{os.pathsep}{os.environ['PATH']}"
+    )
+    machine_data = tmp_path / "ms" / "SY-01-001_01_01.d"
+    csv = cagey.ms.mzml_to_csv(
+        cagey.ms.machine_data_to_mzml(machine_data),
+        tmp_path / "bin" / "MZmine",
+    )
+    assert ReactionKey.from_ms_path(csv) == reaction_key
+    assert cagey.ms.read_features(csv).equals(
+        cagey.ms.read_features(machine_data / "AcqData" / "features.csv")
+    )
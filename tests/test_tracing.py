@@ -0,0 +1,74 @@
+import json
+import os
+import sqlite3
+from pathlib import Path
+
+import cagey
+from cagey import Precursor
+
+
+def test_collect() -> None:
+    with cagey.tracing.collect(enabled=False) as spans:
+        with cagey.tracing.span("outer"):
+            pass
+        assert not cagey.tracing.is_enabled()
+    assert spans == []
+
+    with cagey.tracing.collect() as spans:
+        assert cagey.tracing.is_enabled()
+        with cagey.tracing.span("outer", path="a"):
+            with (
+                cagey.tracing.collect() as inner_spans,
+                cagey.tracing.span("inner"),
+            ):
+                pass
+            cagey.tracing.record(inner_spans)
+    assert not cagey.tracing.is_enabled()
+    assert [span.name for span in spans] == ["inner", "outer"]
+    inner, outer = spans
+    assert outer.args == {"path": "a"}
+    assert outer.pid == os.getpid()
+    assert outer.start_ns <= inner.start_ns
+    assert (
+        inner.start_ns + inner.duration_ns
+        <= outer.start_ns + outer.duration_ns
+    )
+
+
+def test_traced_queries(connection: sqlite3.Connection) -> None:
+    with cagey.tracing.collect() as spans:
+        cagey.queries.insert_precursors(
+            connection, [Precursor("Di2", "O=Cc1ccc(C=O)cc1")]
+        )
+    assert [span.name for span in spans] == ["queries.insert_precursors"]
+
+
+def test_write_chrome_trace(tmp_path: Path) -> None:
+    with cagey.tracing.collect() as spans:
+        for _ in range(3):
+            with cagey.tracing.span("ms.get_peaks", path=tmp_path):
+                pass
+        with cagey.tracing.span("nmr.get_spectrum"):
+            pass
+
+    path = tmp_path / "trace.json"
+    cagey.tracing.write_chrome_trace(path, spans)
+    with path.open() as file:
+        events = json.load(file)["traceEvents"]
+    assert events[0] == {
+        "name": "process_name",
+        "ph": "M",
+        "pid": os.getpid(),
+        "args": {"name": "cagey"},
+    }
+    assert [event["cat"] for event in events[1:]] == ["ms"] * 3 + ["nmr"]
+    assert events[1]["ts"] == 0
+    assert events[1]["args"] == {"path": str(tmp_path)}
+    assert all(event["ph"] == "X" for event in events[1:])
+
+    summary = cagey.tracing.summarize(spans).sort("name")
+    assert summary.get_column("name").to_list() == [
+        "ms.get_peaks",
+        "nmr.get_spectrum",
+    ]
+    assert summary.row(0, named=True)["calls"] == 3  # noqa: PLR2004
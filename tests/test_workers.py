@@ -0,0 +1,88 @@
+import math
+import os
+import time
+from itertools import pairwise
+
+import pytest
+
+import cagey
+from cagey.workers import THREAD_VARIABLES
+
+
+def _pid(_: int) -> int:
+    return os.getpid()
+
+
+def _thread_variables(_: int) -> dict[str, str | None]:
+    return {name: os.environ.get(name) for name in THREAD_VARIABLES}
+
+
+def _interval(_: int) -> tuple[float, float]:
+    start = time.monotonic()
+    time.sleep(0.05)
+    return start, time.monotonic()
+
+
+def test_imap_unordered() -> None:
+    with cagey.workers.WorkerPool(2, modules=()) as pool:
+        assert sorted(pool.imap_unordered(abs, range(-1000, 0))) == list(
+            range(1, 1001)
+        )
+        assert list(pool.imap_unordered(abs, [])) == []
+        with pytest.raises(ValueError, match="math domain error"):
+            list(pool.imap_unordered(math.sqrt, [4.0, -1.0, 9.0]))
+
+
+def test_workers_are_replaced() -> None:
+    with cagey.workers.WorkerPool(
+        2, modules=(), max_chunks_per_worker=1
+    ) as pool:
+        pids = set(pool.imap_unordered(_pid, range(10)))
+    assert len(pids) > 2  # noqa: PLR2004
+    assert os.getpid() not in pids
+
+
+def test_threads() -> None:
+    before = _thread_variables(0)
+    with cagey.workers.WorkerPool(2, cpus=5, modules=()) as pool:
+        assert pool.threads == 2  # noqa: PLR2004
+        variables = list(pool.imap_unordered(_thread_variables, range(4)))
+    assert variables == [dict.fromkeys(THREAD_VARIABLES, "2")] * 4
+    assert _thread_variables(0) == before
+
+
+def test_memory_admission_estimate() -> None:
+    admission = cagey.workers.MemoryAdmission[int](
+        lambda job: job, budget_bytes=2000, default_job_bytes=7
+    )
+    assert admission.estimate(100) == 7  # noqa: PLR2004
+    admission.observe(100, 1100)
+    assert admission.estimate(400) == 1100  # noqa: PLR2004
+    admission.observe(200, 1200)
+    admission.observe(300, 1400)
+    assert admission.estimate(400) == 1550  # noqa: PLR2004
+
+    assert admission.admit(1500)
+    assert not admission.admit(1000)
+    assert admission.admit(1000, force=True)
+    admission.release(1000)
+    admission.release(1500)
+    assert admission.in_use_bytes == 0
+    assert admission.deferred == 1
+
+
+def test_imap_unordered_admission() -> None:
+    admission = cagey.workers.MemoryAdmission[int](
+        lambda _: 0,
+        budget_bytes=100,
+        reserve_bytes=0,
+        default_job_bytes=100,
+    )
+    with cagey.workers.WorkerPool(2, modules=()) as pool:
+        intervals = sorted(
+            pool.imap_unordered(_interval, range(4), admission=admission)
+        )
+    assert len(intervals) == 4  # noqa: PLR2004
+    assert all(end <= start for (_, end), (start, _) in pairwise(intervals))
+    assert admission.in_use_bytes == 0
+    assert admission.deferred > 0